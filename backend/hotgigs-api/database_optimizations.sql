@@ -275,6 +275,169 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
+-- Create generic grouped count function: one round trip returns the row
+-- counts per distinct value of each requested column. Filters are a JSON
+-- object of column -> value (or array of values) equality conditions.
+CREATE OR REPLACE FUNCTION count_grouped(
+    table_name TEXT,
+    group_columns TEXT[],
+    filters JSONB DEFAULT '{}'::JSONB
+)
+RETURNS TABLE (
+    group_column TEXT,
+    group_value TEXT,
+    row_count BIGINT
+) AS $$
+DECLARE
+    where_clause TEXT := 'TRUE';
+    filter_key TEXT;
+    filter_value JSONB;
+    group_column_name TEXT;
+    column_type TEXT;
+    query TEXT := '';
+BEGIN
+    -- Filters compare against the uncast column so its indexes stay usable;
+    -- literals are coerced to the column's type
+    FOR filter_key, filter_value IN SELECT * FROM jsonb_each(COALESCE(filters, '{}'::JSONB)) LOOP
+        IF jsonb_typeof(filter_value) = 'array' THEN
+            SELECT format_type(a.atttypid, a.atttypmod) INTO column_type
+            FROM pg_attribute a
+            WHERE a.attrelid = format('public.%I', table_name)::REGCLASS
+              AND a.attname = filter_key
+              AND NOT a.attisdropped;
+            IF column_type IS NULL THEN
+                RAISE EXCEPTION 'Unknown column % on %', filter_key, table_name;
+            END IF;
+            where_clause := where_clause || format(
+                ' AND %I = ANY(%L::%s[])',
+                filter_key, ARRAY(SELECT jsonb_array_elements_text(filter_value))::TEXT, column_type
+            );
+        ELSIF jsonb_typeof(filter_value) = 'null' THEN
+            where_clause := where_clause || format(' AND %I IS NULL', filter_key);
+        ELSE
+            where_clause := where_clause || format(' AND %I = %L', filter_key, filter_value #>> '{}');
+        END IF;
+    END LOOP;
+
+    FOREACH group_column_name IN ARRAY group_columns LOOP
+        IF query <> '' THEN
+            query := query || ' UNION ALL ';
+        END IF;
+        query := query || format(
+            'SELECT %L::TEXT, %I::TEXT, COUNT(*)::BIGINT FROM public.%I WHERE %s GROUP BY %I',
+            group_column_name, group_column_name, table_name, where_clause, group_column_name
+        );
+    END LOOP;
+
+    RETURN QUERY EXECUTE query;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+-- Only the backend service role may run dynamic counts
+REVOKE EXECUTE ON FUNCTION count_grouped(TEXT, TEXT[], JSONB) FROM PUBLIC, anon, authenticated;
+
+-- Create function for company dashboard analytics: per-status job and
+-- application counts across a set of companies in a single round trip
+CREATE OR REPLACE FUNCTION get_company_analytics(
+    company_ids UUID[],
+    since_date TIMESTAMPTZ DEFAULT NULL
+)
+RETURNS TABLE (
+    entity TEXT,
+    status TEXT,
+    total INTEGER,
+    recent INTEGER
+) AS $$
+BEGIN
+    RETURN QUERY
+    SELECT 
+        'jobs'::TEXT,
+        j.status::TEXT,
+        COUNT(*)::INTEGER,
+        (COUNT(*) FILTER (WHERE since_date IS NULL OR j.created_at >= since_date))::INTEGER
+    FROM public.jobs j
+    WHERE j.company_id = ANY(company_ids)
+    GROUP BY j.status
+    UNION ALL
+    SELECT 
+        'applications'::TEXT,
+        ja.status::TEXT,
+        COUNT(*)::INTEGER,
+        (COUNT(*) FILTER (WHERE since_date IS NULL OR ja.applied_at >= since_date))::INTEGER
+    FROM public.job_applications ja
+    JOIN public.jobs j ON ja.job_id = j.id
+    WHERE j.company_id = ANY(company_ids)
+    GROUP BY ja.status;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+-- Create function for the most recent applications across a set of companies
+CREATE OR REPLACE FUNCTION get_company_recent_applications(
+    company_ids UUID[],
+    limit_count INTEGER DEFAULT 5
+)
+RETURNS SETOF public.job_applications AS $$
+BEGIN
+    RETURN QUERY
+    SELECT ja.*
+    FROM public.job_applications ja
+    JOIN public.jobs j ON ja.job_id = j.id
+    WHERE j.company_id = ANY(company_ids)
+    ORDER BY ja.applied_at DESC
+    LIMIT limit_count;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+-- Create function for candidate search with skill, salary and remote filters
+-- applied in the database so a page always holds exactly limit_count rows
+CREATE OR REPLACE FUNCTION search_candidate_profiles(
+    location_filter TEXT DEFAULT NULL,
+    experience_level_filter TEXT DEFAULT NULL,
+    availability_filter TEXT DEFAULT NULL,
+    skills_filter TEXT[] DEFAULT NULL,
+    salary_min_filter INTEGER DEFAULT NULL,
+    salary_max_filter INTEGER DEFAULT NULL,
+    remote_only BOOLEAN DEFAULT FALSE,
+    limit_count INTEGER DEFAULT 20,
+    offset_count INTEGER DEFAULT 0
+)
+RETURNS SETOF public.candidate_profiles AS $$
+BEGIN
+    RETURN QUERY
+    SELECT cp.*
+    FROM public.candidate_profiles cp
+    JOIN public.users u ON u.id = cp.user_id
+    WHERE 
+        (location_filter IS NULL OR cp.location = location_filter)
+        AND (experience_level_filter IS NULL OR cp.experience_level = experience_level_filter)
+        AND (availability_filter IS NULL OR cp.availability = availability_filter)
+        AND (skills_filter IS NULL OR cardinality(skills_filter) = 0 OR EXISTS (
+            SELECT 1 FROM public.candidate_skills cs
+            WHERE cs.candidate_id = cp.id
+                AND lower(cs.skill_name) = ANY (SELECT lower(s) FROM unnest(skills_filter) AS s)
+        ))
+        AND (salary_min_filter IS NULL OR cp.desired_salary_max IS NULL OR cp.desired_salary_max >= salary_min_filter)
+        AND (salary_max_filter IS NULL OR cp.desired_salary_min IS NULL OR cp.desired_salary_min <= salary_max_filter)
+        AND (NOT remote_only OR cp.remote_preference)
+    ORDER BY cp.updated_at DESC
+    LIMIT limit_count
+    OFFSET offset_count;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+CREATE INDEX IF NOT EXISTS idx_candidate_skills_lower_skill_name ON public.candidate_skills(lower(skill_name), candidate_id);
+CREATE INDEX IF NOT EXISTS idx_candidate_profiles_updated_at ON public.candidate_profiles(updated_at DESC);
+
+-- Per-turn AI interview responses: each answer is one appended row instead of
+-- a rewrite of the whole transcript on the interview_sessions row
+CREATE TABLE IF NOT EXISTS public.interview_responses (
+    session_id UUID NOT NULL,
+    question_index INTEGER NOT NULL,
+    response JSONB NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (session_id, question_index)
+);
+
 -- Enable row level security optimizations
 ALTER TABLE public.users ENABLE ROW LEVEL SECURITY;
 ALTER TABLE public.jobs ENABLE ROW LEVEL SECURITY;
@@ -160,6 +160,28 @@ class SupabaseService:
             logger.error(f"Error counting records in {table}: {str(e)}")
             raise
     
+    def count_grouped(self, table: str, group_by: Union[str, List[str]],
+                      filters: Optional[Dict[str, Any]] = None) -> Dict[Any, Any]:
+        """Count records per distinct value of one or more columns in a single round trip"""
+        try:
+            columns = [group_by] if isinstance(group_by, str) else list(group_by)
+            
+            result = self.client.rpc('count_grouped', {
+                'table_name': table,
+                'group_columns': columns,
+                'filters': filters or {}
+            }).execute()
+            
+            buckets = {column: {} for column in columns}
+            for row in result.data or []:
+                buckets[row['group_column']][row['group_value']] = row['row_count']
+            
+            return buckets[columns[0]] if isinstance(group_by, str) else buckets
+            
+        except Exception as e:
+            logger.error(f"Error counting grouped records in {table}: {str(e)}")
+            raise
+    
     # User-specific operations
     def create_user(self, name: str = None, email: str = None, password: str = None, 
                    role: str = "candidate", user_data: Dict[str, Any] = None) -> Optional[str]:
@@ -375,12 +397,11 @@ class SupabaseService:
                 stats['total_users'] = 0
                 stats['active_users'] = 0
             
-            # Job stats
+            # Job stats (total and active from one grouped count)
             try:
-                job_count = self.count_records('jobs')
-                active_job_count = self.count_records('jobs', {'status': 'active'})
-                stats['total_jobs'] = job_count
-                stats['active_jobs'] = active_job_count
+                job_counts = self.count_grouped('jobs', 'status')
+                stats['total_jobs'] = sum(job_counts.values())
+                stats['active_jobs'] = job_counts.get('active', 0)
             except:
                 stats['total_jobs'] = 0
                 stats['active_jobs'] = 0
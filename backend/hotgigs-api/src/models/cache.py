@@ -0,0 +1,239 @@
+"""
+Query Cache for HotGigs.ai
+Bounded, thread-safe LRU cache with per-entry TTLs and tag-based invalidation
+used by the database services
+"""
+
+import os
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Any, Iterable, Set
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_size(value: Any) -> int:
+    """Estimate the in-memory footprint of a cached value in bytes"""
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return len(repr(value))
+
+
+class _CacheEntry:
+    """Single cached value with its expiry, accounted size and dependency tags"""
+
+    __slots__ = ('value', 'expires_at', 'size', 'tags')
+
+    def __init__(self, value: Any, expires_at: float, size: int, tags: frozenset):
+        self.value = value
+        self.expires_at = expires_at
+        self.size = size
+        self.tags = tags
+
+
+class _CacheShard:
+    """One lock-protected LRU segment of the cache"""
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.lock = threading.Lock()
+        self.entries: 'OrderedDict[str, _CacheEntry]' = OrderedDict()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.bytes = 0
+
+
+class QueryCache:
+    """Size- and byte-bounded LRU cache with TTL expiry, lock striping and tag invalidation
+
+    Entries may be tagged with the tables and records they were derived from.
+    A reverse index from tag to keys lets writers invalidate exactly the
+    dependent entries without scanning the whole cache.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None,
+                 default_ttl: Optional[int] = None, shards: Optional[int] = None):
+        """Initialize cache limits, falling back to environment configuration"""
+        self.max_entries = max_entries or int(os.getenv('DB_CACHE_MAX_ENTRIES', 5000))
+        self.max_bytes = max_bytes or int(os.getenv('DB_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+        self.default_ttl = default_ttl or int(os.getenv('DB_CACHE_TTL', 300))
+        shard_count = shards or int(os.getenv('DB_CACHE_SHARDS', 16))
+
+        # Each shard owns an equal slice of the global limits
+        per_shard_entries = max(1, self.max_entries // shard_count)
+        per_shard_bytes = max(1, self.max_bytes // shard_count)
+        self._shards = [_CacheShard(per_shard_entries, per_shard_bytes) for _ in range(shard_count)]
+
+        # Reverse index from tag to the keys depending on it. Lock order is
+        # always shard lock first, then the tag lock.
+        self._tag_lock = threading.Lock()
+        self._tag_index: Dict[str, Set[str]] = {}
+
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'sets': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'rejected': 0,
+            'invalidations': 0
+        }
+
+    def _shard_for(self, key: str) -> _CacheShard:
+        """Select the shard responsible for a key"""
+        return self._shards[hash(key) % len(self._shards)]
+
+    def _incr(self, counter: str, amount: int = 1):
+        """Increment a statistics counter"""
+        with self._stats_lock:
+            self._stats[counter] += amount
+
+    def _remove_entry(self, shard: _CacheShard, key: str) -> Optional[_CacheEntry]:
+        """Remove a key from a shard and the tag index; caller must hold the shard lock"""
+        entry = shard.entries.pop(key, None)
+        if entry is not None:
+            shard.bytes -= entry.size
+            if entry.tags:
+                self._untag(key, entry.tags)
+        return entry
+
+    def _untag(self, key: str, tags: Iterable[str]):
+        """Drop a key from the reverse index of each of its tags"""
+        with self._tag_lock:
+            for tag in tags:
+                keys = self._tag_index.get(tag)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._tag_index[tag]
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return a cached value, or None if missing or expired"""
+        shard = self._shard_for(key)
+        with shard.lock:
+            entry = shard.entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                self._remove_entry(shard, key)
+                entry = None
+                self._incr('expirations')
+            if entry is not None:
+                shard.entries.move_to_end(key)
+                value = entry.value
+
+        if entry is None:
+            self._incr('misses')
+            return None
+
+        self._incr('hits')
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None,
+            tags: Optional[Iterable[str]] = None):
+        """Store a value, evicting least recently used entries to stay within limits"""
+        size = estimate_size(value) + len(key)
+        shard = self._shard_for(key)
+
+        if size > shard.max_bytes:
+            # A single oversized value would flush the whole shard; skip caching it
+            self._incr('rejected')
+            logger.debug(f"Cache value for {key} too large to store ({size} bytes)")
+            return
+
+        expires_at = time.monotonic() + (ttl if ttl is not None else self.default_ttl)
+        entry_tags = frozenset(tags) if tags else frozenset()
+        evicted = 0
+
+        with shard.lock:
+            self._remove_entry(shard, key)
+            shard.entries[key] = _CacheEntry(value, expires_at, size, entry_tags)
+            shard.bytes += size
+            if entry_tags:
+                with self._tag_lock:
+                    for tag in entry_tags:
+                        self._tag_index.setdefault(tag, set()).add(key)
+
+            while len(shard.entries) > shard.max_entries or shard.bytes > shard.max_bytes:
+                oldest_key = next(iter(shard.entries))
+                self._remove_entry(shard, oldest_key)
+                evicted += 1
+
+        self._incr('sets')
+        if evicted:
+            self._incr('evictions', evicted)
+
+    def delete(self, key: str) -> bool:
+        """Remove a key from the cache"""
+        shard = self._shard_for(key)
+        with shard.lock:
+            return self._remove_entry(shard, key) is not None
+
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        """Remove every entry carrying any of the given tags and return the count"""
+        with self._tag_lock:
+            keys: Set[str] = set()
+            for tag in tags:
+                keys.update(self._tag_index.pop(tag, ()))
+
+        removed = 0
+        for key in keys:
+            if self.delete(key):
+                removed += 1
+
+        if removed:
+            self._incr('invalidations', removed)
+        return removed
+
+    def purge_expired(self) -> int:
+        """Drop all expired entries and return how many were removed"""
+        now = time.monotonic()
+        removed = 0
+        for shard in self._shards:
+            with shard.lock:
+                expired_keys = [k for k, e in shard.entries.items() if e.expires_at <= now]
+                for key in expired_keys:
+                    self._remove_entry(shard, key)
+                removed += len(expired_keys)
+
+        if removed:
+            self._incr('expirations', removed)
+        return removed
+
+    def keys(self) -> List[str]:
+        """Snapshot of all keys currently held"""
+        result = []
+        for shard in self._shards:
+            with shard.lock:
+                result.extend(shard.entries.keys())
+        return result
+
+    def clear(self):
+        """Remove every entry from the cache"""
+        for shard in self._shards:
+            with shard.lock:
+                shard.entries.clear()
+                shard.bytes = 0
+        with self._tag_lock:
+            self._tag_index.clear()
+
+    def __len__(self) -> int:
+        return sum(len(shard.entries) for shard in self._shards)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache occupancy and hit/miss/eviction counters"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+
+        lookups = stats['hits'] + stats['misses']
+        stats.update({
+            'entries': len(self),
+            'tags': len(self._tag_index),
+            'bytes': sum(shard.bytes for shard in self._shards),
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'hit_rate': round(stats['hits'] / lookups, 4) if lookups else 0.0
+        })
+        return stats
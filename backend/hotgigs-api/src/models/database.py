@@ -9,6 +9,7 @@ from typing import Dict, List, Optional, Any, Union
 from datetime import datetime, timezone
 from supabase import create_client, Client
 from dotenv import load_dotenv
+from src.models.registry import registry
 
 # Load environment variables
 load_dotenv()
@@ -20,15 +21,17 @@ logger = logging.getLogger(__name__)
 class SupabaseService:
     """Supabase database service for HotGigs.ai"""
     
-    def __init__(self):
+    def __init__(self, client: Optional[Client] = None):
         """Initialize Supabase client"""
         self.url = os.getenv('SUPABASE_URL')
         self.key = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
         
-        if not self.url or not self.key:
-            raise ValueError("Missing Supabase configuration. Please set SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY")
+        if client is None:
+            if not self.url or not self.key:
+                raise ValueError("Missing Supabase configuration. Please set SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY")
+            client = create_client(self.url, self.key)
         
-        self.client: Client = create_client(self.url, self.key)
+        self.client: Client = client
         logger.info("Supabase client initialized successfully")
     
     def get_client(self) -> Client:
@@ -398,9 +401,9 @@ class SupabaseService:
             }
 
 # Global instance function
-def get_database_service():
-    """Get database service instance"""
-    return SupabaseService()
+def get_database_service() -> SupabaseService:
+    """Get the shared database service instance"""
+    return registry.get_service('database', SupabaseService)
 
 # Backward compatibility
 DatabaseService = SupabaseService
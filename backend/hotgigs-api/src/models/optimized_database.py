@@ -6,13 +6,17 @@ Optimized version with performance improvements, connection pooling, and caching
 import os
 import logging
 import asyncio
-from typing import Dict, List, Optional, Any, Union
+from typing import Dict, List, Optional, Any, Union, Iterator
 from datetime import datetime, timezone, timedelta
 from functools import lru_cache
 import json
 from supabase import create_client, Client
+from postgrest.types import ReturnMethod
 from dotenv import load_dotenv
+from werkzeug.local import LocalProxy
 import time
+from src.models.cache import QueryCache
+from src.models.registry import registry
 
 # Load environment variables
 load_dotenv()
@@ -21,6 +25,36 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Foreign-key style columns whose values scope cached reads more narrowly than
+# the whole table, e.g. a user's notifications or a company's jobs
+TAGGED_COLUMNS = {
+    'jobs': ('company_id',),
+    'job_applications': ('job_id', 'candidate_id'),
+    'candidate_profiles': ('user_id',),
+    'candidate_skills': ('candidate_id',),
+    'work_experiences': ('candidate_id',),
+    'education': ('candidate_id',),
+    'notifications': ('user_id',),
+    'documents': ('user_id',),
+    'company_members': ('company_id', 'user_id'),
+}
+
+def table_tag(table: str) -> str:
+    """Tag for reads that scan a table without a scoping filter"""
+    return f"table:{table}"
+
+def all_tag(table: str) -> str:
+    """Tag carried by every cache entry derived from a table"""
+    return f"all:{table}"
+
+def record_tag(table: str, record_id: Any) -> str:
+    """Tag for reads of a single record"""
+    return f"record:{table}:{record_id}"
+
+def column_tag(table: str, column: str, value: Any) -> str:
+    """Tag for reads scoped to a tracked column value"""
+    return f"column:{table}.{column}={value}"
+
 class PerformanceMonitor:
     """Monitor and log database performance metrics"""
     
@@ -59,18 +93,20 @@ class PerformanceMonitor:
 class OptimizedSupabaseService:
     """Enhanced Supabase database service with performance optimizations"""
     
-    def __init__(self):
+    def __init__(self, client: Optional[Client] = None):
         """Initialize Supabase client with optimizations"""
         self.url = os.getenv('SUPABASE_URL')
         self.key = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
         
-        if not self.url or not self.key:
-            raise ValueError("Missing Supabase configuration. Please set SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY")
+        if client is None:
+            if not self.url or not self.key:
+                raise ValueError("Missing Supabase configuration. Please set SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY")
+            client = create_client(self.url, self.key)
         
-        self.client: Client = create_client(self.url, self.key)
+        self.client: Client = client
         self.performance_monitor = PerformanceMonitor()
-        self._cache = {}
-        self._cache_ttl = 300  # 5 minutes default TTL
+        self._cache_ttl = int(os.getenv('DB_CACHE_TTL', 300))  # 5 minutes default TTL
+        self._cache = QueryCache(default_ttl=self._cache_ttl)
         
         logger.info("Optimized Supabase client initialized successfully")
     
@@ -100,21 +136,73 @@ class OptimizedSupabaseService:
     
     def _get_from_cache(self, cache_key: str) -> Optional[Any]:
         """Get data from cache if not expired"""
-        if cache_key in self._cache:
-            data, timestamp = self._cache[cache_key]
-            if datetime.now(timezone.utc) - timestamp < timedelta(seconds=self._cache_ttl):
-                logger.debug(f"Cache hit for {cache_key}")
-                return data
-            else:
-                del self._cache[cache_key]
-        return None
+        data = self._cache.get(cache_key)
+        if data is not None:
+            logger.debug(f"Cache hit for {cache_key}")
+        return data
     
-    def _set_cache(self, cache_key: str, data: Any, ttl: Optional[int] = None):
-        """Set data in cache"""
-        self._cache[cache_key] = (data, datetime.now(timezone.utc))
-        if ttl:
-            # Custom TTL implementation could be added here
-            pass
+    def _set_cache(self, cache_key: str, data: Any, ttl: Optional[int] = None,
+                   tags: Optional[List[str]] = None):
+        """Set data in cache with an optional per-entry TTL and dependency tags"""
+        self._cache.set(cache_key, data, ttl=ttl, tags=tags)
+    
+    def _read_tags(self, table: str, filters: Optional[Dict[str, Any]] = None) -> List[str]:
+        """Dependency tags for a read of a table with optional equality filters"""
+        tags = [all_tag(table)]
+        scoped = False
+        
+        for column in TAGGED_COLUMNS.get(table, ()):
+            if filters and column in filters:
+                values = filters[column] if isinstance(filters[column], list) else [filters[column]]
+                tags.extend(column_tag(table, column, v) for v in values)
+                scoped = True
+                break
+        
+        if not scoped:
+            tags.append(table_tag(table))
+        return tags
+    
+    def _write_tags(self, table: str, rows: List[Dict[str, Any]],
+                    changed_columns: Optional[List[str]] = None) -> List[str]:
+        """Tags invalidated by a write that produced or touched the given rows"""
+        tracked = TAGGED_COLUMNS.get(table, ())
+        
+        # If a tracked column itself changed we cannot know the old value,
+        # so every entry derived from the table has to go
+        if changed_columns and any(c in tracked for c in changed_columns):
+            return [all_tag(table)]
+        
+        tags = [table_tag(table)]
+        for row in rows:
+            if row.get('id') is not None:
+                tags.append(record_tag(table, row['id']))
+            for column in tracked:
+                if row.get(column) is not None:
+                    tags.append(column_tag(table, column, row[column]))
+        return tags
+    
+    def _filter_write_tags(self, table: str, filters: Dict[str, Any],
+                           changed_columns: Optional[List[str]] = None) -> List[str]:
+        """Tags invalidated by a set-based write whose rows are only known by filter"""
+        tracked = TAGGED_COLUMNS.get(table, ())
+        
+        if changed_columns and any(c in tracked for c in changed_columns):
+            return [all_tag(table)]
+        
+        for column in tracked:
+            if column in filters:
+                values = filters[column] if isinstance(filters[column], list) else [filters[column]]
+                return [table_tag(table)] + [column_tag(table, column, v) for v in values]
+        
+        # Without a tracked column we cannot tell which records were touched
+        return [all_tag(table)]
+    
+    def _invalidate_rows(self, table: str, rows: List[Dict[str, Any]],
+                         changed_columns: Optional[List[str]] = None):
+        """Invalidate exactly the cache entries that depend on the written rows"""
+        removed = self._cache.invalidate_tags(self._write_tags(table, rows, changed_columns))
+        if removed:
+            logger.debug(f"Invalidated {removed} cache entries for {table}")
     
     def get_client(self) -> Client:
         """Get the Supabase client instance"""
@@ -165,8 +253,11 @@ class OptimizedSupabaseService:
             
             jobs = result.data or []
             
-            # Cache the result
-            self._set_cache(cache_key, jobs)
+            # Cache the result; any job or company write can change it
+            self._set_cache(cache_key, jobs, tags=[
+                all_tag('jobs'), table_tag('jobs'),
+                all_tag('companies'), table_tag('companies')
+            ])
             
             duration = time.time() - start_time
             self.performance_monitor.log_query_time("search_jobs_optimized", duration, "jobs")
@@ -179,6 +270,146 @@ class OptimizedSupabaseService:
             logger.error(f"Error in optimized job search: {str(e)}")
             raise
     
+    # Aggregated company analytics
+    def get_company_analytics_optimized(self, company_ids: List[str],
+                                        since: Optional[datetime] = None) -> Dict[str, Dict[str, Dict[str, int]]]:
+        """Get per-status job and application counts for a set of companies"""
+        start_time = time.time()
+        
+        try:
+            # Round the window start so repeated dashboard loads share a cache entry
+            since_date = since.replace(second=0, microsecond=0).isoformat() if since else None
+            company_ids = sorted(company_ids)
+            
+            cache_key = self._get_cache_key("company_analytics", company_ids=company_ids, since=since_date)
+            cached_result = self._get_from_cache(cache_key)
+            if cached_result is not None:
+                return cached_result
+            
+            result = self.client.rpc('get_company_analytics', {
+                'company_ids': company_ids,
+                'since_date': since_date
+            }).execute()
+            
+            analytics = {'jobs': {}, 'applications': {}}
+            for row in result.data or []:
+                analytics.setdefault(row['entity'], {})[row['status']] = {
+                    'total': row['total'],
+                    'recent': row['recent']
+                }
+            
+            self._set_cache(cache_key, analytics, tags=[
+                all_tag('jobs'), *[column_tag('jobs', 'company_id', c) for c in company_ids],
+                all_tag('job_applications'), table_tag('job_applications')
+            ])
+            
+            duration = time.time() - start_time
+            self.performance_monitor.log_query_time("get_company_analytics", duration, "jobs")
+            
+            return analytics
+            
+        except Exception as e:
+            duration = time.time() - start_time
+            self.performance_monitor.log_query_time("get_company_analytics_ERROR", duration, "jobs")
+            logger.error(f"Error getting company analytics: {str(e)}")
+            raise
+    
+    def get_company_recent_applications(self, company_ids: List[str], limit: int = 5) -> List[Dict[str, Any]]:
+        """Get the most recent applications across a set of companies"""
+        start_time = time.time()
+        
+        try:
+            company_ids = sorted(company_ids)
+            
+            cache_key = self._get_cache_key("company_recent_applications", company_ids=company_ids, limit=limit)
+            cached_result = self._get_from_cache(cache_key)
+            if cached_result is not None:
+                return cached_result
+            
+            result = self.client.rpc('get_company_recent_applications', {
+                'company_ids': company_ids,
+                'limit_count': limit
+            }).execute()
+            
+            applications = result.data or []
+            
+            self._set_cache(cache_key, applications, ttl=60, tags=[
+                all_tag('jobs'), *[column_tag('jobs', 'company_id', c) for c in company_ids],
+                all_tag('job_applications'), table_tag('job_applications')
+            ])
+            
+            duration = time.time() - start_time
+            self.performance_monitor.log_query_time("get_company_recent_applications", duration, "job_applications")
+            
+            return applications
+            
+        except Exception as e:
+            duration = time.time() - start_time
+            self.performance_monitor.log_query_time("get_company_recent_applications_ERROR", duration, "job_applications")
+            logger.error(f"Error getting recent company applications: {str(e)}")
+            raise
+    
+    # Optimized candidate search using the new database function
+    def search_candidates_optimized(self, location: Optional[str] = None,
+                                    experience_level: Optional[str] = None,
+                                    availability: Optional[str] = None,
+                                    skills: Optional[List[str]] = None,
+                                    salary_min: Optional[int] = None,
+                                    salary_max: Optional[int] = None,
+                                    remote_only: bool = False,
+                                    limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
+        """Candidate search with all filters applied in the database"""
+        start_time = time.time()
+        
+        try:
+            cache_key = self._get_cache_key(
+                "search_candidates",
+                location=location,
+                experience_level=experience_level,
+                availability=availability,
+                skills=sorted(s.lower() for s in skills) if skills else None,
+                salary_min=salary_min,
+                salary_max=salary_max,
+                remote_only=remote_only,
+                limit=limit,
+                offset=offset
+            )
+            
+            cached_result = self._get_from_cache(cache_key)
+            if cached_result is not None:
+                return cached_result
+            
+            result = self.client.rpc('search_candidate_profiles', {
+                'location_filter': location,
+                'experience_level_filter': experience_level,
+                'availability_filter': availability,
+                'skills_filter': skills or None,
+                'salary_min_filter': salary_min,
+                'salary_max_filter': salary_max,
+                'remote_only': remote_only,
+                'limit_count': limit,
+                'offset_count': offset
+            }).execute()
+            
+            profiles = result.data or []
+            
+            self._set_cache(cache_key, profiles, tags=[
+                all_tag('candidate_profiles'), table_tag('candidate_profiles'),
+                all_tag('candidate_skills'), table_tag('candidate_skills'),
+                all_tag('users'), table_tag('users')
+            ])
+            
+            duration = time.time() - start_time
+            self.performance_monitor.log_query_time("search_candidate_profiles", duration, "candidate_profiles")
+            
+            return profiles
+            
+        except Exception as e:
+            duration = time.time() - start_time
+            self.performance_monitor.log_query_time("search_candidate_profiles_ERROR", duration, "candidate_profiles")
+            logger.error(f"Error in optimized candidate search: {str(e)}")
+            raise
+    
     # Optimized user applications
     def get_user_applications_optimized(self, user_id: str) -> List[Dict[str, Any]]:
         """Get user applications using optimized database function"""
@@ -197,7 +428,10 @@ class OptimizedSupabaseService:
             applications = result.data or []
             
             # Cache with shorter TTL for user-specific data
-            self._set_cache(cache_key, applications)
+            self._set_cache(cache_key, applications, ttl=60, tags=[
+                all_tag('job_applications'), table_tag('job_applications'),
+                all_tag('jobs'), table_tag('jobs')
+            ])
             
             duration = time.time() - start_time
             self.performance_monitor.log_query_time("get_user_applications_optimized", duration, "job_applications")
@@ -228,7 +462,11 @@ class OptimizedSupabaseService:
             stats = result.data[0] if result.data else {}
             
             # Cache company stats for longer
-            self._set_cache(cache_key, stats)
+            self._set_cache(cache_key, stats, ttl=900, tags=[
+                all_tag('companies'), record_tag('companies', company_id),
+                all_tag('jobs'), column_tag('jobs', 'company_id', company_id),
+                all_tag('job_applications'), table_tag('job_applications')
+            ])
             
             duration = time.time() - start_time
             self.performance_monitor.log_query_time("get_company_stats", duration, "companies")
@@ -255,7 +493,7 @@ class OptimizedSupabaseService:
             if result.data:
                 logger.info(f"Created record in {table}: {result.data[0].get('id', 'unknown')}")
                 # Invalidate related caches
-                self._invalidate_table_cache(table)
+                self._invalidate_rows(table, result.data)
                 return result.data[0]
             return None
             
@@ -285,7 +523,11 @@ class OptimizedSupabaseService:
             record = result.data[0] if result.data else None
             
             if record and use_cache:
-                self._set_cache(cache_key, record)
+                # Also tag by tracked columns so set-based writes scoped by them reach this entry
+                tags = [all_tag(table), record_tag(table, record_id)]
+                tags.extend(column_tag(table, column, record[column])
+                            for column in TAGGED_COLUMNS.get(table, ()) if record.get(column) is not None)
+                self._set_cache(cache_key, record, tags=tags)
             
             return record
             
@@ -311,8 +553,7 @@ class OptimizedSupabaseService:
             if result.data:
                 logger.info(f"Updated record in {table}: {record_id}")
                 # Invalidate caches
-                self._invalidate_record_cache(table, record_id)
-                self._invalidate_table_cache(table)
+                self._invalidate_rows(table, result.data, changed_columns=list(data.keys()))
                 return result.data[0]
             return None
             
@@ -322,21 +563,104 @@ class OptimizedSupabaseService:
             logger.error(f"Error updating record in {table}: {str(e)}")
             raise
     
+    def delete_record(self, table: str, record_id: str) -> bool:
+        """Delete a record with cache invalidation"""
+        start_time = time.time()
+        
+        try:
+            result = self.client.table(table).delete().eq('id', record_id).execute()
+            
+            duration = time.time() - start_time
+            self.performance_monitor.log_query_time("delete_record", duration, table)
+            
+            logger.info(f"Deleted record from {table}: {record_id}")
+            self._invalidate_rows(table, result.data or [{'id': record_id}])
+            return True
+            
+        except Exception as e:
+            duration = time.time() - start_time
+            self.performance_monitor.log_query_time("delete_record_ERROR", duration, table)
+            logger.error(f"Error deleting record from {table}: {str(e)}")
+            raise
+    
+    # Set-based operations for bulk changes
+    def _apply_filters(self, query, filters: Dict[str, Any]):
+        """Apply equality (or IN for list values) filters to a query"""
+        for key, value in filters.items():
+            if isinstance(value, list):
+                query = query.in_(key, value)
+            else:
+                query = query.eq(key, value)
+        return query
+    
+    def update_where(self, table: str, filters: Dict[str, Any], data: Dict[str, Any]) -> int:
+        """Update every record matching the filters in a single statement
+        
+        Returns the number of updated records.
+        """
+        if not filters:
+            raise ValueError("update_where requires at least one filter")
+        
+        start_time = time.time()
+        
+        try:
+            # Add updated_at timestamp
+            data['updated_at'] = datetime.now(timezone.utc).isoformat()
+            
+            query = self.client.table(table).update(data, count='exact', returning=ReturnMethod.minimal)
+            result = self._apply_filters(query, filters).execute()
+            
+            duration = time.time() - start_time
+            self.performance_monitor.log_query_time("update_where", duration, table)
+            
+            updated_count = result.count or 0
+            logger.info(f"Updated {updated_count} records in {table}")
+            
+            self._cache.invalidate_tags(self._filter_write_tags(table, filters, list(data.keys())))
+            return updated_count
+            
+        except Exception as e:
+            duration = time.time() - start_time
+            self.performance_monitor.log_query_time("update_where_ERROR", duration, table)
+            logger.error(f"Error updating records in {table}: {str(e)}")
+            raise
+    
+    def delete_where(self, table: str, filters: Dict[str, Any]) -> int:
+        """Delete every record matching the filters in a single statement
+        
+        Returns the number of deleted records.
+        """
+        if not filters:
+            raise ValueError("delete_where requires at least one filter")
+        
+        start_time = time.time()
+        
+        try:
+            query = self.client.table(table).delete(count='exact', returning=ReturnMethod.minimal)
+            result = self._apply_filters(query, filters).execute()
+            
+            duration = time.time() - start_time
+            self.performance_monitor.log_query_time("delete_where", duration, table)
+            
+            deleted_count = result.count or 0
+            logger.info(f"Deleted {deleted_count} records from {table}")
+            
+            self._cache.invalidate_tags(self._filter_write_tags(table, filters))
+            return deleted_count
+            
+        except Exception as e:
+            duration = time.time() - start_time
+            self.performance_monitor.log_query_time("delete_where_ERROR", duration, table)
+            logger.error(f"Error deleting records from {table}: {str(e)}")
+            raise
+    
     def _invalidate_record_cache(self, table: str, record_id: str):
         """Invalidate cache entries for a specific record"""
-        cache_key = self._get_cache_key("get_record", table=table, id=record_id)
-        if cache_key in self._cache:
-            del self._cache[cache_key]
+        self._cache.invalidate_tags([record_tag(table, record_id)])
     
     def _invalidate_table_cache(self, table: str):
-        """Invalidate cache entries related to a table"""
-        keys_to_remove = []
-        for key in self._cache.keys():
-            if table in key:
-                keys_to_remove.append(key)
-        
-        for key in keys_to_remove:
-            del self._cache[key]
+        """Invalidate every cache entry derived from a table"""
+        self._cache.invalidate_tags([all_tag(table)])
     
     # Batch operations for better performance
     def create_records_batch(self, table: str, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
@@ -351,7 +675,7 @@ class OptimizedSupabaseService:
             
             if result.data:
                 logger.info(f"Created {len(result.data)} records in {table}")
-                self._invalidate_table_cache(table)
+                self._invalidate_rows(table, result.data)
                 return result.data
             return []
             
@@ -413,7 +737,7 @@ class OptimizedSupabaseService:
             records = result.data or []
             
             if use_cache:
-                self._set_cache(cache_key, records)
+                self._set_cache(cache_key, records, tags=self._read_tags(table, filters))
             
             return records
             
@@ -423,10 +747,55 @@ class OptimizedSupabaseService:
             logger.error(f"Error getting records from {table}: {str(e)}")
             raise
     
+    def iter_records_keyset(self, table: str, filters: Optional[Dict[str, Any]] = None,
+                            select_fields: str = '*', key: str = 'id', page_size: int = 500,
+                            after: Optional[Any] = None) -> Iterator[List[Dict[str, Any]]]:
+        """Yield pages of records ordered by a unique key, resuming after the last key seen
+        
+        Each page is a range scan on the key's index, so late pages cost the
+        same as the first one (unlike OFFSET). Pages are not cached.
+        select_fields must include the key column.
+        """
+        last_key = after
+        while True:
+            start_time = time.time()
+            try:
+                query = self.client.table(table).select(select_fields)
+                if filters:
+                    query = self._apply_filters(query, filters)
+                if last_key is not None:
+                    query = query.gt(key, last_key)
+                result = query.order(key).limit(page_size).execute()
+                
+                duration = time.time() - start_time
+                self.performance_monitor.log_query_time("iter_records_keyset", duration, table)
+                
+            except Exception as e:
+                duration = time.time() - start_time
+                self.performance_monitor.log_query_time("iter_records_keyset_ERROR", duration, table)
+                logger.error(f"Error paging records from {table}: {str(e)}")
+                raise
+            
+            records = result.data or []
+            if records:
+                yield records
+            if len(records) < page_size:
+                return
+            last_key = records[-1][key]
+    
+    def get_records(self, table: str, filters: Optional[Dict[str, Any]] = None,
+                   limit: Optional[int] = None, offset: Optional[int] = None,
+                   order_by: Optional[str] = None, ascending: bool = True) -> List[Dict[str, Any]]:
+        """Backward compatible alias for get_records_optimized"""
+        return self.get_records_optimized(table, filters=filters, limit=limit, offset=offset,
+                                          order_by=order_by, ascending=ascending)
+    
     # Performance monitoring methods
     def get_performance_stats(self) -> Dict[str, Any]:
-        """Get performance statistics"""
-        return self.performance_monitor.get_performance_stats()
+        """Get performance statistics including cache counters"""
+        stats = self.performance_monitor.get_performance_stats()
+        stats['cache'] = self._cache.get_stats()
+        return stats
     
     def clear_cache(self):
         """Clear all cached data"""
@@ -519,11 +888,65 @@ class OptimizedSupabaseService:
             self.performance_monitor.log_query_time("count_records_ERROR", duration, table)
             logger.error(f"Error counting records in {table}: {str(e)}")
             raise
+    
+    def count_grouped(self, table: str, group_by: Union[str, List[str]],
+                      filters: Optional[Dict[str, Any]] = None,
+                      use_cache: bool = True) -> Dict[Any, Any]:
+        """Count records per distinct value of one or more columns in a single round trip
+        
+        Returns {value: count} when group_by is a column name, or
+        {column: {value: count}} when it is a list of columns.
+        """
+        start_time = time.time()
+        columns = [group_by] if isinstance(group_by, str) else list(group_by)
+        
+        try:
+            cache_key = self._get_cache_key(
+                "count_grouped",
+                table=table,
+                group_by=columns,
+                filters=str(filters)
+            )
+            
+            if use_cache:
+                cached_result = self._get_from_cache(cache_key)
+                if cached_result is not None:
+                    return cached_result
+            
+            result = self.client.rpc('count_grouped', {
+                'table_name': table,
+                'group_columns': columns,
+                'filters': filters or {}
+            }).execute()
+            
+            buckets = {column: {} for column in columns}
+            for row in result.data or []:
+                buckets[row['group_column']][row['group_value']] = row['row_count']
+            
+            counts = buckets[columns[0]] if isinstance(group_by, str) else buckets
+            
+            if use_cache:
+                self._set_cache(cache_key, counts, tags=self._read_tags(table, filters))
+            
+            duration = time.time() - start_time
+            self.performance_monitor.log_query_time("count_grouped", duration, table)
+            
+            return counts
+            
+        except Exception as e:
+            duration = time.time() - start_time
+            self.performance_monitor.log_query_time("count_grouped_ERROR", duration, table)
+            logger.error(f"Error counting grouped records in {table}: {str(e)}")
+            raise
 
 # Global instance function
-def get_database_service():
-    """Get optimized database service instance"""
-    return OptimizedSupabaseService()
+def get_database_service() -> OptimizedSupabaseService:
+    """Get the shared process-wide optimized database service"""
+    return registry.get_service('optimized_database', OptimizedSupabaseService)
+
+# Resolved on every use, so modules can bind it at import time and still reach
+# the service of the current process after a fork
+db_service = LocalProxy(get_database_service)
 
 # Backward compatibility
 DatabaseService = OptimizedSupabaseService
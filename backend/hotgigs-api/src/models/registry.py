@@ -0,0 +1,125 @@
+"""
+Service Registry for HotGigs.ai
+Process-wide Supabase client and database services sharing one pooled HTTP transport
+"""
+
+import os
+import logging
+import threading
+import importlib.util
+from typing import Dict, Any, Callable, Optional
+import httpx
+from supabase import create_client, Client
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+def _env_flag(name: str, default: bool) -> bool:
+    """Read a boolean flag from the environment"""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.lower() in ('1', 'true', 'yes', 'on')
+
+def create_pooled_client(url: str, key: str) -> Client:
+    """Create a Supabase client whose PostgREST transport uses a tuned connection pool"""
+    client: Client = create_client(url, key)
+
+    max_connections = int(os.getenv('DB_POOL_MAX_CONNECTIONS', 20))
+    max_keepalive = int(os.getenv('DB_POOL_MAX_KEEPALIVE', 10))
+    keepalive_expiry = float(os.getenv('DB_POOL_KEEPALIVE_EXPIRY', 30))
+
+    # HTTP/2 needs the optional h2 package; fall back to HTTP/1.1 keep-alive without it
+    http2 = _env_flag('DB_HTTP2', True)
+    if http2 and importlib.util.find_spec('h2') is None:
+        logger.warning("DB_HTTP2 requested but the h2 package is not installed; using HTTP/1.1")
+        http2 = False
+
+    postgrest = getattr(client, 'postgrest', None)
+    session = getattr(postgrest, 'session', None)
+    if not isinstance(session, httpx.Client):
+        logger.warning("Unable to tune PostgREST transport; using client defaults")
+        return client
+
+    postgrest.session = httpx.Client(
+        base_url=session.base_url,
+        headers=session.headers,
+        timeout=session.timeout,
+        follow_redirects=True,
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry
+        )
+    )
+    session.close()
+
+    logger.info(
+        f"PostgREST pool configured: max_connections={max_connections}, "
+        f"keepalive={max_keepalive}, http2={http2}"
+    )
+    return client
+
+class ServiceRegistry:
+    """Lazily built, process-wide Supabase client and database services
+
+    Instances are tied to the creating process so that workers forked from a
+    preloaded master never share sockets with their parent. This only holds
+    for code that asks the registry on each use; a module that keeps a service
+    from import time must hold a proxy such as optimized_database.db_service.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._pid: Optional[int] = None
+        self._client: Optional[Client] = None
+        self._services: Dict[str, Any] = {}
+
+    def _check_process(self):
+        """Discard instances inherited across a fork; caller must hold the lock"""
+        pid = os.getpid()
+        if self._pid != pid:
+            self._client = None
+            self._services = {}
+            self._pid = pid
+
+    def get_client(self) -> Client:
+        """Get the shared Supabase client"""
+        with self._lock:
+            self._check_process()
+            if self._client is None:
+                url = os.getenv('SUPABASE_URL')
+                key = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
+
+                if not url or not key:
+                    raise ValueError("Missing Supabase configuration. Please set SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY")
+
+                self._client = create_pooled_client(url, key)
+            return self._client
+
+    def get_service(self, name: str, factory: Callable[[Client], Any]) -> Any:
+        """Get a named shared service, building it from the shared client on first use"""
+        with self._lock:
+            self._check_process()
+            if name not in self._services:
+                self._services[name] = factory(self.get_client())
+                logger.info(f"Registered shared service: {name}")
+            return self._services[name]
+
+    def reset(self):
+        """Drop all shared instances and close the pooled transport"""
+        with self._lock:
+            client = self._client
+            self._client = None
+            self._services = {}
+
+        session = getattr(getattr(client, 'postgrest', None), 'session', None)
+        if isinstance(session, httpx.Client):
+            session.close()
+
+# Global registry
+registry = ServiceRegistry()
@@ -0,0 +1,125 @@
+"""
+SQLite Cache Store for HotGigs.ai
+Size-bounded key/value store with per-entry TTLs and LRU trimming, kept in
+SQLite so every worker process on a host shares it
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Dict, Any, Optional
+
+
+class SQLiteCacheStore:
+    """Disk-backed store shared by every worker process on a host
+
+    Hits refresh an entry's last_access for LRU trimming at most once per
+    touch_interval seconds, so repeated reads of a hot key are not a write
+    and commit each.
+    """
+
+    def __init__(self, path: str, max_entries: int, max_bytes: int, table: str,
+                 touch_interval: Optional[float] = None):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.table = table
+        self.touch_interval = touch_interval if touch_interval is not None else float(
+            os.getenv('SQLITE_CACHE_TOUCH_INTERVAL', 60)
+        )
+        self._local = threading.local()
+        self._writes = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_last_access ON {table}(last_access)")
+        conn.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Per-thread connection; sqlite3 connections must not cross threads"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute(
+            f"SELECT value, expires_at, last_access FROM {self.table} WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        if row[1] <= now:
+            conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            conn.commit()
+            return None
+        if now - row[2] >= self.touch_interval:
+            conn.execute(f"UPDATE {self.table} SET last_access = ? WHERE key = ?", (now, key))
+            conn.commit()
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Dict[str, Any], ttl: int):
+        conn = self._connect()
+        now = time.time()
+        encoded = json.dumps(value)
+        conn.execute(
+            f"INSERT OR REPLACE INTO {self.table} (key, value, size, expires_at, last_access) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (key, encoded, len(encoded), now + ttl, now)
+        )
+        conn.commit()
+
+        # Enforcing limits scans the table, so only do it every few writes
+        self._writes += 1
+        if self._writes % 50 == 1:
+            self.enforce_limits()
+
+    def enforce_limits(self):
+        """Drop expired rows, then least recently used rows beyond the limits"""
+        conn = self._connect()
+        conn.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (time.time(),))
+        count, total = conn.execute(f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.table}").fetchone()
+        if count > self.max_entries or total > self.max_bytes:
+            # Trim to 90% so that limits are not hit again on the next write
+            keep_entries = int(self.max_entries * 0.9)
+            keep_bytes = int(self.max_bytes * 0.9)
+            rows = conn.execute(f"SELECT key, size FROM {self.table} ORDER BY last_access DESC").fetchall()
+            kept, kept_bytes, stale = 0, 0, []
+            for key, size in rows:
+                if kept < keep_entries and kept_bytes + size <= keep_bytes:
+                    kept += 1
+                    kept_bytes += size
+                else:
+                    stale.append((key,))
+            conn.executemany(f"DELETE FROM {self.table} WHERE key = ?", stale)
+        conn.commit()
+
+    def delete(self, key: str):
+        conn = self._connect()
+        conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+        conn.commit()
+
+    def clear(self):
+        conn = self._connect()
+        conn.execute(f"DELETE FROM {self.table}")
+        conn.commit()
+
+    def __len__(self) -> int:
+        return self._connect().execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
@@ -10,7 +10,6 @@ from flask_jwt_extended import JWTManager
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask_caching import Cache
-from supabase import create_client, Client
 
 # Load environment variables
 load_dotenv(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), '.env'))
@@ -29,6 +28,12 @@ from src.routes.analytics import analytics_bp
 from src.routes.ai import ai_bp
 from src.routes.candidates import candidates_bp
 from src.routes.notifications import notifications_bp
+from src.models.optimized_database import get_database_service
+from src.services.ai.response_cache import get_response_cache
+from src.services.ai.llm_scheduler import get_llm_scheduler
+from src.services.document_jobs import get_document_job_queue, get_document_job_workers
+from src.services.document_results import get_document_result_store
+from src.services.workflow_automation import start_workflow_workers
 
 # Configure logging
 logging.basicConfig(
@@ -86,6 +91,13 @@ def create_app():
         strategy="fixed-window"
     )
     
+    # Queued workflow runs and scheduled workflows are executed by each app
+    # process, started on its first request so forked workers get their own;
+    # WORKFLOW_WORKERS=0 leaves them to the dedicated workflow worker
+    @app.before_request
+    def ensure_workflow_workers():
+        start_workflow_workers()
+    
     # Performance monitoring middleware
     @app.before_request
     def before_request():
@@ -117,15 +129,12 @@ def create_app():
         
         return response
     
-    # Initialize Supabase client
+    # Attach the shared database service and its pooled Supabase client
     try:
-        supabase_url = app.config['SUPABASE_URL']
-        supabase_key = app.config['SUPABASE_SERVICE_ROLE_KEY']
-        
-        if supabase_url and supabase_key:
-            supabase: Client = create_client(supabase_url, supabase_key)
-            app.supabase = supabase
-            app.logger.info("Supabase client initialized successfully")
+        if app.config['SUPABASE_URL'] and app.config['SUPABASE_SERVICE_ROLE_KEY']:
+            app.db_service = get_database_service()
+            app.supabase = app.db_service.client
+            app.logger.info("Shared Supabase client attached successfully")
         else:
             app.logger.warning("Supabase configuration missing")
     except Exception as e:
@@ -199,14 +208,18 @@ def create_app():
     def performance_metrics():
         """Get application performance metrics"""
         try:
-            # Import the optimized database service
-            from src.models.optimized_database import get_database_service
-            
             db_service = get_database_service()
             performance_stats = db_service.get_performance_stats()
             
             return jsonify({
                 'database_performance': performance_stats,
+                'llm_cache': get_response_cache().get_stats(),
+                'llm_scheduler': get_llm_scheduler().get_stats(),
+                'document_results': get_document_result_store().get_stats(),
+                'document_jobs': {
+                    **get_document_job_queue().get_stats(),
+                    **get_document_job_workers().get_stats()
+                },
                 'timestamp': time.time(),
                 'status': 'success'
             }), 200
@@ -227,7 +240,6 @@ def create_app():
             cache.clear()
             
             # Also clear database service cache
-            from src.models.optimized_database import get_database_service
             db_service = get_database_service()
             db_service.clear_cache()
             
@@ -248,8 +260,6 @@ def create_app():
     def refresh_materialized_views():
         """Refresh database materialized views"""
         try:
-            from src.models.optimized_database import get_database_service
-            
             db_service = get_database_service()
             db_service.refresh_materialized_view()
             
@@ -7,7 +7,14 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from marshmallow import Schema, fields, ValidationError
 import os
 from datetime import datetime, timezone
-from src.models.optimized_database import OptimizedSupabaseService
+from src.models.optimized_database import db_service
+from src.services.ai.match_prefilter import calculate_job_match_score
+from src.services.keyword_matcher import (
+    get_keyword_matcher,
+    SECTION_KEYWORDS,
+    SECTION_CATEGORY,
+    TECH_CATEGORY
+)
 from src.services.advanced_ai import (
     vector_service, 
     interview_agent, 
@@ -16,7 +23,6 @@ from src.services.advanced_ai import (
 )
 
 ai_bp = Blueprint('ai', __name__)
-db_service = OptimizedSupabaseService()
 
 # AI service validation schemas
 class JobMatchSchema(Schema):
@@ -42,6 +48,7 @@ def health_check():
             'status': 'healthy',
             'service': 'ai',
             'openai_configured': openai_configured,
+            'interview_sessions': interview_agent.sessions.get_stats(),
             'timestamp': datetime.now(timezone.utc).isoformat()
         }), 200
         
@@ -136,57 +143,6 @@ def match_jobs():
             'status': 'error'
         }), 500
 
-def calculate_job_match_score(job: dict, user_skills: list, match_data: dict) -> float:
-    """Calculate match score between job and candidate"""
-    score = 0.0
-    
-    # Skill matching (40% weight)
-    job_title = job.get('title', '').lower()
-    job_description = job.get('description', '').lower()
-    job_requirements = job.get('requirements', '').lower()
-    
-    skill_matches = 0
-    for skill in user_skills:
-        if (skill in job_title or 
-            skill in job_description or 
-            skill in job_requirements):
-            skill_matches += 1
-    
-    if user_skills:
-        skill_score = skill_matches / len(user_skills)
-        score += skill_score * 0.4
-    
-    # Experience level matching (20% weight)
-    job_experience = job.get('experience_level', '').lower()
-    user_experience = match_data.get('experience_level', '').lower()
-    
-    if job_experience == user_experience:
-        score += 0.2
-    elif (job_experience == 'entry' and user_experience in ['mid', 'senior']) or \
-         (job_experience == 'mid' and user_experience == 'senior'):
-        score += 0.1
-    
-    # Location matching (15% weight)
-    if match_data.get('location_preference'):
-        job_location = job.get('location', '').lower()
-        user_location = match_data['location_preference'].lower()
-        
-        if user_location in job_location or job_location in user_location:
-            score += 0.15
-        elif 'remote' in job_location and match_data.get('remote_preference'):
-            score += 0.15
-    
-    # Salary matching (15% weight)
-    if match_data.get('salary_min') and job.get('salary_max'):
-        if job['salary_max'] >= match_data['salary_min']:
-            score += 0.15
-    
-    # Remote work preference (10% weight)
-    if match_data.get('remote_preference') and job.get('remote_work_allowed'):
-        score += 0.1
-    
-    return min(score, 1.0)  # Cap at 1.0
-
 def get_match_reasons(job: dict, user_skills: list, match_data: dict) -> list:
     """Get reasons why this job matches the candidate"""
     reasons = []
@@ -283,12 +239,11 @@ def perform_resume_analysis(resume_text: str) -> dict:
     # Simple analysis without external AI API
     word_count = len(resume_text.split())
     
-    # Check for common sections
+    # Check for common sections in a single keyword pass
+    keyword_scan = get_keyword_matcher().scan(resume_text)
     sections = {
-        'contact_info': any(keyword in resume_text.lower() for keyword in ['email', 'phone', '@']),
-        'experience': any(keyword in resume_text.lower() for keyword in ['experience', 'work', 'employment']),
-        'education': any(keyword in resume_text.lower() for keyword in ['education', 'degree', 'university', 'college']),
-        'skills': any(keyword in resume_text.lower() for keyword in ['skills', 'technologies', 'programming'])
+        section: keyword_scan.has_any(SECTION_CATEGORY + section)
+        for section in SECTION_KEYWORDS
     }
     
     # Calculate completeness score
@@ -346,19 +301,7 @@ def analyze_resume_for_job(resume_text: str, job: dict) -> dict:
 
 def extract_keywords(text: str) -> list:
     """Extract relevant keywords from text"""
-    # Simple keyword extraction
-    common_tech_keywords = [
-        'python', 'javascript', 'java', 'react', 'node', 'sql', 'aws', 'docker',
-        'kubernetes', 'git', 'agile', 'scrum', 'api', 'database', 'frontend',
-        'backend', 'fullstack', 'devops', 'machine learning', 'ai', 'data'
-    ]
-    
-    found_keywords = []
-    for keyword in common_tech_keywords:
-        if keyword in text:
-            found_keywords.append(keyword)
-    
-    return found_keywords
+    return get_keyword_matcher().scan(text).keywords(TECH_CATEGORY)
 
 @ai_bp.route('/job-recommendations', methods=['GET'])
 @jwt_required()
@@ -524,32 +467,23 @@ def semantic_job_search():
         schema = SemanticSearchSchema()
         data = schema.load(request.get_json())
         
-        # Get all jobs for embedding if not already done
-        jobs_response = db_service.get_jobs()
-        if jobs_response.get('success'):
-            jobs = jobs_response.get('data', [])
-            
-            # Create embeddings if needed
-            if vector_service.job_vectors is None:
-                vector_service.create_job_embeddings(jobs)
-            
-            # Perform semantic search
-            results = vector_service.semantic_job_search(
-                data['query'], 
-                data['top_k']
-            )
-            
-            return jsonify({
-                'success': True,
-                'data': results,
-                'total_results': len(results),
-                'query': data['query']
-            }), 200
-        else:
-            return jsonify({
-                'success': False,
-                'error': 'Failed to retrieve jobs for search'
-            }), 500
+        # Build the index on first use; afterwards it is kept current incrementally
+        if len(vector_service.job_index) == 0:
+            jobs = db_service.get_records_optimized('jobs', {'status': 'active'}, use_cache=False)
+            vector_service.create_job_embeddings(jobs)
+        
+        # Perform semantic search
+        results = vector_service.semantic_job_search(
+            data['query'], 
+            data['top_k']
+        )
+        
+        return jsonify({
+            'success': True,
+            'data': results,
+            'total_results': len(results),
+            'query': data['query']
+        }), 200
             
     except ValidationError as e:
         return jsonify({
@@ -584,7 +518,7 @@ def find_similar_candidates():
         # For now, we'll use a placeholder
         candidates = []  # Would fetch from database
         
-        if vector_service.resume_vectors is None and candidates:
+        if candidates and len(vector_service.resume_index) == 0:
             vector_service.create_resume_embeddings(candidates)
         
         # Find similar candidates
@@ -815,25 +749,20 @@ def predict_hiring_success():
 def refresh_embeddings():
     """Refresh vector embeddings for jobs and resumes"""
     try:
-        # Get fresh data from database
-        jobs_response = db_service.get_jobs()
+        # Get fresh data from database; only new, changed or removed jobs are re-indexed
+        jobs = db_service.get_records_optimized('jobs', {'status': 'active'}, use_cache=False)
+        result = vector_service.create_job_embeddings(jobs)
         
-        if jobs_response.get('success'):
-            jobs = jobs_response.get('data', [])
-            vector_service.create_job_embeddings(jobs)
-            
-            # Would also refresh resume embeddings if we had resume data
-            
-            return jsonify({
-                'success': True,
-                'message': f'Refreshed embeddings for {len(jobs)} jobs',
-                'jobs_processed': len(jobs)
-            }), 200
-        else:
-            return jsonify({
-                'success': False,
-                'error': 'Failed to retrieve jobs for embedding refresh'
-            }), 500
+        # Would also refresh resume embeddings if we had resume data
+        
+        return jsonify({
+            'success': True,
+            'message': f'Refreshed embeddings for {len(jobs)} jobs',
+            'jobs_processed': len(jobs),
+            'jobs_added': result['added'],
+            'jobs_removed': result['removed'],
+            'index': vector_service.get_index_stats()
+        }), 200
             
     except Exception as e:
         current_app.logger.error(f"Refresh embeddings error: {str(e)}")
@@ -6,10 +6,9 @@ from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from marshmallow import Schema, fields, ValidationError
 from datetime import datetime, timezone, timedelta
-from src.models.optimized_database import OptimizedSupabaseService
+from src.models.optimized_database import db_service
 
 analytics_bp = Blueprint('analytics', __name__)
-db_service = OptimizedSupabaseService()
 
 @analytics_bp.route('/health', methods=['GET'])
 def health_check():
@@ -126,6 +125,10 @@ def get_candidate_analytics(user_id: str) -> dict:
         current_app.logger.error(f"Error getting candidate analytics: {str(e)}")
         return {}
 
+def status_total(counts: dict, status: str) -> int:
+    """Total for one status bucket of an aggregated analytics result"""
+    return counts.get(status, {}).get('total', 0)
+
 def get_company_analytics(user_id: str) -> dict:
     """Get analytics for company users"""
     try:
@@ -144,46 +147,31 @@ def get_company_analytics(user_id: str) -> dict:
         
         company_ids = [cm['company_id'] for cm in company_memberships]
         
-        # Get job statistics
-        all_jobs = []
-        all_applications = []
-        
-        for company_id in company_ids:
-            # Get company jobs
-            jobs = db_service.get_records_optimized(
-                'jobs',
-                {'company_id': company_id}
-            )
-            all_jobs.extend(jobs)
-            
-            # Get applications for company jobs
-            for job in jobs:
-                applications = db_service.get_records_optimized(
-                    'job_applications',
-                    {'job_id': job['id']}
-                )
-                all_applications.extend(applications)
+        # Grouped counts and recent activity for all companies in two queries
+        analytics = db_service.get_company_analytics_optimized(company_ids)
+        job_counts = analytics.get('jobs', {})
+        application_counts = analytics.get('applications', {})
         
         # Calculate job statistics
         job_stats = {
-            'total': len(all_jobs),
-            'active': len([j for j in all_jobs if j.get('status') == 'active']),
-            'draft': len([j for j in all_jobs if j.get('status') == 'draft']),
-            'closed': len([j for j in all_jobs if j.get('status') == 'closed']),
-            'paused': len([j for j in all_jobs if j.get('status') == 'paused'])
+            'total': sum(c['total'] for c in job_counts.values()),
+            'active': status_total(job_counts, 'active'),
+            'draft': status_total(job_counts, 'draft'),
+            'closed': status_total(job_counts, 'closed'),
+            'paused': status_total(job_counts, 'paused')
         }
         
         # Calculate application statistics
         app_stats = {
-            'total': len(all_applications),
-            'pending': len([a for a in all_applications if a.get('status') == 'pending']),
-            'interviewing': len([a for a in all_applications if a.get('status') == 'interviewing']),
-            'hired': len([a for a in all_applications if a.get('status') == 'hired']),
-            'rejected': len([a for a in all_applications if a.get('status') == 'rejected'])
+            'total': sum(c['total'] for c in application_counts.values()),
+            'pending': status_total(application_counts, 'pending'),
+            'interviewing': status_total(application_counts, 'interviewing'),
+            'hired': status_total(application_counts, 'hired'),
+            'rejected': status_total(application_counts, 'rejected')
         }
         
         # Get recent activity
-        recent_applications = sorted(all_applications, key=lambda x: x.get('applied_at', ''), reverse=True)[:5]
+        recent_applications = db_service.get_company_recent_applications(company_ids, limit=5)
         
         return {
             'jobs': job_stats,
@@ -325,23 +313,12 @@ def get_company_metrics(user_id: str, start_date: datetime) -> dict:
         
         company_ids = [cm['company_id'] for cm in company_memberships]
         
-        # Get jobs created in time range
-        recent_jobs = []
-        for company_id in company_ids:
-            jobs = db_service.get_records_optimized(
-                'jobs',
-                {'company_id': company_id}
-            )
-            
-            # Filter by date range
-            for job in jobs:
-                if job.get('created_at') and \
-                   datetime.fromisoformat(job['created_at'].replace('Z', '+00:00')) >= start_date:
-                    recent_jobs.append(job)
+        # Reuse the aggregated analytics path with a time window
+        analytics = db_service.get_company_analytics_optimized(company_ids, since=start_date)
         
         return {
-            'jobs_posted': len(recent_jobs),
-            'applications_received': 0,  # Placeholder
+            'jobs_posted': sum(c['recent'] for c in analytics.get('jobs', {}).values()),
+            'applications_received': sum(c['recent'] for c in analytics.get('applications', {}).values()),
             'hires_made': 0,  # Placeholder
             'time_to_hire': 0  # Placeholder
         }
@@ -7,10 +7,11 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from marshmallow import Schema, fields, ValidationError
 from datetime import datetime
-from src.models.database import DatabaseService
+from src.models.optimized_database import db_service
 
 applications_bp = Blueprint('applications', __name__)
-db_service = DatabaseService()
+
+APPLICATION_STATUSES = ['applied', 'reviewing', 'interview_scheduled', 'interviewed', 'offer_extended', 'hired', 'rejected', 'withdrawn']
 
 # Application validation schemas
 class ApplicationCreateSchema(Schema):
@@ -23,7 +24,7 @@ class ApplicationCreateSchema(Schema):
     custom_responses = fields.Dict(load_default={})
 
 class ApplicationUpdateSchema(Schema):
-    status = fields.Str(validate=lambda x: x in ['applied', 'reviewing', 'interview_scheduled', 'interviewed', 'offer_extended', 'hired', 'rejected', 'withdrawn'])
+    status = fields.Str(validate=lambda x: x in APPLICATION_STATUSES)
     notes = fields.Str(allow_none=True)
     interview_date = fields.DateTime(allow_none=True)
     interview_type = fields.Str(validate=lambda x: x in ['phone', 'video', 'in-person', 'technical'])
@@ -462,15 +463,10 @@ def get_application_stats():
             
             candidate_id = candidate_result.data[0]['id']
             
-            # Get application counts by status
-            stats = {}
-            for status in ['applied', 'reviewing', 'interview_scheduled', 'interviewed', 'offer_extended', 'hired', 'rejected', 'withdrawn']:
-                count_result = db_service.supabase.table('job_applications').select('id', count='exact').eq('candidate_id', candidate_id).eq('status', status).execute()
-                stats[status] = count_result.count or 0
-            
-            # Get total applications
-            total_result = db_service.supabase.table('job_applications').select('id', count='exact').eq('candidate_id', candidate_id).execute()
-            stats['total'] = total_result.count or 0
+            # Get application counts by status in one grouped query
+            status_counts = db_service.count_grouped('job_applications', 'status', {'candidate_id': candidate_id})
+            stats = {status: status_counts.get(status, 0) for status in APPLICATION_STATUSES}
+            stats['total'] = sum(status_counts.values())
             
             return jsonify({
                 'stats': stats,
@@ -498,15 +494,10 @@ def get_application_stats():
             if not job_ids:
                 return jsonify({'stats': {}, 'user_type': user_type}), 200
             
-            # Get application counts by status
-            stats = {}
-            for status in ['applied', 'reviewing', 'interview_scheduled', 'interviewed', 'offer_extended', 'hired', 'rejected', 'withdrawn']:
-                count_result = db_service.supabase.table('job_applications').select('id', count='exact').in_('job_id', job_ids).eq('status', status).execute()
-                stats[status] = count_result.count or 0
-            
-            # Get total applications
-            total_result = db_service.supabase.table('job_applications').select('id', count='exact').in_('job_id', job_ids).execute()
-            stats['total'] = total_result.count or 0
+            # Get application counts by status in one grouped query
+            status_counts = db_service.count_grouped('job_applications', 'status', {'job_id': job_ids})
+            stats = {status: status_counts.get(status, 0) for status in APPLICATION_STATUSES}
+            stats['total'] = sum(status_counts.values())
             
             return jsonify({
                 'stats': stats,
@@ -2,21 +2,37 @@
 Email and Bulk Processing routes for HotGigs.ai
 Handles email resume ingestion, Google Drive integration, and bulk operations
 """
-from flask import Blueprint, request, jsonify, current_app, send_file
+from flask import Blueprint, request, jsonify, current_app, send_file, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from marshmallow import Schema, fields, ValidationError
 import os
+import base64
 import tempfile
 from datetime import datetime, timezone
-from src.models.optimized_database import OptimizedSupabaseService
+from src.models.optimized_database import db_service
+from src.services.document_jobs import submit_document_job, STATUS_QUEUED
+from src.services.candidate_export import (
+    EXPORT_MIMETYPES,
+    EXPORT_COMPLETED,
+    iter_candidate_rows,
+    iter_database_candidates,
+    stream_csv,
+    write_export_file,
+    start_candidate_export,
+    get_export_job_store
+)
+from src.services.bulk_email_jobs import start_bulk_email, get_bulk_email_job_store
 from src.services.email_bulk_processing import (
     email_service,
     google_drive_service,
-    bulk_processing_service
+    bulk_processing_service,
+    EMAIL_TEMPLATES
 )
 
 bulk_bp = Blueprint('bulk', __name__)
-db_service = OptimizedSupabaseService()
+BULK_EMAIL_LIMIT = int(os.getenv('BULK_EMAIL_LIMIT', 5000))
+# Larger campaigns always run as a background job
+BULK_EMAIL_SYNC_LIMIT = int(os.getenv('BULK_EMAIL_SYNC_LIMIT', 50))
 
 # Validation schemas
 class EmailConfigSchema(Schema):
@@ -43,6 +59,23 @@ class SendEmailSchema(Schema):
     body = fields.Str(required=True, validate=lambda x: len(x.strip()) >= 10)
     attachments = fields.List(fields.Dict(), load_default=list)
 
+class CandidateExportSchema(Schema):
+    candidates = fields.List(fields.Dict(), load_default=list)
+    source = fields.Str(load_default='request', validate=lambda x: x in ('request', 'database'))
+    filters = fields.Dict(keys=fields.Str(), values=fields.Raw(), load_default=dict)
+    format = fields.Str(load_default='xlsx', validate=lambda x: x in EXPORT_MIMETYPES)
+    filename = fields.Str(load_default=None)
+    run_async = fields.Bool(load_default=False, data_key='async')
+
+class BulkSendEmailSchema(Schema):
+    template = fields.Str(load_default=None, validate=lambda x: x in EMAIL_TEMPLATES)
+    subject = fields.Str(load_default=None, validate=lambda x: len(x.strip()) >= 3)
+    body = fields.Str(load_default=None, validate=lambda x: len(x.strip()) >= 10)
+    recipients = fields.List(fields.Dict(), required=True,
+                             validate=lambda x: 1 <= len(x) <= BULK_EMAIL_LIMIT)
+    attachments = fields.List(fields.Dict(), load_default=list)
+    run_async = fields.Bool(load_default=False, data_key='async')
+
 @bulk_bp.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint for bulk processing service"""
@@ -51,6 +84,7 @@ def health_check():
             'status': 'healthy',
             'service': 'bulk_processing',
             'email_configured': bool(email_service.email_address),
+            'smtp': email_service.get_smtp_stats(),
             'google_drive_available': google_drive_service.service is not None,
             'timestamp': datetime.now(timezone.utc).isoformat()
         }), 200
@@ -125,14 +159,13 @@ def fetch_resume_emails():
             }), 400
         
         # Fetch resume emails
+        # Preview only: listing emails does not advance the mailbox checkpoint
         resume_emails = email_service.fetch_resume_emails(
             data['folder'],
-            data['subject_filter']
+            data['subject_filter'],
+            max_emails=data['max_emails']
         )
         
-        # Limit results
-        resume_emails = resume_emails[:data['max_emails']]
-        
         # Prepare response data (without attachment data for performance)
         email_summaries = []
         for email_info in resume_emails:
@@ -185,7 +218,8 @@ def process_email_resumes():
         # Process resume emails
         result = bulk_processing_service.process_email_resumes(
             data['folder'],
-            data['subject_filter']
+            data['subject_filter'],
+            max_emails=data['max_emails']
         )
         
         return jsonify({
@@ -253,6 +287,106 @@ def send_email():
             'error': 'Failed to send email'
         }), 500
 
+@bulk_bp.route('/email/send-bulk', methods=['POST'])
+@jwt_required()
+def send_bulk_email():
+    """Send a templated email to many recipients over pooled SMTP sessions
+    
+    Campaigns larger than BULK_EMAIL_SYNC_LIMIT, or sent with async, run as a
+    background job whose progress and result are read from the job endpoint.
+    """
+    try:
+        user = db_service.get_record_by_id('users', get_jwt_identity())
+        if not user or user.get('user_type') not in ['company', 'freelance_recruiter']:
+            return jsonify({
+                'success': False,
+                'error': 'Only companies and recruiters can send bulk email'
+            }), 403
+        
+        schema = BulkSendEmailSchema()
+        data = schema.load(request.get_json() or {})
+        
+        if not data['template'] and not (data['subject'] and data['body']):
+            return jsonify({
+                'success': False,
+                'error': 'Provide a template or both subject and body'
+            }), 400
+        
+        if not email_service.email_address:
+            return jsonify({
+                'success': False,
+                'error': 'Email not configured. Please configure email settings first.'
+            }), 400
+        
+        if data['run_async'] or len(data['recipients']) > BULK_EMAIL_SYNC_LIMIT:
+            job_id = start_bulk_email(
+                email_service,
+                data['recipients'],
+                user_id=str(get_jwt_identity()),
+                template_name=data['template'],
+                subject=data['subject'],
+                body=data['body'],
+                attachments=data['attachments']
+            )
+            return jsonify({
+                'success': True,
+                'job_id': job_id,
+                'status_url': f"/api/bulk/email/send-bulk/jobs/{job_id}"
+            }), 202
+        
+        result = email_service.send_many(
+            data['recipients'],
+            template_name=data['template'],
+            subject=data['subject'],
+            body=data['body'],
+            attachments=data['attachments']
+        )
+        
+        if 'error' in result:
+            return jsonify(result), 500
+        
+        return jsonify({
+            'success': result['success'],
+            'data': result
+        }), 200
+        
+    except ValidationError as e:
+        return jsonify({
+            'success': False,
+            'error': 'Validation error',
+            'details': e.messages
+        }), 400
+    except Exception as e:
+        current_app.logger.error(f"Send bulk email error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to send bulk email'
+        }), 500
+
+@bulk_bp.route('/email/send-bulk/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_bulk_email_job(job_id):
+    """Get progress and result of a background bulk email campaign"""
+    try:
+        job = get_bulk_email_job_store().get(job_id)
+        if not job or job['user_id'] != str(get_jwt_identity()):
+            return jsonify({
+                'success': False,
+                'error': 'Bulk email job not found'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'data': job
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Get bulk email job error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to get bulk email job'
+        }), 500
+
 # Google Drive Integration Endpoints
 @bulk_bp.route('/google-drive/authenticate', methods=['POST'])
 @jwt_required()
@@ -365,79 +499,227 @@ def process_google_drive_resumes():
         }), 500
 
 # Export and Download Endpoints
+def _send_export_file(path: str, filename: str, export_format: str):
+    """Send an export file and delete it once the response is closed"""
+    response = send_file(
+        path,
+        as_attachment=True,
+        download_name=filename,
+        mimetype=EXPORT_MIMETYPES[export_format]
+    )
+    response.call_on_close(lambda: os.path.exists(path) and os.unlink(path))
+    return response
+
 @bulk_bp.route('/export/candidates-excel', methods=['POST'])
 @jwt_required()
 def export_candidates_to_excel():
-    """Export candidate data to Excel file"""
+    """Export candidate data to an Excel or CSV file
+    
+    Candidates come from the request body, or from the database when
+    source is 'database'. CSV is streamed to the client as it is produced;
+    with async the export runs in the background and reports progress.
+    """
     try:
-        data = request.get_json()
-        candidates = data.get('candidates', [])
-        filename = data.get('filename')
+        schema = CandidateExportSchema()
+        data = schema.load(request.get_json() or {})
+        export_format = data['format']
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = data['filename'] or f"candidates_export_{timestamp}.{export_format}"
+        
+        if data['source'] == 'database':
+            user = db_service.get_record_by_id('users', get_jwt_identity())
+            if not user or user.get('user_type') not in ['company', 'freelance_recruiter']:
+                return jsonify({
+                    'success': False,
+                    'error': 'Only companies and recruiters can export candidates'
+                }), 403
+            
+            if any(isinstance(value, (list, dict)) for value in data['filters'].values()):
+                return jsonify({
+                    'success': False,
+                    'error': 'Export filters must be column equality values'
+                }), 400
+            
+            if data['run_async']:
+                job_id = start_candidate_export(
+                    db_service,
+                    export_format,
+                    filters=data['filters'],
+                    user_id=str(get_jwt_identity()),
+                    filename=filename
+                )
+                return jsonify({
+                    'success': True,
+                    'job_id': job_id,
+                    'status_url': f"/api/bulk/export/jobs/{job_id}"
+                }), 202
+            
+            candidates = iter_database_candidates(db_service, data['filters'])
+        else:
+            candidates = data['candidates']
+            if not candidates:
+                return jsonify({
+                    'success': False,
+                    'error': 'No candidate data provided'
+                }), 400
+        
+        rows = iter_candidate_rows(candidates)
+        
+        if export_format == 'csv':
+            # Chunked response; rows are read and encoded as the client downloads
+            return Response(
+                stream_with_context(stream_csv(rows)),
+                mimetype=EXPORT_MIMETYPES['csv'],
+                headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+            )
+        
+        # The xlsx container is only complete once the workbook is saved
+        path, _ = write_export_file(rows, export_format)
+        return _send_export_file(path, filename, export_format)
         
-        if not candidates:
+    except ValidationError as e:
+        return jsonify({
+            'success': False,
+            'error': 'Validation error',
+            'details': e.messages
+        }), 400
+    except Exception as e:
+        current_app.logger.error(f"Export candidates error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to export candidates to Excel'
+        }), 500
+
+def _get_owned_export_job(job_id: str):
+    """Export job if it exists and belongs to the current user"""
+    job = get_export_job_store().get(job_id)
+    if not job or job['user_id'] != str(get_jwt_identity()):
+        return None
+    return job
+
+@bulk_bp.route('/export/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_export_job(job_id):
+    """Get progress of a background candidate export"""
+    try:
+        job = _get_owned_export_job(job_id)
+        if not job:
             return jsonify({
                 'success': False,
-                'error': 'No candidate data provided'
-            }), 400
+                'error': 'Export job not found'
+            }), 404
         
-        # Export to Excel
-        excel_filename = bulk_processing_service.export_candidates_to_excel(
-            candidates,
-            filename
-        )
+        job.pop('file_path', None)
+        if job['status'] == EXPORT_COMPLETED:
+            job['download_url'] = f"/api/bulk/export/jobs/{job_id}/download"
+        
+        return jsonify({
+            'success': True,
+            'data': job
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Get export job error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to get export job'
+        }), 500
+
+@bulk_bp.route('/export/jobs/<job_id>/download', methods=['GET'])
+@jwt_required()
+def download_export_job(job_id):
+    """Download the file of a finished background candidate export"""
+    try:
+        job = _get_owned_export_job(job_id)
+        if not job:
+            return jsonify({
+                'success': False,
+                'error': 'Export job not found'
+            }), 404
         
-        # Return file for download
+        if job['status'] != EXPORT_COMPLETED or not job['file_path'] or not os.path.exists(job['file_path']):
+            return jsonify({
+                'success': False,
+                'error': f"Export is not available for download (status: {job['status']})"
+            }), 409
+        
+        # Kept until the job expires so the download can be retried
         return send_file(
-            excel_filename,
+            job['file_path'],
             as_attachment=True,
-            download_name=excel_filename,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            download_name=job['filename'],
+            mimetype=EXPORT_MIMETYPES[job['format']]
         )
         
     except Exception as e:
-        current_app.logger.error(f"Export candidates error: {str(e)}")
+        current_app.logger.error(f"Download export job error: {str(e)}")
         return jsonify({
             'success': False,
-            'error': 'Failed to export candidates to Excel'
+            'error': 'Failed to download export'
         }), 500
 
 @bulk_bp.route('/batch/process-documents', methods=['POST'])
 @jwt_required()
 def batch_process_documents():
-    """Batch process multiple documents"""
+    """Batch process multiple documents through the background job queue"""
     try:
         data = request.get_json()
         documents = data.get('documents', [])
+        batch_limit = int(os.getenv('DOCUMENT_BATCH_LIMIT', 5000))
         
-        if not documents or len(documents) > 50:  # Limit batch size
+        if not documents or len(documents) > batch_limit:  # Limit batch size
             return jsonify({
                 'success': False,
-                'error': 'Invalid batch size (1-50 documents allowed)'
+                'error': f'Invalid batch size (1-{batch_limit} documents allowed)'
             }), 400
         
-        # This would integrate with the document processing service
-        # For now, return a placeholder response
-        results = []
+        queued = []
+        rejected = []
         for i, doc in enumerate(documents):
-            results.append({
+            try:
+                document_bytes = base64.b64decode(doc.get('document_data', ''), validate=True)
+            except Exception:
+                document_bytes = b''
+            
+            if not document_bytes:
+                rejected.append({
+                    'index': i,
+                    'document_id': doc.get('id', f'doc_{i}'),
+                    'status': 'rejected',
+                    'error': 'Missing or invalid base64 document data'
+                })
+                continue
+            
+            queued.append({
                 'index': i,
                 'document_id': doc.get('id', f'doc_{i}'),
-                'status': 'processed',
-                'processing_time': 2.5,
-                'extracted_text_length': 1500,
-                'confidence_score': 0.85
+                'data': document_bytes,
+                'document_type': doc.get('document_type', 'resume'),
+                'perform_ocr': doc.get('perform_ocr', True),
+                'check_fraud': doc.get('check_fraud', True)
             })
         
+        if not queued:
+            return jsonify({
+                'success': False,
+                'error': 'No valid documents in batch',
+                'details': rejected
+            }), 400
+        
+        job_id = submit_document_job(queued, user_id=get_jwt_identity(), source='bulk')
+        
         return jsonify({
             'success': True,
             'data': {
-                'results': results,
+                'job_id': job_id,
+                'status': STATUS_QUEUED,
+                'status_url': f'/api/documents/jobs/{job_id}',
+                'results_url': f'/api/documents/jobs/{job_id}/results',
                 'total_documents': len(documents),
-                'successful_count': len(results),
-                'failed_count': 0,
-                'average_processing_time': 2.5
+                'queued_count': len(queued),
+                'rejected': rejected
             }
-        }), 200
+        }), 202
         
     except Exception as e:
         current_app.logger.error(f"Batch process documents error: {str(e)}")
@@ -495,66 +777,11 @@ def get_processing_stats():
 def get_email_templates():
     """Get email templates for common scenarios"""
     try:
-        templates = {
-            'candidate_welcome': {
-                'subject': 'Welcome to HotGigs.ai - Your Application Received',
-                'body': '''Dear {candidate_name},
-
-Thank you for your interest in opportunities through HotGigs.ai. We have successfully received and processed your resume.
-
-Your profile has been added to our candidate database and will be considered for relevant positions that match your skills and experience.
-
-Key details from your profile:
-- Skills: {skills}
-- Experience: {experience_years} years
-- Location: {location}
-
-We will notify you when suitable opportunities become available.
-
-Best regards,
-HotGigs.ai Team'''
-            },
-            'application_confirmation': {
-                'subject': 'Application Confirmation - {job_title}',
-                'body': '''Dear {candidate_name},
-
-This confirms that your application for the position of {job_title} at {company_name} has been successfully submitted.
-
-Application Details:
-- Position: {job_title}
-- Company: {company_name}
-- Application Date: {application_date}
-- Application ID: {application_id}
-
-The hiring team will review your application and contact you if your qualifications match their requirements.
-
-Best regards,
-HotGigs.ai Team'''
-            },
-            'bulk_processing_complete': {
-                'subject': 'Bulk Processing Complete - {processed_count} Resumes',
-                'body': '''Dear User,
-
-Your bulk resume processing job has been completed successfully.
-
-Processing Summary:
-- Total Files Processed: {total_files}
-- Successful Extractions: {successful_count}
-- Candidates Added: {candidates_added}
-- Processing Time: {processing_time}
-
-You can now review the extracted candidate data in your dashboard.
-
-Best regards,
-HotGigs.ai Team'''
-            }
-        }
-        
         return jsonify({
             'success': True,
             'data': {
-                'templates': templates,
-                'template_count': len(templates)
+                'templates': EMAIL_TEMPLATES,
+                'template_count': len(EMAIL_TEMPLATES)
             }
         }), 200
         
@@ -8,10 +8,9 @@ from marshmallow import Schema, fields, ValidationError
 import re
 import html
 from datetime import datetime, timezone
-from src.models.optimized_database import OptimizedSupabaseService
+from src.models.optimized_database import db_service
 
 candidates_bp = Blueprint('candidates', __name__)
-db_service = OptimizedSupabaseService()
 
 # Candidate validation schemas
 class CandidateProfileSchema(Schema):
@@ -118,50 +117,56 @@ def search_candidates():
 def search_candidate_profiles(search_params: dict) -> list:
     """Search candidate profiles based on criteria"""
     try:
-        # Start with all candidate profiles
-        filters = {}
+        # Filter and paginate in the database so the page is never short
+        candidate_profiles = db_service.search_candidates_optimized(
+            location=search_params.get('location'),
+            experience_level=search_params.get('experience_level'),
+            availability=search_params.get('availability'),
+            skills=search_params.get('skills'),
+            salary_min=search_params.get('salary_min'),
+            salary_max=search_params.get('salary_max'),
+            remote_only=search_params.get('remote_only', False),
+            limit=search_params.get('limit', 20),
+            offset=search_params.get('offset', 0)
+        )
         
-        # Apply filters
-        if search_params.get('location'):
-            filters['location'] = search_params['location']
+        if not candidate_profiles:
+            return []
         
-        if search_params.get('experience_level'):
-            filters['experience_level'] = search_params['experience_level']
+        profile_ids = [profile['id'] for profile in candidate_profiles]
+        user_ids = list({profile['user_id'] for profile in candidate_profiles})
         
-        if search_params.get('availability'):
-            filters['availability'] = search_params['availability']
+        # Enrich with user data and skills in one query per table; experience is counted in the database
+        users = db_service.get_records_optimized(
+            'users',
+            {'id': user_ids},
+            select_fields='id, first_name, last_name, email, profile_image_url'
+        )
+        users_by_id = {user['id']: user for user in users}
         
-        # Get candidate profiles
-        candidate_profiles = db_service.get_records_optimized(
-            'candidate_profiles',
-            filters=filters,
-            limit=search_params.get('limit', 20),
-            offset=search_params.get('offset', 0),
-            order_by='updated_at',
-            ascending=False
+        skills_by_candidate = {}
+        for skill in db_service.get_records_optimized(
+            'candidate_skills',
+            {'candidate_id': profile_ids},
+            select_fields='candidate_id, skill_name, proficiency_level'
+        ):
+            skills_by_candidate.setdefault(skill['candidate_id'], []).append({
+                'skill_name': skill.get('skill_name'),
+                'proficiency_level': skill.get('proficiency_level')
+            })
+        
+        experience_counts = db_service.count_grouped(
+            'work_experiences',
+            'candidate_id',
+            {'candidate_id': profile_ids}
         )
         
-        # Enrich with user data and skills
         enriched_candidates = []
         for profile in candidate_profiles:
-            # Get user data
-            user = db_service.get_record_by_id('users', profile['user_id'])
+            user = users_by_id.get(profile['user_id'])
             if not user:
                 continue
             
-            # Get candidate skills
-            skills = db_service.get_records_optimized(
-                'candidate_skills',
-                {'candidate_id': profile['id']},
-                select_fields='skill_name, proficiency_level'
-            )
-            
-            # Get work experience count
-            experience_count = db_service.count_records(
-                'work_experiences',
-                {'candidate_id': profile['id']}
-            )
-            
             # Build candidate data
             candidate_data = {
                 'id': profile['id'],
@@ -182,33 +187,11 @@ def search_candidate_profiles(search_params: dict) -> list:
                 'linkedin_url': profile.get('linkedin_url'),
                 'github_url': profile.get('github_url'),
                 'portfolio_url': profile.get('portfolio_url'),
-                'skills': skills,
-                'experience_count': experience_count,
+                'skills': skills_by_candidate.get(profile['id'], []),
+                'experience_count': experience_counts.get(profile['id'], 0),
                 'updated_at': profile.get('updated_at')
             }
             
-            # Apply skill filter if specified
-            if search_params.get('skills'):
-                candidate_skills = [skill['skill_name'].lower() for skill in skills]
-                search_skills = [skill.lower() for skill in search_params['skills']]
-                
-                # Check if candidate has any of the required skills
-                if not any(skill in candidate_skills for skill in search_skills):
-                    continue
-            
-            # Apply salary filter if specified
-            if search_params.get('salary_min') and profile.get('desired_salary_max'):
-                if profile['desired_salary_max'] < search_params['salary_min']:
-                    continue
-            
-            if search_params.get('salary_max') and profile.get('desired_salary_min'):
-                if profile['desired_salary_min'] > search_params['salary_max']:
-                    continue
-            
-            # Apply remote filter
-            if search_params.get('remote_only') and not profile.get('remote_preference'):
-                continue
-            
             enriched_candidates.append(candidate_data)
         
         return enriched_candidates
@@ -481,24 +464,18 @@ def update_my_profile():
 def get_candidate_stats():
     """Get candidate statistics for platform analytics"""
     try:
-        # Get general candidate statistics
-        total_candidates = db_service.count_records('candidate_profiles')
+        # Get candidates by experience level and availability in one grouped query
+        counts = db_service.count_grouped('candidate_profiles', ['experience_level', 'availability'])
+        total_candidates = sum(counts['experience_level'].values())
         
-        # Get candidates by experience level
         experience_levels = ['entry', 'mid', 'senior', 'executive']
-        experience_stats = {}
-        
-        for level in experience_levels:
-            count = db_service.count_records('candidate_profiles', {'experience_level': level})
-            experience_stats[level] = count
+        experience_stats = {level: counts['experience_level'].get(level, 0) for level in experience_levels}
         
-        # Get candidates by availability
         availability_options = ['immediate', '2_weeks', '1_month', '3_months']
-        availability_stats = {}
-        
-        for availability in availability_options:
-            count = db_service.count_records('candidate_profiles', {'availability': availability})
-            availability_stats[availability] = count
+        availability_stats = {
+            availability: counts['availability'].get(availability, 0)
+            for availability in availability_options
+        }
         
         return jsonify({
             'statistics': {
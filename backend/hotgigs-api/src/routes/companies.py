@@ -6,10 +6,9 @@ Handles company management, team members, and company-related operations
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from marshmallow import Schema, fields, ValidationError
-from src.models.database import DatabaseService
+from src.models.optimized_database import db_service
 
 companies_bp = Blueprint('companies', __name__)
-db_service = DatabaseService()
 
 # Validation schemas
 class CreateCompanySchema(Schema):
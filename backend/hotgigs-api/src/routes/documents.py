@@ -5,15 +5,24 @@ Handles document upload, management, and document-related operations
 from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from marshmallow import Schema, fields, ValidationError
+import os
 import re
 import html
 import base64
 from datetime import datetime, timezone
-from src.models.optimized_database import OptimizedSupabaseService
+from src.models.optimized_database import db_service
 from src.services.document_processing import document_processor
+from src.services.document_jobs import (
+    get_document_job_queue,
+    get_document_job_workers,
+    submit_document_job,
+    STATUS_QUEUED,
+    STATUS_RUNNING
+)
 
 documents_bp = Blueprint('documents', __name__)
-db_service = OptimizedSupabaseService()
+
+BATCH_LIMIT = int(os.getenv('DOCUMENT_BATCH_LIMIT', 5000))
 
 # Document validation schemas
 class DocumentUploadSchema(Schema):
@@ -262,6 +271,7 @@ class DocumentProcessingSchema(Schema):
     perform_ocr = fields.Bool(load_default=True)
     check_fraud = fields.Bool(load_default=True)
     extract_data = fields.Bool(load_default=True)
+    run_async = fields.Bool(load_default=False, data_key='async')
 
 class OCRSchema(Schema):
     document_data = fields.Str(required=True)  # Base64 encoded
@@ -289,6 +299,24 @@ def process_document():
                 'error': 'Invalid base64 document data'
             }), 400
         
+        # Large scans can outlast the request timeout; hand them to the job queue
+        if data['run_async']:
+            job_id = submit_document_job([{
+                'data': document_bytes,
+                'document_type': data['document_type'],
+                'perform_ocr': data['perform_ocr'],
+                'check_fraud': data['check_fraud']
+            }], user_id=get_jwt_identity(), source='process')
+            
+            return jsonify({
+                'success': True,
+                'data': {
+                    'job_id': job_id,
+                    'status': STATUS_QUEUED,
+                    'status_url': f'/api/documents/jobs/{job_id}'
+                }
+            }), 202
+        
         # Process document
         analysis = document_processor.process_document(
             document_bytes,
@@ -439,10 +467,7 @@ def parse_resume():
                     document_bytes = base64.b64decode(document_data)
                     document_type = data.get('document_type', 'pdf')
                     
-                    if document_type.lower() == 'pdf':
-                        resume_text, _ = document_processor.ocr_service.extract_text_from_pdf(document_bytes)
-                    else:
-                        resume_text, _ = document_processor.ocr_service.extract_text_from_image(document_bytes)
+                    resume_text, _, _ = document_processor.text_extractor.extract(document_bytes, document_type)
                 except Exception as e:
                     return jsonify({
                         'success': False,
@@ -506,63 +531,64 @@ def analyze_domain_expertise():
 @documents_bp.route('/batch-process', methods=['POST'])
 @jwt_required()
 def batch_process_documents():
-    """Process multiple documents in batch"""
+    """Queue multiple documents for background processing"""
     try:
         data = request.get_json()
         documents = data.get('documents', [])
         
-        if not documents or len(documents) > 10:  # Limit batch size
+        if not documents or len(documents) > BATCH_LIMIT:  # Limit batch size
             return jsonify({
                 'success': False,
-                'error': 'Invalid batch size (1-10 documents allowed)'
+                'error': f'Invalid batch size (1-{BATCH_LIMIT} documents allowed)'
             }), 400
         
-        results = []
+        queued = []
+        rejected = []
         
         for i, doc in enumerate(documents):
             try:
-                # Decode document
-                document_bytes = base64.b64decode(doc.get('document_data', ''))
-                document_type = doc.get('document_type', 'pdf')
-                
-                # Process document
-                analysis = document_processor.process_document(
-                    document_bytes,
-                    document_type,
-                    doc.get('perform_ocr', True),
-                    doc.get('check_fraud', True)
-                )
-                
-                results.append({
-                    'index': i,
-                    'success': True,
-                    'text_content': analysis.text_content[:500] + '...' if len(analysis.text_content) > 500 else analysis.text_content,
-                    'confidence_score': analysis.confidence_score,
-                    'fraud_indicators': analysis.fraud_indicators,
-                    'extracted_data': analysis.extracted_data,
-                    'is_authentic': len(analysis.fraud_indicators) == 0
-                })
-                
-            except Exception as e:
-                results.append({
+                document_bytes = base64.b64decode(doc.get('document_data', ''), validate=True)
+            except Exception:
+                document_bytes = b''
+            
+            if not document_bytes:
+                rejected.append({
                     'index': i,
                     'success': False,
-                    'error': str(e)
+                    'error': 'Missing or invalid base64 document data'
                 })
+                continue
+            
+            queued.append({
+                'index': i,
+                'document_id': doc.get('id'),
+                'data': document_bytes,
+                'document_type': doc.get('document_type', 'pdf'),
+                'perform_ocr': doc.get('perform_ocr', True),
+                'check_fraud': doc.get('check_fraud', True)
+            })
+        
+        if not queued:
+            return jsonify({
+                'success': False,
+                'error': 'No valid documents in batch',
+                'details': rejected
+            }), 400
         
-        # Calculate batch statistics
-        successful_count = sum(1 for r in results if r.get('success', False))
+        job_id = submit_document_job(queued, user_id=get_jwt_identity(), source='batch')
         
         return jsonify({
             'success': True,
             'data': {
-                'results': results,
+                'job_id': job_id,
+                'status': STATUS_QUEUED,
+                'status_url': f'/api/documents/jobs/{job_id}',
+                'results_url': f'/api/documents/jobs/{job_id}/results',
                 'total_documents': len(documents),
-                'successful_count': successful_count,
-                'failed_count': len(documents) - successful_count,
-                'success_rate': successful_count / len(documents) if documents else 0
+                'queued_count': len(queued),
+                'rejected': rejected
             }
-        }), 200
+        }), 202
         
     except Exception as e:
         current_app.logger.error(f"Batch processing error: {str(e)}")
@@ -571,6 +597,106 @@ def batch_process_documents():
             'error': 'Batch processing failed'
         }), 500
 
+def _get_owned_job(job_id, include_items=True):
+    """Load a document job if it belongs to the current user"""
+    job = get_document_job_queue().get_job(job_id, include_items=include_items)
+    if job is None or job['user_id'] != str(get_jwt_identity()):
+        return None
+    return job
+
+@documents_bp.route('/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_processing_job(job_id):
+    """Get document job status and per-document progress"""
+    try:
+        include_items = request.args.get('include_documents', 'true').lower() != 'false'
+        job = _get_owned_job(job_id, include_items)
+        if not job:
+            return jsonify({
+                'success': False,
+                'error': 'Job not found'
+            }), 404
+        
+        # Restart embedded workers if this process was recycled with work still pending
+        if job['status'] in (STATUS_QUEUED, STATUS_RUNNING):
+            get_document_job_workers().ensure_started()
+        
+        return jsonify({
+            'success': True,
+            'data': job
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Get processing job error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to retrieve job status'
+        }), 500
+
+@documents_bp.route('/jobs/<job_id>/results', methods=['GET'])
+@jwt_required()
+def get_processing_job_results(job_id):
+    """Get results of finished documents in a job"""
+    try:
+        job = _get_owned_job(job_id, include_items=False)
+        if not job:
+            return jsonify({
+                'success': False,
+                'error': 'Job not found'
+            }), 404
+        
+        offset = max(0, request.args.get('offset', 0, type=int))
+        limit = min(max(1, request.args.get('limit', 100, type=int)), 500)
+        results = get_document_job_queue().get_results(job_id, offset=offset, limit=limit)
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                'job_id': job_id,
+                'status': job['status'],
+                'progress': job['progress'],
+                'results': results,
+                'offset': offset,
+                'limit': limit,
+                'has_more': offset + len(results) < job['completed'] + job['failed'] + job['cancelled']
+            }
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Get processing job results error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to retrieve job results'
+        }), 500
+
+@documents_bp.route('/jobs/<job_id>/cancel', methods=['POST'])
+@jwt_required()
+def cancel_processing_job(job_id):
+    """Cancel documents in a job that have not started processing"""
+    try:
+        if not _get_owned_job(job_id, include_items=False):
+            return jsonify({
+                'success': False,
+                'error': 'Job not found'
+            }), 404
+        
+        cancelled = get_document_job_queue().cancel(job_id)
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                'job_id': job_id,
+                'cancelled_count': cancelled
+            }
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Cancel processing job error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to cancel job'
+        }), 500
+
 @documents_bp.route('/supported-formats', methods=['GET'])
 def get_supported_formats():
     """Get list of supported document formats"""
@@ -580,7 +706,7 @@ def get_supported_formats():
             'supported_formats': document_processor.ocr_service.supported_formats,
             'document_types': ['pdf', 'image', 'resume', 'cv', 'license', 'certificate', 'passport'],
             'max_file_size_mb': 10,
-            'batch_limit': 10
+            'batch_limit': BATCH_LIMIT
         }
     }), 200
 
@@ -8,10 +8,9 @@ from marshmallow import Schema, fields, ValidationError
 import re
 import html
 from datetime import datetime
-from src.models.database import DatabaseService
+from src.models.optimized_database import db_service
 
 jobs_bp = Blueprint('jobs', __name__)
-db_service = DatabaseService()
 
 # Job validation schemas
 class JobCreateSchema(Schema):
@@ -8,10 +8,9 @@ from marshmallow import Schema, fields, ValidationError
 import re
 import html
 from datetime import datetime, timezone
-from src.models.optimized_database import OptimizedSupabaseService
+from src.models.optimized_database import db_service
 
 notifications_bp = Blueprint('notifications', __name__)
-db_service = OptimizedSupabaseService()
 
 # Notification validation schemas
 class NotificationCreateSchema(Schema):
@@ -326,23 +325,15 @@ def mark_all_read():
     try:
         current_user_id = get_jwt_identity()
         
-        # Get all unread notifications for the user
-        unread_notifications = db_service.get_records_optimized(
+        # Mark all unread notifications as read in one statement
+        updated_count = db_service.update_where(
             'notifications',
-            {'user_id': current_user_id, 'is_read': False}
-        )
-        
-        # Update all to read
-        updated_count = 0
-        for notification in unread_notifications:
-            update_data = {
+            {'user_id': current_user_id, 'is_read': False},
+            {
                 'is_read': True,
                 'read_at': datetime.now(timezone.utc).isoformat()
             }
-            
-            updated = db_service.update_record('notifications', notification['id'], update_data)
-            if updated:
-                updated_count += 1
+        )
         
         return jsonify({
             'message': f'Marked {updated_count} notifications as read',
@@ -364,21 +355,12 @@ def clear_all_notifications():
     try:
         current_user_id = get_jwt_identity()
         
-        # Get all notifications for the user
-        user_notifications = db_service.get_records_optimized(
+        # Delete all notifications in one statement
+        deleted_count = db_service.delete_where(
             'notifications',
             {'user_id': current_user_id}
         )
         
-        # Delete all notifications
-        deleted_count = 0
-        for notification in user_notifications:
-            try:
-                db_service.delete_record('notifications', notification['id'])
-                deleted_count += 1
-            except:
-                continue
-        
         return jsonify({
             'message': f'Cleared {deleted_count} notifications',
             'deleted_count': deleted_count,
@@ -486,28 +468,22 @@ def get_notification_stats():
     try:
         current_user_id = get_jwt_identity()
         
-        # Get total notifications
-        total_notifications = db_service.count_records(
+        # Get read state and type breakdowns in one grouped query
+        counts = db_service.count_grouped(
             'notifications',
+            ['is_read', 'notification_type'],
             {'user_id': current_user_id}
         )
         
-        # Get unread notifications
-        unread_notifications = db_service.count_records(
-            'notifications',
-            {'user_id': current_user_id, 'is_read': False}
-        )
+        total_notifications = sum(counts['is_read'].values())
+        unread_notifications = counts['is_read'].get('false', 0)
         
         # Get notifications by type
         notification_types = ['info', 'success', 'warning', 'error', 'job_alert', 'application_update', 'message']
-        type_stats = {}
-        
-        for notification_type in notification_types:
-            count = db_service.count_records(
-                'notifications',
-                {'user_id': current_user_id, 'notification_type': notification_type}
-            )
-            type_stats[notification_type] = count
+        type_stats = {
+            notification_type: counts['notification_type'].get(notification_type, 0)
+            for notification_type in notification_types
+        }
         
         return jsonify({
             'statistics': {
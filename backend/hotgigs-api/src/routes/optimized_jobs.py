@@ -10,10 +10,9 @@ import html
 import time
 from datetime import datetime, timezone
 from functools import wraps
-from src.models.optimized_database import OptimizedSupabaseService
+from src.models.optimized_database import db_service
 
 jobs_bp = Blueprint('jobs', __name__)
-db_service = OptimizedSupabaseService()
 
 # Performance monitoring decorator
 def monitor_performance(operation_name):
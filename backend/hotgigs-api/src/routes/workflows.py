@@ -7,7 +7,7 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from marshmallow import Schema, fields, ValidationError
 import json
 from datetime import datetime, timezone, timedelta
-from src.models.optimized_database import OptimizedSupabaseService
+from src.models.optimized_database import db_service
 from src.services.workflow_automation import (
     task_manager, 
     workflow_engine, 
@@ -19,7 +19,6 @@ from src.services.workflow_automation import (
 )
 
 workflows_bp = Blueprint('workflows', __name__)
-db_service = OptimizedSupabaseService()
 
 # Validation schemas
 class TaskCreateSchema(Schema):
@@ -60,8 +59,12 @@ def health_check():
         return jsonify({
             'status': 'healthy',
             'service': 'workflows',
-            'active_workflows': len(workflow_engine.workflows),
-            'pending_tasks': len(task_manager.get_tasks_by_status(TaskStatus.PENDING)),
+            'active_workflows': workflow_engine.count_workflows(WorkflowStatus.ACTIVE),
+            'pending_tasks': task_manager.count_tasks(TaskStatus.PENDING),
+            'store': workflow_engine.store.get_stats(),
+            'workers': workflow_engine.workers.get_stats(),
+            'steps': workflow_engine.get_step_stats(),
+            'scheduler': workflow_engine.scheduler.get_stats(),
             'timestamp': datetime.now(timezone.utc).isoformat()
         }), 200
         
@@ -193,11 +196,15 @@ def update_task(task_id):
             task_manager.update_task_status(task_id, status, progress)
         
         # Update other fields
+        updates = {}
         if 'assigned_to' in data:
-            task.assigned_to = str(data['assigned_to']) if data['assigned_to'] else None
+            updates['assigned_to'] = str(data['assigned_to']) if data['assigned_to'] else None
         
         if 'priority' in data:
-            task.priority = TaskPriority(data['priority'])
+            updates['priority'] = TaskPriority(data['priority'])
+        
+        if updates:
+            task_manager.update_task(task_id, **updates)
         
         updated_task = task_manager.get_task(task_id)
         
@@ -231,16 +238,16 @@ def get_my_tasks():
     """Get tasks assigned to current user"""
     try:
         user_id = get_jwt_identity()
-        tasks = task_manager.get_tasks_by_assignee(user_id)
         
         # Filter by status if provided
+        status_enum = None
         status_filter = request.args.get('status')
         if status_filter:
             try:
                 status_enum = TaskStatus(status_filter)
-                tasks = [task for task in tasks if task.status == status_enum]
             except ValueError:
                 pass
+        tasks = task_manager.get_tasks_by_assignee(user_id, status_enum)
         
         task_list = []
         for task in tasks:
@@ -375,13 +382,21 @@ def execute_workflow(workflow_id):
         context['user_id'] = get_jwt_identity()
         context['execution_time'] = datetime.now(timezone.utc).isoformat()
         
-        success = workflow_engine.execute_workflow(workflow_id, context)
+        workflow = workflow_engine.get_workflow(workflow_id)
+        if not workflow:
+            return jsonify({
+                'success': False,
+                'error': 'Workflow not found'
+            }), 404
         
-        if success:
+        run_id = workflow_engine.execute_workflow(workflow_id, context)
+        
+        if run_id:
             return jsonify({
                 'success': True,
                 'message': 'Workflow execution started',
-                'workflow_id': workflow_id
+                'workflow_id': workflow_id,
+                'run_id': run_id
             }), 200
         else:
             return jsonify({
@@ -404,19 +419,18 @@ def get_workflows():
         user_id = get_jwt_identity()
         
         user_workflows = []
-        for workflow in workflow_engine.workflows.values():
-            if workflow.created_by == user_id:
-                user_workflows.append({
-                    'id': workflow.id,
-                    'name': workflow.name,
-                    'description': workflow.description,
-                    'trigger_type': workflow.trigger_type,
-                    'status': workflow.status.value,
-                    'created_at': workflow.created_at.isoformat(),
-                    'last_executed': workflow.last_executed.isoformat() if workflow.last_executed else None,
-                    'execution_count': workflow.execution_count,
-                    'step_count': len(workflow.steps)
-                })
+        for workflow in workflow_engine.list_workflows(created_by=user_id):
+            user_workflows.append({
+                'id': workflow.id,
+                'name': workflow.name,
+                'description': workflow.description,
+                'trigger_type': workflow.trigger_type,
+                'status': workflow.status.value,
+                'created_at': workflow.created_at.isoformat(),
+                'last_executed': workflow.last_executed.isoformat() if workflow.last_executed else None,
+                'execution_count': workflow.execution_count,
+                'step_count': len(workflow.steps)
+            })
         
         return jsonify({
             'success': True,
@@ -433,6 +447,44 @@ def get_workflows():
             'error': 'Failed to retrieve workflows'
         }), 500
 
+@workflows_bp.route('/workflows/runs/<run_id>', methods=['GET'])
+@jwt_required()
+def get_workflow_run(run_id):
+    """Get status, step log and context of a workflow run"""
+    try:
+        run = workflow_engine.get_run(run_id)
+        workflow = workflow_engine.get_workflow(run['workflow_id']) if run else None
+        
+        if not workflow or workflow.created_by != str(get_jwt_identity()):
+            return jsonify({
+                'success': False,
+                'error': 'Workflow run not found'
+            }), 404
+        
+        state = run['state']
+        return jsonify({
+            'success': True,
+            'data': {
+                'run_id': run['id'],
+                'workflow_id': run['workflow_id'],
+                'status': run['status'],
+                'attempts': run['attempts'],
+                'error': run['error'],
+                'steps': state.get('log', []),
+                'pending_steps': state.get('pending', []),
+                'context': state.get('context', {}),
+                'created_at': datetime.fromtimestamp(run['created_at'], timezone.utc).isoformat(),
+                'updated_at': datetime.fromtimestamp(run['updated_at'], timezone.utc).isoformat()
+            }
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Get workflow run error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to retrieve workflow run'
+        }), 500
+
 # Auto-Apply Functionality
 @workflows_bp.route('/auto-apply/setup', methods=['POST'])
 @jwt_required()
@@ -458,6 +510,7 @@ def setup_auto_apply():
             str(data['candidate_id']),
             criteria
         )
+        schedule = workflow_engine.store.get_schedule(workflow_id)
         
         return jsonify({
             'success': True,
@@ -465,7 +518,9 @@ def setup_auto_apply():
                 'workflow_id': workflow_id,
                 'candidate_id': str(data['candidate_id']),
                 'criteria': criteria,
-                'status': 'active'
+                'status': 'active',
+                'next_run_at': datetime.fromtimestamp(schedule['next_run_at'], timezone.utc).isoformat()
+                    if schedule else None
             }
         }), 201
         
@@ -521,34 +576,35 @@ def get_workflow_dashboard_stats():
     try:
         user_id = get_jwt_identity()
         
-        # Get task statistics
-        user_tasks = task_manager.get_tasks_by_assignee(user_id)
-        pending_tasks = len([t for t in user_tasks if t.status == TaskStatus.PENDING])
-        in_progress_tasks = len([t for t in user_tasks if t.status == TaskStatus.IN_PROGRESS])
-        completed_tasks = len([t for t in user_tasks if t.status == TaskStatus.COMPLETED])
-        overdue_tasks = len(task_manager.get_overdue_tasks())
+        today_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        
+        # Get task statistics from the store's counters
+        task_counts = task_manager.get_task_counts(user_id)
+        overdue_tasks = task_manager.count_overdue_tasks()
         
         # Get workflow statistics
-        user_workflows = [w for w in workflow_engine.workflows.values() if w.created_by == user_id]
-        active_workflows = len([w for w in user_workflows if w.status == WorkflowStatus.ACTIVE])
+        active_workflows = workflow_engine.count_workflows(WorkflowStatus.ACTIVE, created_by=user_id)
+        total_workflows = workflow_engine.count_workflows(created_by=user_id)
         
         return jsonify({
             'success': True,
             'data': {
                 'tasks': {
-                    'pending': pending_tasks,
-                    'in_progress': in_progress_tasks,
-                    'completed': completed_tasks,
+                    'pending': task_counts[TaskStatus.PENDING.value],
+                    'in_progress': task_counts[TaskStatus.IN_PROGRESS.value],
+                    'completed': task_counts[TaskStatus.COMPLETED.value],
                     'overdue': overdue_tasks,
-                    'total': len(user_tasks)
+                    'total': sum(task_counts.values())
                 },
                 'workflows': {
                     'active': active_workflows,
-                    'total': len(user_workflows)
+                    'total': total_workflows
                 },
                 'recent_activity': {
-                    'tasks_created_today': len([t for t in user_tasks if t.created_at.date() == datetime.now().date()]),
-                    'workflows_executed_today': len([w for w in user_workflows if w.last_executed and w.last_executed.date() == datetime.now().date()])
+                    'tasks_created_today': task_manager.count_tasks_created_on(user_id, today_start.date()),
+                    'workflows_executed_today': workflow_engine.count_workflows(
+                        created_by=user_id, executed_since=today_start
+                    )
                 }
             }
         }), 200
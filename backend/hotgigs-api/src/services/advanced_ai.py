@@ -4,13 +4,15 @@ Implements vector embeddings, semantic search, and advanced AI features
 """
 import os
 import json
+import hashlib
 import numpy as np
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timezone
 import openai
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 import logging
+from src.services.vector_index import LocalVectorIndex, create_text_vectorizer
+from src.services.ai.llm_scheduler import get_llm_scheduler
+from src.services.interview_session_store import InterviewSessionStore, get_interview_session_store
 
 # Configure OpenAI
 openai.api_key = os.getenv('OPENAI_API_KEY')
@@ -18,74 +20,79 @@ openai.api_key = os.getenv('OPENAI_API_KEY')
 class VectorEmbeddingService:
     """Service for handling vector embeddings and semantic search"""
     
-    def __init__(self):
-        self.vectorizer = TfidfVectorizer(
-            max_features=1000,
-            stop_words='english',
-            ngram_range=(1, 2)
-        )
-        self.job_vectors = None
-        self.resume_vectors = None
-        self.job_data = []
-        self.resume_data = []
-        
-    def create_job_embeddings(self, jobs: List[Dict]) -> None:
-        """Create vector embeddings for job descriptions"""
+    def __init__(self, index_dir: Optional[str] = None):
+        # Hashed vectors need no fitted vocabulary, so both indexes share one encoder
+        self.vectorizer = create_text_vectorizer()
+        self.job_index = LocalVectorIndex('jobs', index_dir, self.vectorizer)
+        self.resume_index = LocalVectorIndex('resumes', index_dir, self.vectorizer)
+    
+    @staticmethod
+    def _job_text(job: Dict) -> str:
+        """Text used to embed a job"""
+        return f"{job.get('title', '')} {job.get('description', '')} {job.get('requirements', '')}"
+    
+    @staticmethod
+    def _resume_text(resume: Dict) -> str:
+        """Text used to embed a resume"""
+        return f"{resume.get('skills', '')} {resume.get('experience', '')} {resume.get('education', '')}"
+    
+    @staticmethod
+    def _item_id(record: Dict) -> str:
+        """Stable index id for a record"""
+        record_id = record.get('id') or record.get('candidate_id')
+        if record_id:
+            return str(record_id)
+        # Content hash keeps ids stable across worker processes
+        return hashlib.sha1(json.dumps(record, sort_keys=True, default=str).encode()).hexdigest()
+    
+    def create_job_embeddings(self, jobs: List[Dict]) -> Dict[str, int]:
+        """Sync the job index with the given jobs, embedding only new or changed ones"""
         try:
-            # Combine job title, description, and requirements for embedding
-            job_texts = []
-            self.job_data = jobs
-            
-            for job in jobs:
-                text = f"{job.get('title', '')} {job.get('description', '')} {job.get('requirements', '')}"
-                job_texts.append(text)
-            
-            if job_texts:
-                self.job_vectors = self.vectorizer.fit_transform(job_texts)
-                logging.info(f"Created embeddings for {len(jobs)} jobs")
-            
+            result = self.job_index.sync((self._item_id(job), self._job_text(job), job) for job in jobs)
+            logging.info(f"Synced embeddings for {len(jobs)} jobs: {result}")
+            return result
         except Exception as e:
             logging.error(f"Error creating job embeddings: {str(e)}")
-            
-    def create_resume_embeddings(self, resumes: List[Dict]) -> None:
-        """Create vector embeddings for resumes"""
+            return {'added': 0, 'removed': 0, 'unchanged': 0}
+    
+    def create_resume_embeddings(self, resumes: List[Dict]) -> Dict[str, int]:
+        """Sync the resume index with the given resumes, embedding only new or changed ones"""
         try:
-            resume_texts = []
-            self.resume_data = resumes
-            
-            for resume in resumes:
-                # Combine all resume text fields
-                text = f"{resume.get('skills', '')} {resume.get('experience', '')} {resume.get('education', '')}"
-                resume_texts.append(text)
-            
-            if resume_texts and hasattr(self.vectorizer, 'vocabulary_'):
-                self.resume_vectors = self.vectorizer.transform(resume_texts)
-                logging.info(f"Created embeddings for {len(resumes)} resumes")
-            
+            result = self.resume_index.sync(
+                (self._item_id(resume), self._resume_text(resume), resume) for resume in resumes
+            )
+            logging.info(f"Synced embeddings for {len(resumes)} resumes: {result}")
+            return result
         except Exception as e:
             logging.error(f"Error creating resume embeddings: {str(e)}")
+            return {'added': 0, 'removed': 0, 'unchanged': 0}
+    
+    def add_jobs(self, jobs: List[Dict]) -> int:
+        """Add or replace jobs in the index without touching the rest"""
+        return self.job_index.add((self._item_id(job), self._job_text(job), job) for job in jobs)
+    
+    def remove_jobs(self, job_ids: List[str]) -> int:
+        """Remove jobs from the index"""
+        return self.job_index.remove(job_ids)
+    
+    def add_resumes(self, resumes: List[Dict]) -> int:
+        """Add or replace resumes in the index without touching the rest"""
+        return self.resume_index.add(
+            (self._item_id(resume), self._resume_text(resume), resume) for resume in resumes
+        )
+    
+    def remove_resumes(self, resume_ids: List[str]) -> int:
+        """Remove resumes from the index"""
+        return self.resume_index.remove(resume_ids)
     
     def semantic_job_search(self, query: str, top_k: int = 10) -> List[Dict]:
         """Perform semantic search for jobs based on query"""
         try:
-            if self.job_vectors is None:
-                return []
-            
-            # Transform query to vector
-            query_vector = self.vectorizer.transform([query])
-            
-            # Calculate similarity scores
-            similarities = cosine_similarity(query_vector, self.job_vectors).flatten()
-            
-            # Get top k results
-            top_indices = similarities.argsort()[-top_k:][::-1]
-            
             results = []
-            for idx in top_indices:
-                if similarities[idx] > 0.1:  # Minimum similarity threshold
-                    job = self.job_data[idx].copy()
-                    job['similarity_score'] = float(similarities[idx])
-                    results.append(job)
+            for job, score in self.job_index.search(query, top_k, min_score=0.1):  # Minimum similarity threshold
+                job = dict(job)
+                job['similarity_score'] = score
+                results.append(job)
             
             return results
             
@@ -96,37 +103,35 @@ class VectorEmbeddingService:
     def find_similar_candidates(self, job_description: str, top_k: int = 10) -> List[Dict]:
         """Find candidates similar to job requirements"""
         try:
-            if self.resume_vectors is None:
-                return []
-            
-            # Transform job description to vector
-            job_vector = self.vectorizer.transform([job_description])
-            
-            # Calculate similarity with all resumes
-            similarities = cosine_similarity(job_vector, self.resume_vectors).flatten()
-            
-            # Get top k candidates
-            top_indices = similarities.argsort()[-top_k:][::-1]
-            
             results = []
-            for idx in top_indices:
-                if similarities[idx] > 0.1:
-                    candidate = self.resume_data[idx].copy()
-                    candidate['match_score'] = float(similarities[idx])
-                    results.append(candidate)
+            for candidate, score in self.resume_index.search(job_description, top_k, min_score=0.1):
+                candidate = dict(candidate)
+                candidate['match_score'] = score
+                results.append(candidate)
             
             return results
             
         except Exception as e:
             logging.error(f"Error finding similar candidates: {str(e)}")
             return []
+    
+    def get_index_stats(self) -> Dict[str, Any]:
+        """Get size and layout of the job and resume indexes"""
+        return {
+            'jobs': self.job_index.get_stats(),
+            'resumes': self.resume_index.get_stats()
+        }
 
 class AIInterviewAgent:
-    """AI-powered interview agent for conducting candidate interviews"""
+    """AI-powered interview agent for conducting candidate interviews
     
-    def __init__(self):
-        self.client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-        self.interview_sessions = {}
+    Sessions live in the shared interview session store, so each answer can
+    be handled by any web worker and sessions survive restarts.
+    """
+    
+    def __init__(self, store: Optional[InterviewSessionStore] = None):
+        self.scheduler = get_llm_scheduler()
+        self.sessions = store or get_interview_session_store()
         
     def start_interview(self, candidate_id: str, job_id: str, job_description: str) -> Dict:
         """Start an AI interview session"""
@@ -136,19 +141,12 @@ class AIInterviewAgent:
             # Generate initial interview questions based on job description
             initial_questions = self._generate_interview_questions(job_description)
             
-            session = {
-                'session_id': session_id,
+            self.sessions.create(session_id, initial_questions, {
                 'candidate_id': candidate_id,
                 'job_id': job_id,
                 'job_description': job_description,
-                'questions': initial_questions,
-                'current_question_index': 0,
-                'responses': [],
-                'started_at': datetime.now(timezone.utc).isoformat(),
-                'status': 'active'
-            }
-            
-            self.interview_sessions[session_id] = session
+                'started_at': datetime.now(timezone.utc).isoformat()
+            }, status='active')
             
             return {
                 'session_id': session_id,
@@ -178,7 +176,7 @@ class AIInterviewAgent:
             Return only the questions, one per line.
             """
             
-            response = self.client.chat.completions.create(
+            questions_text = self.scheduler.complete(
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": "You are an expert HR interviewer. Generate relevant, professional interview questions."},
@@ -186,9 +184,7 @@ class AIInterviewAgent:
                 ],
                 max_tokens=800,
                 temperature=0.7
-            )
-            
-            questions_text = response.choices[0].message.content
+            ).content
             questions = [q.strip() for q in questions_text.split('\n') if q.strip()]
             
             return questions[:10]  # Limit to 10 questions
@@ -206,33 +202,36 @@ class AIInterviewAgent:
     def submit_response(self, session_id: str, response: str) -> Dict:
         """Submit candidate response and get next question"""
         try:
-            if session_id not in self.interview_sessions:
+            session = self.sessions.get(session_id)
+            if session is None:
                 return {'error': 'Interview session not found'}
             
-            session = self.interview_sessions[session_id]
-            
             if session['status'] != 'active':
                 return {'error': 'Interview session is not active'}
             
-            # Store the response
-            current_question = session['questions'][session['current_question_index']]
-            session['responses'].append({
-                'question': current_question,
+            # Store the response; only the answer is written, not the transcript
+            questions = session['questions']
+            question_index = session['question_index']
+            is_last = question_index + 1 >= len(questions)
+            recorded = self.sessions.append_response(session_id, question_index, {
+                'question': questions[question_index],
                 'response': response,
                 'timestamp': datetime.now(timezone.utc).isoformat()
-            })
+            }, expected_status='active', status='completed' if is_last else None, finished=is_last)
             
-            # Move to next question
-            session['current_question_index'] += 1
+            if not recorded:
+                return {'error': 'Interview session was updated by another request'}
             
             # Check if interview is complete
-            if session['current_question_index'] >= len(session['questions']):
-                session['status'] = 'completed'
-                session['completed_at'] = datetime.now(timezone.utc).isoformat()
+            if is_last:
+                session['responses'] = self.sessions.list_responses(session_id)
+                session['job_description'] = session['attributes']['job_description']
                 
                 # Generate assessment
                 assessment = self._generate_assessment(session)
-                session['assessment'] = assessment
+                self.sessions.update(session_id, attributes={
+                    'completed_at': datetime.now(timezone.utc).isoformat()
+                }, result=assessment, finished=True)
                 
                 return {
                     'status': 'completed',
@@ -241,12 +240,11 @@ class AIInterviewAgent:
                 }
             else:
                 # Return next question
-                next_question = session['questions'][session['current_question_index']]
                 return {
                     'status': 'active',
-                    'next_question': next_question,
-                    'question_number': session['current_question_index'] + 1,
-                    'total_questions': len(session['questions'])
+                    'next_question': questions[question_index + 1],
+                    'question_number': question_index + 2,
+                    'total_questions': len(questions)
                 }
                 
         except Exception as e:
@@ -280,7 +278,7 @@ class AIInterviewAgent:
             Format as JSON with keys: score, strengths, improvements, recommendation, insights
             """
             
-            response = self.client.chat.completions.create(
+            assessment_text = self.scheduler.complete(
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": "You are an expert HR assessor. Provide fair, objective candidate evaluations."},
@@ -288,9 +286,7 @@ class AIInterviewAgent:
                 ],
                 max_tokens=1000,
                 temperature=0.3
-            )
-            
-            assessment_text = response.choices[0].message.content
+            ).content
             
             # Try to parse as JSON, fallback to structured text
             try:
@@ -318,13 +314,27 @@ class AIInterviewAgent:
     
     def get_interview_session(self, session_id: str) -> Optional[Dict]:
         """Get interview session details"""
-        return self.interview_sessions.get(session_id)
+        session = self.sessions.get(session_id, with_responses=True)
+        if session is None:
+            return None
+        
+        details = {
+            'session_id': session_id,
+            **session['attributes'],
+            'questions': session['questions'],
+            'current_question_index': session['question_index'],
+            'responses': session['responses'],
+            'status': session['status']
+        }
+        if session['result'] is not None:
+            details['assessment'] = session['result']
+        return details
 
 class CandidateFeedbackLoop:
     """AI-powered feedback loop for candidate recommendations"""
     
     def __init__(self):
-        self.client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        self.scheduler = get_llm_scheduler()
         self.feedback_data = {}
     
     def store_rejection_feedback(self, job_id: str, candidate_id: str, feedback: str, reason: str) -> None:
@@ -378,7 +388,7 @@ class CandidateFeedbackLoop:
             Format as JSON with keys: fit_score, success_likelihood, red_flags, improvements, strengths
             """
             
-            response = self.client.chat.completions.create(
+            analysis_text = self.scheduler.complete(
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": "You are an expert recruiter analyzing candidate-job fit."},
@@ -386,9 +396,7 @@ class CandidateFeedbackLoop:
                 ],
                 max_tokens=1000,
                 temperature=0.3
-            )
-            
-            analysis_text = response.choices[0].message.content
+            ).content
             
             try:
                 analysis = json.loads(analysis_text)
@@ -417,7 +425,7 @@ class PredictiveAnalytics:
     """Predictive analytics for hiring insights"""
     
     def __init__(self):
-        self.client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        self.scheduler = get_llm_scheduler()
     
     def predict_hiring_success(self, candidate_data: Dict, job_data: Dict, historical_data: List[Dict]) -> Dict:
         """Predict hiring success based on historical data"""
@@ -471,7 +479,7 @@ class PredictiveAnalytics:
             Format as JSON with keys: success_probability, confidence, success_factors, risk_factors, recommendations
             """
             
-            response = self.client.chat.completions.create(
+            prediction_text = self.scheduler.complete(
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": "You are a data scientist specializing in hiring analytics."},
@@ -479,9 +487,7 @@ class PredictiveAnalytics:
                 ],
                 max_tokens=800,
                 temperature=0.3
-            )
-            
-            prediction_text = response.choices[0].message.content
+            ).content
             
             try:
                 prediction = json.loads(prediction_text)
@@ -13,10 +13,18 @@ from ..database import get_database_service
 logger = logging.getLogger(__name__)
 
 class AIInterviewAgent:
-    def __init__(self):
+    """
+    The interview_sessions row is the authoritative session state. Each
+    answer is appended to interview_responses and advances the row's
+    current_question_index with a guarded update, so a turn does not rewrite
+    the transcript and a duplicate submission is rejected; the full
+    transcript is written to the row once, when the interview completes.
+    """
+    
+    def __init__(self, db_service=None):
         """Initialize AI Interview Agent"""
         self.openai_service = get_openai_service()
-        self.db_service = get_database_service()
+        self.db_service = db_service or get_database_service()
         
         # Interview configuration
         self.interview_types = {
@@ -149,13 +157,14 @@ class AIInterviewAgent:
         """
         try:
             # Get session details
-            session = self.db_service.get_record_by_id('interview_sessions', session_id)
+            session = self.db_service.get_record_by_id('interview_sessions', session_id, use_cache=False)
             if not session:
                 return {"success": False, "error": "Interview session not found"}
             
             if session['status'] != 'in_progress':
                 return {"success": False, "error": "Interview is not in progress"}
             
+            previous_responses = self._session_responses(session)
             current_index = session['current_question_index']
             questions = session['questions']
             
@@ -171,7 +180,7 @@ class AIInterviewAgent:
                 {
                     "question_context": current_question,
                     "interview_type": session['interview_type'],
-                    "previous_responses": session.get('responses', [])
+                    "previous_responses": previous_responses
                 }
             )
             
@@ -188,31 +197,35 @@ class AIInterviewAgent:
                 "response_time_seconds": None  # Could be calculated if needed
             }
             
-            # Update session with new response
-            updated_responses = session.get('responses', [])
-            updated_responses.append(response_record)
-            
             # Determine next action
             next_index = current_index + 1
             is_interview_complete = next_index >= len(questions)
             
-            update_data = {
-                'responses': updated_responses,
-                'current_question_index': next_index
-            }
+            if not self._record_response(session_id, current_index, response_record):
+                return {"success": False, "error": "A response to this question was already submitted"}
             
             if is_interview_complete:
                 # Complete the interview
+                updated_responses = previous_responses + [response_record]
                 final_assessment = self._generate_final_assessment(session_id, updated_responses)
-                update_data.update({
-                    'status': 'completed',
-                    'completed_at': datetime.utcnow().isoformat(),
-                    'final_assessment': final_assessment,
-                    'overall_score': final_assessment.get('overall_score', 0)
-                })
-            
-            # Update session
-            self.db_service.update_record('interview_sessions', session_id, update_data)
+                try:
+                    completed = self.db_service.update_where('interview_sessions', {
+                        'id': session_id,
+                        'status': 'in_progress',
+                        'current_question_index': next_index
+                    }, {
+                        'responses': updated_responses,
+                        'status': 'completed',
+                        'completed_at': datetime.utcnow().isoformat(),
+                        'final_assessment': final_assessment,
+                        'overall_score': final_assessment.get('overall_score', 0)
+                    })
+                except Exception:
+                    completed = 0
+                if not completed:
+                    # Undo the last turn so the answer can be submitted again
+                    self._undo_response(session_id, current_index)
+                    return {"success": False, "error": "Completing the interview failed, please resubmit"}
             
             # Prepare response
             result = {
@@ -241,6 +254,65 @@ class AIInterviewAgent:
             logger.error(f"Submitting response failed: {str(e)}")
             return {"success": False, "error": str(e)}
     
+    def _session_responses(self, session: Dict) -> List[Dict]:
+        """
+        Transcript so far: responses stored on the row (completed interviews
+        and interviews started before per-turn responses) followed by the
+        appended interview_responses rows
+        """
+        responses = list(session.get('responses') or [])
+        if session.get('status') == 'completed':
+            return responses
+        
+        rows = self.db_service.get_records_optimized(
+            'interview_responses', filters={'session_id': session['id']},
+            order_by='question_index', select_fields='question_index,response', use_cache=False
+        )
+        responses.extend(row['response'] for row in rows if row['question_index'] >= len(responses))
+        return responses
+    
+    def _record_response(self, session_id: str, question_index: int, response_record: Dict) -> bool:
+        """
+        Advance the session past `question_index` and append its response.
+        Returns False when another submission already answered the question.
+        """
+        claimed = self.db_service.update_where('interview_sessions', {
+            'id': session_id,
+            'status': 'in_progress',
+            'current_question_index': question_index
+        }, {'current_question_index': question_index + 1})
+        if not claimed:
+            return False
+        
+        try:
+            self.db_service.create_record('interview_responses', {
+                'session_id': session_id,
+                'question_index': question_index,
+                'response': response_record
+            })
+        except Exception:
+            self.db_service.update_where('interview_sessions', {
+                'id': session_id,
+                'current_question_index': question_index + 1
+            }, {'current_question_index': question_index})
+            raise
+        return True
+    
+    def _undo_response(self, session_id: str, question_index: int):
+        """Remove the response to `question_index` and move the session back to it"""
+        try:
+            self.db_service.delete_where('interview_responses', {
+                'session_id': session_id,
+                'question_index': question_index
+            })
+            self.db_service.update_where('interview_sessions', {
+                'id': session_id,
+                'status': 'in_progress',
+                'current_question_index': question_index + 1
+            }, {'current_question_index': question_index})
+        except Exception as e:
+            logger.error(f"Rolling back response {question_index} of interview {session_id} failed: {str(e)}")
+    
     def get_interview_status(self, session_id: str) -> Dict[str, Any]:
         """
         Get current status of an interview session
@@ -252,7 +324,7 @@ class AIInterviewAgent:
             
             # Calculate progress
             total_questions = len(session.get('questions', []))
-            completed_questions = len(session.get('responses', []))
+            completed_questions = max(len(session.get('responses') or []), session.get('current_question_index') or 0)
             progress_percentage = (completed_questions / total_questions * 100) if total_questions > 0 else 0
             
             # Calculate duration if started
@@ -436,17 +508,18 @@ class AIInterviewAgent:
             }}
             """
             
-            assessment_result = self.openai_service.client.chat.completions.create(
+            assessment_text = self.openai_service.chat_completion(
                 model=self.openai_service.models['analysis'],
                 messages=[
                     {"role": "system", "content": "You are an expert interview assessor. Provide thorough, fair, and constructive evaluations."},
                     {"role": "user", "content": assessment_prompt}
                 ],
                 temperature=0.2,
-                max_tokens=1500
+                max_tokens=1500,
+                use_cache=False
             )
             
-            final_assessment = json.loads(assessment_result.choices[0].message.content)
+            final_assessment = json.loads(assessment_text)
             final_assessment["assessment_date"] = datetime.utcnow().isoformat()
             
             return final_assessment
@@ -3,24 +3,82 @@ Job Matching Service for HotGigs.ai
 Implements AI-powered job matching algorithms with feedback loop and recommendation system
 """
 
+import os
 import json
 import logging
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 from .openai_service import get_openai_service
+from .match_prefilter import (
+    MatchPrefilter, calculate_job_match_score, normalize_skills, job_text, candidate_text
+)
 from ..database import get_database_service
 
 logger = logging.getLogger(__name__)
 
 class JobMatchingService:
-    def __init__(self):
+    def __init__(self, db_service=None):
         """Initialize job matching service"""
         self.openai_service = get_openai_service()
-        self.db_service = get_database_service()
+        self.db_service = db_service or get_database_service()
+        self.prefilter = MatchPrefilter()
+        
+        # Two-stage matching: local ranking over pool_size items, LLM for the top llm_top_k
+        self.pool_size = int(os.getenv('MATCH_POOL_SIZE', 500))
+        self.llm_top_k = int(os.getenv('MATCH_LLM_TOP_K', 10))
+        self.latency_budget = float(os.getenv('MATCH_LLM_BUDGET_SECONDS', 20))
     
-    def find_matching_jobs(self, candidate_id: str, limit: int = 20) -> Dict[str, Any]:
+    def _score_shortlist(self, shortlist: List[Dict[str, Any]], job_description_for,
+                         latency_budget: float) -> None:
         """
-        Find jobs that match a candidate's profile using AI analysis
+        Run LLM match analysis for shortlisted items concurrently within a latency budget.
+        Items not scored by the deadline keep their prefilter score.
+        """
+        if not shortlist:
+            return
+        
+        match_results = self.openai_service.calculate_job_match_scores(
+            [(item['candidate_data'], job_description_for(item)) for item in shortlist],
+            timeout=latency_budget
+        )
+        
+        unscored = 0
+        for item, match_result in zip(shortlist, match_results):
+            if not match_result.get('success'):
+                unscored += 1
+                continue
+            
+            match_analysis = match_result['match_analysis']
+            try:
+                item['match_score'] = float(match_analysis.get('match_score', 0))
+            except (TypeError, ValueError):
+                unscored += 1
+                continue
+            item['match_analysis'] = match_analysis
+            item['scored_by'] = 'llm'
+        
+        if unscored:
+            logger.info(f"{unscored} shortlisted items kept prefilter scores (budget {latency_budget}s)")
+    
+    def _shortlist(self, query: str, pool: List[Dict[str, Any]], texts: List[str],
+                   heuristic_scores: List[float], top_k: int) -> List[Dict[str, Any]]:
+        """Stage one: rank the whole pool locally and keep the top_k items"""
+        shortlist = []
+        for index, score in self.prefilter.rank(query, texts, heuristic_scores, top_k):
+            item = pool[index]
+            item['prefilter_score'] = round(score * 100, 1)
+            item['match_score'] = item['prefilter_score']
+            item['match_analysis'] = None
+            item['scored_by'] = 'prefilter'
+            shortlist.append(item)
+        return shortlist
+    
+    def find_matching_jobs(self, candidate_id: str, limit: int = 20,
+                           llm_top_k: Optional[int] = None,
+                           latency_budget: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Find jobs that match a candidate's profile using AI analysis.
+        All active jobs are ranked locally and only the top llm_top_k go to the LLM.
         """
         try:
             # Get candidate profile
@@ -29,50 +87,66 @@ class JobMatchingService:
                 return {"success": False, "error": "Candidate not found"}
             
             # Get candidate's resume and skills
+            preferences = candidate.get('job_preferences') or {}
             candidate_data = {
                 "skills": candidate.get('skills', []),
                 "experience": candidate.get('experience_years', 0),
                 "education": candidate.get('education', []),
-                "preferences": candidate.get('job_preferences', {}),
+                "preferences": preferences,
                 "resume_text": candidate.get('resume_text', '')
             }
             
             # Get active jobs
-            active_jobs = self.db_service.get_records('jobs', {
-                'status': 'active',
-                'limit': 100  # Get more jobs for better matching
-            })
+            active_jobs = self.db_service.get_records('jobs', {'status': 'active'}, limit=self.pool_size)
+            
+            # Preference filters are cheap, so apply them before any scoring
+            eligible_jobs = [job for job in active_jobs if self._meets_candidate_preferences(job, preferences)]
+            
+            skills = normalize_skills(candidate.get('skills'))
+            preferred_locations = preferences.get('preferred_locations') or []
+            heuristic_profile = {
+                'experience_level': candidate.get('experience_level'),
+                'location_preference': preferred_locations[0] if preferred_locations else candidate.get('location'),
+                'remote_preference': preferences.get('remote_preference') or preferences.get('remote'),
+                'salary_min': preferences.get('min_salary')
+            }
             
-            job_matches = []
+            pool = [{
+                'job_id': job['id'],
+                'job_title': job.get('title'),
+                'company_name': job.get('company_name'),
+                'location': job.get('location'),
+                'salary_range': {
+                    'min': job.get('salary_min'),
+                    'max': job.get('salary_max')
+                },
+                'job_type': job.get('job_type'),
+                'posted_date': job.get('created_at'),
+                'application_deadline': job.get('application_deadline'),
+                'candidate_data': candidate_data,
+                'job_description': job.get('description', '')
+            } for job in eligible_jobs]
+            
+            shortlist = self._shortlist(
+                candidate_text(candidate),
+                pool,
+                [job_text(job) for job in eligible_jobs],
+                [calculate_job_match_score(job, skills, heuristic_profile) for job in eligible_jobs],
+                max(limit, llm_top_k or self.llm_top_k)
+            )
             
-            for job in active_jobs:
-                # Calculate match score using AI
-                match_result = self.openai_service.calculate_job_match_score(
-                    candidate_data, 
-                    job.get('description', '')
-                )
-                
-                if match_result['success']:
-                    match_analysis = match_result['match_analysis']
-                    match_score = float(match_analysis.get('match_score', 0))
-                    
-                    # Apply additional filters based on candidate preferences
-                    if self._meets_candidate_preferences(job, candidate.get('job_preferences', {})):
-                        job_matches.append({
-                            'job_id': job['id'],
-                            'job_title': job['title'],
-                            'company_name': job['company_name'],
-                            'location': job['location'],
-                            'salary_range': {
-                                'min': job.get('salary_min'),
-                                'max': job.get('salary_max')
-                            },
-                            'job_type': job.get('job_type'),
-                            'match_score': match_score,
-                            'match_analysis': match_analysis,
-                            'posted_date': job.get('created_at'),
-                            'application_deadline': job.get('application_deadline')
-                        })
+            # Stage two: LLM analysis for the best survivors only
+            self._score_shortlist(
+                shortlist[:llm_top_k or self.llm_top_k],
+                lambda item: item['job_description'],
+                latency_budget or self.latency_budget
+            )
+            
+            job_matches = []
+            for item in shortlist:
+                item.pop('candidate_data')
+                item.pop('job_description')
+                job_matches.append(item)
             
             # Sort by match score and limit results
             job_matches.sort(key=lambda x: x['match_score'], reverse=True)
@@ -83,6 +157,7 @@ class JobMatchingService:
                 "matches": job_matches,
                 "total_analyzed": len(active_jobs),
                 "total_matches": len(job_matches),
+                "llm_scored": sum(1 for match in job_matches if match['scored_by'] == 'llm'),
                 "timestamp": datetime.utcnow().isoformat()
             }
             
@@ -90,9 +165,12 @@ class JobMatchingService:
             logger.error(f"Job matching failed: {str(e)}")
             return {"success": False, "error": str(e)}
     
-    def find_matching_candidates(self, job_id: str, limit: int = 20) -> Dict[str, Any]:
+    def find_matching_candidates(self, job_id: str, limit: int = 20,
+                                 llm_top_k: Optional[int] = None,
+                                 latency_budget: Optional[float] = None) -> Dict[str, Any]:
         """
-        Find candidates that match a job posting using AI analysis
+        Find candidates that match a job posting using AI analysis.
+        All active candidates are ranked locally and only the top llm_top_k go to the LLM.
         """
         try:
             # Get job details
@@ -101,13 +179,10 @@ class JobMatchingService:
                 return {"success": False, "error": "Job not found"}
             
             # Get active candidates
-            candidates = self.db_service.get_records('candidate_profiles', {
-                'status': 'active',
-                'limit': 100
-            })
-            
-            candidate_matches = []
+            candidates = self.db_service.get_records('candidate_profiles', {'status': 'active'}, limit=self.pool_size)
             
+            pool = []
+            heuristic_scores = []
             for candidate in candidates:
                 candidate_data = {
                     "skills": candidate.get('skills', []),
@@ -117,35 +192,54 @@ class JobMatchingService:
                     "location": candidate.get('location', ''),
                     "availability": candidate.get('availability', {})
                 }
-                
-                # Calculate match score using AI
-                match_result = self.openai_service.calculate_job_match_score(
-                    candidate_data, 
-                    job.get('description', '')
+                heuristic_scores.append(calculate_job_match_score(
+                    job,
+                    normalize_skills(candidate.get('skills')),
+                    {
+                        'experience_level': candidate.get('experience_level'),
+                        'location_preference': candidate.get('location'),
+                        'remote_preference': candidate.get('remote_preference'),
+                        'salary_min': candidate.get('expected_salary_min')
+                    }
+                ))
+                pool.append({
+                    'candidate_id': candidate['id'],
+                    'candidate_name': f"{candidate.get('first_name', '')} {candidate.get('last_name', '')}",
+                    'email': candidate.get('email'),
+                    'location': candidate.get('location'),
+                    'experience_years': candidate.get('experience_years', 0),
+                    'current_title': candidate.get('current_title'),
+                    'profile_updated': candidate.get('updated_at'),
+                    'availability': candidate.get('availability', {}),
+                    'candidate_data': candidate_data
+                })
+            
+            shortlist = self._shortlist(
+                job_text(job),
+                pool,
+                [candidate_text(candidate) for candidate in candidates],
+                heuristic_scores,
+                max(limit, llm_top_k or self.llm_top_k)
+            )
+            
+            # Stage two: LLM analysis for the best survivors only
+            job_description = job.get('description', '')
+            self._score_shortlist(
+                shortlist[:llm_top_k or self.llm_top_k],
+                lambda item: job_description,
+                latency_budget or self.latency_budget
+            )
+            
+            # Historical feedback is per job, so load it once for the whole shortlist
+            historical_feedback = self._get_historical_feedback(job_id)
+            
+            candidate_matches = []
+            for item in shortlist:
+                candidate_data = item.pop('candidate_data')
+                item['feedback_enhanced_score'] = self._get_feedback_enhanced_score(
+                    job_id, candidate_data, item['match_score'], historical_feedback
                 )
-                
-                if match_result['success']:
-                    match_analysis = match_result['match_analysis']
-                    match_score = float(match_analysis.get('match_score', 0))
-                    
-                    # Get historical feedback for this job if available
-                    feedback_score = self._get_feedback_enhanced_score(
-                        job_id, candidate_data, match_score
-                    )
-                    
-                    candidate_matches.append({
-                        'candidate_id': candidate['id'],
-                        'candidate_name': f"{candidate.get('first_name', '')} {candidate.get('last_name', '')}",
-                        'email': candidate.get('email'),
-                        'location': candidate.get('location'),
-                        'experience_years': candidate.get('experience_years', 0),
-                        'current_title': candidate.get('current_title'),
-                        'match_score': match_score,
-                        'feedback_enhanced_score': feedback_score,
-                        'match_analysis': match_analysis,
-                        'profile_updated': candidate.get('updated_at'),
-                        'availability': candidate.get('availability', {})
-                    })
+                candidate_matches.append(item)
             
             # Sort by feedback-enhanced score, then by match score
             candidate_matches.sort(
@@ -159,6 +253,7 @@ class JobMatchingService:
                 "matches": candidate_matches,
                 "total_analyzed": len(candidates),
                 "total_matches": len(candidate_matches),
+                "llm_scored": sum(1 for match in candidate_matches if match['scored_by'] == 'llm'),
                 "timestamp": datetime.utcnow().isoformat()
             }
             
@@ -234,17 +329,18 @@ class JobMatchingService:
             }}
             """
             
-            improvement_result = self.openai_service.client.chat.completions.create(
+            improvement_text = self.openai_service.chat_completion(
                 model=self.openai_service.models['analysis'],
                 messages=[
                     {"role": "system", "content": "You are an expert resume consultant and career advisor. Provide actionable, specific improvement suggestions."},
                     {"role": "user", "content": improvement_prompt}
                 ],
                 temperature=0.3,
-                max_tokens=1500
+                max_tokens=1500,
+                validate=json.loads
             )
             
-            suggestions = json.loads(improvement_result.choices[0].message.content)
+            suggestions = json.loads(improvement_text)
             
             return {
                 "success": True,
@@ -328,31 +424,32 @@ class JobMatchingService:
         """
         try:
             # Get applications for this job that were rejected
-            rejected_applications = self.db_service.get_records('applications', {
-                'job_id': job_id,
-                'status': 'rejected',
-                'limit': 50
-            })
-            
-            feedback_list = []
-            for app in rejected_applications:
-                feedback = self.db_service.get_records('application_feedback', {
-                    'application_id': app['id']
-                })
-                feedback_list.extend(feedback)
+            rejected_applications = self.db_service.get_records_optimized(
+                'applications',
+                {'job_id': job_id, 'status': 'rejected'},
+                limit=50,
+                select_fields='id'
+            )
+            if not rejected_applications:
+                return []
             
-            return feedback_list
+            # One query for the feedback of every rejected application
+            return self.db_service.get_records_optimized('application_feedback', {
+                'application_id': [app['id'] for app in rejected_applications]
+            })
             
         except Exception as e:
             logger.error(f"Getting historical feedback failed: {str(e)}")
             return []
     
-    def _get_feedback_enhanced_score(self, job_id: str, candidate_data: Dict, base_score: float) -> float:
+    def _get_feedback_enhanced_score(self, job_id: str, candidate_data: Dict, base_score: float,
+                                     historical_feedback: Optional[List[Dict]] = None) -> float:
         """
         Enhance match score based on historical feedback for this job
         """
         try:
-            historical_feedback = self._get_historical_feedback(job_id)
+            if historical_feedback is None:
+                historical_feedback = self._get_historical_feedback(job_id)
             
             if not historical_feedback:
                 return base_score
@@ -369,7 +466,7 @@ class JobMatchingService:
             
             # Calculate adjustment based on whether candidate has common issues
             adjustment = 0
-            candidate_skills = [skill.lower() for skill in candidate_data.get('skills', [])]
+            candidate_skills = normalize_skills(candidate_data.get('skills'))
             
             for issue, frequency in common_issues.items():
                 weight = frequency / len(historical_feedback)  # How common this issue is
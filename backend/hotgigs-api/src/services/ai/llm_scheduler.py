@@ -0,0 +1,328 @@
+"""
+LLM Request Scheduler for HotGigs.ai
+Shared asynchronous scheduler for OpenAI chat completions with bounded concurrency,
+request/token rate limits, jittered retries and per-call deadlines
+"""
+
+import os
+import time
+import random
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Dict, List, Any, Optional, Union
+import openai
+
+logger = logging.getLogger(__name__)
+
+
+class LLMDeadlineExceeded(TimeoutError):
+    """Raised when a request cannot complete before its deadline"""
+
+
+@dataclass
+class LLMResult:
+    """Content and token usage of a completed chat completion"""
+    content: str
+    usage: Dict[str, int] = field(default_factory=dict)
+    attempts: int = 1
+    latency: float = 0.0
+
+
+class TokenBucket:
+    """Continuously refilling bucket used for per-minute request and token limits"""
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay_for(self, amount: float) -> float:
+        """Seconds until amount can be taken; takes it immediately when available"""
+        self._refill()
+        # Requests larger than the bucket are allowed once it is full
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def available(self) -> float:
+        """Current level without taking anything, safe to read from other threads"""
+        return min(self.capacity, self.tokens + (time.monotonic() - self.updated) * self.rate)
+
+    def adjust(self, amount: float):
+        """Return unused tokens or charge extra once actual usage is known"""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class LLMScheduler:
+    """Process-wide scheduler running OpenAI calls on a dedicated asyncio loop
+
+    Synchronous callers submit requests and wait on the returned futures, so
+    Flask handlers and batch jobs share the same concurrency and rate limits.
+    Batches are fanned out concurrently and complete at API-limited throughput.
+    """
+
+    RETRYABLE_STATUS = {408, 409, 429}
+
+    def __init__(self, max_concurrency: Optional[int] = None,
+                 requests_per_minute: Optional[int] = None,
+                 tokens_per_minute: Optional[int] = None,
+                 max_retries: Optional[int] = None):
+        self.max_concurrency = max_concurrency or int(os.getenv('OPENAI_MAX_CONCURRENCY', 8))
+        self.requests_per_minute = requests_per_minute or int(os.getenv('OPENAI_REQUESTS_PER_MINUTE', 500))
+        self.tokens_per_minute = tokens_per_minute or int(os.getenv('OPENAI_TOKENS_PER_MINUTE', 200000))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv('OPENAI_MAX_RETRIES', 4))
+        self.default_timeout = float(os.getenv('OPENAI_REQUEST_TIMEOUT', 60))
+
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._request_bucket: Optional[TokenBucket] = None
+        self._token_bucket: Optional[TokenBucket] = None
+
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'retries': 0,
+            'rate_limited': 0,
+            'deadline_exceeded': 0,
+            'in_flight': 0,
+            'prompt_tokens': 0,
+            'completion_tokens': 0,
+            'throttle_wait_seconds': 0.0
+        }
+
+    def _incr(self, counter: str, amount: Union[int, float] = 1):
+        with self._stats_lock:
+            self._stats[counter] += amount
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """Start the scheduler loop thread, restarting it after a fork"""
+        with self._lock:
+            if self._loop is not None and self._pid == os.getpid():
+                return self._loop
+
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name='llm-scheduler', daemon=True)
+            thread.start()
+
+            self._loop = loop
+            self._pid = os.getpid()
+            self._client = openai.AsyncOpenAI(api_key=os.getenv('OPENAI_API_KEY'), max_retries=0)
+            self._request_bucket = TokenBucket(self.requests_per_minute)
+            self._token_bucket = TokenBucket(self.tokens_per_minute)
+            self._semaphore = None
+            return loop
+
+    @staticmethod
+    def estimate_tokens(messages: List[Dict[str, str]], max_tokens: Optional[int]) -> int:
+        """Rough token cost of a request used for rate limiting before the call"""
+        prompt_chars = sum(len(message.get('content') or '') for message in messages)
+        return prompt_chars // 4 + (max_tokens or 512)
+
+    async def _acquire(self, estimated_tokens: int, deadline: float):
+        """Wait for both rate limit buckets, failing early if the deadline would pass"""
+        while True:
+            wait = max(self._request_bucket.delay_for(1), 0.0)
+            if wait == 0.0:
+                wait = self._token_bucket.delay_for(estimated_tokens)
+                if wait > 0.0:
+                    # Give back the request slot until tokens are available
+                    self._request_bucket.adjust(1)
+            if wait == 0.0:
+                return
+            if time.monotonic() + wait > deadline:
+                raise LLMDeadlineExceeded("Rate limit wait exceeds request deadline")
+            self._incr('throttle_wait_seconds', wait)
+            await asyncio.sleep(wait)
+
+    def _is_retryable(self, error: Exception) -> bool:
+        if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError)):
+            return True
+        if isinstance(error, openai.APIStatusError):
+            return error.status_code in self.RETRYABLE_STATUS or error.status_code >= 500
+        return False
+
+    @staticmethod
+    def _retry_after(error: Exception) -> Optional[float]:
+        """Server-provided retry delay, when present"""
+        response = getattr(error, 'response', None)
+        headers = getattr(response, 'headers', None) or {}
+        value = headers.get('retry-after')
+        try:
+            return float(value) if value is not None else None
+        except ValueError:
+            return None
+
+    async def _run(self, model: str, messages: List[Dict[str, str]], temperature: float,
+                   max_tokens: Optional[int], deadline: float) -> LLMResult:
+        """Execute one request with rate limiting, retries and a deadline"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        estimated_tokens = self.estimate_tokens(messages, max_tokens)
+        started = time.monotonic()
+        attempt = 0
+
+        # Waiting for a concurrency slot counts against the request deadline too
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=max(deadline - time.monotonic(), 0))
+        except asyncio.TimeoutError:
+            self._incr('deadline_exceeded')
+            raise LLMDeadlineExceeded("Request deadline exceeded waiting for a concurrency slot")
+
+        try:
+            self._incr('in_flight')
+            try:
+                while True:
+                    attempt += 1
+                    await self._acquire(estimated_tokens, deadline)
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise LLMDeadlineExceeded("Request deadline exceeded before dispatch")
+
+                    try:
+                        response = await asyncio.wait_for(
+                            self._client.chat.completions.create(
+                                model=model,
+                                messages=messages,
+                                temperature=temperature,
+                                max_tokens=max_tokens
+                            ),
+                            timeout=remaining
+                        )
+                    except asyncio.TimeoutError:
+                        raise LLMDeadlineExceeded("Request deadline exceeded waiting for response")
+                    except Exception as e:
+                        if not self._is_retryable(e) or attempt > self.max_retries:
+                            raise
+                        if isinstance(e, openai.RateLimitError):
+                            self._incr('rate_limited')
+
+                        # Full jitter exponential backoff, honouring Retry-After when given
+                        backoff = random.uniform(0, min(20.0, 0.5 * (2 ** attempt)))
+                        backoff = max(backoff, self._retry_after(e) or 0.0)
+                        if time.monotonic() + backoff >= deadline:
+                            raise
+                        self._incr('retries')
+                        logger.warning(f"LLM request failed ({str(e)}); retry {attempt} in {backoff:.2f}s")
+                        await asyncio.sleep(backoff)
+                        continue
+
+                    usage = getattr(response, 'usage', None)
+                    usage_dict = {
+                        'prompt_tokens': getattr(usage, 'prompt_tokens', 0) or 0,
+                        'completion_tokens': getattr(usage, 'completion_tokens', 0) or 0
+                    }
+                    actual = usage_dict['prompt_tokens'] + usage_dict['completion_tokens']
+                    if actual:
+                        self._token_bucket.adjust(estimated_tokens - actual)
+
+                    with self._stats_lock:
+                        self._stats['completed'] += 1
+                        self._stats['prompt_tokens'] += usage_dict['prompt_tokens']
+                        self._stats['completion_tokens'] += usage_dict['completion_tokens']
+
+                    return LLMResult(
+                        content=response.choices[0].message.content,
+                        usage=usage_dict,
+                        attempts=attempt,
+                        latency=time.monotonic() - started
+                    )
+            except LLMDeadlineExceeded:
+                self._incr('deadline_exceeded')
+                raise
+            except Exception:
+                self._incr('failed')
+                raise
+            finally:
+                self._incr('in_flight', -1)
+        finally:
+            self._semaphore.release()
+
+    def submit(self, model: str, messages: List[Dict[str, str]], temperature: float = 0.3,
+               max_tokens: Optional[int] = None, timeout: Optional[float] = None) -> Future:
+        """Schedule a chat completion and return a future resolving to an LLMResult"""
+        loop = self._ensure_loop()
+        deadline = time.monotonic() + (timeout if timeout is not None else self.default_timeout)
+        self._incr('submitted')
+        return asyncio.run_coroutine_threadsafe(
+            self._run(model, messages, temperature, max_tokens, deadline), loop
+        )
+
+    def complete(self, model: str, messages: List[Dict[str, str]], temperature: float = 0.3,
+                 max_tokens: Optional[int] = None, timeout: Optional[float] = None) -> LLMResult:
+        """Run a chat completion and block until it finishes"""
+        return self.submit(model, messages, temperature, max_tokens, timeout).result()
+
+    async def acomplete(self, model: str, messages: List[Dict[str, str]], temperature: float = 0.3,
+                        max_tokens: Optional[int] = None, timeout: Optional[float] = None) -> LLMResult:
+        """Awaitable chat completion for callers running their own event loop"""
+        return await asyncio.wrap_future(self.submit(model, messages, temperature, max_tokens, timeout))
+
+    def complete_many(self, requests: List[Dict[str, Any]],
+                      timeout: Optional[float] = None) -> List[Union[LLMResult, Exception]]:
+        """
+        Run many chat completions concurrently and return results in request order.
+        Each request is a dict of submit() arguments; failures are returned in place.
+        """
+        futures = []
+        for request in requests:
+            request = dict(request)
+            request.setdefault('timeout', timeout)
+            futures.append(self.submit(**request))
+
+        results: List[Union[LLMResult, Exception]] = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def get_headroom(self) -> float:
+        """Fraction (0-1) of concurrency and per-minute budget currently free"""
+        with self._stats_lock:
+            headroom = 1.0 - self._stats['in_flight'] / self.max_concurrency
+        for bucket in (self._request_bucket, self._token_bucket):
+            if bucket is not None:
+                headroom = min(headroom, bucket.available() / bucket.capacity)
+        return max(0.0, headroom)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get throughput, retry and rate limit counters"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats.update({
+            'max_concurrency': self.max_concurrency,
+            'requests_per_minute': self.requests_per_minute,
+            'tokens_per_minute': self.tokens_per_minute
+        })
+        return stats
+
+
+_scheduler: Optional[LLMScheduler] = None
+_scheduler_lock = threading.Lock()
+
+def get_llm_scheduler() -> LLMScheduler:
+    """Get the process-wide LLM scheduler"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = LLMScheduler()
+        return _scheduler
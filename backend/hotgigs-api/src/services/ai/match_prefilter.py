@@ -0,0 +1,125 @@
+"""
+Match Prefilter for HotGigs.ai
+Fast local scoring used to shortlist jobs or candidates before LLM match analysis
+"""
+
+import os
+import logging
+from typing import Dict, List, Any, Optional, Tuple
+import numpy as np
+from ..vector_index import create_text_vectorizer
+
+logger = logging.getLogger(__name__)
+
+def calculate_job_match_score(job: dict, user_skills: list, match_data: dict) -> float:
+    """Calculate match score between job and candidate"""
+    score = 0.0
+
+    # Skill matching (40% weight)
+    job_title = (job.get('title') or '').lower()
+    job_description = (job.get('description') or '').lower()
+    job_requirements = (job.get('requirements') or '').lower()
+
+    skill_matches = 0
+    for skill in user_skills:
+        if (skill in job_title or
+            skill in job_description or
+            skill in job_requirements):
+            skill_matches += 1
+
+    if user_skills:
+        skill_score = skill_matches / len(user_skills)
+        score += skill_score * 0.4
+
+    # Experience level matching (20% weight)
+    job_experience = (job.get('experience_level') or '').lower()
+    user_experience = (match_data.get('experience_level') or '').lower()
+
+    if job_experience == user_experience:
+        score += 0.2
+    elif (job_experience == 'entry' and user_experience in ['mid', 'senior']) or \
+         (job_experience == 'mid' and user_experience == 'senior'):
+        score += 0.1
+
+    # Location matching (15% weight)
+    if match_data.get('location_preference'):
+        job_location = (job.get('location') or '').lower()
+        user_location = match_data['location_preference'].lower()
+
+        if user_location in job_location or job_location in user_location:
+            score += 0.15
+        elif 'remote' in job_location and match_data.get('remote_preference'):
+            score += 0.15
+
+    # Salary matching (15% weight)
+    if match_data.get('salary_min') and job.get('salary_max'):
+        if job['salary_max'] >= match_data['salary_min']:
+            score += 0.15
+
+    # Remote work preference (10% weight)
+    if match_data.get('remote_preference') and job.get('remote_work_allowed'):
+        score += 0.1
+
+    return min(score, 1.0)  # Cap at 1.0
+
+def normalize_skills(skills: Any) -> List[str]:
+    """Lower-cased skill names from a list of strings or skill records"""
+    if not skills:
+        return []
+    if isinstance(skills, str):
+        skills = skills.split(',')
+
+    names = []
+    for skill in skills:
+        if isinstance(skill, dict):
+            skill = skill.get('skill_name') or skill.get('name') or ''
+        skill = str(skill).strip().lower()
+        if skill:
+            names.append(skill)
+    return names
+
+def job_text(job: Dict) -> str:
+    """Text used to compare a job against candidates"""
+    return f"{job.get('title') or ''} {job.get('description') or ''} {job.get('requirements') or ''}"
+
+def candidate_text(candidate: Dict) -> str:
+    """Text used to compare a candidate against jobs"""
+    skills = ' '.join(normalize_skills(candidate.get('skills')))
+    return f"{candidate.get('current_title') or ''} {skills} {candidate.get('resume_text') or ''}"
+
+class MatchPrefilter:
+    """Ranks a pool of jobs or candidates with text similarity plus the match heuristics
+
+    Both stages are local and vectorized, so the whole pool can be ranked in
+    milliseconds and only the best few need an LLM call.
+    """
+
+    def __init__(self, similarity_weight: Optional[float] = None):
+        self.vectorizer = create_text_vectorizer()
+        self.similarity_weight = similarity_weight if similarity_weight is not None else \
+            float(os.getenv('MATCH_SIMILARITY_WEIGHT', 0.5))
+
+    def similarities(self, query: str, texts: List[str]) -> np.ndarray:
+        """Cosine similarity between the query and each text"""
+        if not texts:
+            return np.zeros(0, dtype=np.float32)
+
+        # Rows are L2-normalized, so a sparse dot product is the cosine
+        matrix = self.vectorizer.transform(texts)
+        query_vector = self.vectorizer.transform([query or ''])
+        return np.asarray((matrix @ query_vector.T).todense(), dtype=np.float32).ravel()
+
+    def rank(self, query: str, texts: List[str], heuristic_scores: List[float],
+             top_k: int) -> List[Tuple[int, float]]:
+        """Return (index, combined score) for the top_k items, best first"""
+        if not texts or top_k <= 0:
+            return []
+
+        similarity = self.similarities(query, texts)
+        heuristics = np.asarray(heuristic_scores, dtype=np.float32)
+        combined = self.similarity_weight * similarity + (1 - self.similarity_weight) * heuristics
+
+        k = min(top_k, len(combined))
+        top = np.argpartition(-combined, k - 1)[:k]
+        top = top[np.argsort(-combined[top])]
+        return [(int(i), float(combined[i])) for i in top]
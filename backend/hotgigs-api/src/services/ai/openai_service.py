@@ -6,9 +6,11 @@ Handles all AI-powered features including job matching, resume analysis, and int
 import os
 import json
 import openai
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Callable, Union, Tuple
 from datetime import datetime
 import logging
+from .response_cache import get_response_cache, completion_cache_key
+from .llm_scheduler import get_llm_scheduler
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -30,8 +32,79 @@ class OpenAIService:
             'analysis': 'gpt-4o-mini',
             'matching': 'gpt-4o-mini'
         }
+        
+        # Shared across instances so repeated prompts are served from one cache
+        # and all callers draw on the same concurrency and rate limits
+        self.response_cache = get_response_cache()
+        self.scheduler = get_llm_scheduler()
+    
+    def chat_completion(self, model: str, messages: List[Dict[str, str]], temperature: float,
+                        max_tokens: Optional[int] = None, use_cache: bool = True,
+                        validate: Optional[Callable[[str], Any]] = None,
+                        timeout: Optional[float] = None) -> str:
+        """
+        Run a chat completion through the response cache and shared scheduler.
+        Responses rejected by validate are returned but never cached.
+        """
+        result = self.chat_completions([{
+            'model': model,
+            'messages': messages,
+            'temperature': temperature,
+            'max_tokens': max_tokens
+        }], use_cache=use_cache, validate=validate, timeout=timeout)[0]
+        
+        if isinstance(result, Exception):
+            raise result
+        return result
+    
+    def chat_completions(self, requests: List[Dict[str, Any]], use_cache: bool = True,
+                         validate: Optional[Callable[[str], Any]] = None,
+                         timeout: Optional[float] = None) -> List[Union[str, Exception]]:
+        """
+        Run many chat completions concurrently, serving repeats from the response cache.
+        Results are returned in request order with failures in place.
+        """
+        results: List[Union[str, Exception, None]] = [None] * len(requests)
+        cache_keys: List[Optional[str]] = [None] * len(requests)
+        pending = []
+        
+        for i, request in enumerate(requests):
+            if use_cache and self.response_cache.enabled:
+                cache_keys[i] = completion_cache_key(
+                    request['model'], request['messages'], request['temperature'], request.get('max_tokens')
+                )
+                cached = self.response_cache.get(cache_keys[i])
+                if cached is not None:
+                    results[i] = cached['content']
+                    continue
+            elif not use_cache:
+                self.response_cache.record_bypass()
+            pending.append(i)
+        
+        outcomes = self.scheduler.complete_many([requests[i] for i in pending], timeout=timeout)
+        
+        for i, outcome in zip(pending, outcomes):
+            if isinstance(outcome, Exception):
+                results[i] = outcome
+                continue
+            
+            results[i] = outcome.content
+            if cache_keys[i] is None:
+                continue
+            try:
+                if validate is not None:
+                    validate(outcome.content)
+            except Exception:
+                continue
+            self.response_cache.set(cache_keys[i], outcome.content, outcome.usage)
+        
+        return results
     
-    def analyze_resume(self, resume_text: str, job_description: str = None) -> Dict[str, Any]:
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get response cache hit rate and saved-token metrics"""
+        return self.response_cache.get_stats()
+    
+    def analyze_resume(self, resume_text: str, job_description: str = None, use_cache: bool = True) -> Dict[str, Any]:
         """
         Analyze resume and extract key information including skills, experience, and domain expertise
         """
@@ -102,17 +175,17 @@ class OpenAIService:
                 }}
                 """
 
-            response = self.client.chat.completions.create(
+            analysis_text = self.chat_completion(
                 model=self.models['analysis'],
                 messages=[
                     {"role": "system", "content": "You are an expert HR analyst and resume reviewer. Provide detailed, accurate analysis in valid JSON format."},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.3,
-                max_tokens=2000
+                max_tokens=2000,
+                use_cache=use_cache,
+                validate=json.loads
             )
-
-            analysis_text = response.choices[0].message.content
             
             # Parse JSON response
             try:
@@ -140,74 +213,99 @@ class OpenAIService:
                 "timestamp": datetime.utcnow().isoformat()
             }
 
-    def calculate_job_match_score(self, candidate_profile: Dict, job_description: str) -> Dict[str, Any]:
+    def _job_match_request(self, candidate_profile: Dict, job_description: str) -> Dict[str, Any]:
         """
-        Calculate compatibility score between candidate and job
+        Build the chat completion request for a candidate/job match analysis
+        """
+        prompt = f"""
+        Calculate the job match score between the candidate and job description.
+
+        Candidate Profile:
+        {json.dumps(candidate_profile, indent=2)}
+
+        Job Description:
+        {job_description}
+
+        Provide analysis in JSON format:
+        {{
+            "match_score": "overall compatibility score (0-100)",
+            "skill_match": {{
+                "score": "skill compatibility score (0-100)",
+                "matching_skills": ["skills that match"],
+                "missing_critical_skills": ["critical skills missing"],
+                "transferable_skills": ["skills that could transfer"]
+            }},
+            "experience_match": {{
+                "score": "experience compatibility score (0-100)",
+                "relevant_experience": "years of relevant experience",
+                "domain_match": "how well candidate's domain expertise matches"
+            }},
+            "cultural_fit": {{
+                "score": "estimated cultural fit score (0-100)",
+                "reasoning": "explanation of cultural fit assessment"
+            }},
+            "recommendations": {{
+                "for_candidate": ["recommendations for the candidate"],
+                "for_recruiter": ["recommendations for the recruiter"],
+                "interview_focus": ["areas to focus on during interview"]
+            }},
+            "decision_recommendation": "hire/interview/reject with reasoning"
+        }}
         """
-        try:
-            prompt = f"""
-            Calculate the job match score between the candidate and job description.
-
-            Candidate Profile:
-            {json.dumps(candidate_profile, indent=2)}
 
-            Job Description:
-            {job_description}
+        return {
+            'model': self.models['matching'],
+            'messages': [
+                {"role": "system", "content": "You are an expert talent acquisition specialist. Provide accurate job matching analysis."},
+                {"role": "user", "content": prompt}
+            ],
+            'temperature': 0.2,
+            'max_tokens': 1500
+        }
 
-            Provide analysis in JSON format:
-            {{
-                "match_score": "overall compatibility score (0-100)",
-                "skill_match": {{
-                    "score": "skill compatibility score (0-100)",
-                    "matching_skills": ["skills that match"],
-                    "missing_critical_skills": ["critical skills missing"],
-                    "transferable_skills": ["skills that could transfer"]
-                }},
-                "experience_match": {{
-                    "score": "experience compatibility score (0-100)",
-                    "relevant_experience": "years of relevant experience",
-                    "domain_match": "how well candidate's domain expertise matches"
-                }},
-                "cultural_fit": {{
-                    "score": "estimated cultural fit score (0-100)",
-                    "reasoning": "explanation of cultural fit assessment"
-                }},
-                "recommendations": {{
-                    "for_candidate": ["recommendations for the candidate"],
-                    "for_recruiter": ["recommendations for the recruiter"],
-                    "interview_focus": ["areas to focus on during interview"]
-                }},
-                "decision_recommendation": "hire/interview/reject with reasoning"
-            }}
-            """
+    def calculate_job_match_score(self, candidate_profile: Dict, job_description: str, use_cache: bool = True) -> Dict[str, Any]:
+        """
+        Calculate compatibility score between candidate and job
+        """
+        return self.calculate_job_match_scores([(candidate_profile, job_description)], use_cache=use_cache)[0]
 
-            response = self.client.chat.completions.create(
-                model=self.models['matching'],
-                messages=[
-                    {"role": "system", "content": "You are an expert talent acquisition specialist. Provide accurate job matching analysis."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.2,
-                max_tokens=1500
+    def calculate_job_match_scores(self, pairs: List[Tuple[Dict, str]], use_cache: bool = True,
+                                   timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Calculate compatibility scores for many (candidate_profile, job_description) pairs concurrently
+        """
+        try:
+            contents = self.chat_completions(
+                [self._job_match_request(profile, description) for profile, description in pairs],
+                use_cache=use_cache,
+                validate=json.loads,
+                timeout=timeout
             )
-
-            match_analysis = json.loads(response.choices[0].message.content)
-            
-            return {
-                "success": True,
-                "match_analysis": match_analysis,
-                "timestamp": datetime.utcnow().isoformat()
-            }
-
         except Exception as e:
             logger.error(f"Job match calculation failed: {str(e)}")
-            return {
-                "success": False,
-                "error": str(e),
-                "timestamp": datetime.utcnow().isoformat()
-            }
+            contents = [e] * len(pairs)
 
-    def generate_interview_questions(self, job_description: str, candidate_resume: str, question_count: int = 10) -> Dict[str, Any]:
+        results = []
+        for content in contents:
+            try:
+                if isinstance(content, Exception):
+                    raise content
+                match_analysis = json.loads(content)
+                results.append({
+                    "success": True,
+                    "match_analysis": match_analysis,
+                    "timestamp": datetime.utcnow().isoformat()
+                })
+            except Exception as e:
+                logger.error(f"Job match calculation failed: {str(e)}")
+                results.append({
+                    "success": False,
+                    "error": str(e),
+                    "timestamp": datetime.utcnow().isoformat()
+                })
+        return results
+
+    def generate_interview_questions(self, job_description: str, candidate_resume: str, question_count: int = 10, use_cache: bool = True) -> Dict[str, Any]:
         """
         Generate personalized interview questions based on job and candidate
         """
@@ -241,17 +339,19 @@ class OpenAIService:
             Mix different question types: technical skills, behavioral, situational, and experience-based.
             """
 
-            response = self.client.chat.completions.create(
+            content = self.chat_completion(
                 model=self.models['chat'],
                 messages=[
                     {"role": "system", "content": "You are an expert interviewer and talent assessor. Generate thoughtful, relevant interview questions."},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.4,
-                max_tokens=2000
+                max_tokens=2000,
+                use_cache=use_cache,
+                validate=json.loads
             )
 
-            questions_data = json.loads(response.choices[0].message.content)
+            questions_data = json.loads(content)
             
             return {
                 "success": True,
@@ -303,17 +403,19 @@ class OpenAIService:
             Be professional, encouraging, and constructive in your analysis.
             """
 
-            response = self.client.chat.completions.create(
+            content = self.chat_completion(
                 model=self.models['chat'],
                 messages=[
                     {"role": "system", "content": "You are a professional AI interview agent. Be thorough but encouraging in your analysis."},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.3,
-                max_tokens=1000
+                max_tokens=1000,
+                use_cache=False,
+                validate=json.loads
             )
 
-            interview_analysis = json.loads(response.choices[0].message.content)
+            interview_analysis = json.loads(content)
             
             return {
                 "success": True,
@@ -329,7 +431,7 @@ class OpenAIService:
                 "timestamp": datetime.utcnow().isoformat()
             }
 
-    def generate_job_description(self, job_title: str, company_info: str, requirements: List[str] = None) -> Dict[str, Any]:
+    def generate_job_description(self, job_title: str, company_info: str, requirements: List[str] = None, use_cache: bool = True) -> Dict[str, Any]:
         """
         Generate comprehensive job description using AI
         """
@@ -366,17 +468,19 @@ class OpenAIService:
             Make it engaging and comprehensive while being realistic about requirements.
             """
 
-            response = self.client.chat.completions.create(
+            content = self.chat_completion(
                 model=self.models['chat'],
                 messages=[
                     {"role": "system", "content": "You are an expert HR professional and job description writer. Create compelling, accurate job descriptions."},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.4,
-                max_tokens=1500
+                max_tokens=1500,
+                use_cache=use_cache,
+                validate=json.loads
             )
 
-            job_description = json.loads(response.choices[0].message.content)
+            job_description = json.loads(content)
             
             return {
                 "success": True,
@@ -392,7 +496,7 @@ class OpenAIService:
                 "timestamp": datetime.utcnow().isoformat()
             }
 
-    def provide_career_advice(self, candidate_profile: Dict, career_goals: str) -> Dict[str, Any]:
+    def provide_career_advice(self, candidate_profile: Dict, career_goals: str, use_cache: bool = True) -> Dict[str, Any]:
         """
         Provide AI-powered career advice and path recommendations
         """
@@ -441,17 +545,19 @@ class OpenAIService:
             }}
             """
 
-            response = self.client.chat.completions.create(
+            content = self.chat_completion(
                 model=self.models['chat'],
                 messages=[
                     {"role": "system", "content": "You are an expert career counselor and industry advisor. Provide practical, actionable career advice."},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.3,
-                max_tokens=2000
+                max_tokens=2000,
+                use_cache=use_cache,
+                validate=json.loads
             )
 
-            career_advice = json.loads(response.choices[0].message.content)
+            career_advice = json.loads(content)
             
             return {
                 "success": True,
@@ -0,0 +1,153 @@
+"""
+LLM Response Cache for HotGigs.ai
+Content-addressed cache for chat completions with memory or SQLite storage
+"""
+
+import os
+import json
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Any, Optional
+from ...models.cache import QueryCache
+from ...models.sqlite_cache import SQLiteCacheStore
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))),
+    'data', 'openai_cache.db'
+)
+
+def completion_cache_key(model: str, messages: List[Dict[str, str]], temperature: float,
+                         max_tokens: Optional[int]) -> str:
+    """Hash of everything that determines a completion"""
+    payload = json.dumps({
+        'model': model,
+        'messages': messages,
+        'temperature': temperature,
+        'max_tokens': max_tokens
+    }, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LLMResponseCache:
+    """Caches chat completion content keyed by model, messages, temperature and max_tokens
+
+    The memory backend is per process; the SQLite backend is shared by all
+    workers on a host and survives restarts.
+    """
+
+    def __init__(self, backend: Optional[str] = None, ttl: Optional[int] = None,
+                 max_entries: Optional[int] = None, max_bytes: Optional[int] = None,
+                 path: Optional[str] = None):
+        self.backend = (backend or os.getenv('OPENAI_CACHE_BACKEND', 'memory')).lower()
+        self.ttl = ttl or int(os.getenv('OPENAI_CACHE_TTL', 86400))
+        max_entries = max_entries or int(os.getenv('OPENAI_CACHE_MAX_ENTRIES', 10000))
+        max_bytes = max_bytes or int(os.getenv('OPENAI_CACHE_MAX_BYTES', 128 * 1024 * 1024))
+
+        self._store = None
+        if self.backend == 'sqlite':
+            path = path or os.getenv('OPENAI_CACHE_PATH', DEFAULT_CACHE_PATH)
+            try:
+                self._store = SQLiteCacheStore(path, max_entries, max_bytes, table='llm_responses')
+            except sqlite3.Error as e:
+                logger.warning(f"OpenAI cache database unavailable ({str(e)}); using memory cache")
+                self.backend = 'memory'
+        if self.backend == 'memory':
+            self._store = QueryCache(max_entries=max_entries, max_bytes=max_bytes,
+                                     default_ttl=self.ttl, shards=4)
+        elif self._store is None:
+            self.backend = 'off'
+
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'bypassed': 0,
+            'errors': 0,
+            'saved_prompt_tokens': 0,
+            'saved_completion_tokens': 0
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self._store is not None
+
+    def _incr(self, counter: str, amount: int = 1):
+        with self._stats_lock:
+            self._stats[counter] += amount
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a cached {'content', 'usage'} entry and credit the tokens it saved"""
+        if not self.enabled:
+            return None
+        try:
+            entry = self._store.get(key)
+        except sqlite3.Error as e:
+            self._incr('errors')
+            logger.warning(f"OpenAI cache read failed: {str(e)}")
+            return None
+
+        if entry is None:
+            self._incr('misses')
+            return None
+
+        usage = entry.get('usage') or {}
+        with self._stats_lock:
+            self._stats['hits'] += 1
+            self._stats['saved_prompt_tokens'] += usage.get('prompt_tokens', 0)
+            self._stats['saved_completion_tokens'] += usage.get('completion_tokens', 0)
+        return entry
+
+    def set(self, key: str, content: str, usage: Optional[Dict[str, int]] = None):
+        """Store completion content with the token usage it cost"""
+        if not self.enabled:
+            return
+        entry = {'content': content, 'usage': usage or {}}
+        try:
+            if self.backend == 'sqlite':
+                self._store.set(key, entry, self.ttl)
+            else:
+                self._store.set(key, entry, ttl=self.ttl)
+        except sqlite3.Error as e:
+            self._incr('errors')
+            logger.warning(f"OpenAI cache write failed: {str(e)}")
+            return
+        self._incr('stores')
+
+    def record_bypass(self):
+        self._incr('bypassed')
+
+    def clear(self):
+        """Remove every cached response"""
+        if self.enabled:
+            self._store.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit rate and saved-token counters"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+
+        lookups = stats['hits'] + stats['misses']
+        stats.update({
+            'backend': self.backend,
+            'entries': len(self._store) if self.enabled else 0,
+            'hit_rate': round(stats['hits'] / lookups, 4) if lookups else 0.0,
+            'saved_tokens': stats['saved_prompt_tokens'] + stats['saved_completion_tokens']
+        })
+        return stats
+
+
+_response_cache: Optional[LLMResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+def get_response_cache() -> LLMResponseCache:
+    """Get the process-wide LLM response cache"""
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = LLMResponseCache()
+        return _response_cache
@@ -0,0 +1,172 @@
+"""
+Bulk Email Jobs for HotGigs.ai
+Runs bulk email campaigns on a background thread so a request for thousands
+of recipients returns at once, and records their progress and outcome where
+every web worker can report it
+"""
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from typing import Dict, List, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOB_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'data', 'bulk_email_jobs.db'
+)
+
+# Bulk email job states
+BULK_EMAIL_RUNNING = 'running'
+BULK_EMAIL_COMPLETED = 'completed'
+BULK_EMAIL_FAILED = 'failed'
+
+
+class BulkEmailJobStore:
+    """Progress and results of background bulk email campaigns
+
+    A campaign runs on a thread of the worker that accepted it and records
+    how many messages it has handed to the SMTP pool as it goes. Campaigns
+    whose progress stops updating (their worker died) are reported as failed.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv('BULK_EMAIL_JOB_DB_PATH', DEFAULT_JOB_PATH)
+        self.retention_seconds = int(os.getenv('BULK_EMAIL_RETENTION_SECONDS', 86400))
+        self.stale_seconds = int(os.getenv('BULK_EMAIL_STALE_SECONDS', 600))
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._connect().execute("""
+            CREATE TABLE IF NOT EXISTS bulk_email_jobs (
+                id TEXT PRIMARY KEY,
+                user_id TEXT,
+                status TEXT NOT NULL,
+                total INTEGER NOT NULL,
+                processed INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Per-thread connection; sqlite3 connections must not cross threads or forks"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def create(self, user_id: Optional[str], total: int) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._connect().execute(
+            "INSERT INTO bulk_email_jobs (id, user_id, status, total, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (job_id, str(user_id) if user_id is not None else None, BULK_EMAIL_RUNNING, total, now, now)
+        )
+        return job_id
+
+    def progress(self, job_id: str, processed: int):
+        self._connect().execute(
+            "UPDATE bulk_email_jobs SET processed = ?, updated_at = ? WHERE id = ?",
+            (processed, time.time(), job_id)
+        )
+
+    def complete(self, job_id: str, result: Dict[str, Any]):
+        self._connect().execute(
+            "UPDATE bulk_email_jobs SET status = ?, processed = total, result = ?, updated_at = ? WHERE id = ?",
+            (BULK_EMAIL_COMPLETED, json.dumps(result, default=str), time.time(), job_id)
+        )
+
+    def fail(self, job_id: str, error: str):
+        self._connect().execute(
+            "UPDATE bulk_email_jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+            (BULK_EMAIL_FAILED, error, time.time(), job_id)
+        )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Job status with progress, and the campaign result once it has finished"""
+        row = self._connect().execute(
+            "SELECT id, user_id, status, total, processed, result, error, created_at, updated_at "
+            "FROM bulk_email_jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        job = dict(zip(('job_id', 'user_id', 'status', 'total', 'processed', 'result', 'error',
+                        'created_at', 'updated_at'), row))
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        if job['status'] == BULK_EMAIL_RUNNING and time.time() - job['updated_at'] > self.stale_seconds:
+            job['status'] = BULK_EMAIL_FAILED
+            job['error'] = 'Bulk email stopped reporting progress'
+            self.fail(job_id, job['error'])
+
+        if job['status'] == BULK_EMAIL_COMPLETED:
+            job['progress'] = 1.0
+        else:
+            job['progress'] = round(min(job['processed'] / job['total'], 0.99), 4) if job['total'] else 0.0
+        return job
+
+    def purge_expired(self) -> int:
+        """Delete finished jobs after the retention period"""
+        cursor = self._connect().execute(
+            "DELETE FROM bulk_email_jobs WHERE status != ? AND updated_at < ?",
+            (BULK_EMAIL_RUNNING, time.time() - self.retention_seconds)
+        )
+        return cursor.rowcount
+
+
+_bulk_email_jobs: Optional[BulkEmailJobStore] = None
+_bulk_email_jobs_lock = threading.Lock()
+
+def get_bulk_email_job_store() -> BulkEmailJobStore:
+    """Get the process-wide bulk email job store"""
+    global _bulk_email_jobs
+    with _bulk_email_jobs_lock:
+        if _bulk_email_jobs is None:
+            _bulk_email_jobs = BulkEmailJobStore()
+        return _bulk_email_jobs
+
+def start_bulk_email(email_service, recipients: List[Dict[str, Any]], user_id: Optional[str] = None,
+                     template_name: Optional[str] = None, subject: Optional[str] = None,
+                     body: Optional[str] = None,
+                     attachments: Optional[List[Dict[str, Any]]] = None) -> str:
+    """Send a bulk email campaign on a background thread and return the job id"""
+    store = get_bulk_email_job_store()
+    try:
+        store.purge_expired()
+    except sqlite3.Error as e:
+        logger.warning(f"Bulk email job purge failed: {str(e)}")
+
+    job_id = store.create(user_id, len(recipients))
+
+    def run():
+        try:
+            result = email_service.send_many(
+                recipients,
+                template_name=template_name,
+                subject=subject,
+                body=body,
+                attachments=attachments,
+                progress=lambda processed: store.progress(job_id, processed)
+            )
+            if 'error' in result:
+                store.fail(job_id, result['error'])
+            else:
+                store.complete(job_id, result)
+        except Exception as e:
+            logger.error(f"Bulk email {job_id} failed: {str(e)}")
+            store.fail(job_id, str(e))
+
+    threading.Thread(target=run, name=f"bulk-email-{job_id[:8]}", daemon=True).start()
+    return job_id
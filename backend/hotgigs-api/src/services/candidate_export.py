@@ -0,0 +1,375 @@
+"""
+Candidate Export for HotGigs.ai
+Constant-memory candidate exports: rows are pulled from the database a page
+at a time with keyset pagination and written straight to CSV or a write-only
+Excel workbook, either streamed to the client or built by a background
+export job that reports progress
+"""
+import os
+import io
+import csv
+import time
+import uuid
+import sqlite3
+import logging
+import tempfile
+import threading
+from datetime import datetime
+from typing import Dict, List, Any, Iterable, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EXPORT_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'data', 'exports'
+)
+
+EXPORT_COLUMNS = [
+    'Name', 'Email', 'Phone', 'Location', 'Summary', 'Skills', 'Experience_Years',
+    'Education', 'Domain_Expertise', 'Source_File', 'Processing_Confidence', 'Processed_Date'
+]
+
+EXPORT_MIMETYPES = {
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'csv': 'text/csv'
+}
+
+# Related rows are read in pages no larger than PostgREST's default max-rows,
+# which would otherwise silently truncate a page's skills or experiences
+RELATED_PAGE_SIZE = 1000
+
+# Export job states
+EXPORT_RUNNING = 'running'
+EXPORT_COMPLETED = 'completed'
+EXPORT_FAILED = 'failed'
+
+def candidate_export_row(candidate: Dict[str, Any], processed_date: str) -> List[Any]:
+    """Values of one candidate in EXPORT_COLUMNS order"""
+    return [
+        candidate.get('name', ''),
+        candidate.get('email', ''),
+        candidate.get('phone', ''),
+        candidate.get('location', ''),
+        candidate.get('summary', ''),
+        ', '.join(candidate.get('skills', [])),
+        len(candidate.get('work_experience', [])),
+        ', '.join([edu.get('degree', '') for edu in candidate.get('education', [])]),
+        ', '.join([domain.get('domain', '') for domain in candidate.get('domain_expertise', [])]),
+        candidate.get('source_file', ''),
+        candidate.get('processing_confidence', 0),
+        processed_date
+    ]
+
+def iter_candidate_rows(candidates: Iterable[Dict[str, Any]]) -> Iterator[List[Any]]:
+    """Export rows for candidates, stamped with one processed date for the whole export"""
+    processed_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    for candidate in candidates:
+        yield candidate_export_row(candidate, processed_date)
+
+def iter_database_candidates(db_service, filters: Optional[Dict[str, Any]] = None,
+                             page_size: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Stream candidate profiles from the database in the shape expected by
+    candidate_export_row. Profiles are paged by id and each page is enriched
+    from each related table, itself read in keyset pages of RELATED_PAGE_SIZE,
+    so memory is bounded by the page size.
+    """
+    page_size = page_size or int(os.getenv('CANDIDATE_EXPORT_PAGE_SIZE', 250))
+
+    for profiles in db_service.iter_records_keyset('candidate_profiles', filters, page_size=page_size):
+        profile_ids = [profile['id'] for profile in profiles]
+        user_ids = list({profile['user_id'] for profile in profiles if profile.get('user_id')})
+
+        users_by_id = {
+            user['id']: user
+            for user in db_service.get_records_optimized(
+                'users', {'id': user_ids},
+                select_fields='id, first_name, last_name, email, phone',
+                use_cache=False
+            )
+        } if user_ids else {}
+
+        related = {}
+        for table, fields in (('candidate_skills', 'id, candidate_id, skill_name'),
+                              ('work_experiences', 'id, candidate_id'),
+                              ('education', 'id, candidate_id, degree')):
+            rows_by_candidate: Dict[str, List[Dict[str, Any]]] = {}
+            for rows in db_service.iter_records_keyset(
+                table, {'candidate_id': profile_ids}, select_fields=fields, page_size=RELATED_PAGE_SIZE
+            ):
+                for row in rows:
+                    rows_by_candidate.setdefault(row['candidate_id'], []).append(row)
+            related[table] = rows_by_candidate
+
+        for profile in profiles:
+            user = users_by_id.get(profile.get('user_id'), {})
+            skills = [skill['skill_name'] for skill in related['candidate_skills'].get(profile['id'], [])
+                      if skill.get('skill_name')]
+            yield {
+                'name': ' '.join(filter(None, [user.get('first_name'), user.get('last_name')])),
+                'email': user.get('email') or '',
+                'phone': user.get('phone') or '',
+                'location': profile.get('location') or '',
+                'summary': profile.get('summary') or profile.get('bio') or '',
+                'skills': skills or list(profile.get('skills') or []),
+                'work_experience': related['work_experiences'].get(profile['id'], []),
+                'education': related['education'].get(profile['id'], []),
+                'domain_expertise': [],
+                'source_file': profile.get('source_file') or '',
+                'processing_confidence': profile.get('processing_confidence') or 0
+            }
+
+
+class CandidateExportWriter:
+    """Writes export rows to a file without holding them in memory
+
+    Excel output uses openpyxl's write-only mode, which streams rows into the
+    sheet XML on disk; CSV output is written row by row.
+    """
+
+    def __init__(self, path: str, export_format: str = 'xlsx'):
+        if export_format not in EXPORT_MIMETYPES:
+            raise ValueError(f"Unsupported export format: {export_format}")
+        self.path = path
+        self.export_format = export_format
+        self.rows_written = 0
+
+        if export_format == 'xlsx':
+            from openpyxl import Workbook
+            from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+            self._illegal_characters = ILLEGAL_CHARACTERS_RE
+            self._workbook = Workbook(write_only=True)
+            self._sheet = self._workbook.create_sheet('Candidates')
+            self._sheet.append(EXPORT_COLUMNS)
+        else:
+            self._file = open(path, 'w', newline='', encoding='utf-8')
+            self._csv = csv.writer(self._file)
+            self._csv.writerow(EXPORT_COLUMNS)
+
+    def write(self, row: List[Any]):
+        if self.export_format == 'xlsx':
+            # Control characters are rejected by the xlsx format
+            self._sheet.append([
+                self._illegal_characters.sub('', value) if isinstance(value, str) else value
+                for value in row
+            ])
+        else:
+            self._csv.writerow(row)
+        self.rows_written += 1
+
+    def close(self):
+        if self.export_format == 'xlsx':
+            self._workbook.save(self.path)
+        else:
+            self._file.close()
+
+    def abort(self):
+        """Release the output file without finishing it"""
+        if self.export_format == 'csv':
+            self._file.close()
+
+
+def stream_csv(rows: Iterable[List[Any]], chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """Encode rows as CSV and yield them in chunks for a streamed HTTP response"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+def write_export_file(rows: Iterable[List[Any]], export_format: str = 'xlsx',
+                      path: Optional[str] = None, progress=None,
+                      progress_every: int = 1000) -> Tuple[str, int]:
+    """Write rows to an export file (a temp file by default); returns its path and row count"""
+    if path is None:
+        export_dir = os.getenv('CANDIDATE_EXPORT_DIR', DEFAULT_EXPORT_DIR)
+        os.makedirs(export_dir, exist_ok=True)
+        handle, path = tempfile.mkstemp(suffix=f'.{export_format}', prefix='candidates_', dir=export_dir)
+        os.close(handle)
+
+    writer = None
+    try:
+        writer = CandidateExportWriter(path, export_format)
+        for row in rows:
+            writer.write(row)
+            if progress and writer.rows_written % progress_every == 0:
+                progress(writer.rows_written)
+        writer.close()
+    except Exception:
+        if writer is not None:
+            writer.abort()
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+        raise
+
+    if progress:
+        progress(writer.rows_written)
+    return path, writer.rows_written
+
+
+class ExportJobStore:
+    """Progress and output location of background exports, shared by all web workers
+
+    A job runs on a thread of the worker that accepted it and records its row
+    count as it goes; any worker can report progress or serve the finished
+    file. Jobs whose progress stops updating (their worker died) are reported
+    as failed.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        export_dir = os.getenv('CANDIDATE_EXPORT_DIR', DEFAULT_EXPORT_DIR)
+        self.path = path or os.getenv('EXPORT_JOB_DB_PATH', os.path.join(export_dir, 'export_jobs.db'))
+        self.retention_seconds = int(os.getenv('EXPORT_RETENTION_SECONDS', 86400))
+        self.stale_seconds = int(os.getenv('EXPORT_STALE_SECONDS', 600))
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._connect().execute("""
+            CREATE TABLE IF NOT EXISTS export_jobs (
+                id TEXT PRIMARY KEY,
+                user_id TEXT,
+                format TEXT NOT NULL,
+                status TEXT NOT NULL,
+                rows_written INTEGER NOT NULL DEFAULT 0,
+                total_rows INTEGER,
+                file_path TEXT,
+                filename TEXT NOT NULL,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Per-thread connection; sqlite3 connections must not cross threads or forks"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def create(self, user_id: Optional[str], export_format: str, filename: str,
+               total_rows: Optional[int] = None) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._connect().execute(
+            "INSERT INTO export_jobs (id, user_id, format, status, total_rows, filename, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (job_id, str(user_id) if user_id is not None else None, export_format, EXPORT_RUNNING,
+             total_rows, filename, now, now)
+        )
+        return job_id
+
+    def progress(self, job_id: str, rows_written: int):
+        self._connect().execute(
+            "UPDATE export_jobs SET rows_written = ?, updated_at = ? WHERE id = ?",
+            (rows_written, time.time(), job_id)
+        )
+
+    def complete(self, job_id: str, file_path: str, rows_written: int):
+        self._connect().execute(
+            "UPDATE export_jobs SET status = ?, file_path = ?, rows_written = ?, updated_at = ? WHERE id = ?",
+            (EXPORT_COMPLETED, file_path, rows_written, time.time(), job_id)
+        )
+
+    def fail(self, job_id: str, error: str):
+        self._connect().execute(
+            "UPDATE export_jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+            (EXPORT_FAILED, error, time.time(), job_id)
+        )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Job status with progress"""
+        row = self._connect().execute(
+            "SELECT id, user_id, format, status, rows_written, total_rows, file_path, filename, error, "
+            "created_at, updated_at FROM export_jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        job = dict(zip(('job_id', 'user_id', 'format', 'status', 'rows_written', 'total_rows',
+                        'file_path', 'filename', 'error', 'created_at', 'updated_at'), row))
+        if job['status'] == EXPORT_RUNNING and time.time() - job['updated_at'] > self.stale_seconds:
+            job['status'] = EXPORT_FAILED
+            job['error'] = 'Export stopped reporting progress'
+            self.fail(job_id, job['error'])
+
+        total = job['total_rows']
+        if job['status'] == EXPORT_COMPLETED:
+            job['progress'] = 1.0
+        else:
+            job['progress'] = round(min(job['rows_written'] / total, 0.99), 4) if total else None
+        return job
+
+    def purge_expired(self) -> int:
+        """Delete finished jobs and their files after the retention period"""
+        cutoff = time.time() - self.retention_seconds
+        conn = self._connect()
+        expired = conn.execute(
+            "SELECT id, file_path FROM export_jobs WHERE status != ? AND updated_at < ?",
+            (EXPORT_RUNNING, cutoff)
+        ).fetchall()
+        for job_id, file_path in expired:
+            if file_path:
+                try:
+                    os.unlink(file_path)
+                except OSError:
+                    pass
+            conn.execute("DELETE FROM export_jobs WHERE id = ?", (job_id,))
+        return len(expired)
+
+
+_export_jobs: Optional[ExportJobStore] = None
+_export_jobs_lock = threading.Lock()
+
+def get_export_job_store() -> ExportJobStore:
+    """Get the process-wide export job store"""
+    global _export_jobs
+    with _export_jobs_lock:
+        if _export_jobs is None:
+            _export_jobs = ExportJobStore()
+        return _export_jobs
+
+def start_candidate_export(db_service, export_format: str = 'xlsx',
+                           filters: Optional[Dict[str, Any]] = None,
+                           user_id: Optional[str] = None, filename: Optional[str] = None) -> str:
+    """Export candidates from the database on a background thread and return the job id"""
+    store = get_export_job_store()
+    try:
+        store.purge_expired()
+    except sqlite3.Error as e:
+        logger.warning(f"Export job purge failed: {str(e)}")
+
+    try:
+        total_rows = db_service.count_records('candidate_profiles', filters)
+    except Exception:
+        total_rows = None
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = filename or f"candidates_export_{timestamp}.{export_format}"
+    job_id = store.create(user_id, export_format, filename, total_rows)
+
+    def run():
+        try:
+            rows = iter_candidate_rows(iter_database_candidates(db_service, filters))
+            path, rows_written = write_export_file(
+                rows, export_format, progress=lambda written: store.progress(job_id, written)
+            )
+            store.complete(job_id, path, rows_written)
+        except Exception as e:
+            logger.error(f"Candidate export {job_id} failed: {str(e)}")
+            store.fail(job_id, str(e))
+
+    threading.Thread(target=run, name=f"candidate-export-{job_id[:8]}", daemon=True).start()
+    return job_id
@@ -2,8 +2,7 @@
 Database service import helper for AI services
 """
 
-from src.models.database import get_database_service
+from src.models.optimized_database import get_database_service
 
 # Re-export for convenience
 __all__ = ['get_database_service']
-
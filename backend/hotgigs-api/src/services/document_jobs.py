@@ -0,0 +1,675 @@
+"""
+Document Processing Job Queue for HotGigs.ai
+Durable SQLite-backed queue that runs DocumentProcessor work in background
+worker processes, with per-document progress, results and retries
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import atexit
+import signal
+import sqlite3
+import logging
+import argparse
+import threading
+import multiprocessing
+from dataclasses import asdict
+from typing import Dict, List, Any, Optional, Tuple
+from src.services.document_results import (
+    document_content_hash,
+    document_result_key,
+    deduplication_summary
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'data', 'document_jobs.db'
+)
+
+# Item and job states
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_COMPLETED = 'completed'
+STATUS_FAILED = 'failed'
+STATUS_CANCELLED = 'cancelled'
+TERMINAL_STATUSES = (STATUS_COMPLETED, STATUS_FAILED, STATUS_CANCELLED)
+
+def analysis_to_result(analysis) -> Dict[str, Any]:
+    """JSON-serializable result of a DocumentAnalysis"""
+    result = asdict(analysis)
+    result['is_authentic'] = len(analysis.fraud_indicators) == 0
+    return result
+
+
+class DocumentJobQueue:
+    """Durable queue of document processing jobs shared by web and worker processes
+
+    A job groups one or more documents (items). Workers claim single items
+    under a lease, so a crashed worker's items become claimable again once the
+    lease expires; a live worker renews its lease with heartbeat(). Outcomes
+    are fenced on the worker id and attempt, so a worker whose lease was taken
+    over cannot overwrite the new holder's result. Failed items are retried
+    with exponential backoff until max_attempts is reached.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_attempts: Optional[int] = None,
+                 lease_seconds: Optional[int] = None, retry_backoff: Optional[float] = None):
+        self.path = path or os.getenv('DOCUMENT_JOB_DB_PATH', DEFAULT_QUEUE_PATH)
+        self.max_attempts = max_attempts or int(os.getenv('DOCUMENT_JOB_MAX_ATTEMPTS', 3))
+        self.lease_seconds = lease_seconds or int(os.getenv('DOCUMENT_JOB_LEASE_SECONDS', 900))
+        self.retry_backoff = retry_backoff or float(os.getenv('DOCUMENT_JOB_RETRY_BACKOFF', 5))
+        self.retention_seconds = int(os.getenv('DOCUMENT_JOB_RETENTION_SECONDS', 7 * 86400))
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = self._connect()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS document_jobs (
+                id TEXT PRIMARY KEY,
+                user_id TEXT,
+                source TEXT NOT NULL,
+                status TEXT NOT NULL,
+                total INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS document_job_items (
+                job_id TEXT NOT NULL,
+                item_index INTEGER NOT NULL,
+                document_id TEXT,
+                document_type TEXT NOT NULL,
+                options TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                available_at REAL NOT NULL,
+                lease_expires_at REAL,
+                worker_id TEXT,
+                result TEXT,
+                error TEXT,
+                processing_time REAL,
+                content_key TEXT,
+                duplicate_of INTEGER,
+                deduplicated INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (job_id, item_index)
+            );
+            CREATE TABLE IF NOT EXISTS document_job_payloads (
+                job_id TEXT NOT NULL,
+                item_index INTEGER NOT NULL,
+                data BLOB NOT NULL,
+                PRIMARY KEY (job_id, item_index)
+            );
+            CREATE INDEX IF NOT EXISTS idx_document_job_items_claim
+                ON document_job_items(status, available_at);
+            CREATE INDEX IF NOT EXISTS idx_document_jobs_updated
+                ON document_jobs(status, updated_at);
+        """)
+
+        # Queues created before deduplication lack these columns
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(document_job_items)")}
+        for column, definition in (('content_key', 'TEXT'),
+                                   ('duplicate_of', 'INTEGER'),
+                                   ('deduplicated', 'INTEGER NOT NULL DEFAULT 0')):
+            if column not in columns:
+                conn.execute(f"ALTER TABLE document_job_items ADD COLUMN {column} {definition}")
+        conn.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Per-thread connection; sqlite3 connections must not cross threads or forks"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def submit(self, documents: List[Dict[str, Any]], user_id: Optional[str] = None,
+               source: str = 'api') -> str:
+        """
+        Queue documents for processing and return the job id.
+        Each document is a dict with 'data' (bytes), 'document_type' and optional
+        'index', 'document_id', 'perform_ocr' and 'check_fraud'. Repeats of a
+        document within the job are stored once and take the first copy's result.
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        conn = self._connect()
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO document_jobs (id, user_id, source, status, total, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, str(user_id) if user_id is not None else None, source, STATUS_QUEUED,
+                 len(documents), now, now)
+            )
+            first_index_by_key: Dict[str, int] = {}
+            for position, document in enumerate(documents):
+                index = document.get('index', position)
+                document_type = document.get('document_type', 'pdf')
+                options = {
+                    'perform_ocr': document.get('perform_ocr', True),
+                    'check_fraud': document.get('check_fraud', True)
+                }
+                content_key = document_result_key(
+                    document_content_hash(document['data']), document_type,
+                    options['perform_ocr'], options['check_fraud']
+                )
+                duplicate_of = first_index_by_key.setdefault(content_key, index)
+                duplicate_of = duplicate_of if duplicate_of != index else None
+
+                conn.execute(
+                    "INSERT INTO document_job_items (job_id, item_index, document_id, document_type, "
+                    "options, status, available_at, content_key, duplicate_of, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (job_id, index, document.get('document_id'), document_type,
+                     json.dumps(options), STATUS_QUEUED, now, content_key, duplicate_of, now)
+                )
+                if duplicate_of is None:
+                    conn.execute(
+                        "INSERT INTO document_job_payloads (job_id, item_index, data) VALUES (?, ?, ?)",
+                        (job_id, index, sqlite3.Binary(document['data']))
+                    )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        return job_id
+
+    def claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """Lease the next runnable item, including items whose previous lease expired"""
+        now = time.time()
+        conn = self._connect()
+
+        # BEGIN IMMEDIATE takes the write lock so two workers cannot claim the same item
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT job_id, item_index, document_type, options, attempts FROM document_job_items "
+                "WHERE duplicate_of IS NULL AND ((status = ? AND available_at <= ?) "
+                "OR (status = ? AND lease_expires_at <= ?)) "
+                "ORDER BY available_at LIMIT 1",
+                (STATUS_QUEUED, now, STATUS_RUNNING, now)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+
+            job_id, item_index, document_type, options, attempts = row
+            if attempts >= self.max_attempts:
+                # The worker holding the last attempt died mid-document
+                self._finish_item(conn, job_id, item_index, STATUS_FAILED,
+                                  error='Worker lease expired', now=now)
+                conn.execute("COMMIT")
+                return self.claim(worker_id)
+
+            conn.execute(
+                "UPDATE document_job_items SET status = ?, attempts = attempts + 1, "
+                "lease_expires_at = ?, worker_id = ?, updated_at = ? WHERE job_id = ? AND item_index = ?",
+                (STATUS_RUNNING, now + self.lease_seconds, worker_id, now, job_id, item_index)
+            )
+            conn.execute(
+                "UPDATE document_jobs SET status = ?, updated_at = ? WHERE id = ? AND status = ?",
+                (STATUS_RUNNING, now, job_id, STATUS_QUEUED)
+            )
+            payload = conn.execute(
+                "SELECT data FROM document_job_payloads WHERE job_id = ? AND item_index = ?",
+                (job_id, item_index)
+            ).fetchone()
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        return {
+            'job_id': job_id,
+            'item_index': item_index,
+            'document_type': document_type,
+            'options': json.loads(options),
+            'attempt': attempts + 1,
+            'data': bytes(payload[0]) if payload else b''
+        }
+
+    def heartbeat(self, job_id: str, item_index: int, worker_id: str, attempt: int) -> bool:
+        """Extend the lease of an item this worker is running; False once the lease was lost"""
+        now = time.time()
+        return self._connect().execute(
+            "UPDATE document_job_items SET lease_expires_at = ?, updated_at = ? "
+            "WHERE job_id = ? AND item_index = ? AND status = ? AND worker_id = ? AND attempts = ?",
+            (now + self.lease_seconds, now, job_id, item_index, STATUS_RUNNING, worker_id, attempt)
+        ).rowcount > 0
+
+    def complete(self, job_id: str, item_index: int, worker_id: str, attempt: int, result: Dict[str, Any],
+                 processing_time: Optional[float] = None, deduplicated: bool = False) -> bool:
+        """
+        Store an item's result; deduplicated marks results reused from the result store.
+        Returns False when the lease for this attempt was lost and the result was discarded.
+        """
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            recorded = self._finish_item(conn, job_id, item_index, STATUS_COMPLETED, result=result,
+                                         processing_time=processing_time, deduplicated=deduplicated,
+                                         lease=(worker_id, attempt))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return recorded
+
+    def fail(self, job_id: str, item_index: int, worker_id: str, attempt: int, error: str) -> bool:
+        """
+        Record a failed attempt; the item is retried with backoff until attempts run out.
+        Returns False when the lease for this attempt was lost.
+        """
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if attempt < self.max_attempts:
+                recorded = conn.execute(
+                    "UPDATE document_job_items SET status = ?, available_at = ?, lease_expires_at = NULL, "
+                    "worker_id = NULL, error = ?, updated_at = ? "
+                    "WHERE job_id = ? AND item_index = ? AND status = ? AND worker_id = ? AND attempts = ?",
+                    (STATUS_QUEUED, now + self.retry_backoff * (2 ** (attempt - 1)), error, now,
+                     job_id, item_index, STATUS_RUNNING, worker_id, attempt)
+                ).rowcount > 0
+            else:
+                recorded = self._finish_item(conn, job_id, item_index, STATUS_FAILED, error=error, now=now,
+                                             lease=(worker_id, attempt))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return recorded
+
+    def _finish_item(self, conn: sqlite3.Connection, job_id: str, item_index: int, status: str,
+                     result: Optional[Dict[str, Any]] = None, error: Optional[str] = None,
+                     processing_time: Optional[float] = None, now: Optional[float] = None,
+                     deduplicated: bool = False, lease: Optional[Tuple[str, int]] = None) -> bool:
+        """
+        Move an item and its in-job duplicates to a terminal state, drop its payload and settle the job status.
+        With a (worker_id, attempt) lease the item only moves while that attempt still holds it.
+        """
+        now = now or time.time()
+        encoded = json.dumps(result) if result is not None else None
+        query = (
+            "UPDATE document_job_items SET status = ?, result = ?, error = ?, processing_time = ?, "
+            "deduplicated = ?, lease_expires_at = NULL, updated_at = ? "
+            "WHERE job_id = ? AND item_index = ? AND status NOT IN (?, ?, ?)"
+        )
+        params = (status, encoded, error, processing_time, int(deduplicated), now,
+                  job_id, item_index) + TERMINAL_STATUSES
+        if lease is not None:
+            query += " AND worker_id = ? AND attempts = ?"
+            params += tuple(lease)
+        if not conn.execute(query, params).rowcount:
+            return False
+
+        conn.execute(
+            "UPDATE document_job_items SET status = ?, result = ?, error = ?, processing_time = 0, "
+            "deduplicated = 1, updated_at = ? "
+            "WHERE job_id = ? AND duplicate_of = ? AND status NOT IN (?, ?, ?)",
+            (status, encoded, error, now, job_id, item_index) + TERMINAL_STATUSES
+        )
+
+        conn.execute(
+            "DELETE FROM document_job_payloads WHERE job_id = ? AND item_index = ?",
+            (job_id, item_index)
+        )
+        remaining = conn.execute(
+            "SELECT COUNT(*) FROM document_job_items WHERE job_id = ? AND status NOT IN (?, ?, ?)",
+            (job_id,) + TERMINAL_STATUSES
+        ).fetchone()[0]
+        if remaining == 0:
+            conn.execute(
+                "UPDATE document_jobs SET status = ?, updated_at = ? WHERE id = ? AND status != ?",
+                (STATUS_COMPLETED, now, job_id, STATUS_CANCELLED)
+            )
+        else:
+            conn.execute("UPDATE document_jobs SET updated_at = ? WHERE id = ?", (now, job_id))
+        return True
+
+    def cancel(self, job_id: str) -> int:
+        """Cancel every item that has not started; returns the number cancelled"""
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cancelled = conn.execute(
+                "UPDATE document_job_items SET status = ?, updated_at = ? WHERE job_id = ? AND status = ?",
+                (STATUS_CANCELLED, now, job_id, STATUS_QUEUED)
+            ).rowcount
+            conn.execute(
+                "DELETE FROM document_job_payloads WHERE job_id = ? AND item_index IN "
+                "(SELECT item_index FROM document_job_items WHERE job_id = ? AND status = ?)",
+                (job_id, job_id, STATUS_CANCELLED)
+            )
+            conn.execute(
+                "UPDATE document_jobs SET status = ?, updated_at = ? WHERE id = ? AND status IN (?, ?)",
+                (STATUS_CANCELLED, now, job_id, STATUS_QUEUED, STATUS_RUNNING)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return cancelled
+
+    def get_job(self, job_id: str, include_items: bool = True) -> Optional[Dict[str, Any]]:
+        """Job status with per-status counts, progress and optionally per-document state"""
+        conn = self._connect()
+        job = conn.execute(
+            "SELECT id, user_id, source, status, total, created_at, updated_at FROM document_jobs WHERE id = ?",
+            (job_id,)
+        ).fetchone()
+        if job is None:
+            return None
+
+        counts = dict(conn.execute(
+            "SELECT status, COUNT(*) FROM document_job_items WHERE job_id = ? GROUP BY status", (job_id,)
+        ).fetchall())
+        total = job[4]
+        finished = sum(counts.get(status, 0) for status in TERMINAL_STATUSES)
+        deduplicated = conn.execute(
+            "SELECT COUNT(*) FROM document_job_items WHERE job_id = ? AND deduplicated = 1", (job_id,)
+        ).fetchone()[0]
+
+        status = {
+            'job_id': job[0],
+            'user_id': job[1],
+            'source': job[2],
+            'status': job[3],
+            'total_documents': total,
+            'queued': counts.get(STATUS_QUEUED, 0),
+            'running': counts.get(STATUS_RUNNING, 0),
+            'completed': counts.get(STATUS_COMPLETED, 0),
+            'failed': counts.get(STATUS_FAILED, 0),
+            'cancelled': counts.get(STATUS_CANCELLED, 0),
+            'progress': round(finished / total, 4) if total else 1.0,
+            'deduplication': deduplication_summary(finished, deduplicated),
+            'created_at': job[5],
+            'updated_at': job[6]
+        }
+
+        if include_items:
+            status['documents'] = [
+                {
+                    'index': row[0],
+                    'document_id': row[1],
+                    'status': row[2],
+                    'attempts': row[3],
+                    'error': row[4],
+                    'processing_time': row[5],
+                    'deduplicated': bool(row[6])
+                }
+                for row in conn.execute(
+                    "SELECT item_index, document_id, status, attempts, error, processing_time, deduplicated "
+                    "FROM document_job_items WHERE job_id = ? ORDER BY item_index", (job_id,)
+                )
+            ]
+        return status
+
+    def get_results(self, job_id: str, offset: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        """Finished items with their results, in submission order"""
+        conn = self._connect()
+        rows = conn.execute(
+            "SELECT item_index, document_id, status, attempts, result, error, processing_time, deduplicated "
+            "FROM document_job_items WHERE job_id = ? AND status IN (?, ?, ?) "
+            "ORDER BY item_index LIMIT ? OFFSET ?",
+            (job_id,) + TERMINAL_STATUSES + (limit, offset)
+        ).fetchall()
+
+        return [
+            {
+                'index': row[0],
+                'document_id': row[1],
+                'status': row[2],
+                'success': row[2] == STATUS_COMPLETED,
+                'attempts': row[3],
+                'result': json.loads(row[4]) if row[4] else None,
+                'error': row[5],
+                'processing_time': row[6],
+                'deduplicated': bool(row[7])
+            }
+            for row in rows
+        ]
+
+    def purge_expired(self) -> int:
+        """Delete finished jobs older than the retention period"""
+        cutoff = time.time() - self.retention_seconds
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            job_ids = [row[0] for row in conn.execute(
+                "SELECT id FROM document_jobs WHERE status IN (?, ?, ?) AND updated_at < ?",
+                TERMINAL_STATUSES + (cutoff,)
+            )]
+            for table, column in (('document_job_payloads', 'job_id'),
+                                  ('document_job_items', 'job_id'),
+                                  ('document_jobs', 'id')):
+                conn.executemany(f"DELETE FROM {table} WHERE {column} = ?", [(job_id,) for job_id in job_ids])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return len(job_ids)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth by item status"""
+        conn = self._connect()
+        counts = dict(conn.execute(
+            "SELECT status, COUNT(*) FROM document_job_items GROUP BY status"
+        ).fetchall())
+        active_jobs = conn.execute(
+            "SELECT COUNT(*) FROM document_jobs WHERE status IN (?, ?)", (STATUS_QUEUED, STATUS_RUNNING)
+        ).fetchone()[0]
+        return {
+            'active_jobs': active_jobs,
+            'items_by_status': counts,
+            'max_attempts': self.max_attempts,
+            'lease_seconds': self.lease_seconds
+        }
+
+
+def _renew_lease(queue: DocumentJobQueue, item: Dict[str, Any], worker_id: str,
+                 stop_event: threading.Event):
+    """Heartbeat an item's lease while its document is processed"""
+    interval = max(queue.lease_seconds / 3, 1)
+    while not stop_event.wait(interval):
+        try:
+            if not queue.heartbeat(item['job_id'], item['item_index'], worker_id, item['attempt']):
+                logger.warning(f"Document job {item['job_id']}[{item['item_index']}] lease lost")
+                return
+        except sqlite3.Error as e:
+            logger.error(f"Document job lease renewal failed: {str(e)}")
+
+
+def run_worker(queue_path: Optional[str] = None, poll_interval: Optional[float] = None,
+               stop_event=None):
+    """Worker process loop: claim items, run DocumentProcessor and record the outcome"""
+    # Documents are processed in parallel across workers, so each worker OCRs
+    # its pages inline unless told otherwise
+    os.environ.setdefault('OCR_WORKERS', os.getenv('DOCUMENT_JOB_OCR_WORKERS', '0'))
+
+    # Imported here so the web process and supervisor do not load the OCR/CV stack twice
+    from src.services.document_processing import DocumentProcessor
+
+    poll_interval = poll_interval or float(os.getenv('DOCUMENT_JOB_POLL_INTERVAL', 1.0))
+    queue = DocumentJobQueue(queue_path)
+    processor = DocumentProcessor()
+    worker_id = f"{os.uname().nodename}:{os.getpid()}"
+    logger.info(f"Document job worker {worker_id} started")
+
+    while stop_event is None or not stop_event.is_set():
+        try:
+            item = queue.claim(worker_id)
+        except sqlite3.Error as e:
+            logger.error(f"Document job claim failed: {str(e)}")
+            time.sleep(poll_interval)
+            continue
+
+        if item is None:
+            time.sleep(poll_interval)
+            continue
+
+        started = time.time()
+        heartbeat_stop = threading.Event()
+        heartbeat = threading.Thread(
+            target=_renew_lease, args=(queue, item, worker_id, heartbeat_stop),
+            name=f"document-lease-{item['job_id']}-{item['item_index']}", daemon=True
+        )
+        heartbeat.start()
+        try:
+            analysis = processor.process_document(
+                item['data'],
+                item['document_type'],
+                item['options'].get('perform_ocr', True),
+                item['options'].get('check_fraud', True)
+            )
+            # process_document reports internal failures in the metadata instead of raising
+            error = analysis.processing_metadata.get('error')
+            if error:
+                raise RuntimeError(error)
+            recorded = queue.complete(item['job_id'], item['item_index'], worker_id, item['attempt'],
+                                      analysis_to_result(analysis), time.time() - started,
+                                      analysis.processing_metadata.get('deduplicated', False))
+        except Exception as e:
+            logger.error(f"Document job {item['job_id']}[{item['item_index']}] "
+                         f"attempt {item['attempt']} failed: {str(e)}")
+            recorded = queue.fail(item['job_id'], item['item_index'], worker_id, item['attempt'], str(e))
+        finally:
+            heartbeat_stop.set()
+            heartbeat.join()
+        if not recorded:
+            logger.warning(f"Document job {item['job_id']}[{item['item_index']}] attempt {item['attempt']} "
+                           f"lost its lease; outcome discarded")
+
+
+class DocumentJobWorkers:
+    """Supervisor keeping a fixed number of worker processes alive"""
+
+    def __init__(self, worker_count: Optional[int] = None, queue_path: Optional[str] = None):
+        self.worker_count = worker_count if worker_count is not None else int(os.getenv('DOCUMENT_JOB_WORKERS', 2))
+        self.queue_path = queue_path
+        self.start_method = os.getenv('DOCUMENT_JOB_START_METHOD', 'spawn')
+        self._lock = threading.Lock()
+        self._processes: List[multiprocessing.Process] = []
+        self._pid: Optional[int] = None
+        self._atexit_registered = False
+
+    def ensure_started(self):
+        """Start missing workers; replaces workers that exited"""
+        if self.worker_count <= 0:
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                # Processes started by a parent before a fork are not ours to manage
+                self._processes = []
+                self._pid = os.getpid()
+
+            self._processes = [process for process in self._processes if process.is_alive()]
+            context = multiprocessing.get_context(self.start_method)
+            while len(self._processes) < self.worker_count:
+                process = context.Process(
+                    target=run_worker,
+                    kwargs={'queue_path': self.queue_path},
+                    name='document-job-worker'
+                )
+                process.start()
+                self._processes.append(process)
+
+            # Registered after the first start so it runs before multiprocessing's
+            # own exit handler, which would otherwise wait on the workers forever
+            if not self._atexit_registered:
+                atexit.register(self.stop)
+                self._atexit_registered = True
+
+    def stop(self, timeout: float = 10.0):
+        """Terminate worker processes; their leased items are retried after the lease expires"""
+        with self._lock:
+            for process in self._processes:
+                process.terminate()
+            for process in self._processes:
+                process.join(timeout)
+            self._processes = []
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            alive = sum(1 for process in self._processes if process.is_alive())
+        return {'configured_workers': self.worker_count, 'alive_workers': alive}
+
+
+_job_queue: Optional[DocumentJobQueue] = None
+_job_workers: Optional[DocumentJobWorkers] = None
+_job_lock = threading.Lock()
+
+def get_document_job_queue() -> DocumentJobQueue:
+    """Get the process-wide document job queue"""
+    global _job_queue
+    with _job_lock:
+        if _job_queue is None:
+            _job_queue = DocumentJobQueue()
+        return _job_queue
+
+def get_document_job_workers() -> DocumentJobWorkers:
+    """Get the supervisor for worker processes embedded in this process
+
+    Set DOCUMENT_JOB_WORKERS=0 when workers run as a separate service
+    (python -m src.services.document_jobs).
+    """
+    global _job_workers
+    with _job_lock:
+        if _job_workers is None:
+            _job_workers = DocumentJobWorkers()
+        return _job_workers
+
+def submit_document_job(documents: List[Dict[str, Any]], user_id: Optional[str] = None,
+                        source: str = 'api') -> str:
+    """Queue documents and make sure workers are running to process them"""
+    queue = get_document_job_queue()
+    job_id = queue.submit(documents, user_id=user_id, source=source)
+    get_document_job_workers().ensure_started()
+    try:
+        queue.purge_expired()
+    except sqlite3.Error as e:
+        logger.warning(f"Document job purge failed: {str(e)}")
+    return job_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run HotGigs.ai document processing workers')
+    parser.add_argument('--workers', type=int, default=int(os.getenv('DOCUMENT_JOB_WORKERS', 2) or 1))
+    parser.add_argument('--queue-path', default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    workers = DocumentJobWorkers(max(1, args.workers), args.queue_path)
+    queue = DocumentJobQueue(args.queue_path)
+
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopping.set())
+    signal.signal(signal.SIGINT, lambda *_: stopping.set())
+
+    logger.info(f"Starting {workers.worker_count} document job workers on {queue.path}")
+    last_purge = 0.0
+    while not stopping.is_set():
+        workers.ensure_started()
+        if time.time() - last_purge > 3600:
+            purged = queue.purge_expired()
+            if purged:
+                logger.info(f"Purged {purged} expired document jobs")
+            last_purge = time.time()
+        stopping.wait(5)
+
+    workers.stop()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,19 +4,32 @@ Implements OCR, fraud detection, and automated document processing
 """
 import os
 import io
+import copy
 import json
-import hashlib
 import logging
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Optional, Tuple, Union
 from datetime import datetime, timezone
-from PIL import Image, ImageEnhance, ImageFilter
-import pytesseract
+from PIL import Image
 import cv2
 import numpy as np
-from pdf2image import convert_from_bytes
 import openai
 import re
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
+from src.services.ai.llm_scheduler import get_llm_scheduler
+from src.services.ocr_engine import get_ocr_engine, ocr_image, enhance_image_for_ocr
+from src.services.text_extraction import TextExtractionService
+from src.services.keyword_matcher import (
+    get_keyword_matcher,
+    KeywordScan,
+    DOMAIN_KEYWORDS,
+    DOMAIN_CATEGORY,
+    TECH_CATEGORY
+)
+from src.services.document_results import (
+    get_document_result_store,
+    document_content_hash,
+    document_result_key
+)
 
 # Configure OpenAI
 openai.api_key = os.getenv('OPENAI_API_KEY')
@@ -36,51 +49,39 @@ class OCRService:
     
     def __init__(self):
         self.supported_formats = ['.pdf', '.png', '.jpg', '.jpeg', '.tiff', '.bmp']
+        self.ocr_engine = get_ocr_engine()
         
-    def extract_text_from_image(self, image_data: bytes, enhance: bool = True) -> Tuple[str, float]:
+    def extract_text_from_image(self, image_data: Union[bytes, Image.Image], enhance: bool = True) -> Tuple[str, float]:
         """Extract text from image using OCR"""
         try:
-            # Convert bytes to PIL Image
-            image = Image.open(io.BytesIO(image_data))
+            # Accept already decoded pages so callers can skip an encode/decode round trip
+            if isinstance(image_data, Image.Image):
+                image = image_data
+            else:
+                image = Image.open(io.BytesIO(image_data))
             
             # Enhance image for better OCR if requested
             if enhance:
                 image = self._enhance_image_for_ocr(image)
             
-            # Perform OCR
-            custom_config = r'--oem 3 --psm 6'
-            text = pytesseract.image_to_string(image, config=custom_config)
-            
-            # Get confidence score
-            data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
-            confidences = [int(conf) for conf in data['conf'] if int(conf) > 0]
-            avg_confidence = sum(confidences) / len(confidences) if confidences else 0
-            
-            return text.strip(), avg_confidence / 100.0
+            return self._ocr_image(image)
             
         except Exception as e:
             logging.error(f"OCR extraction error: {str(e)}")
             return "", 0.0
     
+    def _ocr_image(self, image: Image.Image) -> Tuple[str, float]:
+        """Single Tesseract pass producing both the text and its mean word confidence"""
+        return ocr_image(image)
+    
     def extract_text_from_pdf(self, pdf_data: bytes) -> Tuple[str, float]:
         """Extract text from PDF document"""
         try:
-            # Convert PDF to images
-            images = convert_from_bytes(pdf_data, dpi=300)
-            
-            all_text = []
-            all_confidences = []
-            
-            for image in images:
-                # Convert PIL image to bytes for processing
-                img_byte_arr = io.BytesIO()
-                image.save(img_byte_arr, format='PNG')
-                img_bytes = img_byte_arr.getvalue()
-                
-                text, confidence = self.extract_text_from_image(img_bytes)
-                if text:
-                    all_text.append(text)
-                    all_confidences.append(confidence)
+            # Pages are rasterized and OCRed in parallel by the shared process pool
+            page_results = self.ocr_engine.ocr_pdf(pdf_data)
+            
+            all_text = [text for _, text, _ in page_results if text]
+            all_confidences = [confidence for _, text, confidence in page_results if text]
             
             combined_text = '\n\n'.join(all_text)
             avg_confidence = sum(all_confidences) / len(all_confidences) if all_confidences else 0
@@ -91,44 +92,35 @@ class OCRService:
             logging.error(f"PDF OCR extraction error: {str(e)}")
             return "", 0.0
     
-    def _enhance_image_for_ocr(self, image: Image.Image) -> Image.Image:
-        """Enhance image quality for better OCR results"""
+    def extract_text_from_pdf_pages(self, pdf_data: bytes, pages: List[int],
+                                    enhance: bool = True) -> Dict[int, Tuple[str, float]]:
+        """OCR selected 1-based PDF pages, rasterizing only those pages"""
         try:
-            # Convert to grayscale
-            if image.mode != 'L':
-                image = image.convert('L')
-            
-            # Enhance contrast
-            enhancer = ImageEnhance.Contrast(image)
-            image = enhancer.enhance(2.0)
-            
-            # Enhance sharpness
-            enhancer = ImageEnhance.Sharpness(image)
-            image = enhancer.enhance(2.0)
-            
-            # Apply noise reduction
-            image = image.filter(ImageFilter.MedianFilter(size=3))
-            
-            return image
-            
+            page_results = self.ocr_engine.ocr_pdf(pdf_data, pages, enhance=enhance)
+            return {page: (text, confidence) for page, text, confidence in page_results}
         except Exception as e:
-            logging.error(f"Image enhancement error: {str(e)}")
-            return image
+            logging.error(f"PDF page OCR extraction error: {str(e)}")
+            return {page: ("", 0.0) for page in pages}
+    
+    def _enhance_image_for_ocr(self, image: Image.Image) -> Image.Image:
+        """Enhance image quality for better OCR results"""
+        return enhance_image_for_ocr(image)
 
 class DocumentFraudDetector:
     """Service for detecting document tampering and fraud"""
     
     def __init__(self):
-        self.client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        self.scheduler = get_llm_scheduler()
         
-    def analyze_document_authenticity(self, document_data: bytes, document_type: str) -> Dict[str, Any]:
+    def analyze_document_authenticity(self, document_data: bytes, document_type: str,
+                                      content_hash: Optional[str] = None) -> Dict[str, Any]:
         """Analyze document for signs of tampering or fraud"""
         try:
             fraud_indicators = []
             confidence_score = 1.0
             
             # Perform various fraud detection checks
-            metadata_analysis = self._analyze_metadata(document_data)
+            metadata_analysis = self._analyze_metadata(document_data, content_hash)
             visual_analysis = self._analyze_visual_inconsistencies(document_data)
             text_analysis = self._analyze_text_patterns(document_data, document_type)
             
@@ -160,7 +152,7 @@ class DocumentFraudDetector:
                 'risk_level': 'high'
             }
     
-    def _analyze_metadata(self, document_data: bytes) -> Dict[str, Any]:
+    def _analyze_metadata(self, document_data: bytes, content_hash: Optional[str] = None) -> Dict[str, Any]:
         """Analyze document metadata for inconsistencies"""
         indicators = []
         
@@ -172,12 +164,14 @@ class DocumentFraudDetector:
             
             # Check for common metadata tampering signs
             # This is a simplified check - real implementation would be more sophisticated
-            data_hash = hashlib.md5(document_data).hexdigest()
+            # Reuse the content hash computed for result deduplication when given
+            data_hash = content_hash or document_content_hash(document_data)
             
             return {
                 'indicators': indicators,
                 'file_size': file_size,
-                'hash': data_hash
+                'hash': data_hash,
+                'hash_algorithm': 'sha256'
             }
             
         except Exception as e:
@@ -263,7 +257,7 @@ class DocumentFraudDetector:
             - concerns: list of areas requiring manual review
             """
             
-            response = self.client.chat.completions.create(
+            analysis_text = self.scheduler.complete(
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": "You are a document fraud detection expert."},
@@ -271,9 +265,7 @@ class DocumentFraudDetector:
                 ],
                 max_tokens=500,
                 temperature=0.1
-            )
-            
-            analysis_text = response.choices[0].message.content
+            ).content
             
             try:
                 analysis = json.loads(analysis_text)
@@ -304,111 +296,148 @@ class DocumentFraudDetector:
         else:
             return 'high'
 
+# Resume extraction patterns, compiled once
+SKILL_LINE_PATTERN = re.compile(r'(?i)(?:skills?|technologies?|programming languages?|tools?)[:\s]*([^\n]+)')
+SKILL_DELIMITER_PATTERN = re.compile(r'[,;|•\n]')
+EXPERIENCE_PATTERNS = [
+    re.compile(r'(?i)(\d{4})\s*[-–]\s*(\d{4}|\w+)\s*[:\s]*([^\n]+)'),
+    re.compile(r'(?i)(\w+\s+\d{4})\s*[-–]\s*(\w+\s+\d{4}|\w+)\s*[:\s]*([^\n]+)')
+]
+DEGREE_PATTERNS = [
+    re.compile(r'(?i)(bachelor|master|phd|doctorate|associate)[^\n]*(\d{4})'),
+    re.compile(r'(?i)(b\.?s\.?|m\.?s\.?|m\.?b\.?a\.?|ph\.?d\.?)[^\n]*(\d{4})')
+]
+EMAIL_PATTERN = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+PHONE_PATTERN = re.compile(r'(\+?1?[-.\s]?)?\(?([0-9]{3})\)?[-.\s]?([0-9]{3})[-.\s]?([0-9]{4})')
+
 class ResumeParser:
     """Advanced resume parsing with domain knowledge identification"""
     
     def __init__(self):
-        self.client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-        self.domain_keywords = {
-            'automobile': ['automotive', 'car', 'vehicle', 'ford', 'gm', 'toyota', 'honda', 'bmw'],
-            'ecommerce': ['amazon', 'ebay', 'shopify', 'ecommerce', 'online retail', 'marketplace'],
-            'government': ['government', 'federal', 'state', 'municipal', 'public sector', 'dod'],
-            'defense': ['defense', 'military', 'army', 'navy', 'air force', 'pentagon', 'lockheed'],
-            'healthcare': ['hospital', 'medical', 'healthcare', 'pharma', 'clinic', 'patient'],
-            'banking': ['bank', 'financial', 'credit', 'loan', 'mortgage', 'jpmorgan', 'wells fargo'],
-            'finance': ['investment', 'trading', 'portfolio', 'hedge fund', 'private equity', 'goldman'],
-            'technology': ['software', 'tech', 'programming', 'development', 'google', 'microsoft'],
-            'consulting': ['consulting', 'advisory', 'mckinsey', 'deloitte', 'accenture', 'pwc']
-        }
+        self.scheduler = get_llm_scheduler()
+        self.domain_keywords = DOMAIN_KEYWORDS
+        self.keyword_matcher = get_keyword_matcher()
     
     def parse_resume(self, resume_text: str) -> Dict[str, Any]:
         """Parse resume and extract structured information"""
         try:
             # Use AI to extract structured data
             structured_data = self._ai_resume_parsing(resume_text)
-            
-            # Identify domain knowledge
-            domain_expertise = self._identify_domain_knowledge(resume_text)
-            
-            # Extract skills and experience
-            skills = self._extract_skills(resume_text)
-            experience = self._extract_experience(resume_text)
-            education = self._extract_education(resume_text)
-            
-            return {
-                'structured_data': structured_data,
-                'domain_expertise': domain_expertise,
-                'skills': skills,
-                'experience': experience,
-                'education': education,
-                'parsing_confidence': self._calculate_parsing_confidence(structured_data)
-            }
+            return self._build_parsed_resume(resume_text, structured_data)
             
         except Exception as e:
             logging.error(f"Resume parsing error: {str(e)}")
-            return {
-                'structured_data': {},
-                'domain_expertise': [],
-                'skills': [],
-                'experience': [],
-                'education': [],
-                'parsing_confidence': 0.0
-            }
+            return self._empty_parsed_resume()
+    
+    def parse_resumes(self, resume_texts: List[str]) -> List[Dict[str, Any]]:
+        """Parse many resumes, submitting all AI parsing requests concurrently"""
+        outcomes = self.scheduler.complete_many(
+            [self._ai_resume_request(resume_text) for resume_text in resume_texts]
+        )
+        
+        results = []
+        for resume_text, outcome in zip(resume_texts, outcomes):
+            try:
+                if isinstance(outcome, Exception):
+                    logging.error(f"AI resume parsing error: {str(outcome)}")
+                    structured_data = self._fallback_parsing(resume_text)
+                else:
+                    structured_data = self._parse_ai_output(outcome.content, resume_text)
+                results.append(self._build_parsed_resume(resume_text, structured_data))
+            except Exception as e:
+                logging.error(f"Resume parsing error: {str(e)}")
+                results.append(self._empty_parsed_resume())
+        return results
+    
+    def _build_parsed_resume(self, resume_text: str, structured_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Combine AI structured data with local domain, skill and history extraction"""
+        # One keyword pass serves both domain and skill detection
+        keyword_scan = self.keyword_matcher.scan(resume_text)
+        
+        # Identify domain knowledge
+        domain_expertise = self._identify_domain_knowledge(resume_text, keyword_scan)
+        
+        # Extract skills and experience
+        skills = self._extract_skills(resume_text, keyword_scan)
+        experience = self._extract_experience(resume_text)
+        education = self._extract_education(resume_text)
+        
+        return {
+            'structured_data': structured_data,
+            'domain_expertise': domain_expertise,
+            'skills': skills,
+            'experience': experience,
+            'education': education,
+            'parsing_confidence': self._calculate_parsing_confidence(structured_data)
+        }
+    
+    def _empty_parsed_resume(self) -> Dict[str, Any]:
+        return {
+            'structured_data': {},
+            'domain_expertise': [],
+            'skills': [],
+            'experience': [],
+            'education': [],
+            'parsing_confidence': 0.0
+        }
+    
+    def _ai_resume_request(self, resume_text: str) -> Dict[str, Any]:
+        """Build the chat completion request for AI resume parsing"""
+        prompt = f"""
+        Parse the following resume text and extract structured information:
+        
+        Resume: {resume_text[:2000]}...
+        
+        Extract and return JSON with:
+        - name: candidate name
+        - email: email address
+        - phone: phone number
+        - location: current location
+        - summary: professional summary
+        - work_experience: list of jobs with company, title, dates, description
+        - education: list of degrees with school, degree, year
+        - skills: list of technical and soft skills
+        - certifications: list of certifications
+        """
+        
+        return {
+            'model': "gpt-3.5-turbo",
+            'messages': [
+                {"role": "system", "content": "You are an expert resume parser. Extract accurate structured data."},
+                {"role": "user", "content": prompt}
+            ],
+            'max_tokens': 1500,
+            'temperature': 0.1
+        }
+    
+    def _parse_ai_output(self, parsed_text: str, resume_text: str) -> Dict[str, Any]:
+        """Decode the AI parser's JSON, falling back to local parsing"""
+        try:
+            return json.loads(parsed_text)
+        except:
+            # Fallback parsing
+            return self._fallback_parsing(resume_text)
     
     def _ai_resume_parsing(self, resume_text: str) -> Dict[str, Any]:
         """Use AI to parse resume into structured format"""
         try:
-            prompt = f"""
-            Parse the following resume text and extract structured information:
-            
-            Resume: {resume_text[:2000]}...
-            
-            Extract and return JSON with:
-            - name: candidate name
-            - email: email address
-            - phone: phone number
-            - location: current location
-            - summary: professional summary
-            - work_experience: list of jobs with company, title, dates, description
-            - education: list of degrees with school, degree, year
-            - skills: list of technical and soft skills
-            - certifications: list of certifications
-            """
-            
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are an expert resume parser. Extract accurate structured data."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=1500,
-                temperature=0.1
-            )
-            
-            parsed_text = response.choices[0].message.content
-            
-            try:
-                parsed_data = json.loads(parsed_text)
-            except:
-                # Fallback parsing
-                parsed_data = self._fallback_parsing(resume_text)
-            
-            return parsed_data
+            parsed_text = self.scheduler.complete(**self._ai_resume_request(resume_text)).content
+            return self._parse_ai_output(parsed_text, resume_text)
             
         except Exception as e:
             logging.error(f"AI resume parsing error: {str(e)}")
             return self._fallback_parsing(resume_text)
     
-    def _identify_domain_knowledge(self, resume_text: str) -> List[Dict[str, Any]]:
+    def _identify_domain_knowledge(self, resume_text: str,
+                                   keyword_scan: Optional[KeywordScan] = None) -> List[Dict[str, Any]]:
         """Identify domain expertise based on company names and experience"""
         domain_expertise = []
-        text_lower = resume_text.lower()
+        keyword_scan = keyword_scan or self.keyword_matcher.scan(resume_text)
         
-        for domain, keywords in self.domain_keywords.items():
-            matches = []
-            for keyword in keywords:
-                if keyword.lower() in text_lower:
-                    matches.append(keyword)
+        for domain in self.domain_keywords:
+            # Most frequently mentioned evidence first
+            matches = sorted(keyword_scan.keywords(DOMAIN_CATEGORY + domain),
+                             key=lambda keyword: keyword_scan.counts[keyword], reverse=True)
             
             if matches:
                 # Calculate confidence based on number of matches
@@ -424,28 +453,28 @@ class ResumeParser:
         
         return domain_expertise[:3]  # Top 3 domains
     
-    def _extract_skills(self, resume_text: str) -> List[str]:
+    def _extract_skills(self, resume_text: str, keyword_scan: Optional[KeywordScan] = None) -> List[str]:
         """Extract skills from resume text"""
-        # Common skill patterns
-        skill_patterns = [
-            r'(?i)skills?[:\s]*([^\n]+)',
-            r'(?i)technologies?[:\s]*([^\n]+)',
-            r'(?i)programming languages?[:\s]*([^\n]+)',
-            r'(?i)tools?[:\s]*([^\n]+)'
-        ]
+        skills = []
+        seen = set()
         
-        skills = set()
-        for pattern in skill_patterns:
-            matches = re.findall(pattern, resume_text)
-            for match in matches:
-                # Split by common delimiters
-                skill_list = re.split(r'[,;|•\n]', match)
-                for skill in skill_list:
-                    skill = skill.strip()
-                    if skill and len(skill) > 2:
-                        skills.add(skill)
+        # Skill section lines ("Skills:", "Technologies:", "Tools:" ...)
+        for match in SKILL_LINE_PATTERN.findall(resume_text):
+            # Split by common delimiters
+            for skill in SKILL_DELIMITER_PATTERN.split(match):
+                skill = skill.strip()
+                if skill and len(skill) > 2 and skill.lower() not in seen:
+                    seen.add(skill.lower())
+                    skills.append(skill)
+        
+        # Known technical skills mentioned anywhere in the resume
+        keyword_scan = keyword_scan or self.keyword_matcher.scan(resume_text)
+        for skill in keyword_scan.keywords(TECH_CATEGORY):
+            if skill not in seen:
+                seen.add(skill)
+                skills.append(skill)
         
-        return list(skills)[:20]  # Limit to top 20 skills
+        return skills[:20]  # Limit to top 20 skills
     
     def _extract_experience(self, resume_text: str) -> List[Dict[str, str]]:
         """Extract work experience from resume"""
@@ -453,13 +482,8 @@ class ResumeParser:
         experience = []
         
         # Look for common experience patterns
-        exp_patterns = [
-            r'(?i)(\d{4})\s*[-–]\s*(\d{4}|\w+)\s*[:\s]*([^\n]+)',
-            r'(?i)(\w+\s+\d{4})\s*[-–]\s*(\w+\s+\d{4}|\w+)\s*[:\s]*([^\n]+)'
-        ]
-        
-        for pattern in exp_patterns:
-            matches = re.findall(pattern, resume_text)
+        for pattern in EXPERIENCE_PATTERNS:
+            matches = pattern.findall(resume_text)
             for match in matches:
                 if len(match) >= 3:
                     experience.append({
@@ -475,14 +499,8 @@ class ResumeParser:
         education = []
         
         # Look for degree patterns
-        degree_patterns = [
-            r'(?i)(bachelor|master|phd|doctorate|associate)[^\n]*(\d{4})',
-            r'(?i)(b\.?s\.?|m\.?s\.?|m\.?b\.?a\.?|ph\.?d\.?)[^\n]*(\d{4})',
-            r'(?i)university|college[^\n]*(\d{4})'
-        ]
-        
-        for pattern in degree_patterns:
-            matches = re.findall(pattern, resume_text)
+        for pattern in DEGREE_PATTERNS:
+            matches = pattern.findall(resume_text)
             for match in matches:
                 if isinstance(match, tuple) and len(match) >= 2:
                     education.append({
@@ -509,14 +527,12 @@ class ResumeParser:
     
     def _extract_email(self, text: str) -> str:
         """Extract email address from text"""
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        matches = re.findall(email_pattern, text)
+        matches = EMAIL_PATTERN.findall(text)
         return matches[0] if matches else 'Not found'
     
     def _extract_phone(self, text: str) -> str:
         """Extract phone number from text"""
-        phone_pattern = r'(\+?1?[-.\s]?)?\(?([0-9]{3})\)?[-.\s]?([0-9]{3})[-.\s]?([0-9]{4})'
-        matches = re.findall(phone_pattern, text)
+        matches = PHONE_PATTERN.findall(text)
         return ''.join(matches[0]) if matches else 'Not found'
     
     def _calculate_parsing_confidence(self, structured_data: Dict[str, Any]) -> float:
@@ -548,12 +564,39 @@ class DocumentProcessor:
     
     def __init__(self):
         self.ocr_service = OCRService()
+        self.text_extractor = TextExtractionService(self.ocr_service)
         self.fraud_detector = DocumentFraudDetector()
         self.resume_parser = ResumeParser()
+        self.result_store = get_document_result_store()
     
     def process_document(self, document_data: bytes, document_type: str, 
-                        perform_ocr: bool = True, check_fraud: bool = True) -> DocumentAnalysis:
-        """Process document with OCR, fraud detection, and parsing"""
+                        perform_ocr: bool = True, check_fraud: bool = True,
+                        use_cache: bool = True) -> DocumentAnalysis:
+        """Process document with OCR, fraud detection, and parsing; identical documents reuse stored results"""
+        content_hash = document_content_hash(document_data)
+        if not use_cache or not self.result_store.enabled:
+            return self._process_document(document_data, document_type, perform_ocr, check_fraud, content_hash)
+        
+        key = document_result_key(content_hash, document_type, perform_ocr, check_fraud)
+        
+        # Concurrent copies of the same document wait for the first and then hit the store
+        with self.result_store.single_flight(key):
+            stored = self.result_store.get(key)
+            if stored is not None:
+                analysis = DocumentAnalysis(**copy.deepcopy(stored))
+                analysis.processing_metadata['deduplicated'] = True
+                return analysis
+            
+            analysis = self._process_document(document_data, document_type, perform_ocr, check_fraud, content_hash)
+            
+            # Failed runs are not stored so the document is retried next time
+            if 'error' not in analysis.processing_metadata:
+                self.result_store.set(key, asdict(analysis))
+            return analysis
+    
+    def _process_document(self, document_data: bytes, document_type: str, perform_ocr: bool,
+                          check_fraud: bool, content_hash: str) -> DocumentAnalysis:
+        """Run extraction, fraud detection and parsing on a document"""
         try:
             processing_start = datetime.now(timezone.utc)
             
@@ -563,18 +606,19 @@ class DocumentProcessor:
             fraud_indicators = []
             extracted_data = {}
             
-            # Perform OCR if requested
+            extraction = {}
+            
+            # Extract text if requested, using embedded text before falling back to OCR
             if perform_ocr:
-                if document_type.lower() == 'pdf':
-                    text_content, confidence_score = self.ocr_service.extract_text_from_pdf(document_data)
-                else:
-                    text_content, confidence_score = self.ocr_service.extract_text_from_image(document_data)
+                text_content, confidence_score, extraction = self.text_extractor.extract(
+                    document_data, document_type
+                )
             
             # Perform fraud detection if requested
             fraud_analysis = {}
             if check_fraud:
                 fraud_analysis = self.fraud_detector.analyze_document_authenticity(
-                    document_data, document_type
+                    document_data, document_type, content_hash
                 )
                 fraud_indicators = fraud_analysis.get('fraud_indicators', [])
             
@@ -589,9 +633,13 @@ class DocumentProcessor:
             # Create processing metadata
             processing_metadata = {
                 'processing_time_seconds': processing_time,
-                'ocr_performed': perform_ocr,
+                'ocr_performed': extraction.get('ocr_performed', False),
+                'extraction_tier': extraction.get('tier'),
+                'extraction': extraction,
                 'fraud_check_performed': check_fraud,
                 'document_size_bytes': len(document_data),
+                'content_hash': content_hash,
+                'deduplicated': False,
                 'processed_at': processing_end.isoformat(),
                 'fraud_analysis': fraud_analysis
             }
@@ -613,7 +661,7 @@ class DocumentProcessor:
                 document_type=document_type,
                 fraud_indicators=[f"Processing error: {str(e)}"],
                 extracted_data={},
-                processing_metadata={'error': str(e)}
+                processing_metadata={'error': str(e), 'content_hash': content_hash, 'deduplicated': False}
             )
 
 # Global instance
@@ -0,0 +1,181 @@
+"""
+Document Result Store for HotGigs.ai
+Content-addressed store of document processing results so identical documents
+arriving through email, Drive or upload are processed only once
+"""
+import os
+import json
+import hashlib
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Optional
+from src.models.cache import QueryCache
+from src.models.sqlite_cache import SQLiteCacheStore
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'data', 'document_results.db'
+)
+
+# Bump when extraction, fraud checks or parsing change so stale results are not reused
+PROCESSING_VERSION = 1
+
+def document_content_hash(document_data: bytes) -> str:
+    """SHA-256 of the document bytes"""
+    return hashlib.sha256(document_data).hexdigest()
+
+def document_result_key(content_hash: str, document_type: str, perform_ocr: bool,
+                        check_fraud: bool) -> str:
+    """Key of a processing result: content hash plus every option that changes the output"""
+    options = json.dumps({
+        'version': PROCESSING_VERSION,
+        'document_type': document_type.lower(),
+        'perform_ocr': bool(perform_ocr),
+        'check_fraud': bool(check_fraud)
+    }, sort_keys=True, separators=(',', ':'))
+    return f"{content_hash}:{hashlib.sha256(options.encode('utf-8')).hexdigest()[:16]}"
+
+def deduplication_summary(total: int, deduplicated: int) -> Dict[str, Any]:
+    """Dedup statistics reported in bulk import summaries"""
+    return {
+        'documents': total,
+        'deduplicated': deduplicated,
+        'processed': total - deduplicated,
+        'dedup_rate': round(deduplicated / total, 4) if total else 0.0
+    }
+
+
+class DocumentResultStore:
+    """Stores serialized DocumentAnalysis results keyed by content and options
+
+    The SQLite backend (default) is shared by web and job worker processes on
+    a host; lookups of the same key within a process are single-flighted so
+    concurrent duplicates wait for the first one instead of reprocessing.
+    """
+
+    def __init__(self, backend: Optional[str] = None, ttl: Optional[int] = None,
+                 max_entries: Optional[int] = None, max_bytes: Optional[int] = None,
+                 path: Optional[str] = None):
+        self.backend = (backend or os.getenv('DOCUMENT_RESULT_STORE', 'sqlite')).lower()
+        self.ttl = ttl or int(os.getenv('DOCUMENT_RESULT_TTL', 30 * 86400))
+        max_entries = max_entries or int(os.getenv('DOCUMENT_RESULT_MAX_ENTRIES', 50000))
+        max_bytes = max_bytes or int(os.getenv('DOCUMENT_RESULT_MAX_BYTES', 512 * 1024 * 1024))
+
+        self._store = None
+        if self.backend == 'sqlite':
+            path = path or os.getenv('DOCUMENT_RESULT_PATH', DEFAULT_STORE_PATH)
+            try:
+                self._store = SQLiteCacheStore(path, max_entries, max_bytes, table='document_results')
+            except sqlite3.Error as e:
+                logger.warning(f"Document result store unavailable ({str(e)}); using memory store")
+                self.backend = 'memory'
+        if self.backend == 'memory':
+            self._store = QueryCache(max_entries=max_entries, max_bytes=max_bytes,
+                                     default_ttl=self.ttl, shards=4)
+        elif self._store is None:
+            self.backend = 'off'
+
+        self._inflight_lock = threading.Lock()
+        self._inflight: Dict[str, list] = {}
+
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'errors': 0,
+            'saved_seconds': 0.0
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self._store is not None
+
+    def _incr(self, counter: str, amount=1):
+        with self._stats_lock:
+            self._stats[counter] += amount
+
+    @contextmanager
+    def single_flight(self, key: str):
+        """Serialize processing of one key within this process"""
+        with self._inflight_lock:
+            entry = self._inflight.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._inflight_lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    self._inflight.pop(key, None)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a stored analysis dict, crediting the processing time it saved"""
+        if not self.enabled:
+            return None
+        try:
+            entry = self._store.get(key)
+        except sqlite3.Error as e:
+            self._incr('errors')
+            logger.warning(f"Document result store read failed: {str(e)}")
+            return None
+
+        if entry is None:
+            self._incr('misses')
+            return None
+
+        with self._stats_lock:
+            self._stats['hits'] += 1
+            self._stats['saved_seconds'] += entry.get('processing_metadata', {}).get('processing_time_seconds', 0.0)
+        return entry
+
+    def set(self, key: str, analysis: Dict[str, Any]):
+        """Store a serialized analysis"""
+        if not self.enabled:
+            return
+        try:
+            if self.backend == 'sqlite':
+                self._store.set(key, analysis, self.ttl)
+            else:
+                self._store.set(key, analysis, ttl=self.ttl)
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            self._incr('errors')
+            logger.warning(f"Document result store write failed: {str(e)}")
+            return
+        self._incr('stores')
+
+    def clear(self):
+        """Remove every stored result"""
+        if self.enabled:
+            self._store.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit rate and processing time saved"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+
+        lookups = stats['hits'] + stats['misses']
+        stats.update({
+            'backend': self.backend,
+            'entries': len(self._store) if self.enabled else 0,
+            'hit_rate': round(stats['hits'] / lookups, 4) if lookups else 0.0,
+            'saved_seconds': round(stats['saved_seconds'], 3)
+        })
+        return stats
+
+
+_result_store: Optional[DocumentResultStore] = None
+_result_store_lock = threading.Lock()
+
+def get_document_result_store() -> DocumentResultStore:
+    """Get the process-wide document result store"""
+    global _result_store
+    with _result_store_lock:
+        if _result_store is None:
+            _result_store = DocumentResultStore()
+        return _result_store
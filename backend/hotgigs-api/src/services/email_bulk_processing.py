@@ -6,19 +6,17 @@ import os
 import io
 import json
 import logging
-import email
 import imaplib
-import smtplib
 import base64
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Iterable, Optional, Tuple
 from datetime import datetime, timezone
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
 from email import encoders
 import zipfile
-import pandas as pd
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from contextlib import contextmanager
 import threading
 import time
 
@@ -35,8 +33,68 @@ except ImportError:
     logging.warning("Google Drive integration not available. Install google-api-python-client to enable.")
 
 from src.services.document_processing import document_processor
+from src.services.document_results import deduplication_summary
+from src.services.imap_ingestion import UIDCheckpointStore, ResumeMailboxScan
+from src.services.smtp_pool import SMTPConnectionPool, EmailTemplate, SECURITY_NONE
+from src.services.candidate_export import iter_candidate_rows, write_export_file
 from src.services.workflow_automation import task_manager, TaskPriority
 
+# Templates for candidate and bulk job notifications, rendered with str.format fields
+EMAIL_TEMPLATES = {
+    'candidate_welcome': {
+        'subject': 'Welcome to HotGigs.ai - Your Application Received',
+        'body': '''Dear {candidate_name},
+
+Thank you for your interest in opportunities through HotGigs.ai. We have successfully received and processed your resume.
+
+Your profile has been added to our candidate database and will be considered for relevant positions that match your skills and experience.
+
+Key details from your profile:
+- Skills: {skills}
+- Experience: {experience_years} years
+- Location: {location}
+
+We will notify you when suitable opportunities become available.
+
+Best regards,
+HotGigs.ai Team'''
+    },
+    'application_confirmation': {
+        'subject': 'Application Confirmation - {job_title}',
+        'body': '''Dear {candidate_name},
+
+This confirms that your application for the position of {job_title} at {company_name} has been successfully submitted.
+
+Application Details:
+- Position: {job_title}
+- Company: {company_name}
+- Application Date: {application_date}
+- Application ID: {application_id}
+
+The hiring team will review your application and contact you if your qualifications match their requirements.
+
+Best regards,
+HotGigs.ai Team'''
+    },
+    'bulk_processing_complete': {
+        'subject': 'Bulk Processing Complete - {processed_count} Resumes',
+        'body': '''Dear User,
+
+Your bulk resume processing job has been completed successfully.
+
+Processing Summary:
+- Total Files Processed: {total_files}
+- Successful Extractions: {successful_count}
+- Candidates Added: {candidates_added}
+- Processing Time: {processing_time}
+
+You can now review the extracted candidate data in your dashboard.
+
+Best regards,
+HotGigs.ai Team'''
+    }
+}
+
 class EmailService:
     """Email service for resume ingestion and communication"""
     
@@ -48,6 +106,17 @@ class EmailService:
         self.email_address = os.getenv('EMAIL_ADDRESS')
         self.email_password = os.getenv('EMAIL_PASSWORD')
         self.supported_attachments = ['.pdf', '.doc', '.docx', '.txt']
+        self.checkpoints = UIDCheckpointStore()
+        
+        # Idle IMAP sessions reused across scans
+        self._imap_lock = threading.Lock()
+        self._idle_imap: List[Tuple[Tuple[str, int, str], imaplib.IMAP4_SSL]] = []
+        self.max_idle_imap = int(os.getenv('IMAP_MAX_IDLE_CONNECTIONS', 2))
+        
+        # Persistent SMTP sessions, rebuilt when the SMTP settings change
+        self._smtp_lock = threading.Lock()
+        self._smtp_pool: Optional[SMTPConnectionPool] = None
+        self._smtp_pool_key: Optional[Tuple[str, int, str, str]] = None
         
     def connect_imap(self) -> Optional[imaplib.IMAP4_SSL]:
         """Connect to IMAP server"""
@@ -64,101 +133,84 @@ class EmailService:
             logging.error(f"IMAP connection error: {str(e)}")
             return None
     
-    def fetch_resume_emails(self, folder: str = 'INBOX', 
-                           subject_filter: str = 'resume') -> List[Dict[str, Any]]:
-        """Fetch emails with resume attachments"""
+    def _imap_key(self) -> Tuple[str, int, str]:
+        return (self.imap_server, self.imap_port, self.email_address or '')
+    
+    def _acquire_imap(self) -> Optional[imaplib.IMAP4_SSL]:
+        """Reuse an idle session for the current account, or log in again"""
+        key = self._imap_key()
+        while True:
+            with self._imap_lock:
+                idle = next((entry for entry in self._idle_imap if entry[0] == key), None)
+                if idle:
+                    self._idle_imap.remove(idle)
+            if idle is None:
+                return self.connect_imap()
+            
+            try:
+                if idle[1].noop()[0] == 'OK':
+                    return idle[1]
+            except Exception:
+                pass
+            self._logout_quietly(idle[1])
+    
+    def _release_imap(self, mail: imaplib.IMAP4_SSL, reusable: bool = True):
+        with self._imap_lock:
+            if reusable and len(self._idle_imap) < self.max_idle_imap:
+                self._idle_imap.append((self._imap_key(), mail))
+                return
+        self._logout_quietly(mail)
+    
+    @staticmethod
+    def _logout_quietly(mail: imaplib.IMAP4_SSL):
         try:
-            mail = self.connect_imap()
-            if not mail:
-                return []
-            
-            mail.select(folder)
-            
-            # Search for emails with subject containing filter
-            search_criteria = f'(SUBJECT "{subject_filter}")'
-            status, messages = mail.search(None, search_criteria)
-            
-            if status != 'OK':
-                logging.error("Failed to search emails")
-                return []
-            
-            email_ids = messages[0].split()
-            resume_emails = []
-            
-            for email_id in email_ids[-50:]:  # Process last 50 emails
-                try:
-                    status, msg_data = mail.fetch(email_id, '(RFC822)')
-                    if status != 'OK':
-                        continue
-                    
-                    email_body = msg_data[0][1]
-                    email_message = email.message_from_bytes(email_body)
-                    
-                    # Extract email metadata
-                    email_info = {
-                        'email_id': email_id.decode(),
-                        'subject': email_message['Subject'],
-                        'from': email_message['From'],
-                        'date': email_message['Date'],
-                        'attachments': [],
-                        'body': ''
-                    }
-                    
-                    # Extract body text
-                    if email_message.is_multipart():
-                        for part in email_message.walk():
-                            if part.get_content_type() == "text/plain":
-                                email_info['body'] = part.get_payload(decode=True).decode('utf-8', errors='ignore')
-                                break
-                    else:
-                        email_info['body'] = email_message.get_payload(decode=True).decode('utf-8', errors='ignore')
-                    
-                    # Extract attachments
-                    attachments = self._extract_attachments(email_message)
-                    email_info['attachments'] = attachments
-                    
-                    if attachments:  # Only include emails with attachments
-                        resume_emails.append(email_info)
-                
-                except Exception as e:
-                    logging.error(f"Error processing email {email_id}: {str(e)}")
-                    continue
-            
-            mail.close()
             mail.logout()
-            
+        except Exception:
+            pass
+    
+    @contextmanager
+    def resume_email_scan(self, folder: str = 'INBOX', subject_filter: str = 'resume',
+                          max_emails: Optional[int] = None):
+        """
+        Open an incremental scan of emails with resume attachments newer than the
+        folder's checkpoint. Iterate the scan to stream emails; call commit() on it
+        once they have been processed to advance the checkpoint.
+        """
+        mail = self._acquire_imap()
+        if not mail:
+            raise ConnectionError("IMAP connection unavailable")
+        
+        reusable = False
+        try:
+            yield ResumeMailboxScan(
+                mail,
+                self.checkpoints,
+                f"{self.email_address}@{self.imap_server}",
+                folder,
+                subject_filter,
+                self.supported_attachments,
+                max_emails=max_emails
+            )
+            reusable = True
+        finally:
+            self._release_imap(mail, reusable)
+    
+    def fetch_resume_emails(self, folder: str = 'INBOX', 
+                           subject_filter: str = 'resume',
+                           max_emails: Optional[int] = None,
+                           commit: bool = False) -> List[Dict[str, Any]]:
+        """Fetch emails with resume attachments received since the last committed run"""
+        try:
+            with self.resume_email_scan(folder, subject_filter, max_emails) as scan:
+                resume_emails = list(scan)
+                if commit:
+                    scan.commit()
             return resume_emails
             
         except Exception as e:
             logging.error(f"Error fetching resume emails: {str(e)}")
             return []
     
-    def _extract_attachments(self, email_message) -> List[Dict[str, Any]]:
-        """Extract attachments from email message"""
-        attachments = []
-        
-        try:
-            for part in email_message.walk():
-                if part.get_content_disposition() == 'attachment':
-                    filename = part.get_filename()
-                    if filename:
-                        # Check if it's a supported file type
-                        file_ext = os.path.splitext(filename)[1].lower()
-                        if file_ext in self.supported_attachments:
-                            attachment_data = part.get_payload(decode=True)
-                            
-                            attachments.append({
-                                'filename': filename,
-                                'file_extension': file_ext,
-                                'size_bytes': len(attachment_data),
-                                'data': base64.b64encode(attachment_data).decode('utf-8')
-                            })
-        
-        except Exception as e:
-            logging.error(f"Error extracting attachments: {str(e)}")
-        
-        return attachments
-    
     def process_resume_email(self, email_info: Dict[str, Any]) -> Dict[str, Any]:
         """Process a single resume email"""
         try:
@@ -197,7 +249,9 @@ class EmailService:
                         'text_content': analysis.text_content[:500] + '...' if len(analysis.text_content) > 500 else analysis.text_content,
                         'confidence_score': analysis.confidence_score,
                         'fraud_indicators': analysis.fraud_indicators,
-                        'domain_expertise': analysis.extracted_data.get('domain_expertise', [])
+                        'domain_expertise': analysis.extracted_data.get('domain_expertise', []),
+                        'content_hash': analysis.processing_metadata.get('content_hash'),
+                        'deduplicated': analysis.processing_metadata.get('deduplicated', False)
                     })
                 
                 except Exception as e:
@@ -224,46 +278,128 @@ class EmailService:
         except:
             return ''
     
+    def get_smtp_pool(self) -> SMTPConnectionPool:
+        """Get the SMTP session pool for the current server and account"""
+        key = (self.smtp_server, self.smtp_port, self.email_address or '', self.email_password or '')
+        with self._smtp_lock:
+            if self._smtp_pool is None or self._smtp_pool_key != key:
+                if self._smtp_pool is not None:
+                    self._smtp_pool.close()
+                self._smtp_pool = SMTPConnectionPool(
+                    self.smtp_server,
+                    self.smtp_port,
+                    username=self.email_address,
+                    password=self.email_password
+                )
+                self._smtp_pool_key = key
+            return self._smtp_pool
+    
+    def _smtp_configured(self) -> bool:
+        if not self.email_address:
+            return False
+        # A local debugging server accepts mail without a login
+        return bool(self.email_password) or self.get_smtp_pool().security == SECURITY_NONE
+    
+    @staticmethod
+    def _build_attachment_parts(attachments: Optional[List[Dict[str, Any]]]) -> List[MIMEBase]:
+        parts = []
+        for attachment in attachments or []:
+            part = MIMEBase('application', 'octet-stream')
+            part.set_payload(attachment['data'])
+            encoders.encode_base64(part)
+            part.add_header(
+                'Content-Disposition',
+                f'attachment; filename= {attachment["filename"]}'
+            )
+            parts.append(part)
+        return parts
+    
+    def _build_message(self, to_email: str, subject: str, body: str,
+                       attachment_parts: List[MIMEBase]) -> MIMEMultipart:
+        msg = MIMEMultipart()
+        msg['From'] = self.email_address
+        msg['To'] = to_email
+        msg['Subject'] = subject
+        
+        msg.attach(MIMEText(body, 'plain'))
+        for part in attachment_parts:
+            msg.attach(part)
+        return msg
+    
     def send_email(self, to_email: str, subject: str, body: str, 
                    attachments: Optional[List[Dict[str, Any]]] = None) -> bool:
-        """Send email with optional attachments"""
+        """Send email with optional attachments over a pooled SMTP session"""
         try:
-            if not self.email_address or not self.email_password:
+            if not self._smtp_configured():
                 logging.error("Email credentials not configured")
                 return False
             
-            msg = MIMEMultipart()
-            msg['From'] = self.email_address
-            msg['To'] = to_email
-            msg['Subject'] = subject
-            
-            msg.attach(MIMEText(body, 'plain'))
-            
-            # Add attachments if provided
-            if attachments:
-                for attachment in attachments:
-                    part = MIMEBase('application', 'octet-stream')
-                    part.set_payload(attachment['data'])
-                    encoders.encode_base64(part)
-                    part.add_header(
-                        'Content-Disposition',
-                        f'attachment; filename= {attachment["filename"]}'
-                    )
-                    msg.attach(part)
-            
-            # Send email
-            server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-            server.starttls()
-            server.login(self.email_address, self.email_password)
-            text = msg.as_string()
-            server.sendmail(self.email_address, to_email, text)
-            server.quit()
-            
-            return True
+            msg = self._build_message(to_email, subject, body, self._build_attachment_parts(attachments))
+            return self.get_smtp_pool().send(msg)
             
         except Exception as e:
             logging.error(f"Error sending email: {str(e)}")
             return False
+    
+    def send_many(self, recipients: List[Dict[str, Any]], template_name: Optional[str] = None,
+                  subject: Optional[str] = None, body: Optional[str] = None,
+                  attachments: Optional[List[Dict[str, Any]]] = None,
+                  workers: Optional[int] = None, progress=None,
+                  progress_every: int = 100) -> Dict[str, Any]:
+        """
+        Send one personalised email per recipient. Each recipient dict holds
+        'to_email' plus the template fields; subject and body default to the
+        named template in EMAIL_TEMPLATES. Templates are parsed and attachments
+        encoded once, and messages are built lazily while being streamed over
+        reused SMTP sessions. `progress` is called with the number of
+        recipients handed to the pool every `progress_every` recipients.
+        """
+        try:
+            if not self._smtp_configured():
+                return {'success': False, 'error': 'Email credentials not configured'}
+            
+            template = EMAIL_TEMPLATES.get(template_name, {}) if template_name else {}
+            if template_name and not template:
+                return {'success': False, 'error': f"Unknown email template: {template_name}"}
+            
+            subject_template = EmailTemplate(subject or template.get('subject', ''))
+            body_template = EmailTemplate(body or template.get('body', ''))
+            attachment_parts = self._build_attachment_parts(attachments)
+            skipped = []
+            
+            def messages():
+                for processed, recipient in enumerate(recipients):
+                    if progress and processed and processed % progress_every == 0:
+                        progress(processed)
+                    to_email = (recipient.get('to_email') or '').strip()
+                    if not to_email:
+                        skipped.append({'recipient': recipient, 'error': 'Missing to_email'})
+                        continue
+                    yield self._build_message(
+                        to_email,
+                        subject_template.render(recipient),
+                        body_template.render(recipient),
+                        attachment_parts
+                    )
+            
+            result = self.get_smtp_pool().send_many(messages(), workers=workers)
+            result.update({
+                'success': result['failed'] == 0 and not skipped,
+                'template': template_name,
+                'recipients': len(recipients),
+                'skipped': skipped
+            })
+            return result
+            
+        except Exception as e:
+            logging.error(f"Error sending bulk email: {str(e)}")
+            return {'success': False, 'error': str(e)}
+    
+    def get_smtp_stats(self) -> Dict[str, Any]:
+        """Get SMTP connection reuse and throughput metrics"""
+        with self._smtp_lock:
+            pool = self._smtp_pool
+        return pool.get_stats() if pool else {'connections_opened': 0, 'messages_sent': 0}
 
 class GoogleDriveService:
     """Google Drive integration for bulk resume import"""
@@ -440,64 +576,66 @@ class BulkProcessingService:
         self.max_concurrent_jobs = 10
         
     def process_email_resumes(self, folder: str = 'INBOX', 
-                             subject_filter: str = 'resume') -> Dict[str, Any]:
-        """Process resumes from email"""
+                             subject_filter: str = 'resume',
+                             max_emails: Optional[int] = None) -> Dict[str, Any]:
+        """Process resumes from email received since the last run"""
         try:
-            # Fetch resume emails
-            resume_emails = self.email_service.fetch_resume_emails(folder, subject_filter)
+            results = []
+            scan_error = None
+            
+            with self.email_service.resume_email_scan(folder, subject_filter, max_emails) as scan:
+                # Emails stream from the mailbox into the pool as they are fetched,
+                # with a bounded number waiting so memory stays flat
+                with ThreadPoolExecutor(max_workers=self.max_concurrent_jobs) as executor:
+                    in_flight = {}
+                    try:
+                        for email_info in scan:
+                            future = executor.submit(self.email_service.process_resume_email, email_info)
+                            in_flight[future] = email_info
+                            if len(in_flight) >= self.max_concurrent_jobs * 2:
+                                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                                for future in done:
+                                    self._collect_email_result(future, in_flight.pop(future), results)
+                    except Exception as e:
+                        # Keep what was already fetched; the checkpoint stops before the failure
+                        logging.error(f"Email scan interrupted: {str(e)}")
+                        scan_error = str(e)
+                    
+                    for future in as_completed(list(in_flight)):
+                        self._collect_email_result(future, in_flight.pop(future), results)
+                
+                scan.commit()
+                scan_stats = dict(scan.stats, last_uid=scan.last_uid)
             
-            if not resume_emails:
+            if not results and not scan_error:
                 return {
                     'success': True,
-                    'message': 'No resume emails found',
+                    'message': 'No new resume emails found',
                     'processed_count': 0,
+                    'scan': scan_stats,
                     'results': []
                 }
             
-            # Process emails in parallel
-            results = []
-            with ThreadPoolExecutor(max_workers=self.max_concurrent_jobs) as executor:
-                future_to_email = {
-                    executor.submit(self.email_service.process_resume_email, email_info): email_info
-                    for email_info in resume_emails
-                }
-                
-                for future in as_completed(future_to_email):
-                    email_info = future_to_email[future]
-                    try:
-                        result = future.result()
-                        results.append(result)
-                        
-                        # Create task for manual review if needed
-                        if result['errors']:
-                            task_manager.create_task(
-                                title=f"Review email processing errors",
-                                description=f"Email {result['email_id']} had processing errors: {', '.join(result['errors'])}",
-                                task_type="review",
-                                priority=TaskPriority.MEDIUM,
-                                created_by="bulk_processing"
-                            )
-                    
-                    except Exception as e:
-                        logging.error(f"Error processing email: {str(e)}")
-                        results.append({
-                            'email_id': email_info.get('email_id', 'unknown'),
-                            'processed_attachments': [],
-                            'errors': [str(e)],
-                            'candidate_data': {}
-                        })
-            
             # Calculate statistics
             successful_count = len([r for r in results if not r['errors']])
             total_attachments = sum(len(r['processed_attachments']) for r in results)
+            deduplicated_count = sum(
+                1 for r in results for attachment in r['processed_attachments'] if attachment.get('deduplicated')
+            )
             
-            return {
+            response = {
                 'success': True,
                 'processed_count': len(results),
                 'successful_count': successful_count,
                 'total_attachments': total_attachments,
+                'deduplication': deduplication_summary(total_attachments, deduplicated_count),
+                'scan': scan_stats,
                 'results': results
             }
+            if scan_error:
+                response['partial'] = True
+                response['scan_error'] = scan_error
+            return response
             
         except Exception as e:
             logging.error(f"Error processing email resumes: {str(e)}")
@@ -508,6 +646,31 @@ class BulkProcessingService:
                 'results': []
             }
     
+    def _collect_email_result(self, future, email_info: Dict[str, Any], results: List[Dict[str, Any]]):
+        """Record a processed email and open a review task when it had errors"""
+        try:
+            result = future.result()
+            results.append(result)
+            
+            # Create task for manual review if needed
+            if result['errors']:
+                task_manager.create_task(
+                    title=f"Review email processing errors",
+                    description=f"Email {result['email_id']} had processing errors: {', '.join(result['errors'])}",
+                    task_type="review",
+                    priority=TaskPriority.MEDIUM,
+                    created_by="bulk_processing"
+                )
+        
+        except Exception as e:
+            logging.error(f"Error processing email: {str(e)}")
+            results.append({
+                'email_id': email_info.get('email_id', 'unknown'),
+                'processed_attachments': [],
+                'errors': [str(e)],
+                'candidate_data': {}
+            })
+    
     def process_google_drive_resumes(self, folder_id: str, 
                                    max_files: int = 1000) -> Dict[str, Any]:
         """Process resumes from Google Drive folder"""
@@ -548,10 +711,15 @@ class BulkProcessingService:
                 except Exception as e:
                     logging.error(f"Error extracting candidate data: {str(e)}")
             
+            deduplicated_count = sum(
+                1 for file_result in processed_files
+                if file_result['analysis']['processing_metadata'].get('deduplicated')
+            )
+            
             # Create summary task
             task_manager.create_task(
                 title=f"Review Google Drive bulk import",
-                description=f"Processed {len(processed_files)} files from Google Drive, extracted {len(candidates)} candidate profiles",
+                description=f"Processed {len(processed_files)} files from Google Drive ({deduplicated_count} already seen), extracted {len(candidates)} candidate profiles",
                 task_type="review",
                 priority=TaskPriority.HIGH,
                 created_by="bulk_processing"
@@ -561,6 +729,7 @@ class BulkProcessingService:
                 'success': True,
                 'processed_count': len(processed_files),
                 'candidates_extracted': len(candidates),
+                'deduplication': deduplication_summary(len(processed_files), deduplicated_count),
                 'folder_id': folder_id,
                 'results': processed_files,
                 'candidates': candidates
@@ -574,38 +743,17 @@ class BulkProcessingService:
                 'processed_count': 0
             }
     
-    def export_candidates_to_excel(self, candidates: List[Dict[str, Any]], 
-                                  filename: str = None) -> str:
-        """Export candidate data to Excel file"""
+    def export_candidates_to_excel(self, candidates: Iterable[Dict[str, Any]], 
+                                  filename: str = None, export_format: str = 'xlsx') -> str:
+        """Export candidate data to an Excel (or CSV) file and return its path
+        
+        Rows are written as they are read from `candidates`, which may be a
+        generator, so memory does not grow with the number of candidates.
+        Without a filename the file is created in the export directory.
+        """
         try:
-            if not filename:
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                filename = f"candidates_export_{timestamp}.xlsx"
-            
-            # Prepare data for Excel
-            excel_data = []
-            for candidate in candidates:
-                row = {
-                    'Name': candidate.get('name', ''),
-                    'Email': candidate.get('email', ''),
-                    'Phone': candidate.get('phone', ''),
-                    'Location': candidate.get('location', ''),
-                    'Summary': candidate.get('summary', ''),
-                    'Skills': ', '.join(candidate.get('skills', [])),
-                    'Experience_Years': len(candidate.get('work_experience', [])),
-                    'Education': ', '.join([edu.get('degree', '') for edu in candidate.get('education', [])]),
-                    'Domain_Expertise': ', '.join([domain.get('domain', '') for domain in candidate.get('domain_expertise', [])]),
-                    'Source_File': candidate.get('source_file', ''),
-                    'Processing_Confidence': candidate.get('processing_confidence', 0),
-                    'Processed_Date': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                }
-                excel_data.append(row)
-            
-            # Create DataFrame and save to Excel
-            df = pd.DataFrame(excel_data)
-            df.to_excel(filename, index=False)
-            
-            return filename
+            path, _ = write_export_file(iter_candidate_rows(candidates), export_format, path=filename)
+            return path
             
         except Exception as e:
             logging.error(f"Error exporting to Excel: {str(e)}")
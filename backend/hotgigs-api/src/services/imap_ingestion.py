@@ -0,0 +1,478 @@
+"""
+Incremental IMAP Ingestion for HotGigs.ai
+UID checkpoints, batched BODYSTRUCTURE/header prefetch and attachment-only
+body fetches for streaming resume emails out of a mailbox
+"""
+import os
+import re
+import time
+import email
+import base64
+import quopri
+import imaplib
+import sqlite3
+import logging
+import threading
+from email.header import decode_header, make_header
+from email.utils import decode_rfc2231
+from typing import Dict, List, Any, Optional, Iterator, Tuple
+from urllib.parse import unquote
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECKPOINT_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'data', 'email_checkpoints.db'
+)
+
+HEADER_FIELDS = 'SUBJECT FROM DATE MESSAGE-ID'
+BODY_PREVIEW_BYTES = 20000
+_LITERAL_SIZE = re.compile(rb'\{\d+\}$')
+
+
+# IMAP response parsing
+
+def _flatten_fetch_response(data: List[Any]) -> Tuple[bytes, List[bytes]]:
+    """Join imaplib FETCH data into one buffer, replacing literals with markers"""
+    parts = []
+    literals = []
+    for item in data:
+        if isinstance(item, tuple):
+            head, literal = item
+            parts.append(_LITERAL_SIZE.sub(b'', head.rstrip()))
+            parts.append(b'\x00%d\x00' % len(literals))
+            literals.append(literal)
+        elif item:
+            parts.append(item)
+    return b' '.join(parts), literals
+
+def _tokenize(buffer: bytes, literals: List[bytes]) -> Iterator[Any]:
+    """Yield '(' and ')' markers, None for NIL, str atoms and strings, and bytes literals"""
+    i = 0
+    length = len(buffer)
+    while i < length:
+        char = buffer[i:i + 1]
+        if char in (b' ', b'\r', b'\n'):
+            i += 1
+        elif char in (b'(', b')'):
+            yield char.decode()
+            i += 1
+        elif char == b'"':
+            i += 1
+            value = bytearray()
+            while i < length and buffer[i:i + 1] != b'"':
+                if buffer[i:i + 1] == b'\\':
+                    i += 1
+                value += buffer[i:i + 1]
+                i += 1
+            i += 1
+            yield QuotedString(value.decode('utf-8', errors='replace'))
+        elif char == b'\x00':
+            end = buffer.index(b'\x00', i + 1)
+            yield literals[int(buffer[i + 1:end])]
+            i = end + 1
+        else:
+            start = i
+            depth = 0
+            # Atoms such as BODY[HEADER.FIELDS (SUBJECT)] contain spaces and parens inside brackets
+            while i < length:
+                char = buffer[i:i + 1]
+                if char == b'[':
+                    depth += 1
+                elif char == b']':
+                    depth -= 1
+                elif depth == 0 and char in (b' ', b'(', b')', b'"', b'\x00', b'\r', b'\n'):
+                    break
+                i += 1
+            atom = buffer[start:i].decode('utf-8', errors='replace')
+            yield None if atom.upper() == 'NIL' else atom
+
+class QuotedString(str):
+    """A quoted IMAP string, kept distinct from atoms so that "NIL" stays a string"""
+
+def parse_fetch_response(data: List[Any]) -> Dict[str, Dict[str, Any]]:
+    """Parse UID FETCH data into {uid: {item name: value}}"""
+    buffer, literals = _flatten_fetch_response(data)
+    tokens = _tokenize(buffer, literals)
+
+    def parse_list():
+        items = []
+        for token in tokens:
+            if token == '(' and not isinstance(token, QuotedString):
+                items.append(parse_list())
+            elif token == ')' and not isinstance(token, QuotedString):
+                return items
+            else:
+                items.append(token)
+        return items
+
+    messages = {}
+    for token in tokens:
+        # Each message is "<seq> (<name> <value> ...)"
+        if token == '(' and not isinstance(token, QuotedString):
+            fields = parse_list()
+            values = {}
+            for name, value in zip(fields[0::2], fields[1::2]):
+                values[str(name).upper()] = value
+            if 'UID' in values:
+                messages[str(values['UID'])] = values
+    return messages
+
+
+# BODYSTRUCTURE handling
+
+def _pairs(value: Any) -> Dict[str, str]:
+    """IMAP parameter list ("NAME" "value" ...) as a lower-cased dict"""
+    if not isinstance(value, list):
+        return {}
+    return {
+        str(key).lower(): _as_text(item)
+        for key, item in zip(value[0::2], value[1::2])
+        if key is not None
+    }
+
+def _as_text(value: Any) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, bytes):
+        return value.decode('utf-8', errors='replace')
+    return str(value)
+
+def _decode_filename(params: Dict[str, str]) -> Optional[str]:
+    """Filename from disposition or type parameters, decoding RFC 2231 and encoded words"""
+    for key in ('filename*', 'name*'):
+        if params.get(key):
+            charset, _, value = decode_rfc2231(params[key])
+            try:
+                return unquote(value, encoding=charset or 'utf-8', errors='replace')
+            except LookupError:
+                return unquote(value, errors='replace')
+    for key in ('filename', 'name'):
+        if params.get(key):
+            try:
+                return str(make_header(decode_header(params[key])))
+            except Exception:
+                return params[key]
+    return None
+
+def describe_parts(structure: List[Any]) -> List[Dict[str, Any]]:
+    """Flatten a BODYSTRUCTURE into leaf parts with their section numbers"""
+    parts = []
+
+    def walk(node: List[Any], section: str):
+        if node and isinstance(node[0], list):
+            # Trailing list elements after the subtype are extension data, not children
+            children = []
+            for child in node:
+                if not isinstance(child, list):
+                    break
+                children.append(child)
+            for number, child in enumerate(children, start=1):
+                walk(child, f"{section}.{number}" if section else str(number))
+            return
+
+        content_type = _as_text(node[0]).lower()
+        subtype = _as_text(node[1]).lower() if len(node) > 1 else ''
+        params = _pairs(node[2]) if len(node) > 2 else {}
+        encoding = _as_text(node[5]).lower() if len(node) > 5 else '7bit'
+        try:
+            size = int(node[6]) if len(node) > 6 and node[6] is not None else 0
+        except (TypeError, ValueError):
+            size = 0
+
+        if content_type == 'message' and subtype == 'rfc822' and len(node) > 8 and isinstance(node[8], list):
+            # Forwarded messages: their parts are numbered under this section
+            body = node[8]
+            walk(body, section if body and isinstance(body[0], list) else f"{section}.1")
+            return
+
+        if content_type == 'text':
+            disposition_index = 9
+        else:
+            disposition_index = 8
+        disposition = node[disposition_index] if len(node) > disposition_index else None
+        disposition_type = ''
+        disposition_params = {}
+        if isinstance(disposition, list) and disposition:
+            disposition_type = _as_text(disposition[0]).lower()
+            disposition_params = _pairs(disposition[1]) if len(disposition) > 1 else {}
+
+        parts.append({
+            'section': section,
+            'content_type': f"{content_type}/{subtype}",
+            'charset': params.get('charset') or 'utf-8',
+            'encoding': encoding,
+            'size': size,
+            'disposition': disposition_type,
+            'filename': _decode_filename(disposition_params) or _decode_filename(params)
+        })
+
+    if isinstance(structure, list) and structure:
+        walk(structure, '' if isinstance(structure[0], list) else '1')
+    return parts
+
+def decode_part(data: Any, encoding: str, partial: bool = False) -> bytes:
+    """Undo a part's content transfer encoding
+
+    `partial` marks a byte-range preview that may end mid-way through a
+    base64 quantum; the incomplete tail is dropped rather than rejected.
+    """
+    if data is None:
+        return b''
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    if encoding == 'base64':
+        if partial:
+            data = b''.join(data.split())
+            data = data[:len(data) - len(data) % 4]
+        return base64.b64decode(data)
+    if encoding == 'quoted-printable':
+        return quopri.decodestring(data)
+    return data
+
+
+class UIDCheckpointStore:
+    """Last processed UID per mailbox, folder and search, kept across runs and processes
+
+    Checkpoints are tied to the folder's UIDVALIDITY; when the server
+    renumbers a folder the checkpoint is discarded and the folder rescanned.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv('EMAIL_CHECKPOINT_PATH', DEFAULT_CHECKPOINT_PATH)
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS imap_checkpoints (
+                account TEXT NOT NULL,
+                folder TEXT NOT NULL,
+                search TEXT NOT NULL,
+                uidvalidity INTEGER NOT NULL,
+                last_uid INTEGER NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (account, folder, search)
+            )
+        """)
+        conn.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Per-thread connection; sqlite3 connections must not cross threads"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, account: str, folder: str, search: str, uidvalidity: int) -> int:
+        """Last processed UID, or 0 when unknown or the folder was renumbered"""
+        row = self._connect().execute(
+            "SELECT uidvalidity, last_uid FROM imap_checkpoints WHERE account = ? AND folder = ? AND search = ?",
+            (account, folder, search)
+        ).fetchone()
+        if row is None or row[0] != uidvalidity:
+            return 0
+        return row[1]
+
+    def set(self, account: str, folder: str, search: str, uidvalidity: int, last_uid: int):
+        """Advance the checkpoint; it never moves backwards within a UIDVALIDITY"""
+        conn = self._connect()
+        conn.execute(
+            "INSERT INTO imap_checkpoints (account, folder, search, uidvalidity, last_uid, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(account, folder, search) DO UPDATE SET "
+            "last_uid = CASE WHEN uidvalidity = excluded.uidvalidity "
+            "THEN MAX(last_uid, excluded.last_uid) ELSE excluded.last_uid END, "
+            "uidvalidity = excluded.uidvalidity, updated_at = excluded.updated_at",
+            (account, folder, search, uidvalidity, last_uid, time.time())
+        )
+        conn.commit()
+
+    def reset(self, account: str, folder: Optional[str] = None):
+        """Forget checkpoints so the next run rescans"""
+        conn = self._connect()
+        if folder is None:
+            conn.execute("DELETE FROM imap_checkpoints WHERE account = ?", (account,))
+        else:
+            conn.execute("DELETE FROM imap_checkpoints WHERE account = ? AND folder = ?", (account, folder))
+        conn.commit()
+
+
+class ResumeMailboxScan:
+    """One incremental pass over a folder, streaming emails with supported attachments
+
+    Iterating yields email dicts in UID order. Headers and BODYSTRUCTURE are
+    prefetched in batches; only messages with supported attachments have
+    their attachment parts (and a text preview) downloaded. The checkpoint
+    advances only when commit() is called, after the caller has processed
+    what was yielded.
+    """
+
+    def __init__(self, mail, checkpoints: UIDCheckpointStore, account: str, folder: str,
+                 subject_filter: str, supported_extensions: List[str],
+                 max_emails: Optional[int] = None, batch_size: Optional[int] = None):
+        self.mail = mail
+        self.checkpoints = checkpoints
+        self.account = account
+        self.folder = folder
+        self.subject_filter = subject_filter
+        self.supported_extensions = supported_extensions
+        self.max_emails = max_emails
+        self.batch_size = batch_size or int(os.getenv('EMAIL_FETCH_BATCH_SIZE', 100))
+
+        self.uidvalidity: Optional[int] = None
+        self.start_uid = 0
+        self.last_uid = 0
+        self.stats = {
+            'candidates': 0,
+            'scanned': 0,
+            'with_attachments': 0,
+            'failed': 0,
+            'attachment_bytes': 0
+        }
+
+    @property
+    def search_key(self) -> str:
+        return f"SUBJECT {self.subject_filter}"
+
+    def _select(self):
+        status, _ = self.mail.select(self._quote(self.folder), readonly=True)
+        if status != 'OK':
+            raise RuntimeError(f"Cannot select folder {self.folder}")
+
+        _, values = self.mail.response('UIDVALIDITY')
+        if not values or values[0] is None:
+            _, data = self.mail.status(self._quote(self.folder), '(UIDVALIDITY)')
+            match = re.search(rb'UIDVALIDITY (\d+)', data[0] if data else b'')
+            values = [match.group(1)] if match else [b'0']
+        self.uidvalidity = int(values[-1])
+
+    @staticmethod
+    def _quote(value: str) -> str:
+        return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+    def _search(self) -> List[int]:
+        """New matching UIDs, oldest first"""
+        status, data = self.mail.uid(
+            'SEARCH', None, f'UID {self.start_uid + 1}:*', 'SUBJECT', self._quote(self.subject_filter)
+        )
+        if status != 'OK':
+            raise RuntimeError("Failed to search emails")
+
+        # "n:*" always matches the newest message, even when it is older than n
+        uids = sorted(int(uid) for uid in (data[0] or b'').split() if int(uid) > self.start_uid)
+        if self.max_emails:
+            uids = uids[:self.max_emails]
+        return uids
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        self._select()
+        self.start_uid = self.checkpoints.get(self.account, self.folder, self.search_key, self.uidvalidity)
+        self.last_uid = self.start_uid
+
+        uids = self._search()
+        self.stats['candidates'] = len(uids)
+
+        for offset in range(0, len(uids), self.batch_size):
+            batch = uids[offset:offset + self.batch_size]
+            status, data = self.mail.uid(
+                'FETCH', ','.join(str(uid) for uid in batch),
+                f'(UID BODYSTRUCTURE BODY.PEEK[HEADER.FIELDS ({HEADER_FIELDS})])'
+            )
+            if status != 'OK':
+                raise RuntimeError("Failed to fetch message structure")
+
+            messages = parse_fetch_response(data)
+            for uid in batch:
+                message = messages.get(str(uid))
+                try:
+                    email_info = self._build_email(uid, message) if message else None
+                except (imaplib.IMAP4.error, OSError):
+                    # Server or connection trouble: stop before this UID so the next run fetches it
+                    raise
+                except Exception as e:
+                    # A message that cannot be built is skipped, not retried forever
+                    logger.error(f"Skipping message {uid}: {str(e)}")
+                    self.stats['failed'] += 1
+                    email_info = None
+                self.stats['scanned'] += 1
+                # Everything up to this UID has been handed to the caller
+                self.last_uid = uid
+                if email_info is not None:
+                    self.stats['with_attachments'] += 1
+                    yield email_info
+
+    def _build_email(self, uid: int, message: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Download attachment parts of a message that has supported attachments"""
+        parts = describe_parts(message.get('BODYSTRUCTURE') or [])
+        attachment_parts = [
+            part for part in parts
+            if part['disposition'] == 'attachment' and part['filename'] and
+            os.path.splitext(part['filename'])[1].lower() in self.supported_extensions
+        ]
+        if not attachment_parts:
+            return None
+
+        text_part = next((part for part in parts if part['content_type'] == 'text/plain'
+                          and part['disposition'] != 'attachment'), None)
+
+        sections = [f"BODY.PEEK[{part['section']}]" for part in attachment_parts]
+        if text_part:
+            sections.append(f"BODY.PEEK[{text_part['section']}]<0.{BODY_PREVIEW_BYTES}>")
+        status, data = self.mail.uid('FETCH', str(uid), f"({' '.join(sections)})")
+        if status != 'OK':
+            raise imaplib.IMAP4.error(f"Failed to fetch attachments of message {uid}")
+        bodies = parse_fetch_response(data).get(str(uid), {})
+
+        header_value = next((value for key, value in message.items() if key.startswith('BODY[HEADER')), b'')
+        headers = email.message_from_bytes(header_value if isinstance(header_value, bytes)
+                                           else _as_text(header_value).encode('utf-8'))
+
+        attachments = []
+        for part in attachment_parts:
+            try:
+                attachment_data = decode_part(bodies.get(f"BODY[{part['section']}]"), part['encoding'])
+            except Exception as e:
+                logger.error(f"Error decoding attachment {part['filename']} of message {uid}: {str(e)}")
+                continue
+            self.stats['attachment_bytes'] += len(attachment_data)
+            attachments.append({
+                'filename': part['filename'],
+                'file_extension': os.path.splitext(part['filename'])[1].lower(),
+                'size_bytes': len(attachment_data),
+                'data': base64.b64encode(attachment_data).decode('utf-8')
+            })
+        if not attachments:
+            return None
+
+        body = ''
+        if text_part:
+            try:
+                raw = decode_part(bodies.get(f"BODY[{text_part['section']}]<0>"), text_part['encoding'],
+                                  partial=True)
+            except ValueError as e:
+                logger.error(f"Error decoding body preview of message {uid}: {str(e)}")
+                raw = b''
+            try:
+                body = raw.decode(text_part['charset'], errors='ignore')
+            except LookupError:
+                body = raw.decode('utf-8', errors='ignore')
+
+        return {
+            'email_id': str(uid),
+            'uid': uid,
+            'message_id': headers['Message-ID'],
+            'subject': headers['Subject'],
+            'from': headers['From'],
+            'date': headers['Date'],
+            'attachments': attachments,
+            'body': body
+        }
+
+    def commit(self):
+        """Persist the checkpoint up to the last UID handed to the caller"""
+        if self.uidvalidity is not None and self.last_uid > self.start_uid:
+            self.checkpoints.set(self.account, self.folder, self.search_key, self.uidvalidity, self.last_uid)
@@ -0,0 +1,229 @@
+"""
+Interview Session Store for HotGigs.ai
+Durable SQLite storage for live AI interview sessions, shared by every web
+worker on a host so any of them can serve the next turn of an interview
+"""
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Dict, List, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'data', 'interview_sessions.db'
+)
+
+SESSION_COLUMNS = ('id', 'status', 'question_index', 'response_count', 'questions', 'attributes', 'result',
+                   'created_at', 'updated_at', 'expires_at')
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, default=str, separators=(',', ':'))
+
+
+class InterviewSessionStore:
+    """Interview sessions as a compact state row plus an append-only response log
+
+    The session row holds the cursor (status, question index, response
+    count) and small attributes; questions are written once when the session
+    is created. Each answer appends one response row and advances the cursor
+    in the same transaction, guarded on the expected question index, so a
+    turn costs the same regardless of transcript length and a duplicate
+    submission from another worker is rejected rather than recorded twice.
+
+    Sessions expire `ttl_seconds` after their last turn; finished sessions
+    are kept for `retention_seconds`. Expired sessions are invisible at once
+    and deleted by a periodic purge.
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl_seconds: Optional[int] = None,
+                 retention_seconds: Optional[int] = None):
+        self.path = path or os.getenv('INTERVIEW_SESSION_DB_PATH', DEFAULT_STORE_PATH)
+        self.ttl_seconds = ttl_seconds or int(os.getenv('INTERVIEW_SESSION_TTL_SECONDS', 86400))
+        self.retention_seconds = retention_seconds or int(os.getenv('INTERVIEW_SESSION_RETENTION_SECONDS', 7 * 86400))
+        self.purge_interval = int(os.getenv('INTERVIEW_SESSION_PURGE_INTERVAL', 3600))
+        self._next_purge = 0.0
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._connect().executescript("""
+            CREATE TABLE IF NOT EXISTS interview_sessions (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                question_index INTEGER NOT NULL DEFAULT 0,
+                response_count INTEGER NOT NULL DEFAULT 0,
+                questions TEXT NOT NULL,
+                attributes TEXT NOT NULL,
+                result TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS interview_responses (
+                session_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (session_id, seq)
+            );
+            CREATE INDEX IF NOT EXISTS idx_interview_sessions_expiry ON interview_sessions(expires_at);
+        """)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Per-thread connection; sqlite3 connections must not cross threads or forks"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _expiry(self, now: float, finished: bool) -> float:
+        return now + (self.retention_seconds if finished else self.ttl_seconds)
+
+    def create(self, session_id: str, questions: List[Any], attributes: Dict[str, Any], status: str,
+               responses: Optional[List[Dict[str, Any]]] = None):
+        """Create or replace a session, optionally seeded with earlier responses"""
+        now = time.time()
+        responses = responses or []
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM interview_responses WHERE session_id = ?", (session_id,))
+            conn.execute(
+                f"INSERT OR REPLACE INTO interview_sessions ({', '.join(SESSION_COLUMNS)}) "
+                "VALUES (?, ?, ?, ?, ?, ?, NULL, ?, ?, ?)",
+                (session_id, status, len(responses), len(responses), _dumps(questions), _dumps(attributes),
+                 now, now, self._expiry(now, False))
+            )
+            conn.executemany(
+                "INSERT INTO interview_responses (session_id, seq, payload, created_at) VALUES (?, ?, ?, ?)",
+                [(session_id, seq, _dumps(response), now) for seq, response in enumerate(responses)]
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        if now >= self._next_purge:
+            self._next_purge = now + self.purge_interval
+            try:
+                purged = self.purge_expired()
+                if purged:
+                    logger.info(f"Purged {purged} expired interview sessions")
+            except Exception as e:
+                logger.error(f"Interview session purge failed: {str(e)}")
+
+    def get(self, session_id: str, with_responses: bool = False) -> Optional[Dict[str, Any]]:
+        """Session state, plus its response log when asked for; None once expired"""
+        conn = self._connect()
+        row = conn.execute(
+            f"SELECT {', '.join(SESSION_COLUMNS)} FROM interview_sessions WHERE id = ? AND expires_at > ?",
+            (session_id, time.time())
+        ).fetchone()
+        if row is None:
+            return None
+
+        session = dict(zip(SESSION_COLUMNS, row))
+        for field in ('questions', 'attributes', 'result'):
+            if session[field] is not None:
+                session[field] = json.loads(session[field])
+        if with_responses:
+            session['responses'] = self.list_responses(session_id)
+        return session
+
+    def list_responses(self, session_id: str) -> List[Dict[str, Any]]:
+        rows = self._connect().execute(
+            "SELECT payload FROM interview_responses WHERE session_id = ? ORDER BY seq", (session_id,)
+        ).fetchall()
+        return [json.loads(payload) for payload, in rows]
+
+    def append_response(self, session_id: str, question_index: int, response: Dict[str, Any],
+                        expected_status: str, status: Optional[str] = None, finished: bool = False) -> bool:
+        """
+        Record the answer to `question_index` and advance the session past it.
+        Returns False when the session has moved on, changed status or expired.
+        """
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = conn.execute(
+                "UPDATE interview_sessions SET question_index = question_index + 1, "
+                "response_count = response_count + 1, status = COALESCE(?, status), updated_at = ?, "
+                "expires_at = ? WHERE id = ? AND question_index = ? AND status = ? AND expires_at > ?",
+                (status, now, self._expiry(now, finished), session_id, question_index, expected_status, now)
+            )
+            if cursor.rowcount == 0:
+                conn.execute("ROLLBACK")
+                return False
+            conn.execute(
+                "INSERT INTO interview_responses (session_id, seq, payload, created_at) VALUES (?, ?, ?, ?)",
+                (session_id, question_index, _dumps(response), now)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return True
+
+    def update(self, session_id: str, status: Optional[str] = None, attributes: Optional[Dict[str, Any]] = None,
+               result: Optional[Any] = None, expected_status: Optional[str] = None, finished: bool = False) -> bool:
+        """Change status, merge attributes or set the result without touching the response log"""
+        now = time.time()
+        query = (
+            "UPDATE interview_sessions SET status = COALESCE(?, status), "
+            "attributes = json_patch(attributes, ?), result = COALESCE(?, result), updated_at = ?, "
+            "expires_at = ? WHERE id = ? AND expires_at > ?"
+        )
+        params = [status, _dumps(attributes or {}), _dumps(result) if result is not None else None, now,
+                  self._expiry(now, finished), session_id, now]
+        if expected_status is not None:
+            query += " AND status = ?"
+            params.append(expected_status)
+        return self._connect().execute(query, tuple(params)).rowcount > 0
+
+    def purge_expired(self) -> int:
+        """Delete expired sessions and their response logs"""
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "DELETE FROM interview_responses WHERE session_id IN "
+                "(SELECT id FROM interview_sessions WHERE expires_at <= ?)", (now,)
+            )
+            purged = conn.execute("DELETE FROM interview_sessions WHERE expires_at <= ?", (now,)).rowcount
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return purged
+
+    def get_stats(self) -> Dict[str, Any]:
+        conn = self._connect()
+        sessions = dict(conn.execute(
+            "SELECT status, COUNT(*) FROM interview_sessions WHERE expires_at > ? GROUP BY status", (time.time(),)
+        ).fetchall())
+        return {
+            'sessions': sessions,
+            'responses': conn.execute("SELECT COUNT(*) FROM interview_responses").fetchone()[0]
+        }
+
+
+_interview_sessions: Optional[InterviewSessionStore] = None
+_interview_sessions_lock = threading.Lock()
+
+def get_interview_session_store() -> InterviewSessionStore:
+    """Get the process-wide interview session store"""
+    global _interview_sessions
+    with _interview_sessions_lock:
+        if _interview_sessions is None:
+            _interview_sessions = InterviewSessionStore()
+        return _interview_sessions
@@ -0,0 +1,168 @@
+"""
+Keyword Matcher for HotGigs.ai
+Single-pass multi-keyword matching over resumes and job text using one regex
+compiled from a trie of every dictionary keyword
+"""
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Iterable, Optional, Set
+
+# Domain expertise evidence used by ResumeParser
+DOMAIN_KEYWORDS = {
+    'automobile': ['automotive', 'car', 'vehicle', 'ford', 'gm', 'toyota', 'honda', 'bmw'],
+    'ecommerce': ['amazon', 'ebay', 'shopify', 'ecommerce', 'online retail', 'marketplace'],
+    'government': ['government', 'federal', 'state', 'municipal', 'public sector', 'dod'],
+    'defense': ['defense', 'military', 'army', 'navy', 'air force', 'pentagon', 'lockheed'],
+    'healthcare': ['hospital', 'medical', 'healthcare', 'pharma', 'clinic', 'patient'],
+    'banking': ['bank', 'financial', 'credit', 'loan', 'mortgage', 'jpmorgan', 'wells fargo'],
+    'finance': ['investment', 'trading', 'portfolio', 'hedge fund', 'private equity', 'goldman'],
+    'technology': ['software', 'tech', 'programming', 'development', 'google', 'microsoft'],
+    'consulting': ['consulting', 'advisory', 'mckinsey', 'deloitte', 'accenture', 'pwc']
+}
+
+# Technical skills compared between resumes and job requirements
+TECH_KEYWORDS = [
+    'python', 'javascript', 'java', 'react', 'node', 'sql', 'aws', 'docker',
+    'kubernetes', 'git', 'agile', 'scrum', 'api', 'database', 'frontend',
+    'backend', 'fullstack', 'devops', 'machine learning', 'ai', 'data'
+]
+
+# Words signalling that a resume section is present
+SECTION_KEYWORDS = {
+    'contact_info': ['email', 'phone', '@'],
+    'experience': ['experience', 'work', 'employment'],
+    'education': ['education', 'degree', 'university', 'college'],
+    'skills': ['skills', 'technologies', 'programming']
+}
+
+DOMAIN_CATEGORY = 'domain:'
+SECTION_CATEGORY = 'section:'
+TECH_CATEGORY = 'tech'
+
+@dataclass
+class KeywordHit:
+    """One keyword occurrence"""
+    keyword: str
+    start: int
+    end: int
+
+@dataclass
+class KeywordScan:
+    """All keyword hits in a text with per-keyword counts"""
+    hits: List[KeywordHit] = field(default_factory=list)
+    counts: Dict[str, int] = field(default_factory=dict)
+    categories: Dict[str, List[str]] = field(default_factory=dict)
+
+    def keywords(self, category: str) -> List[str]:
+        """Distinct keywords of a category in order of first occurrence"""
+        return list(self.categories.get(category, []))
+
+    def has_any(self, category: str) -> bool:
+        return bool(self.categories.get(category))
+
+
+class _TrieNode:
+    __slots__ = ('children', 'terminal')
+
+    def __init__(self):
+        self.children: Dict[str, '_TrieNode'] = {}
+        self.terminal = False
+
+
+class KeywordMatcher:
+    """Matches every keyword of a set of dictionaries in one scan of the text
+
+    Keywords are compiled into a single regex factored as a trie, so the cost
+    per text position depends on keyword length rather than dictionary size.
+    Matching is case-insensitive, respects word boundaries at alphanumeric
+    keyword edges (allowing a plural 's'), lets spaces match any whitespace
+    and prefers the longest keyword at each position.
+    """
+
+    def __init__(self, dictionaries: Dict[str, Iterable[str]]):
+        self.keyword_categories: Dict[str, Set[str]] = {}
+        for category, keywords in dictionaries.items():
+            for keyword in keywords:
+                normalized = self.normalize(keyword)
+                if normalized:
+                    self.keyword_categories.setdefault(normalized, set()).add(category)
+
+        self.pattern = re.compile(self._build_pattern(self.keyword_categories), re.IGNORECASE)
+
+    @staticmethod
+    def normalize(keyword: str) -> str:
+        return ' '.join(keyword.lower().split())
+
+    @classmethod
+    def _build_pattern(cls, keywords: Iterable[str]) -> str:
+        root = _TrieNode()
+        for keyword in keywords:
+            node = root
+            for char in keyword:
+                node = node.children.setdefault(char, _TrieNode())
+            node.terminal = True
+
+        if not root.children:
+            # Matches nothing
+            return r'(?!)'
+
+        alternatives = []
+        for char, child in sorted(root.children.items()):
+            prefix = r'(?<!\w)' if char.isalnum() else ''
+            alternatives.append(prefix + cls._char_pattern(char) + cls._node_pattern(child, char))
+        return '|'.join(alternatives)
+
+    @classmethod
+    def _node_pattern(cls, node: _TrieNode, last_char: str) -> str:
+        alternatives = [
+            cls._char_pattern(char) + cls._node_pattern(child, char)
+            for char, child in sorted(node.children.items())
+        ]
+        if node.terminal:
+            # Listed last so longer keywords sharing this prefix are tried first
+            alternatives.append(r's?(?!\w)' if last_char.isalnum() else '')
+
+        if len(alternatives) == 1:
+            return alternatives[0]
+        return '(?:' + '|'.join(alternatives) + ')'
+
+    @staticmethod
+    def _char_pattern(char: str) -> str:
+        return r'\s+' if char == ' ' else re.escape(char)
+
+    def scan(self, text: str) -> KeywordScan:
+        """Find every keyword in text in a single pass"""
+        result = KeywordScan()
+        if not text:
+            return result
+
+        for match in self.pattern.finditer(text):
+            keyword = self.normalize(match.group(0))
+            if keyword not in self.keyword_categories:
+                # Plural form of a keyword
+                keyword = keyword[:-1]
+            result.hits.append(KeywordHit(keyword, match.start(), match.end()))
+            result.counts[keyword] = result.counts.get(keyword, 0) + 1
+
+            if result.counts[keyword] == 1:
+                for category in self.keyword_categories.get(keyword, ()):
+                    result.categories.setdefault(category, []).append(keyword)
+        return result
+
+
+_keyword_matcher: Optional[KeywordMatcher] = None
+_keyword_matcher_lock = threading.Lock()
+
+def get_keyword_matcher() -> KeywordMatcher:
+    """Get the shared matcher over the domain, tech skill and resume section dictionaries"""
+    global _keyword_matcher
+    with _keyword_matcher_lock:
+        if _keyword_matcher is None:
+            dictionaries: Dict[str, Iterable[str]] = {TECH_CATEGORY: TECH_KEYWORDS}
+            for domain, keywords in DOMAIN_KEYWORDS.items():
+                dictionaries[DOMAIN_CATEGORY + domain] = keywords
+            for section, keywords in SECTION_KEYWORDS.items():
+                dictionaries[SECTION_CATEGORY + section] = keywords
+            _keyword_matcher = KeywordMatcher(dictionaries)
+        return _keyword_matcher
@@ -0,0 +1,303 @@
+"""
+OCR Execution Engine for HotGigs.ai
+Bounded process pool running Tesseract with page-level parallelism; each
+worker rasterizes only its own page so peak memory stays flat per document
+"""
+import os
+import time
+import logging
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import CancelledError, ProcessPoolExecutor, TimeoutError as FutureTimeoutError, wait
+from concurrent.futures.process import BrokenProcessPool
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+from PIL import Image, ImageEnhance, ImageFilter
+import pytesseract
+from pdf2image import convert_from_path, pdfinfo_from_path
+
+logger = logging.getLogger(__name__)
+
+OCR_DPI = 300
+PAGE_POLL_INTERVAL = 0.5
+
+def enhance_image_for_ocr(image: Image.Image) -> Image.Image:
+    """Enhance image quality for better OCR results"""
+    try:
+        # Convert to grayscale
+        if image.mode != 'L':
+            image = image.convert('L')
+
+        # Enhance contrast
+        enhancer = ImageEnhance.Contrast(image)
+        image = enhancer.enhance(2.0)
+
+        # Enhance sharpness
+        enhancer = ImageEnhance.Sharpness(image)
+        image = enhancer.enhance(2.0)
+
+        # Apply noise reduction
+        image = image.filter(ImageFilter.MedianFilter(size=3))
+
+        return image
+
+    except Exception as e:
+        logging.error(f"Image enhancement error: {str(e)}")
+        return image
+
+def ocr_image(image: Image.Image, timeout: float = 0) -> Tuple[str, float]:
+    """Single Tesseract pass producing both the text and its mean word confidence"""
+    custom_config = r'--oem 3 --psm 6'
+    # A non-zero timeout kills the tesseract process and raises RuntimeError
+    data = pytesseract.image_to_data(image, config=custom_config, output_type=pytesseract.Output.DICT,
+                                     timeout=timeout)
+
+    # Rebuild the text layout from word boxes: words joined per line,
+    # lines per paragraph, and paragraphs separated by a blank line
+    paragraphs = []
+    lines: Dict[Tuple[int, int, int], List[str]] = {}
+    confidences = []
+    for i, word in enumerate(data['text']):
+        try:
+            conf = float(data['conf'][i])
+        except (TypeError, ValueError):
+            conf = -1.0
+        if conf < 0 or not word or not word.strip():
+            continue
+
+        paragraph_key = (data['block_num'][i], data['par_num'][i])
+        line_key = paragraph_key + (data['line_num'][i],)
+        if line_key not in lines:
+            if not paragraphs or paragraphs[-1][0] != paragraph_key:
+                paragraphs.append((paragraph_key, []))
+            lines[line_key] = []
+            paragraphs[-1][1].append(lines[line_key])
+        lines[line_key].append(word.strip())
+
+        if conf > 0:
+            confidences.append(conf)
+
+    text = '\n\n'.join(
+        '\n'.join(' '.join(words) for words in paragraph_lines)
+        for _, paragraph_lines in paragraphs
+    )
+    avg_confidence = sum(confidences) / len(confidences) if confidences else 0
+
+    return text.strip(), avg_confidence / 100.0
+
+def ocr_pdf_page(pdf_path: str, page_number: int, dpi: int = OCR_DPI,
+                 enhance: bool = True, timeout: Optional[float] = None) -> Tuple[str, float]:
+    """Rasterize a single 1-based PDF page and OCR it; runs inside pool workers"""
+    images = convert_from_path(pdf_path, dpi=dpi, first_page=page_number, last_page=page_number,
+                               timeout=timeout)
+    if not images:
+        return "", 0.0
+
+    image = images[0]
+    if enhance:
+        image = enhance_image_for_ocr(image)
+    return ocr_image(image, timeout or 0)
+
+
+class _PageTask:
+    """A page submitted to a pool, and when the pool handed it to a worker"""
+    __slots__ = ('page', 'future', 'pool', 'started_at', 'attempt')
+
+    def __init__(self, page: int, future, pool: ProcessPoolExecutor, attempt: int):
+        self.page = page
+        self.future = future
+        self.pool = pool
+        self.started_at: Optional[float] = None
+        self.attempt = attempt
+
+
+class OCREngine:
+    """Process pool for Tesseract work shared by all OCR callers in a process
+
+    Pages are submitted as (file, page number) tasks with at most `window`
+    pages in flight per document, so only that many page bitmaps exist at once.
+    Results are reassembled in page order. With OCR_WORKERS=0 pages are
+    processed inline on the calling thread.
+
+    The poppler and tesseract subprocesses of a page are killed after
+    page_timeout. A worker that still fails to return by then cannot be
+    cancelled, so the pool is recycled: its workers are terminated and the
+    document's remaining pages go to a fresh pool. The timeout counts from
+    when the pool dispatches a page to a worker, so pages queued behind
+    other documents are not mistaken for stuck ones. Pages of other
+    documents lost with a recycled pool are resubmitted by their callers.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, window: Optional[int] = None,
+                 page_timeout: Optional[float] = None):
+        workers = max_workers if max_workers is not None else int(os.getenv('OCR_WORKERS', os.cpu_count() or 1))
+        self.max_workers = max(0, workers)
+        self.window = window or int(os.getenv('OCR_PAGE_WINDOW', max(1, self.max_workers) * 2))
+        self.page_timeout = page_timeout or float(os.getenv('OCR_PAGE_TIMEOUT', 120))
+        self.start_method = os.getenv('OCR_START_METHOD', 'spawn')
+
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pid: Optional[int] = None
+
+    def _get_pool(self) -> Optional[ProcessPoolExecutor]:
+        """Create the pool on first use, and again after a fork or a crashed worker"""
+        if self.max_workers == 0:
+            return None
+        with self._lock:
+            if self._pool is None or self._pid != os.getpid():
+                # Spawned workers do not inherit the web worker's threads or sockets
+                context = multiprocessing.get_context(self.start_method)
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+                self._pid = os.getpid()
+            return self._pool
+
+    def _reset_pool(self):
+        with self._lock:
+            pool = self._pool
+            self._pool = None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _recycle_pool(self, pool: ProcessPoolExecutor):
+        """Terminate a pool with a stuck worker; a running task cannot be cancelled any other way"""
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        # Pages of other documents on this pool fail with CancelledError or
+        # BrokenProcessPool; their callers resubmit them to the next pool
+        for process in list((getattr(pool, '_processes', None) or {}).values()):
+            if process.is_alive():
+                process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def ocr_pdf(self, pdf_data: bytes, pages: Optional[List[int]] = None, dpi: int = OCR_DPI,
+                enhance: bool = True) -> List[Tuple[int, str, float]]:
+        """OCR the given 1-based pages (all pages by default) and return results in page order"""
+        # Workers read the document from disk instead of receiving a copy per page
+        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as pdf_file:
+            pdf_file.write(pdf_data)
+            pdf_path = pdf_file.name
+
+        try:
+            if pages is None:
+                page_count = int(pdfinfo_from_path(pdf_path).get('Pages', 0))
+                pages = list(range(1, page_count + 1))
+            results = self._run_pages(pdf_path, sorted(set(pages)), dpi, enhance)
+        finally:
+            os.unlink(pdf_path)
+
+        return [(page, results[page][0], results[page][1]) for page in sorted(results)]
+
+    def _submit(self, pool: ProcessPoolExecutor, pdf_path: str, page: int, dpi: int, enhance: bool,
+                attempt: int = 1) -> _PageTask:
+        future = pool.submit(ocr_pdf_page, pdf_path, page, dpi, enhance, self.page_timeout)
+        return _PageTask(page, future, pool, attempt)
+
+    def _wait_page(self, task: _PageTask, in_flight: Deque[_PageTask]) -> Tuple[str, float]:
+        """
+        Result of a page, allowing page_timeout from when its future started
+        running. A process pool marks a future running when it moves to the
+        workers' call queue, which holds one task more than there are workers,
+        so the count may start a page or two before a worker picks it up.
+        """
+        while True:
+            now = time.monotonic()
+            for pending in (task, *in_flight):
+                if pending.started_at is None and (pending.future.running() or pending.future.done()):
+                    pending.started_at = now
+
+            timeout = PAGE_POLL_INTERVAL
+            if task.started_at is not None:
+                remaining = task.started_at + self.page_timeout - now
+                if remaining <= 0:
+                    raise FutureTimeoutError()
+                timeout = min(timeout, remaining)
+
+            done, _ = wait([task.future], timeout=timeout)
+            if done:
+                return task.future.result()
+
+    def _run_pages(self, pdf_path: str, pages: List[int], dpi: int,
+                   enhance: bool) -> Dict[int, Tuple[str, float]]:
+        """Stream pages through the pool keeping at most `window` in flight"""
+        results: Dict[int, Tuple[str, float]] = {}
+        pool = self._get_pool()
+
+        if pool is None:
+            for page in pages:
+                results[page] = self._run_inline(pdf_path, page, dpi, enhance)
+            return results
+
+        queue = deque(pages)
+        in_flight: Deque[_PageTask] = deque()
+        while queue or in_flight:
+            while queue and len(in_flight) < self.window:
+                in_flight.append(self._submit(pool, pdf_path, queue.popleft(), dpi, enhance))
+
+            task = in_flight.popleft()
+            try:
+                results[task.page] = self._wait_page(task, in_flight)
+            except FutureTimeoutError:
+                logger.error(f"OCR of page {task.page} timed out after {self.page_timeout}s; recycling the pool")
+                results[task.page] = ("", 0.0)
+                self._recycle_pool(task.pool)
+                pool = self._get_pool()
+                in_flight = deque(
+                    self._submit(pool, pdf_path, pending.page, dpi, enhance, pending.attempt)
+                    for pending in in_flight
+                )
+            except (CancelledError, BrokenProcessPool):
+                recycled = task.pool is not self._pool
+                if recycled and task.attempt < 2:
+                    # Another document recycled the pool under this page; retry on the new one
+                    logger.warning(f"OCR pool was recycled while page {task.page} was queued; resubmitting")
+                    pool = self._get_pool()
+                    in_flight.appendleft(task)
+                    in_flight = deque(
+                        pending if pending.pool is pool
+                        else self._submit(pool, pdf_path, pending.page, dpi, enhance, pending.attempt + 1)
+                        for pending in in_flight
+                    )
+                    continue
+
+                # A crashed worker poisons the pool; finish this document inline
+                logger.error("OCR process pool broke; continuing inline")
+                if not recycled:
+                    self._reset_pool()
+                results[task.page] = self._run_inline(pdf_path, task.page, dpi, enhance)
+                for pending in in_flight:
+                    results[pending.page] = self._run_inline(pdf_path, pending.page, dpi, enhance)
+                in_flight.clear()
+                for pending_page in queue:
+                    results[pending_page] = self._run_inline(pdf_path, pending_page, dpi, enhance)
+                queue.clear()
+            except Exception as e:
+                logger.error(f"OCR of page {task.page} failed: {str(e)}")
+                results[task.page] = ("", 0.0)
+
+        return results
+
+    def _run_inline(self, pdf_path: str, page: int, dpi: int, enhance: bool) -> Tuple[str, float]:
+        try:
+            return ocr_pdf_page(pdf_path, page, dpi, enhance, self.page_timeout)
+        except Exception as e:
+            logger.error(f"OCR of page {page} failed: {str(e)}")
+            return "", 0.0
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        self._reset_pool()
+
+
+_ocr_engine: Optional[OCREngine] = None
+_ocr_engine_lock = threading.Lock()
+
+def get_ocr_engine() -> OCREngine:
+    """Get the process-wide OCR engine"""
+    global _ocr_engine
+    with _ocr_engine_lock:
+        if _ocr_engine is None:
+            _ocr_engine = OCREngine()
+        return _ocr_engine
@@ -0,0 +1,319 @@
+"""
+SMTP Connection Pool for HotGigs.ai
+Persistent authenticated SMTP sessions shared by single sends and bulk
+campaigns, so a batch of candidate emails costs a handful of TLS handshakes
+and logins instead of one per message
+"""
+import os
+import ssl
+import time
+import logging
+import smtplib
+import email.errors
+import threading
+from contextlib import contextmanager
+from email.message import Message
+from string import Formatter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Iterable, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SECURITY_STARTTLS = 'starttls'
+SECURITY_SSL = 'ssl'
+SECURITY_NONE = 'none'
+
+# Rejections of a single message, by the server or while preparing a
+# malformed message locally (bad addresses or headers); the session stays usable
+MESSAGE_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError,
+                  smtplib.SMTPNotSupportedError, email.errors.MessageError, ValueError, UnicodeError)
+
+class EmailTemplate:
+    """A str.format style template parsed once and rendered per recipient
+
+    Missing fields render as empty strings instead of raising, so one
+    incomplete candidate record does not abort a campaign.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self._parts: List[Tuple[str, Optional[str], str, Optional[str]]] = list(Formatter().parse(text))
+        self.fields = sorted({field for _, field, _, _ in self._parts if field})
+
+    def render(self, context: Dict[str, Any]) -> str:
+        rendered = []
+        for literal, field, format_spec, conversion in self._parts:
+            rendered.append(literal)
+            if field is None:
+                continue
+            value = context.get(field, '')
+            if value is None:
+                value = ''
+            if conversion == 'r':
+                value = repr(value)
+            elif conversion == 's':
+                value = str(value)
+            try:
+                rendered.append(format(value, format_spec or ''))
+            except (TypeError, ValueError):
+                rendered.append(str(value))
+        return ''.join(rendered)
+
+
+class _SMTPSession:
+    __slots__ = ('smtp', 'messages_sent', 'opened_at', 'last_used')
+
+    def __init__(self, smtp: smtplib.SMTP):
+        self.replace(smtp)
+
+    def replace(self, smtp: smtplib.SMTP):
+        self.smtp = smtp
+        self.messages_sent = 0
+        self.opened_at = time.monotonic()
+        self.last_used = self.opened_at
+
+
+class SMTPConnectionPool:
+    """Bounded pool of logged-in SMTP sessions for one server and account
+
+    Each session is recycled after `max_messages_per_session` messages, since
+    providers cap messages per connection, and idle sessions older than
+    `idle_timeout` are closed rather than reused. Security is STARTTLS by
+    default, implicit TLS for port 465, and SMTP_SECURITY=none with an empty
+    password works against a local debugging server.
+    """
+
+    def __init__(self, host: str, port: int, username: Optional[str] = None,
+                 password: Optional[str] = None, security: Optional[str] = None,
+                 max_connections: Optional[int] = None,
+                 max_messages_per_session: Optional[int] = None,
+                 idle_timeout: Optional[float] = None, timeout: Optional[float] = None):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        default_security = SECURITY_SSL if port == 465 else SECURITY_STARTTLS
+        self.security = (security or os.getenv('SMTP_SECURITY', default_security)).lower()
+        self.max_connections = max(1, max_connections or int(os.getenv('SMTP_POOL_SIZE', 4)))
+        self.max_messages_per_session = max_messages_per_session or int(os.getenv('SMTP_MAX_MESSAGES_PER_SESSION', 100))
+        self.idle_timeout = idle_timeout or float(os.getenv('SMTP_IDLE_TIMEOUT', 60))
+        self.timeout = timeout or float(os.getenv('SMTP_TIMEOUT', 30))
+        self.max_session_failures = int(os.getenv('SMTP_MAX_SESSION_FAILURES', 3))
+
+        self._slots = threading.BoundedSemaphore(self.max_connections)
+        self._idle_lock = threading.Lock()
+        self._idle: List[_SMTPSession] = []
+
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'connections_opened': 0,
+            'connection_errors': 0,
+            'sessions_recycled': 0,
+            'reconnects': 0,
+            'messages_sent': 0,
+            'messages_failed': 0,
+            'send_seconds': 0.0
+        }
+
+    def _incr(self, counter: str, amount=1):
+        with self._stats_lock:
+            self._stats[counter] += amount
+
+    def _connect(self) -> smtplib.SMTP:
+        try:
+            if self.security == SECURITY_SSL:
+                smtp = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout,
+                                        context=ssl.create_default_context())
+            else:
+                smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+                if self.security == SECURITY_STARTTLS:
+                    smtp.starttls(context=ssl.create_default_context())
+            if self.username and self.password:
+                smtp.login(self.username, self.password)
+        except Exception:
+            self._incr('connection_errors')
+            raise
+
+        self._incr('connections_opened')
+        return smtp
+
+    @staticmethod
+    def _close(session: _SMTPSession):
+        try:
+            session.smtp.quit()
+        except Exception:
+            try:
+                session.smtp.close()
+            except Exception:
+                pass
+
+    def _take_idle(self) -> Optional[_SMTPSession]:
+        """Most recently used idle session that is still fresh"""
+        while True:
+            with self._idle_lock:
+                if not self._idle:
+                    return None
+                session = self._idle.pop()
+            if time.monotonic() - session.last_used < self.idle_timeout:
+                return session
+            self._close(session)
+
+    @contextmanager
+    def session(self) -> Iterator[_SMTPSession]:
+        """Borrow a session, blocking while all `max_connections` are in use"""
+        self._slots.acquire()
+        session = None
+        try:
+            session = self._take_idle() or _SMTPSession(self._connect())
+            yield session
+        except Exception:
+            # The session may be mid-transaction or dropped; never reuse it
+            if session is not None:
+                self._close(session)
+                session = None
+            raise
+        finally:
+            if session is not None:
+                self._release(session)
+            self._slots.release()
+
+    def _release(self, session: _SMTPSession):
+        if session.messages_sent >= self.max_messages_per_session:
+            self._incr('sessions_recycled')
+            self._close(session)
+            return
+        session.last_used = time.monotonic()
+        with self._idle_lock:
+            self._idle.append(session)
+
+    def _send_on(self, session: _SMTPSession, message: Message):
+        """Send over a session, reconnecting when the cap was hit or the server dropped it"""
+        if session.messages_sent >= self.max_messages_per_session:
+            self._incr('sessions_recycled')
+            self._close(session)
+            session.replace(self._connect())
+
+        started = time.monotonic()
+        try:
+            session.smtp.send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            self._incr('reconnects')
+            self._close(session)
+            session.replace(self._connect())
+            session.smtp.send_message(message)
+
+        session.messages_sent += 1
+        session.last_used = time.monotonic()
+        with self._stats_lock:
+            self._stats['messages_sent'] += 1
+            self._stats['send_seconds'] += session.last_used - started
+
+    def send(self, message: Message) -> bool:
+        """Send one message over a pooled session"""
+        try:
+            with self.session() as session:
+                try:
+                    self._send_on(session, message)
+                except MESSAGE_ERRORS as e:
+                    # Keep the session; only this message was rejected
+                    self._incr('messages_failed')
+                    logger.error(f"Email to {message.get('To')} rejected: {str(e)}")
+                    return False
+            return True
+        except Exception as e:
+            self._incr('messages_failed')
+            logger.error(f"Error sending email to {message.get('To')}: {str(e)}")
+            return False
+
+    def send_many(self, messages: Iterable[Message], workers: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Stream messages over up to `workers` sessions held for the whole batch.
+        Messages are pulled lazily from the iterable, so a generator that builds
+        them on demand keeps memory flat for large campaigns.
+        """
+        workers = max(1, min(workers or self.max_connections, self.max_connections))
+        source = iter(messages)
+        source_lock = threading.Lock()
+        failures: List[Dict[str, Any]] = []
+        failures_lock = threading.Lock()
+        started = time.monotonic()
+
+        def next_message() -> Optional[Message]:
+            with source_lock:
+                return next(source, None)
+
+        def record_failure(message: Message, error: str):
+            self._incr('messages_failed')
+            with failures_lock:
+                failures.append({'to_email': message.get('To'), 'error': error})
+
+        def worker() -> int:
+            sent = 0
+            session_failures = 0
+            message = next_message()
+            while message is not None and session_failures < self.max_session_failures:
+                try:
+                    with self.session() as session:
+                        while message is not None:
+                            try:
+                                self._send_on(session, message)
+                                sent += 1
+                                session_failures = 0
+                            except MESSAGE_ERRORS as e:
+                                record_failure(message, str(e))
+                            message = next_message()
+                except Exception as e:
+                    # Drop the message the session failed on and retry with a new session
+                    session_failures += 1
+                    logger.error(f"SMTP session error: {str(e)}")
+                    if message is not None:
+                        record_failure(message, str(e))
+                        message = next_message()
+            if message is not None:
+                record_failure(message, 'SMTP server unavailable')
+            return sent
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            sent = sum(executor.map(lambda _: worker(), range(workers)))
+
+        # Every worker gave up on the server; account for what was never attempted
+        for message in source:
+            record_failure(message, 'SMTP server unavailable')
+
+        elapsed = time.monotonic() - started
+        return {
+            'sent': sent,
+            'failed': len(failures),
+            'failures': failures,
+            'elapsed_seconds': round(elapsed, 3),
+            'messages_per_second': round(sent / elapsed, 2) if elapsed > 0 else 0.0,
+            'sessions': workers
+        }
+
+    def close(self):
+        """Close every idle session"""
+        with self._idle_lock:
+            idle, self._idle = self._idle, []
+        for session in idle:
+            self._close(session)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get connection reuse, throughput and failure counters"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        with self._idle_lock:
+            stats['idle_connections'] = len(self._idle)
+
+        attempted = stats['messages_sent'] + stats['messages_failed']
+        stats.update({
+            'server': f"{self.host}:{self.port}",
+            'max_connections': self.max_connections,
+            'max_messages_per_session': self.max_messages_per_session,
+            'messages_per_connection': round(stats['messages_sent'] / stats['connections_opened'], 2)
+                if stats['connections_opened'] else 0.0,
+            'failure_rate': round(stats['messages_failed'] / attempted, 4) if attempted else 0.0,
+            'avg_send_ms': round(stats['send_seconds'] * 1000 / stats['messages_sent'], 2)
+                if stats['messages_sent'] else 0.0,
+            'send_seconds': round(stats['send_seconds'], 3)
+        })
+        return stats
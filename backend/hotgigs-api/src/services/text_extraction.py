@@ -0,0 +1,210 @@
+"""
+Tiered Text Extraction for HotGigs.ai
+Pulls embedded text from PDF text layers, DOCX and plain text documents and
+falls back to OCR only for pages without usable text
+"""
+import io
+import os
+import re
+import codecs
+import shutil
+import logging
+import zipfile
+import subprocess
+from xml.etree import ElementTree
+from typing import Dict, List, Any, Optional, Tuple
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # pypdf is optional; poppler's pdftotext is tried first
+    PdfReader = None
+
+logger = logging.getLogger(__name__)
+
+# Extraction tiers recorded in processing_metadata
+TIER_TEXT_LAYER = 'text_layer'
+TIER_DOCX = 'docx'
+TIER_PLAIN_TEXT = 'plain_text'
+TIER_OCR = 'ocr'
+TIER_MIXED = 'text_layer+ocr'
+TIER_NONE = 'none'
+
+WORD_NAMESPACE = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+IMAGE_SIGNATURES = (
+    b'\x89PNG\r\n\x1a\n',
+    b'\xff\xd8\xff',
+    b'II*\x00',
+    b'MM\x00*',
+    b'BM',
+    b'GIF8'
+)
+
+def detect_document_format(data: bytes) -> str:
+    """Identify the file format from its leading bytes"""
+    head = data[:8]
+    if head.startswith(b'%PDF'):
+        return 'pdf'
+    if head.startswith(b'PK\x03\x04'):
+        try:
+            with zipfile.ZipFile(io.BytesIO(data)) as archive:
+                if 'word/document.xml' in archive.namelist():
+                    return 'docx'
+        except zipfile.BadZipFile:
+            pass
+        return 'unknown'
+    if any(head.startswith(signature) for signature in IMAGE_SIGNATURES):
+        return 'image'
+    try:
+        # The sample may end part-way through a multibyte character
+        codecs.getincrementaldecoder('utf-8')().decode(data[:4096], final=len(data) <= 4096)
+        return 'text'
+    except UnicodeDecodeError:
+        return 'unknown'
+
+def is_usable_text(text: str, min_chars: Optional[int] = None) -> bool:
+    """Whether extracted text is substantial and mostly readable"""
+    min_chars = min_chars or int(os.getenv('TEXT_LAYER_MIN_CHARS', 50))
+    compact = re.sub(r'\s+', '', text or '')
+    if len(compact) < min_chars:
+        return False
+
+    # Broken font encodings show up as (cid:NN) runs or replacement characters
+    if compact.count('(cid:') * 6 > len(compact) * 0.2:
+        return False
+    readable = sum(1 for ch in compact if ch.isalnum() or ch in '.,;:-@()/&+#%\'"')
+    return readable / len(compact) >= 0.7
+
+def extract_pdf_text_layer(pdf_data: bytes) -> Optional[List[str]]:
+    """Embedded text of each PDF page, or None when no extractor is available"""
+    if shutil.which('pdftotext'):
+        try:
+            result = subprocess.run(
+                ['pdftotext', '-layout', '-enc', 'UTF-8', '-', '-'],
+                input=pdf_data,
+                capture_output=True,
+                timeout=60,
+                check=True
+            )
+            # pdftotext ends every page with a form feed
+            pages = result.stdout.decode('utf-8', errors='replace').split('\f')
+            if pages and not pages[-1].strip():
+                pages = pages[:-1]
+            return pages
+        except (subprocess.SubprocessError, OSError) as e:
+            logger.warning(f"pdftotext failed: {str(e)}")
+
+    if PdfReader is not None:
+        try:
+            reader = PdfReader(io.BytesIO(pdf_data))
+            return [page.extract_text() or '' for page in reader.pages]
+        except Exception as e:
+            logger.warning(f"pypdf text extraction failed: {str(e)}")
+
+    return None
+
+def extract_docx_text(docx_data: bytes) -> str:
+    """Paragraph text from a DOCX document body, including tables"""
+    with zipfile.ZipFile(io.BytesIO(docx_data)) as archive:
+        root = ElementTree.fromstring(archive.read('word/document.xml'))
+
+    paragraphs = []
+    for paragraph in root.iter(f'{WORD_NAMESPACE}p'):
+        parts = []
+        for node in paragraph.iter():
+            if node.tag == f'{WORD_NAMESPACE}t' and node.text:
+                parts.append(node.text)
+            elif node.tag == f'{WORD_NAMESPACE}tab':
+                parts.append('\t')
+            elif node.tag in (f'{WORD_NAMESPACE}br', f'{WORD_NAMESPACE}cr'):
+                parts.append('\n')
+        text = ''.join(parts).strip()
+        if text:
+            paragraphs.append(text)
+    return '\n'.join(paragraphs)
+
+def extract_plain_text(data: bytes) -> str:
+    """Decode a plain text document"""
+    for encoding in ('utf-8-sig', 'utf-16'):
+        try:
+            return data.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return data.decode('latin-1')
+
+class TextExtractionService:
+    """Extracts document text through the cheapest tier that yields usable text
+
+    Embedded text (PDF text layer, DOCX XML, plain text) is used whenever it is
+    usable; OCR runs only for images and for PDF pages without a usable text layer.
+    """
+
+    def __init__(self, ocr_service):
+        self.ocr_service = ocr_service
+
+    def extract(self, document_data: bytes, document_type: str = '',
+                enhance: bool = True) -> Tuple[str, float, Dict[str, Any]]:
+        """Return (text, confidence, extraction metadata)"""
+        document_format = detect_document_format(document_data)
+        if document_format == 'unknown' and document_type.lower() == 'pdf':
+            document_format = 'pdf'
+
+        if document_format == 'pdf':
+            return self._extract_pdf(document_data, enhance)
+
+        if document_format == 'docx':
+            text = extract_docx_text(document_data)
+            return text, 1.0 if text else 0.0, {'format': 'docx', 'tier': TIER_DOCX if text else TIER_NONE,
+                                                'ocr_performed': False}
+
+        if document_format == 'text':
+            text = extract_plain_text(document_data).strip()
+            return text, 1.0 if text else 0.0, {'format': 'text', 'tier': TIER_PLAIN_TEXT if text else TIER_NONE,
+                                                'ocr_performed': False}
+
+        text, confidence = self.ocr_service.extract_text_from_image(document_data, enhance)
+        return text, confidence, {'format': document_format, 'tier': TIER_OCR if text else TIER_NONE,
+                                  'ocr_performed': True}
+
+    def _extract_pdf(self, pdf_data: bytes, enhance: bool) -> Tuple[str, float, Dict[str, Any]]:
+        """Use each page's text layer when usable and OCR only the remaining pages"""
+        page_texts = extract_pdf_text_layer(pdf_data)
+        if page_texts is None:
+            # No text layer extractor available; OCR the whole document
+            text, confidence = self.ocr_service.extract_text_from_pdf(pdf_data)
+            return text, confidence, {'format': 'pdf', 'tier': TIER_OCR if text else TIER_NONE,
+                                      'ocr_performed': True}
+
+        ocr_pages = [number for number, text in enumerate(page_texts, start=1) if not is_usable_text(text)]
+        ocr_results = self.ocr_service.extract_text_from_pdf_pages(pdf_data, ocr_pages, enhance) if ocr_pages else {}
+
+        texts = []
+        confidences = []
+        for number, text in enumerate(page_texts, start=1):
+            if ocr_results.get(number, ('', 0.0))[0]:
+                text, confidence = ocr_results[number]
+            else:
+                # Keep whatever the text layer had if OCR found nothing better
+                confidence = 1.0 if text.strip() else 0.0
+            if text.strip():
+                texts.append(text.strip())
+                confidences.append(confidence)
+
+        if not texts:
+            tier = TIER_NONE
+        elif not ocr_pages:
+            tier = TIER_TEXT_LAYER
+        elif len(ocr_pages) == len(page_texts):
+            tier = TIER_OCR
+        else:
+            tier = TIER_MIXED
+
+        metadata = {
+            'format': 'pdf',
+            'tier': tier,
+            'pages': len(page_texts),
+            'ocr_pages': ocr_pages,
+            # The tier reflects where the text came from; OCR may have run and found nothing
+            'ocr_performed': bool(ocr_pages)
+        }
+        confidence = sum(confidences) / len(confidences) if confidences else 0.0
+        return '\n\n'.join(texts), confidence, metadata
@@ -0,0 +1,414 @@
+"""
+Local Vector Index for HotGigs.ai
+Incrementally updatable, memory-mapped sparse vector index shared by all
+worker processes on a host
+"""
+import os
+import json
+import time
+import shutil
+import logging
+import threading
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import HashingVectorizer
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'data', 'vector_index'
+)
+
+
+def create_text_vectorizer(n_features: Optional[int] = None) -> HashingVectorizer:
+    """Stateless text vectorizer producing L2-normalized sparse vectors
+
+    Hashing needs no fitted vocabulary, so every process encodes the same text
+    to the same vector and documents can be added without refitting.
+    """
+    return HashingVectorizer(
+        n_features=n_features or int(os.getenv('VECTOR_INDEX_FEATURES', 2 ** 18)),
+        stop_words='english',
+        ngram_range=(1, 2),
+        alternate_sign=False,
+        norm='l2',
+        dtype=np.float32
+    )
+
+
+class _Segment:
+    """Immutable block of indexed rows backed by memory-mapped arrays"""
+
+    def __init__(self, name: str, seq: int, matrix: sp.csr_matrix,
+                 ids: List[str], payloads: List[Dict[str, Any]]):
+        self.name = name
+        self.seq = seq
+        self.matrix = matrix
+        self.ids = ids
+        self.payloads = payloads
+        self.live = np.ones(len(ids), dtype=bool)
+
+
+class LocalVectorIndex:
+    """Append-only segmented index over sparse, L2-normalized document vectors
+
+    Additions are written as new segments and removals as tombstones in a small
+    manifest, so updates never rewrite or refit the existing corpus. Segment
+    arrays are memory-mapped read-only, letting every worker share one copy in
+    the page cache. Writers serialize on a file lock and readers pick up new
+    manifests on their next query. Segments dropped from the manifest are
+    kept for a grace period, so a reader that loaded the previous manifest
+    can still map them.
+    """
+
+    def __init__(self, name: str, directory: Optional[str] = None,
+                 vectorizer: Optional[HashingVectorizer] = None,
+                 max_segments: Optional[int] = None, retire_grace: Optional[float] = None):
+        self.name = name
+        self.path = os.path.join(directory or os.getenv('VECTOR_INDEX_DIR', DEFAULT_INDEX_DIR), name)
+        self.vectorizer = vectorizer or create_text_vectorizer()
+        self.max_segments = max_segments or int(os.getenv('VECTOR_INDEX_MAX_SEGMENTS', 8))
+        self.retire_grace = retire_grace if retire_grace is not None else float(
+            os.getenv('VECTOR_INDEX_RETIRE_GRACE_SECONDS', 600)
+        )
+
+        self._lock = threading.RLock()
+        self._manifest_stamp: Optional[Tuple[int, int, int]] = None
+        self._manifest: Dict[str, Any] = {'next_seq': 1, 'segments': [], 'deleted': {}}
+        self._segments: List[_Segment] = []
+        self._locator: Dict[str, Tuple[int, int]] = {}
+        self._idf: Optional[np.ndarray] = None
+
+        os.makedirs(self.path, exist_ok=True)
+        self._refresh()
+
+    @property
+    def _manifest_path(self) -> str:
+        return os.path.join(self.path, 'manifest.json')
+
+    @contextmanager
+    def _write_lock(self):
+        """Serialize writers across threads and processes"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(os.path.join(self.path, '.lock'), 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _manifest_version(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = os.stat(self._manifest_path)
+            # The manifest is replaced atomically, so a new inode marks a new version
+            return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            return None
+
+    def _refresh(self, attempts: int = 3):
+        """Reload the manifest and segments if another process changed them"""
+        stamp = self._manifest_version()
+
+        with self._lock:
+            if stamp == self._manifest_stamp:
+                return
+            if stamp is None:
+                manifest = {'next_seq': 1, 'segments': [], 'deleted': {}}
+            else:
+                with open(self._manifest_path) as f:
+                    manifest = json.load(f)
+
+            loaded = {segment.name: segment for segment in self._segments}
+            segments = []
+            try:
+                for entry in manifest['segments']:
+                    segment = loaded.get(entry['name']) or self._load_segment(entry['name'], entry['seq'])
+                    segments.append(segment)
+            except FileNotFoundError:
+                # The manifest was superseded and its segments retired while we read it
+                if attempts <= 1:
+                    raise
+                return self._refresh(attempts - 1)
+
+            self._manifest = manifest
+            self._segments = segments
+            self._manifest_stamp = stamp
+            self._rebuild_locator()
+
+    def _load_segment(self, name: str, seq: int) -> _Segment:
+        """Memory-map a segment's arrays from disk"""
+        seg_dir = os.path.join(self.path, name)
+        data = np.load(os.path.join(seg_dir, 'data.npy'), mmap_mode='r')
+        indices = np.load(os.path.join(seg_dir, 'indices.npy'), mmap_mode='r')
+        indptr = np.load(os.path.join(seg_dir, 'indptr.npy'), mmap_mode='r')
+        with open(os.path.join(seg_dir, 'items.json')) as f:
+            items = json.load(f)
+
+        shape = (len(indptr) - 1, self.vectorizer.n_features)
+        matrix = sp.csr_matrix((data, indices, indptr), shape=shape, copy=False)
+        return _Segment(name, seq, matrix, items['ids'], items['payloads'])
+
+    def _rebuild_locator(self):
+        """Resolve each id to its newest row and mark superseded or deleted rows dead"""
+        locator: Dict[str, Tuple[int, int]] = {}
+        for seg_idx, segment in enumerate(self._segments):
+            segment.live[:] = False
+            for row, item_id in enumerate(segment.ids):
+                locator[item_id] = (seg_idx, row)
+
+        for item_id in self._manifest['deleted']:
+            locator.pop(item_id, None)
+
+        for seg_idx, row in locator.values():
+            self._segments[seg_idx].live[row] = True
+
+        self._locator = locator
+        self._idf = None
+
+    def _write_segment(self, seq: int, matrix: sp.csr_matrix, ids: List[str],
+                       payloads: List[Dict[str, Any]]) -> str:
+        """Persist a new immutable segment and return its name"""
+        name = f"seg-{seq:08d}"
+        tmp_dir = os.path.join(self.path, f".{name}.tmp")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        # Matching index dtypes let scipy wrap the mapped arrays without copying
+        index_dtype = np.int64 if matrix.nnz > np.iinfo(np.int32).max else np.int32
+        np.save(os.path.join(tmp_dir, 'data.npy'), matrix.data.astype(np.float32, copy=False))
+        np.save(os.path.join(tmp_dir, 'indices.npy'), matrix.indices.astype(index_dtype, copy=False))
+        np.save(os.path.join(tmp_dir, 'indptr.npy'), matrix.indptr.astype(index_dtype, copy=False))
+        with open(os.path.join(tmp_dir, 'items.json'), 'w') as f:
+            json.dump({'ids': ids, 'payloads': payloads}, f, default=str)
+
+        os.replace(tmp_dir, os.path.join(self.path, name))
+        return name
+
+    def _commit_manifest(self, manifest: Dict[str, Any]):
+        """
+        Atomically publish a manifest. Segments it no longer references are
+        retired and deleted only once retired for longer than retire_grace.
+        """
+        now = time.time()
+        referenced = {entry['name'] for entry in manifest['segments']}
+        retired = {name: at for name, at in self._manifest.get('retired', {}).items() if name not in referenced}
+        for entry in os.listdir(self.path):
+            if entry.startswith('seg-') and entry not in referenced:
+                retired.setdefault(entry, now)
+        expired = [name for name, at in retired.items() if now - at >= self.retire_grace]
+        manifest['retired'] = {name: at for name, at in retired.items() if name not in expired}
+
+        tmp_path = self._manifest_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self._manifest_path)
+
+        for name in expired:
+            # No manifest newer than the grace period references it; mappings
+            # already open keep working after unlink
+            shutil.rmtree(os.path.join(self.path, name), ignore_errors=True)
+
+        self._manifest_stamp = None
+        self._refresh()
+
+    def _encode(self, texts: List[str]) -> sp.csr_matrix:
+        """Encode texts into sparse L2-normalized vectors"""
+        matrix = self.vectorizer.transform(texts).tocsr()
+        matrix.sort_indices()
+        return matrix
+
+    def add(self, items: Iterable[Tuple[str, str, Dict[str, Any]]]) -> int:
+        """Add or replace (id, text, payload) items and return how many were written"""
+        ids, texts, payloads = [], [], []
+        seen = {}
+        for item_id, text, payload in items:
+            item_id = str(item_id)
+            if item_id in seen:
+                # Last write wins within a batch
+                texts[seen[item_id]] = text or ''
+                payloads[seen[item_id]] = payload
+                continue
+            seen[item_id] = len(ids)
+            ids.append(item_id)
+            texts.append(text or '')
+            payloads.append(payload)
+
+        if not ids:
+            return 0
+
+        matrix = self._encode(texts)
+        with self._write_lock():
+            self._refresh()
+            manifest = {
+                'next_seq': self._manifest['next_seq'] + 1,
+                'segments': list(self._manifest['segments']),
+                'deleted': {k: v for k, v in self._manifest['deleted'].items() if k not in seen}
+            }
+            seq = self._manifest['next_seq']
+            name = self._write_segment(seq, matrix, ids, payloads)
+            manifest['segments'].append({'name': name, 'seq': seq})
+            self._commit_manifest(manifest)
+
+            if len(self._segments) > self.max_segments:
+                self._compact_locked()
+
+        logger.info(f"Vector index {self.name}: added {len(ids)} items")
+        return len(ids)
+
+    def remove(self, item_ids: Iterable[str]) -> int:
+        """Tombstone items by id and return how many were live"""
+        with self._write_lock():
+            self._refresh()
+            removed = [str(i) for i in item_ids if str(i) in self._locator]
+            if not removed:
+                return 0
+
+            deleted = dict(self._manifest['deleted'])
+            seq = self._manifest['next_seq']
+            for item_id in removed:
+                deleted[item_id] = seq
+            self._commit_manifest({
+                'next_seq': seq + 1,
+                'segments': list(self._manifest['segments']),
+                'deleted': deleted
+            })
+
+            total_rows = sum(len(segment.ids) for segment in self._segments)
+            if total_rows and len(self._locator) < total_rows // 2:
+                self._compact_locked()
+
+        logger.info(f"Vector index {self.name}: removed {len(removed)} items")
+        return len(removed)
+
+    def sync(self, items: Iterable[Tuple[str, str, Dict[str, Any]]]) -> Dict[str, int]:
+        """Make the index match the given items, touching only what changed"""
+        items = [(str(item_id), text or '', payload) for item_id, text, payload in items]
+        self._refresh()
+
+        with self._lock:
+            current = {item_id: self._payload_at(loc) for item_id, loc in self._locator.items()}
+
+        wanted = {item_id for item_id, _, _ in items}
+        changed = [
+            item for item in items
+            if item[0] not in current or current[item[0]] != json.loads(json.dumps(item[2], default=str))
+        ]
+        stale = [item_id for item_id in current if item_id not in wanted]
+
+        added = self.add(changed) if changed else 0
+        removed = self.remove(stale) if stale else 0
+        return {'added': added, 'removed': removed, 'unchanged': len(items) - added}
+
+    def compact(self):
+        """Merge all live rows into a single segment"""
+        with self._write_lock():
+            self._refresh()
+            self._compact_locked()
+
+    def _compact_locked(self):
+        """Compact segments; caller must hold the write lock"""
+        if len(self._segments) <= 1 and not self._manifest['deleted']:
+            return
+
+        matrices, ids, payloads = [], [], []
+        for segment in self._segments:
+            rows = np.flatnonzero(segment.live)
+            if len(rows):
+                matrices.append(segment.matrix[rows])
+                ids.extend(segment.ids[r] for r in rows)
+                payloads.extend(segment.payloads[r] for r in rows)
+
+        seq = self._manifest['next_seq']
+        manifest = {'next_seq': seq + 1, 'segments': [], 'deleted': {}}
+        if ids:
+            matrix = sp.vstack(matrices, format='csr')
+            name = self._write_segment(seq, matrix, ids, payloads)
+            manifest['segments'].append({'name': name, 'seq': seq})
+        self._commit_manifest(manifest)
+        logger.info(f"Vector index {self.name}: compacted to {len(ids)} items")
+
+    def _payload_at(self, location: Tuple[int, int]) -> Dict[str, Any]:
+        seg_idx, row = location
+        return self._segments[seg_idx].payloads[row]
+
+    def _get_idf(self) -> np.ndarray:
+        """Smoothed inverse document frequencies over live rows"""
+        if self._idf is None:
+            df = np.zeros(self.vectorizer.n_features, dtype=np.float64)
+            for segment in self._segments:
+                rows = np.flatnonzero(segment.live)
+                if len(rows):
+                    df += np.bincount(segment.matrix[rows].indices, minlength=len(df))
+            n_docs = len(self._locator)
+            self._idf = (np.log((1.0 + n_docs) / (1.0 + df)) + 1.0).astype(np.float32)
+        return self._idf
+
+    def search(self, text: str, top_k: int = 10, min_score: float = 0.0) -> List[Tuple[Dict[str, Any], float]]:
+        """Return the top_k (payload, score) pairs most similar to the text"""
+        self._refresh()
+
+        with self._lock:
+            segments = list(self._segments)
+            if not self._locator or top_k <= 0:
+                return []
+
+            # IDF weighting is applied on the query side so stored vectors never change
+            query = self._encode([text or ''])
+            if query.nnz == 0:
+                return []
+            query = query.multiply(self._get_idf()).tocsr()
+            norm = np.sqrt(query.multiply(query).sum())
+            if norm == 0:
+                return []
+            query = (query / norm).T.tocsc()
+
+            score_blocks = []
+            for segment in segments:
+                scores = np.asarray((segment.matrix @ query).todense()).ravel()
+                scores[~segment.live] = -np.inf
+                score_blocks.append(scores)
+
+        scores = np.concatenate(score_blocks)
+        k = min(top_k, len(scores))
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        candidates = candidates[np.argsort(-scores[candidates])]
+
+        offsets = np.cumsum([0] + [len(segment.ids) for segment in segments])
+        results = []
+        for position in candidates:
+            score = float(scores[position])
+            if score <= min_score:
+                break
+            seg_idx = int(np.searchsorted(offsets, position, side='right') - 1)
+            results.append((segments[seg_idx].payloads[position - offsets[seg_idx]], score))
+        return results
+
+    def __len__(self) -> int:
+        self._refresh()
+        return len(self._locator)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get index size and segment layout"""
+        self._refresh()
+        with self._lock:
+            return {
+                'name': self.name,
+                'items': len(self._locator),
+                'segments': len(self._segments),
+                'rows': sum(len(segment.ids) for segment in self._segments),
+                'tombstones': len(self._manifest['deleted']),
+                'retired_segments': len(self._manifest.get('retired', {})),
+                'nnz': int(sum(segment.matrix.nnz for segment in self._segments)),
+                'path': self.path
+            }
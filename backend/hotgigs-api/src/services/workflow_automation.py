@@ -3,17 +3,27 @@ Workflow Automation and Task Management Service for HotGigs.ai
 Implements automated workflows, task management, and intelligent automation
 """
 import os
+import sys
 import json
+import uuid
+import signal
+import socket
 import logging
-from typing import Dict, List, Any, Optional, Callable
-from datetime import datetime, timezone, timedelta
+import argparse
+import sqlite3
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, List, Any, Optional, Callable, Tuple
+from datetime import date, datetime, timezone, timedelta
 from dataclasses import dataclass, asdict
 from enum import Enum
 import asyncio
 import threading
 import time
-from concurrent.futures import ThreadPoolExecutor
 import openai
+from src.services.ai.llm_scheduler import get_llm_scheduler
+from src.services.workflow_store import WorkflowStore, get_workflow_store, RUN_TERMINAL_STATUSES
+from src.services.workflow_scheduler import WorkflowScheduler, search_jobs, job_search_query, filter_jobs
 
 # Configure OpenAI
 openai.api_key = os.getenv('OPENAI_API_KEY')
@@ -84,40 +94,72 @@ class Workflow:
     execution_count: int = 0
 
 class TaskManager:
-    """Task management system"""
+    """Task management system backed by the shared workflow store"""
     
-    def __init__(self):
-        self.tasks: Dict[str, Task] = {}
-        self.task_counter = 0
+    def __init__(self, store: Optional[WorkflowStore] = None):
+        self.store = store or get_workflow_store()
+    
+    @staticmethod
+    def _to_timestamp(value: Optional[datetime]) -> Optional[float]:
+        if value is None:
+            return None
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    
+    @staticmethod
+    def _to_datetime(value: Optional[float]) -> Optional[datetime]:
+        return datetime.fromtimestamp(value, timezone.utc) if value is not None else None
+    
+    def _task_from_record(self, record: Dict[str, Any]) -> Task:
+        return Task(
+            id=record['id'],
+            title=record['title'],
+            description=record['description'],
+            task_type=record['task_type'],
+            status=TaskStatus(record['status']),
+            priority=TaskPriority(record['priority']),
+            assigned_to=record['assigned_to'],
+            created_by=record['created_by'],
+            created_at=self._to_datetime(record['created_at']),
+            due_date=self._to_datetime(record['due_date']),
+            completed_at=self._to_datetime(record['completed_at']),
+            metadata=record['metadata'],
+            dependencies=record['dependencies'],
+            progress=record['progress']
+        )
         
     def create_task(self, title: str, description: str, task_type: str, 
                    assigned_to: Optional[str] = None, created_by: str = "system",
                    priority: TaskPriority = TaskPriority.MEDIUM,
                    due_date: Optional[datetime] = None,
                    metadata: Optional[Dict[str, Any]] = None,
-                   dependencies: Optional[List[str]] = None) -> str:
-        """Create a new task"""
+                   dependencies: Optional[List[str]] = None,
+                   idempotency_key: Optional[str] = None) -> str:
+        """Create a new task
+        
+        Calls repeated with the same idempotency_key return the first task's id.
+        """
         try:
-            self.task_counter += 1
-            task_id = f"task_{self.task_counter}_{int(datetime.now().timestamp())}"
-            
-            task = Task(
-                id=task_id,
-                title=title,
-                description=description,
-                task_type=task_type,
-                status=TaskStatus.PENDING,
-                priority=priority,
-                assigned_to=assigned_to,
-                created_by=created_by,
-                created_at=datetime.now(timezone.utc),
-                due_date=due_date,
-                completed_at=None,
-                metadata=metadata or {},
-                dependencies=dependencies or []
-            )
-            
-            self.tasks[task_id] = task
+            task_id = f"task_{uuid.uuid4().hex[:12]}_{int(datetime.now().timestamp())}"
+            
+            task_id = self.store.insert_task({
+                'id': task_id,
+                'title': title,
+                'description': description,
+                'task_type': task_type,
+                'status': TaskStatus.PENDING.value,
+                'priority': priority.value,
+                'assigned_to': str(assigned_to) if assigned_to is not None else None,
+                'created_by': str(created_by) if created_by is not None else None,
+                'created_at': time.time(),
+                'due_date': self._to_timestamp(due_date),
+                'completed_at': None,
+                'metadata': metadata or {},
+                'dependencies': dependencies or [],
+                'progress': 0.0,
+                'idempotency_key': idempotency_key
+            })
             logging.info(f"Created task {task_id}: {title}")
             
             return task_id
@@ -130,18 +172,17 @@ class TaskManager:
                           progress: Optional[float] = None) -> bool:
         """Update task status and progress"""
         try:
-            if task_id not in self.tasks:
-                return False
-            
-            task = self.tasks[task_id]
-            task.status = status
+            fields = {'status': status.value}
             
             if progress is not None:
-                task.progress = max(0.0, min(100.0, progress))
+                fields['progress'] = max(0.0, min(100.0, progress))
             
             if status == TaskStatus.COMPLETED:
-                task.completed_at = datetime.now(timezone.utc)
-                task.progress = 100.0
+                fields['completed_at'] = time.time()
+                fields['progress'] = 100.0
+            
+            if not self.store.update_task(task_id, fields):
+                return False
             
             logging.info(f"Updated task {task_id} status to {status.value}")
             return True
@@ -150,187 +191,469 @@ class TaskManager:
             logging.error(f"Error updating task status: {str(e)}")
             return False
     
+    def update_task(self, task_id: str, priority: Optional[TaskPriority] = None,
+                    **fields) -> bool:
+        """Update a task's priority and/or assignee (pass assigned_to=None to unassign)"""
+        try:
+            updates = {}
+            if priority is not None:
+                updates['priority'] = priority.value
+            if 'assigned_to' in fields:
+                assigned_to = fields['assigned_to']
+                updates['assigned_to'] = str(assigned_to) if assigned_to is not None else None
+            return self.store.update_task(task_id, updates)
+            
+        except Exception as e:
+            logging.error(f"Error updating task: {str(e)}")
+            return False
+    
     def get_task(self, task_id: str) -> Optional[Task]:
         """Get task by ID"""
-        return self.tasks.get(task_id)
+        record = self.store.get_task(task_id)
+        return self._task_from_record(record) if record else None
     
-    def get_tasks_by_assignee(self, assignee: str) -> List[Task]:
-        """Get tasks assigned to a specific user"""
-        return [task for task in self.tasks.values() if task.assigned_to == assignee]
+    def get_tasks_by_assignee(self, assignee: str, status: Optional[TaskStatus] = None) -> List[Task]:
+        """Get tasks assigned to a specific user, optionally in one status"""
+        if status is None:
+            records = self.store.find_tasks("assigned_to = ?", (str(assignee),))
+        else:
+            records = self.store.find_tasks("assigned_to = ? AND status = ?", (str(assignee), status.value))
+        return [self._task_from_record(record) for record in records]
     
     def get_tasks_by_status(self, status: TaskStatus) -> List[Task]:
         """Get tasks by status"""
-        return [task for task in self.tasks.values() if task.status == status]
+        return [self._task_from_record(record)
+                for record in self.store.find_tasks("status = ?", (status.value,))]
     
     def get_overdue_tasks(self) -> List[Task]:
-        """Get overdue tasks"""
-        now = datetime.now(timezone.utc)
-        return [
-            task for task in self.tasks.values()
-            if task.due_date and task.due_date < now and task.status != TaskStatus.COMPLETED
-        ]
+        """Get overdue tasks, most overdue first"""
+        return [self._task_from_record(record) for record in self.store.find_overdue_tasks(time.time())]
+    
+    def get_task_counts(self, assignee: Optional[str] = None) -> Dict[str, int]:
+        """Get task counts per status for one assignee, or across all tasks"""
+        counts = self.store.task_counts(assignee)
+        return {status.value: counts.get(status.value, 0) for status in TaskStatus}
+    
+    def count_tasks(self, status: TaskStatus) -> int:
+        return self.store.task_counts().get(status.value, 0)
+    
+    def count_tasks_created_on(self, assignee: str, day: date) -> int:
+        """Count tasks assigned to a user that were created on a UTC day"""
+        return self.store.tasks_created_on(assignee, day.isoformat())
+    
+    def count_overdue_tasks(self) -> int:
+        return self.store.count_overdue_tasks(time.time())
+
+# Condition operators; a clause with an unknown operator only requires the key
+CONDITION_OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    'equals': lambda actual, value: actual == value,
+    'greater_than': lambda actual, value: actual > value,
+    'less_than': lambda actual, value: actual < value,
+    'contains': lambda actual, value: value in str(actual)
+}
+
+def compile_conditions(conditions: Dict[str, Any]) -> Callable[[Dict[str, Any]], bool]:
+    """Compile a step's condition dict into a predicate over the run context"""
+    clauses: List[Tuple[str, Callable[[Any, Any], bool], Any]] = []
+    for key, expected_value in conditions.items():
+        if isinstance(expected_value, dict):
+            operator = expected_value.get('operator', 'equals')
+            test = CONDITION_OPERATORS.get(operator, lambda actual, value: True)
+            clauses.append((key, test, expected_value.get('value')))
+        else:
+            clauses.append((key, CONDITION_OPERATORS['equals'], expected_value))
+    
+    if not clauses:
+        return lambda context: True
+    
+    def predicate(context: Dict[str, Any]) -> bool:
+        try:
+            for key, test, value in clauses:
+                if key not in context or not test(context[key], value):
+                    return False
+            return True
+        except Exception as e:
+            logging.error(f"Error checking step conditions: {str(e)}")
+            return False
+    
+    return predicate
+
+@dataclass(frozen=True)
+class CompiledStep:
+    """A workflow step with its condition predicate and successor indexes"""
+    index: int
+    step: WorkflowStep
+    predicate: Callable[[Dict[str, Any]], bool]
+    next_steps: Tuple[int, ...]
+    failure_steps: Tuple[int, ...]
+
+class WorkflowPlan:
+    """A workflow compiled into an indexed step graph
+    
+    Step ids resolve to positions once, successor lists become index tuples
+    and conditions become predicates, so executing a run does no lookups or
+    condition parsing per transition. References to unknown steps are dropped
+    at compile time.
+    """
+    
+    def __init__(self, workflow: Workflow):
+        self.workflow_id = workflow.id
+        self.index = {step.id: i for i, step in enumerate(workflow.steps)}
+        
+        def resolve(step: WorkflowStep, step_ids: List[str]) -> Tuple[int, ...]:
+            resolved = []
+            for step_id in step_ids:
+                if step_id in self.index:
+                    resolved.append(self.index[step_id])
+                else:
+                    logging.warning(f"Workflow {workflow.id} step {step.id} references unknown step {step_id}")
+            return tuple(resolved)
+        
+        self.steps: Tuple[CompiledStep, ...] = tuple(
+            CompiledStep(
+                index=i,
+                step=step,
+                predicate=compile_conditions(step.conditions),
+                next_steps=resolve(step, step.next_steps),
+                failure_steps=resolve(step, step.failure_steps)
+            )
+            for i, step in enumerate(workflow.steps)
+        )
+        self.entry: Optional[CompiledStep] = self.steps[0] if self.steps else None
+    
+    def get(self, step_id: str) -> Optional[CompiledStep]:
+        i = self.index.get(step_id)
+        return self.steps[i] if i is not None else None
+
+def _renew_run_lease(store: WorkflowStore, run_id: str, worker_id: str, stop_event: threading.Event):
+    """Heartbeat a run's lease while its step activations execute"""
+    interval = max(store.lease_seconds / 3, 1)
+    while not stop_event.wait(interval):
+        try:
+            if not store.heartbeat_run(run_id, worker_id):
+                logging.warning(f"Workflow run {run_id} lease lost")
+                return
+        except sqlite3.Error as e:
+            logging.error(f"Workflow run lease renewal failed: {str(e)}")
 
 class WorkflowEngine:
-    """Workflow automation engine"""
+    """Workflow automation engine
+    
+    Workflows and their runs live in the shared workflow store, so a run
+    started by one web worker is executed by whichever process's worker pool
+    claims it first. Every step is checkpointed and the lease is heartbeated
+    while steps run, however long they take; a run whose worker dies is
+    resumed from its last checkpoint once the lease expires.
     
-    def __init__(self, task_manager: TaskManager):
-        self.workflows: Dict[str, Workflow] = {}
+    Each step a completed step activates is queued as its own activation, and
+    up to `step_concurrency` ready activations of a run execute at once, so
+    independent branches (a notification next to a task, several AI calls)
+    overlap instead of waiting on each other.
+    """
+    
+    def __init__(self, task_manager: TaskManager, store: Optional[WorkflowStore] = None):
         self.task_manager = task_manager
-        self.workflow_counter = 0
-        self.executor = ThreadPoolExecutor(max_workers=5)
-        self.running = False
+        self.store = store or task_manager.store
+        self.max_steps_per_run = int(os.getenv('WORKFLOW_MAX_STEPS', 1000))
+        self.step_concurrency = max(1, int(os.getenv('WORKFLOW_STEP_CONCURRENCY', 4)))
+        self.plan_cache_size = int(os.getenv('WORKFLOW_PLAN_CACHE_SIZE', 256))
+        self._plans: 'OrderedDict[str, WorkflowPlan]' = OrderedDict()
+        self._plans_lock = threading.Lock()
+        self._step_stats: Dict[str, Dict[str, float]] = {}
+        self._step_stats_lock = threading.Lock()
+        self.workers = WorkflowWorkerPool(self)
+        self.scheduler = WorkflowScheduler(self)
+    
+    def _workflow_from_record(self, record: Dict[str, Any]) -> Workflow:
+        return Workflow(
+            id=record['id'],
+            name=record['name'],
+            description=record['description'],
+            trigger_type=record['trigger_type'],
+            trigger_conditions=record['trigger_conditions'],
+            steps=[WorkflowStep(**step) for step in record['steps']],
+            status=WorkflowStatus(record['status']),
+            created_by=record['created_by'],
+            created_at=TaskManager._to_datetime(record['created_at']),
+            last_executed=TaskManager._to_datetime(record['last_executed']),
+            execution_count=record['execution_count']
+        )
         
     def create_workflow(self, name: str, description: str, trigger_type: str,
                        trigger_conditions: Dict[str, Any], steps: List[WorkflowStep],
                        created_by: str = "system") -> str:
         """Create a new workflow"""
         try:
-            self.workflow_counter += 1
-            workflow_id = f"workflow_{self.workflow_counter}_{int(datetime.now().timestamp())}"
-            
-            workflow = Workflow(
-                id=workflow_id,
-                name=name,
-                description=description,
-                trigger_type=trigger_type,
-                trigger_conditions=trigger_conditions,
-                steps=steps,
-                status=WorkflowStatus.ACTIVE,
-                created_by=created_by,
-                created_at=datetime.now(timezone.utc),
-                last_executed=None
-            )
-            
-            self.workflows[workflow_id] = workflow
+            workflow_id = f"workflow_{uuid.uuid4().hex[:12]}_{int(datetime.now().timestamp())}"
+            
+            record = {
+                'id': workflow_id,
+                'name': name,
+                'description': description,
+                'trigger_type': trigger_type,
+                'trigger_conditions': trigger_conditions,
+                'steps': [asdict(step) for step in steps],
+                'status': WorkflowStatus.ACTIVE.value,
+                'created_by': str(created_by) if created_by is not None else None,
+                'created_at': time.time(),
+                'last_executed': None,
+                'execution_count': 0
+            }
+            self.store.insert_workflow(record)
             logging.info(f"Created workflow {workflow_id}: {name}")
             
+            if trigger_type == 'scheduled':
+                self.scheduler.register(record)
+                self.workers.ensure_started()
+            
             return workflow_id
             
         except Exception as e:
             logging.error(f"Error creating workflow: {str(e)}")
             raise
     
-    def execute_workflow(self, workflow_id: str, context: Dict[str, Any]) -> bool:
-        """Execute a workflow"""
+    def get_workflow(self, workflow_id: str) -> Optional[Workflow]:
+        """Get workflow by ID"""
+        record = self.store.get_workflow(workflow_id)
+        return self._workflow_from_record(record) if record else None
+    
+    def list_workflows(self, created_by: Optional[str] = None) -> List[Workflow]:
+        """Get all workflows, or those created by one user"""
+        return [self._workflow_from_record(record) for record in self.store.list_workflows(created_by)]
+    
+    def count_workflows(self, status: Optional[WorkflowStatus] = None, created_by: Optional[str] = None,
+                        executed_since: Optional[datetime] = None) -> int:
+        return self.store.count_workflows(status.value if status else None, created_by,
+                                          TaskManager._to_timestamp(executed_since))
+    
+    def execute_workflow(self, workflow_id: str, context: Dict[str, Any]) -> Optional[str]:
+        """Queue a run of a workflow and return its run id"""
         try:
-            if workflow_id not in self.workflows:
+            workflow = self.get_workflow(workflow_id)
+            if workflow is None:
                 logging.error(f"Workflow {workflow_id} not found")
-                return False
-            
-            workflow = self.workflows[workflow_id]
+                return None
             
             if workflow.status != WorkflowStatus.ACTIVE:
                 logging.warning(f"Workflow {workflow_id} is not active")
-                return False
-            
-            # Execute workflow in background
-            self.executor.submit(self._execute_workflow_steps, workflow, context)
+                return None
+            
+            # Execution state checkpointed after every step; each activation
+            # carries the seq its idempotency key is derived from
+            state = {
+                'pending': [{'seq': 1, 'step_id': workflow.steps[0].id}] if workflow.steps else [],
+                'context': context,
+                'seq': 1 if workflow.steps else 0,
+                'log': []
+            }
+            run_id = self.store.create_run(workflow_id, state)
             
-            # Update execution metadata
-            workflow.last_executed = datetime.now(timezone.utc)
-            workflow.execution_count += 1
+            self.workers.ensure_started()
+            self.workers.wake()
             
-            return True
+            return run_id
             
         except Exception as e:
             logging.error(f"Error executing workflow: {str(e)}")
-            return False
+            return None
+    
+    def get_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """Get a workflow run with its step log and context"""
+        run = self.store.get_run(run_id)
+        if run and run['status'] not in RUN_TERMINAL_STATUSES:
+            # Make sure something in this process will pick up queued or abandoned runs
+            self.workers.ensure_started()
+        return run
     
-    def _execute_workflow_steps(self, workflow: Workflow, context: Dict[str, Any]):
-        """Execute workflow steps sequentially"""
+    def get_plan(self, workflow: Workflow) -> WorkflowPlan:
+        """Get the compiled plan for a workflow, compiling it on first use"""
+        # Workflow steps are immutable once created, so plans are cached by id
+        with self._plans_lock:
+            plan = self._plans.get(workflow.id)
+            if plan is not None:
+                self._plans.move_to_end(workflow.id)
+                return plan
+        
+        plan = WorkflowPlan(workflow)
+        with self._plans_lock:
+            self._plans[workflow.id] = plan
+            while len(self._plans) > self.plan_cache_size:
+                self._plans.popitem(last=False)
+        return plan
+    
+    def execute_run(self, run: Dict[str, Any], worker_id: str):
+        """Execute a claimed run from its checkpoint until it finishes or the lease is lost"""
+        state = run['state']
+        executor = None
+        heartbeat = None
+        heartbeat_stop = threading.Event()
         try:
-            logging.info(f"Starting workflow execution: {workflow.name}")
-            
-            current_steps = [workflow.steps[0]] if workflow.steps else []
-            
-            while current_steps:
-                step = current_steps.pop(0)
-                
-                try:
-                    # Check step conditions
-                    if not self._check_step_conditions(step, context):
-                        logging.info(f"Step {step.name} conditions not met, skipping")
+            workflow = self.get_workflow(run['workflow_id'])
+            if workflow is None:
+                self.store.fail_run(run['id'], worker_id, 'Workflow not found', self.store.max_attempts)
+                return
+            
+            logging.info(f"Starting workflow execution: {workflow.name} ({run['id']})")
+            plan = self.get_plan(workflow)
+            context = state['context']
+            
+            # Checkpoints only renew the lease between steps; a slow AI call must not expire it
+            heartbeat = threading.Thread(
+                target=_renew_run_lease, args=(self.store, run['id'], worker_id, heartbeat_stop),
+                name=f"workflow-lease-{run['id'][:8]}", daemon=True
+            )
+            heartbeat.start()
+            
+            ready = deque()
+            for activation in state['pending']:
+                if isinstance(activation, str):
+                    # Checkpoints written before activations carried their seq
+                    state['seq'] += 1
+                    activation = {'seq': state['seq'], 'step_id': activation}
+                ready.append(activation)
+            
+            executor = ThreadPoolExecutor(max_workers=self.step_concurrency,
+                                          thread_name_prefix=f"workflow-run-{run['id'][:8]}")
+            in_flight: Dict[Any, Dict[str, Any]] = {}
+            
+            while ready or in_flight:
+                while ready and len(in_flight) < self.step_concurrency:
+                    activation = ready.popleft()
+                    compiled = plan.get(activation['step_id'])
+                    if compiled is None:
                         continue
+                    # The key makes replays of this activation after a crash idempotent
+                    step_key = f"{run['id']}:{activation['seq']}"
+                    # Each activation works on a snapshot; its writes are merged back here
+                    in_flight[executor.submit(self._run_step, compiled, dict(context), step_key)] = activation
+                
+                if not in_flight:
+                    continue
+                
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    activation = in_flight.pop(future)
+                    compiled = plan.get(activation['step_id'])
+                    outcome, duration_ms, updates = future.result()
+                    context.update(updates)
                     
-                    # Execute step action
-                    success = self._execute_step_action(step, context)
-                    
-                    if success:
-                        logging.info(f"Step {step.name} completed successfully")
-                        # Add next steps to execution queue
-                        for next_step_id in step.next_steps:
-                            next_step = self._find_step_by_id(workflow, next_step_id)
-                            if next_step:
-                                current_steps.append(next_step)
+                    if outcome == 'completed':
+                        successors = compiled.next_steps
+                    elif outcome == 'failed':
+                        successors = compiled.failure_steps
                     else:
-                        logging.error(f"Step {step.name} failed")
-                        # Add failure steps to execution queue
-                        for failure_step_id in step.failure_steps:
-                            failure_step = self._find_step_by_id(workflow, failure_step_id)
-                            if failure_step:
-                                current_steps.append(failure_step)
+                        successors = ()
+                    for index in successors:
+                        if state['seq'] >= self.max_steps_per_run:
+                            raise RuntimeError(f"Run exceeded {self.max_steps_per_run} steps")
+                        state['seq'] += 1
+                        ready.append({'seq': state['seq'], 'step_id': plan.steps[index].step.id})
+                    
+                    state['log'].append({
+                        'seq': activation['seq'],
+                        'step_id': activation['step_id'],
+                        'outcome': outcome,
+                        'duration_ms': duration_ms
+                    })
                 
-                except Exception as e:
-                    logging.error(f"Error executing step {step.name}: {str(e)}")
-                    continue
+                # In-flight activations stay pending so a takeover replays them
+                state['pending'] = list(in_flight.values()) + list(ready)
+                if not self.store.checkpoint_run(run['id'], worker_id, state):
+                    logging.warning(f"Lost lease on workflow run {run['id']}; stopping")
+                    return
             
-            logging.info(f"Workflow execution completed: {workflow.name}")
+            self.store.complete_run(run['id'], worker_id, state)
+            logging.info(f"Workflow execution completed: {workflow.name} ({run['id']})")
             
         except Exception as e:
             logging.error(f"Error in workflow execution: {str(e)}")
+            self.store.fail_run(run['id'], worker_id, str(e), run['attempts'])
+        
+        finally:
+            heartbeat_stop.set()
+            if heartbeat is not None:
+                heartbeat.join()
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
     
-    def _check_step_conditions(self, step: WorkflowStep, context: Dict[str, Any]) -> bool:
-        """Check if step conditions are met"""
+    def _run_step(self, compiled: CompiledStep, snapshot: Dict[str, Any],
+                  step_key: str) -> Tuple[str, float, Dict[str, Any]]:
+        """Run one step activation; returns its outcome, latency in milliseconds and context writes"""
+        step = compiled.step
+        context = dict(snapshot)
+        started = time.monotonic()
         try:
-            conditions = step.conditions
-            
-            for key, expected_value in conditions.items():
-                if key not in context:
-                    return False
-                
-                actual_value = context[key]
-                
-                # Simple condition checking - can be extended
-                if isinstance(expected_value, dict):
-                    operator = expected_value.get('operator', 'equals')
-                    value = expected_value.get('value')
-                    
-                    if operator == 'equals' and actual_value != value:
-                        return False
-                    elif operator == 'greater_than' and actual_value <= value:
-                        return False
-                    elif operator == 'less_than' and actual_value >= value:
-                        return False
-                    elif operator == 'contains' and value not in str(actual_value):
-                        return False
-                else:
-                    if actual_value != expected_value:
-                        return False
-            
-            return True
-            
+            # Check step conditions
+            if not compiled.predicate(context):
+                logging.info(f"Step {step.name} conditions not met, skipping")
+                outcome = 'skipped'
+            
+            # Execute step action
+            elif self._execute_step_action(step, context, step_key):
+                logging.info(f"Step {step.name} completed successfully")
+                outcome = 'completed'
+            else:
+                logging.error(f"Step {step.name} failed")
+                outcome = 'failed'
+        
         except Exception as e:
-            logging.error(f"Error checking step conditions: {str(e)}")
-            return False
+            logging.error(f"Error executing step {step.name}: {str(e)}")
+            outcome = 'error'
+        
+        duration_ms = round((time.monotonic() - started) * 1000, 2)
+        self._record_step(step.action, outcome, duration_ms)
+        updates = {key: value for key, value in context.items()
+                   if key not in snapshot or snapshot[key] is not value}
+        return outcome, duration_ms, updates
+    
+    def _record_step(self, action: str, outcome: str, duration_ms: float):
+        with self._step_stats_lock:
+            stats = self._step_stats.setdefault(action, {'count': 0, 'failed': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            stats['count'] += 1
+            stats['total_ms'] += duration_ms
+            stats['max_ms'] = max(stats['max_ms'], duration_ms)
+            if outcome in ('failed', 'error'):
+                stats['failed'] += 1
     
-    def _execute_step_action(self, step: WorkflowStep, context: Dict[str, Any]) -> bool:
+    def get_step_stats(self) -> Dict[str, Any]:
+        """Get per-action step counts and latency for runs executed in this process"""
+        with self._step_stats_lock:
+            actions = {
+                action: {
+                    'count': stats['count'],
+                    'failed': stats['failed'],
+                    'avg_ms': round(stats['total_ms'] / stats['count'], 2) if stats['count'] else 0.0,
+                    'max_ms': stats['max_ms']
+                }
+                for action, stats in self._step_stats.items()
+            }
+        with self._plans_lock:
+            cached_plans = len(self._plans)
+        return {
+            'step_concurrency': self.step_concurrency,
+            'cached_plans': cached_plans,
+            'actions': actions
+        }
+    
+    def _execute_step_action(self, step: WorkflowStep, context: Dict[str, Any],
+                             step_key: Optional[str] = None) -> bool:
         """Execute step action"""
         try:
             action = step.action
             parameters = step.parameters
             
             if action == "create_task":
-                return self._action_create_task(parameters, context)
+                return self._action_create_task(parameters, context, step_key)
             elif action == "send_notification":
                 return self._action_send_notification(parameters, context)
             elif action == "update_application_status":
                 return self._action_update_application_status(parameters, context)
             elif action == "auto_apply":
-                return self._action_auto_apply(parameters, context)
+                return self._action_auto_apply(parameters, context, step_key)
             elif action == "screen_candidate":
                 return self._action_screen_candidate(parameters, context)
             elif action == "schedule_interview":
-                return self._action_schedule_interview(parameters, context)
+                return self._action_schedule_interview(parameters, context, step_key)
             elif action == "ai_analysis":
                 return self._action_ai_analysis(parameters, context)
             else:
@@ -341,7 +664,8 @@ class WorkflowEngine:
             logging.error(f"Error executing step action: {str(e)}")
             return False
     
-    def _action_create_task(self, parameters: Dict[str, Any], context: Dict[str, Any]) -> bool:
+    def _action_create_task(self, parameters: Dict[str, Any], context: Dict[str, Any],
+                            step_key: Optional[str] = None) -> bool:
         """Create task action"""
         try:
             title = parameters.get('title', 'Automated Task')
@@ -358,7 +682,8 @@ class WorkflowEngine:
                 description=description,
                 task_type=task_type,
                 assigned_to=assigned_to,
-                created_by="workflow_automation"
+                created_by="workflow_automation",
+                idempotency_key=step_key
             )
             
             context['created_task_id'] = task_id
@@ -405,7 +730,8 @@ class WorkflowEngine:
             logging.error(f"Error in update_application_status action: {str(e)}")
             return False
     
-    def _action_auto_apply(self, parameters: Dict[str, Any], context: Dict[str, Any]) -> bool:
+    def _action_auto_apply(self, parameters: Dict[str, Any], context: Dict[str, Any],
+                           step_key: Optional[str] = None) -> bool:
         """Auto-apply to job action"""
         try:
             candidate_id = context.get('candidate_id') or parameters.get('candidate_id')
@@ -422,7 +748,8 @@ class WorkflowEngine:
                 title=f"Review auto-application for job {job_id}",
                 description=f"Candidate {candidate_id} was automatically applied to job {job_id}",
                 task_type="review",
-                created_by="auto_apply_workflow"
+                created_by="auto_apply_workflow",
+                idempotency_key=step_key
             )
             
             return True
@@ -457,7 +784,8 @@ class WorkflowEngine:
             logging.error(f"Error in screen_candidate action: {str(e)}")
             return False
     
-    def _action_schedule_interview(self, parameters: Dict[str, Any], context: Dict[str, Any]) -> bool:
+    def _action_schedule_interview(self, parameters: Dict[str, Any], context: Dict[str, Any],
+                                   step_key: Optional[str] = None) -> bool:
         """Schedule interview action"""
         try:
             candidate_id = context.get('candidate_id') or parameters.get('candidate_id')
@@ -476,7 +804,8 @@ class WorkflowEngine:
                 description=f"Interview scheduled with candidate {candidate_id}",
                 task_type="interview",
                 assigned_to=interviewer_id,
-                created_by="interview_workflow"
+                created_by="interview_workflow",
+                idempotency_key=step_key
             )
             
             return True
@@ -503,6 +832,13 @@ class WorkflowEngine:
                 # Placeholder for job matching
                 context['match_score'] = 85
                 context['match_reasons'] = ['Skills alignment', 'Experience level match']
+            elif analysis_type == 'job_search':
+                # Scheduled runs arrive with jobs from their shared search batch
+                if 'jobs' not in context:
+                    criteria = parameters.get('criteria', {})
+                    jobs = search_jobs(job_search_query(criteria), self.scheduler.search_limit)
+                    context['jobs'] = filter_jobs(jobs, criteria, self.scheduler.jobs_per_run)
+                context['jobs_found'] = len(context['jobs'])
             
             logging.info(f"Completed AI analysis: {analysis_type}")
             return True
@@ -522,20 +858,88 @@ class WorkflowEngine:
         except Exception as e:
             logging.error(f"Error replacing placeholders: {str(e)}")
             return text
+
+class WorkflowWorkerPool:
+    """Threads that claim and execute workflow runs from the shared store
+    
+    Each process that executes workflows runs its own pool; runs are leased
+    individually, so any number of pools across processes can work the same
+    store. The web app starts a pool in each worker process through
+    start_workflow_workers(); WORKFLOW_WORKERS=0 disables it there when a
+    dedicated worker runs (python -m src.services.workflow_automation).
+    The workflow scheduler runs wherever the pool does.
+    """
+    
+    def __init__(self, engine: 'WorkflowEngine', workers: Optional[int] = None,
+                 poll_interval: Optional[float] = None):
+        self.engine = engine
+        self.workers = workers if workers is not None else int(os.getenv('WORKFLOW_WORKERS', 2))
+        self.poll_interval = poll_interval or float(os.getenv('WORKFLOW_POLL_INTERVAL', 2))
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self._pid: Optional[int] = None
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self.runs_executed = 0
+    
+    def ensure_started(self):
+        """Start the worker threads, and the scheduler alongside them, if they are not running in this process"""
+        if self.workers <= 0:
+            return
+        self.engine.scheduler.ensure_started()
+        with self._lock:
+            if self._pid == os.getpid() and all(thread.is_alive() for thread in self._threads):
+                return
+            self._stopping.clear()
+            self._threads = [thread for thread in self._threads if thread.is_alive()] if self._pid == os.getpid() else []
+            self._pid = os.getpid()
+            while len(self._threads) < self.workers:
+                worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+                thread = threading.Thread(target=self._work, args=(worker_id,),
+                                          name=f"workflow-worker-{len(self._threads)}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+    
+    def wake(self):
+        """Wake idle workers in this process to claim new runs"""
+        self._wake.set()
+    
+    def stop(self):
+        self._stopping.set()
+        self._wake.set()
     
-    def _find_step_by_id(self, workflow: Workflow, step_id: str) -> Optional[WorkflowStep]:
-        """Find workflow step by ID"""
-        for step in workflow.steps:
-            if step.id == step_id:
-                return step
-        return None
+    def _work(self, worker_id: str):
+        while not self._stopping.is_set():
+            try:
+                run = self.engine.store.claim_run(worker_id)
+            except Exception as e:
+                logging.error(f"Workflow worker {worker_id} failed to claim a run: {str(e)}")
+                run = None
+            
+            if run is None:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+            
+            self.engine.execute_run(run, worker_id)
+            with self._lock:
+                self.runs_executed += 1
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            alive = sum(1 for thread in self._threads if thread.is_alive()) if self._pid == os.getpid() else 0
+            return {
+                'configured_workers': self.workers,
+                'alive_workers': alive,
+                'runs_executed': self.runs_executed
+            }
 
 class AutoApplyService:
     """Automated job application service"""
     
     def __init__(self, workflow_engine: WorkflowEngine):
         self.workflow_engine = workflow_engine
-        self.client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        self.scheduler = get_llm_scheduler()
     
     def setup_auto_apply_workflow(self, candidate_id: str, criteria: Dict[str, Any]) -> str:
         """Set up auto-apply workflow for a candidate"""
@@ -646,7 +1050,7 @@ class AutoApplyService:
             Format as JSON with keys: score, matching_factors, missing_requirements, recommendation
             """
             
-            response = self.client.chat.completions.create(
+            analysis_text = self.scheduler.complete(
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": "You are an expert job matching analyst."},
@@ -654,9 +1058,7 @@ class AutoApplyService:
                 ],
                 max_tokens=800,
                 temperature=0.3
-            )
-            
-            analysis_text = response.choices[0].message.content
+            ).content
             
             try:
                 analysis = json.loads(analysis_text)
@@ -684,3 +1086,43 @@ task_manager = TaskManager()
 workflow_engine = WorkflowEngine(task_manager)
 auto_apply_service = AutoApplyService(workflow_engine)
 
+_workers_started_pid: Optional[int] = None
+
+def start_workflow_workers():
+    """
+    Start the workflow worker pool and scheduler in this process. Cheap to call
+    on every request: after a fork (e.g. gunicorn workers) the first call in
+    the child starts them there.
+    """
+    global _workers_started_pid
+    if _workers_started_pid == os.getpid():
+        return
+    workflow_engine.workers.ensure_started()
+    _workers_started_pid = os.getpid()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run HotGigs.ai workflow workers')
+    parser.add_argument('--workers', type=int, default=int(os.getenv('WORKFLOW_WORKERS', 2) or 1))
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO'))
+    pool = WorkflowWorkerPool(workflow_engine, workers=max(1, args.workers))
+    
+    def stop(*_):
+        workflow_engine.scheduler.stop()
+        pool.stop()
+    
+    signal.signal(signal.SIGTERM, stop)
+    pool.ensure_started()
+    logging.info(f"Workflow workers running: {pool.workers}")
+    
+    try:
+        while not pool._stopping.wait(1):
+            pass
+    except KeyboardInterrupt:
+        stop()
+    sys.exit(0)
+
+if __name__ == '__main__':
+    main()
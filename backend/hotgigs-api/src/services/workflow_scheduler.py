@@ -0,0 +1,317 @@
+"""
+Workflow Scheduler for HotGigs.ai
+Fires trigger_type='scheduled' workflows from the shared workflow store,
+coalescing auto-apply candidates with the same job search into one search
+per batch and holding back when the run queue or LLM budget is exhausted
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional, Callable, Tuple
+from src.services.ai.llm_scheduler import TokenBucket, get_llm_scheduler
+from src.services.workflow_store import RUN_QUEUED
+
+logger = logging.getLogger(__name__)
+
+SCHEDULE_INTERVALS = {
+    'hourly': 3600,
+    'daily': 86400,
+    'weekly': 7 * 86400
+}
+
+# Fields kept from search results in run contexts; descriptions stay in the database
+JOB_CONTEXT_FIELDS = ('id', 'title', 'location', 'employment_type', 'salary_min', 'salary_max',
+                      'experience_level', 'company_name', 'relevance_score')
+
+def schedule_interval(trigger_conditions: Dict[str, Any]) -> Optional[float]:
+    """Seconds between firings for a scheduled workflow's trigger conditions"""
+    if trigger_conditions.get('interval_seconds'):
+        return float(trigger_conditions['interval_seconds'])
+    return SCHEDULE_INTERVALS.get(str(trigger_conditions.get('schedule', '')).lower())
+
+def job_search_criteria(steps: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Criteria of a workflow's job search step, if it has one"""
+    for step in steps:
+        parameters = step.get('parameters') or {}
+        if step.get('action') == 'ai_analysis' and parameters.get('analysis_type') == 'job_search':
+            return parameters.get('criteria') or {}
+    return None
+
+def _normalize(value: Any) -> Optional[str]:
+    if isinstance(value, (list, tuple)):
+        value = ' '.join(str(item) for item in value)
+    value = ' '.join(str(value or '').lower().split())
+    return value or None
+
+def job_search_query(criteria: Dict[str, Any]) -> Dict[str, Optional[str]]:
+    """
+    The part of auto-apply criteria sent to the job search. Locations and
+    salary are applied per candidate afterwards, so candidates who differ only
+    in those share one search.
+    """
+    job_criteria = criteria.get('job_criteria') or {}
+    search_term = next((job_criteria[key] for key in ('keywords', 'search_term', 'title', 'job_title')
+                        if job_criteria.get(key)), None)
+    return {
+        'search_term': _normalize(search_term),
+        'employment_type': _normalize(job_criteria.get('employment_type')),
+        'experience_level': _normalize(job_criteria.get('experience_level'))
+    }
+
+def _dumps_key(query: Dict[str, Optional[str]]) -> str:
+    return json.dumps(query, sort_keys=True, separators=(',', ':'))
+
+def search_jobs(query: Dict[str, Optional[str]], limit: int) -> List[Dict[str, Any]]:
+    """Run a job search and keep the fields run contexts need"""
+    from src.models.optimized_database import get_database_service
+    jobs = get_database_service().search_jobs_optimized(limit=limit, **query)
+    return [{field: job.get(field) for field in JOB_CONTEXT_FIELDS} for job in jobs]
+
+def filter_jobs(jobs: List[Dict[str, Any]], criteria: Dict[str, Any], limit: int) -> List[Dict[str, Any]]:
+    """Apply one candidate's location and salary preferences to shared search results"""
+    locations = [location.lower() for location in criteria.get('preferred_locations') or [] if location]
+    salary_range = criteria.get('salary_range') or {}
+    salary_floor, salary_ceiling = salary_range.get('min'), salary_range.get('max')
+
+    matched = []
+    for job in jobs:
+        if locations and not any(location in (job.get('location') or '').lower() for location in locations):
+            continue
+        if salary_floor and job.get('salary_max') and job['salary_max'] < salary_floor:
+            continue
+        if salary_ceiling and job.get('salary_min') and job['salary_min'] > salary_ceiling:
+            continue
+        matched.append(job)
+        if len(matched) >= limit:
+            break
+    return matched
+
+
+class WorkflowScheduler:
+    """Fires due scheduled workflows as workflow runs
+
+    Every scheduled workflow fires at a fixed offset into its period. The
+    offset is derived from the workflow's job search, so candidates with the
+    same search land in the same slot and are claimed together as one batch.
+    Different searches are spread across the period. Schedules are claimed
+    from the store's next_run_at index, so schedulers in several processes
+    never fire the same workflow twice.
+
+    A tick fires at most what the budget allows: headroom in the queued run
+    backlog (WORKFLOW_SCHEDULER_MAX_QUEUED_RUNS), a runs-per-minute bucket,
+    and a minimum free fraction of the shared LLM scheduler's capacity. Job
+    searches have their own per-minute bucket. When any of these is
+    exhausted, schedules stay due and are fired late rather than dropped.
+    """
+
+    def __init__(self, engine, poll_interval: Optional[float] = None):
+        self.engine = engine
+        self.store = engine.store
+        self.enabled = os.getenv('WORKFLOW_SCHEDULER_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+        self.poll_interval = poll_interval or float(os.getenv('WORKFLOW_SCHEDULER_POLL_INTERVAL', 5))
+        self.batch_size = int(os.getenv('WORKFLOW_SCHEDULER_BATCH_SIZE', 200))
+        self.jitter = min(1.0, max(0.0, float(os.getenv('WORKFLOW_SCHEDULER_JITTER', 1.0))))
+        self.max_queued_runs = int(os.getenv('WORKFLOW_SCHEDULER_MAX_QUEUED_RUNS', 500))
+        self.min_llm_headroom = float(os.getenv('WORKFLOW_SCHEDULER_MIN_LLM_HEADROOM', 0.2))
+        self.backpressure_delay = float(os.getenv('WORKFLOW_SCHEDULER_BACKPRESSURE_DELAY', 30))
+        self.search_limit = int(os.getenv('WORKFLOW_SCHEDULER_SEARCH_LIMIT', 100))
+        self.jobs_per_run = int(os.getenv('WORKFLOW_SCHEDULER_JOBS_PER_RUN', 20))
+        self._run_bucket = TokenBucket(float(os.getenv('WORKFLOW_SCHEDULER_RUNS_PER_MINUTE', 600)))
+        self._search_bucket = TokenBucket(float(os.getenv('WORKFLOW_SCHEDULER_SEARCHES_PER_MINUTE', 60)))
+        self.search: Callable[[Dict[str, Optional[str]], int], List[Dict[str, Any]]] = search_jobs
+
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._stopping = threading.Event()
+        self._error_delay = self.poll_interval
+        self._last_backpressure: Optional[str] = None
+        self._stats = {
+            'ticks': 0,
+            'fired': 0,
+            'skipped': 0,
+            'batches': 0,
+            'batched_runs': 0,
+            'searches': 0,
+            'search_errors': 0,
+            'backpressure': 0
+        }
+
+    def _incr(self, counter: str, amount: int = 1):
+        with self._lock:
+            self._stats[counter] += amount
+
+    # Registration
+
+    def _slot_offset(self, key: str, interval: float) -> float:
+        """Stable offset into the period; the same key always gets the same slot"""
+        digest = int(hashlib.sha1(key.encode('utf-8')).hexdigest()[:12], 16)
+        return (digest / float(1 << 48)) * interval * self.jitter
+
+    def register(self, workflow: Dict[str, Any], now: Optional[float] = None) -> Optional[float]:
+        """Schedule a scheduled workflow record and return its first due time"""
+        interval = schedule_interval(workflow.get('trigger_conditions') or {})
+        if not interval:
+            logger.warning(f"Workflow {workflow['id']} has no recognised schedule; it will not fire")
+            return None
+
+        criteria = job_search_criteria(workflow.get('steps') or [])
+        batch_key = _dumps_key(job_search_query(criteria)) if criteria is not None else ''
+        offset = self._slot_offset(batch_key or workflow['id'], interval)
+
+        now = now if now is not None else time.time()
+        next_run_at = (now // interval) * interval + offset
+        if next_run_at <= now:
+            next_run_at += interval
+        self.store.upsert_schedule(workflow['id'], interval, next_run_at, batch_key)
+        return next_run_at
+
+    def register_missing(self) -> int:
+        """Schedule scheduled workflows created before they were registered here"""
+        workflows = self.store.list_unscheduled_workflows('scheduled')
+        for workflow in workflows:
+            self.register(workflow)
+        return len(workflows)
+
+    # Firing
+
+    def _fire_budget(self) -> Tuple[int, Optional[str]]:
+        """How many workflows may fire now, and what limits it when that is zero"""
+        queue_room = self.max_queued_runs - self.store.count_runs(RUN_QUEUED)
+        if queue_room <= 0:
+            return 0, 'run_queue_full'
+        if get_llm_scheduler().get_headroom() < self.min_llm_headroom:
+            return 0, 'llm_budget_exhausted'
+        rate_room = int(self._run_bucket.available())
+        if rate_room <= 0:
+            return 0, 'run_rate_limited'
+        return min(queue_room, rate_room, self.batch_size), None
+
+    def tick(self, now: Optional[float] = None) -> float:
+        """Fire what is due within budget; returns seconds until the next tick"""
+        self._incr('ticks')
+        now = now if now is not None else time.time()
+        next_due = self.store.next_schedule_due()
+        if next_due is None or next_due > now:
+            return self.poll_interval if next_due is None else min(self.poll_interval, next_due - now)
+
+        limit, reason = self._fire_budget()
+        if limit <= 0:
+            self._incr('backpressure')
+            with self._lock:
+                self._last_backpressure = reason
+            logger.info(f"Workflow scheduler holding back: {reason}")
+            return self.backpressure_delay
+
+        schedules = self.store.claim_due_schedules(now, limit)
+
+        # Claimed in (next_run_at, batch_key) order, so batches are contiguous
+        batches: 'OrderedDict[str, List[Dict[str, Any]]]' = OrderedDict()
+        for schedule in schedules:
+            batches.setdefault(schedule['batch_key'], []).append(schedule)
+
+        remaining = list(batches.items())
+        while remaining:
+            batch_key, batch = remaining.pop(0)
+            jobs = None
+            if batch_key:
+                wait = self._search_bucket.delay_for(1)
+                if wait > 0:
+                    # Out of search budget; the rest of this claim fires when it refills
+                    self.store.release_schedules(batch + [s for _, rest in remaining for s in rest])
+                    self._incr('backpressure')
+                    with self._lock:
+                        self._last_backpressure = 'search_rate_limited'
+                    return wait
+                try:
+                    jobs = self.search(json.loads(batch_key), self.search_limit)
+                    self._incr('searches')
+                except Exception as e:
+                    logger.error(f"Scheduled job search failed: {str(e)}")
+                    self._incr('search_errors')
+                    self.store.release_schedules(batch + [s for _, rest in remaining for s in rest])
+                    self._error_delay = min(self._error_delay * 2, self.backpressure_delay * 10)
+                    return self._error_delay
+
+            self._incr('batches')
+            for schedule in batch:
+                self._fire(schedule, jobs)
+
+        self._error_delay = self.poll_interval
+        with self._lock:
+            self._last_backpressure = None
+        # A full claim means more may be due already
+        return 0.0 if len(schedules) >= limit else min(self.poll_interval, 1.0)
+
+    def _fire(self, schedule: Dict[str, Any], jobs: Optional[List[Dict[str, Any]]]):
+        workflow = self.store.get_workflow(schedule['workflow_id'])
+        if workflow is None or workflow['status'] != 'active':
+            self._incr('skipped')
+            return
+
+        context: Dict[str, Any] = {
+            'scheduled_at': datetime.fromtimestamp(schedule['due_at'], timezone.utc).isoformat()
+        }
+        if jobs is not None:
+            # The job search step uses these instead of searching again
+            criteria = job_search_criteria(workflow['steps']) or {}
+            context['jobs'] = filter_jobs(jobs, criteria, self.jobs_per_run)
+
+        if self.engine.execute_workflow(workflow['id'], context):
+            # Only runs that were actually queued count against the run rate
+            self._run_bucket.adjust(-1)
+            self._incr('fired')
+            if jobs is not None:
+                self._incr('batched_runs')
+        else:
+            self._incr('skipped')
+
+    # Background thread
+
+    def ensure_started(self):
+        """Start the scheduler thread if it is not running in this process"""
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._loop, name='workflow-scheduler', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+
+    def _loop(self):
+        try:
+            registered = self.register_missing()
+            if registered:
+                logger.info(f"Scheduled {registered} existing workflows")
+        except Exception as e:
+            logger.error(f"Error registering scheduled workflows: {str(e)}")
+
+        while not self._stopping.is_set():
+            try:
+                delay = self.tick()
+            except Exception as e:
+                logger.error(f"Workflow scheduler tick failed: {str(e)}")
+                delay = self.poll_interval
+            if delay > 0:
+                self._stopping.wait(delay)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['last_backpressure'] = self._last_backpressure
+            stats['running'] = self._pid == os.getpid() and self._thread is not None and self._thread.is_alive()
+        # Job searches saved by sharing one search across a batch
+        stats['coalesced_searches'] = max(0, stats['batched_runs'] - stats['searches'])
+        next_due = self.store.next_schedule_due()
+        stats['next_due_at'] = datetime.fromtimestamp(next_due, timezone.utc).isoformat() if next_due else None
+        return stats
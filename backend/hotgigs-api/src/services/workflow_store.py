@@ -0,0 +1,582 @@
+"""
+Workflow Store for HotGigs.ai
+Durable SQLite storage for workflow definitions, workflow runs and tasks,
+shared by every web and worker process on a host so any of them can start,
+execute or inspect a workflow
+"""
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from typing import Dict, List, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'data', 'workflows.db'
+)
+
+# Run states
+RUN_QUEUED = 'queued'
+RUN_RUNNING = 'running'
+RUN_COMPLETED = 'completed'
+RUN_FAILED = 'failed'
+RUN_TERMINAL_STATUSES = (RUN_COMPLETED, RUN_FAILED)
+
+WORKFLOW_COLUMNS = ('id', 'name', 'description', 'trigger_type', 'trigger_conditions', 'steps',
+                    'status', 'created_by', 'created_at', 'last_executed', 'execution_count')
+
+TASK_COLUMNS = ('id', 'title', 'description', 'task_type', 'status', 'priority', 'assigned_to',
+                'created_by', 'created_at', 'due_date', 'completed_at', 'metadata', 'dependencies',
+                'progress', 'idempotency_key')
+
+RUN_COLUMNS = ('id', 'workflow_id', 'status', 'state', 'attempts', 'available_at', 'lease_expires_at',
+               'worker_id', 'error', 'created_at', 'updated_at')
+
+SCHEDULE_COLUMNS = ('workflow_id', 'interval_seconds', 'next_run_at', 'batch_key', 'last_fired_at', 'fire_count')
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, default=str, separators=(',', ':'))
+
+
+class WorkflowStore:
+    """SQLite-backed workflows, tasks and lease-based workflow runs
+
+    A run holds its execution state (pending steps, context and step log) as
+    a checkpoint that the executing worker rewrites after every step. Workers
+    claim runs under a lease that each checkpoint renews, and the executing
+    worker heartbeats it while steps are in flight; when a worker dies its
+    lease expires and another worker resumes the run from the last
+    checkpoint.
+
+    Task lookups by assignee, status and due date are served by indexes, and
+    per-assignee/status and per-day creation counters are maintained by
+    triggers in the same transaction as each task write, so dashboard counts
+    never scan the task table.
+
+    Scheduled workflows have a row in workflow_schedules; the next_run_at
+    index is the shared priority queue every process's scheduler claims due
+    workflows from.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_attempts: Optional[int] = None,
+                 lease_seconds: Optional[int] = None, retry_backoff: Optional[float] = None):
+        self.path = path or os.getenv('WORKFLOW_DB_PATH', DEFAULT_STORE_PATH)
+        self.max_attempts = max_attempts or int(os.getenv('WORKFLOW_MAX_ATTEMPTS', 3))
+        self.lease_seconds = lease_seconds or int(os.getenv('WORKFLOW_LEASE_SECONDS', 300))
+        self.retry_backoff = retry_backoff or float(os.getenv('WORKFLOW_RETRY_BACKOFF', 10))
+        self.retention_seconds = int(os.getenv('WORKFLOW_RUN_RETENTION_SECONDS', 30 * 86400))
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = self._connect()
+        has_counters = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'task_counters'"
+        ).fetchone() is not None
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS workflows (
+                id TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                description TEXT,
+                trigger_type TEXT NOT NULL,
+                trigger_conditions TEXT NOT NULL,
+                steps TEXT NOT NULL,
+                status TEXT NOT NULL,
+                created_by TEXT,
+                created_at REAL NOT NULL,
+                last_executed REAL,
+                execution_count INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS workflow_runs (
+                id TEXT PRIMARY KEY,
+                workflow_id TEXT NOT NULL,
+                status TEXT NOT NULL,
+                state TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                available_at REAL NOT NULL,
+                lease_expires_at REAL,
+                worker_id TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS tasks (
+                id TEXT PRIMARY KEY,
+                title TEXT NOT NULL,
+                description TEXT,
+                task_type TEXT NOT NULL,
+                status TEXT NOT NULL,
+                priority TEXT NOT NULL,
+                assigned_to TEXT,
+                created_by TEXT,
+                created_at REAL NOT NULL,
+                due_date REAL,
+                completed_at REAL,
+                metadata TEXT NOT NULL,
+                dependencies TEXT NOT NULL,
+                progress REAL NOT NULL DEFAULT 0,
+                idempotency_key TEXT UNIQUE
+            );
+            CREATE TABLE IF NOT EXISTS workflow_schedules (
+                workflow_id TEXT PRIMARY KEY,
+                interval_seconds REAL NOT NULL,
+                next_run_at REAL NOT NULL,
+                batch_key TEXT NOT NULL,
+                last_fired_at REAL,
+                fire_count INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_workflows_created_by ON workflows(created_by);
+            CREATE INDEX IF NOT EXISTS idx_workflows_trigger ON workflows(trigger_type);
+            CREATE INDEX IF NOT EXISTS idx_workflow_schedules_due ON workflow_schedules(next_run_at, batch_key);
+            CREATE INDEX IF NOT EXISTS idx_workflow_runs_claim ON workflow_runs(status, available_at);
+            CREATE INDEX IF NOT EXISTS idx_workflow_runs_workflow ON workflow_runs(workflow_id);
+
+            CREATE INDEX IF NOT EXISTS idx_tasks_assignee ON tasks(assigned_to, status, created_at);
+            CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status, created_at);
+            CREATE INDEX IF NOT EXISTS idx_tasks_open_due ON tasks(due_date)
+                WHERE due_date IS NOT NULL AND status != 'completed';
+
+            -- assigned_to '' stands for unassigned tasks
+            CREATE TABLE IF NOT EXISTS task_counters (
+                assigned_to TEXT NOT NULL,
+                status TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (assigned_to, status)
+            );
+            CREATE TABLE IF NOT EXISTS task_daily_counters (
+                assigned_to TEXT NOT NULL,
+                day TEXT NOT NULL,
+                created INTEGER NOT NULL,
+                PRIMARY KEY (assigned_to, day)
+            );
+
+            CREATE TRIGGER IF NOT EXISTS trg_tasks_insert AFTER INSERT ON tasks BEGIN
+                INSERT INTO task_counters (assigned_to, status, count)
+                VALUES (COALESCE(NEW.assigned_to, ''), NEW.status, 1)
+                ON CONFLICT (assigned_to, status) DO UPDATE SET count = count + 1;
+                INSERT INTO task_daily_counters (assigned_to, day, created)
+                VALUES (COALESCE(NEW.assigned_to, ''), date(NEW.created_at, 'unixepoch'), 1)
+                ON CONFLICT (assigned_to, day) DO UPDATE SET created = created + 1;
+            END;
+            CREATE TRIGGER IF NOT EXISTS trg_tasks_update AFTER UPDATE OF assigned_to, status ON tasks BEGIN
+                UPDATE task_counters SET count = count - 1
+                WHERE assigned_to = COALESCE(OLD.assigned_to, '') AND status = OLD.status;
+                INSERT INTO task_counters (assigned_to, status, count)
+                VALUES (COALESCE(NEW.assigned_to, ''), NEW.status, 1)
+                ON CONFLICT (assigned_to, status) DO UPDATE SET count = count + 1;
+                UPDATE task_daily_counters SET created = created - 1
+                WHERE OLD.assigned_to IS NOT NEW.assigned_to AND assigned_to = COALESCE(OLD.assigned_to, '')
+                    AND day = date(OLD.created_at, 'unixepoch');
+                INSERT INTO task_daily_counters (assigned_to, day, created)
+                SELECT COALESCE(NEW.assigned_to, ''), date(NEW.created_at, 'unixepoch'), 1
+                WHERE OLD.assigned_to IS NOT NEW.assigned_to
+                ON CONFLICT (assigned_to, day) DO UPDATE SET created = created + 1;
+            END;
+            CREATE TRIGGER IF NOT EXISTS trg_tasks_delete AFTER DELETE ON tasks BEGIN
+                UPDATE task_counters SET count = count - 1
+                WHERE assigned_to = COALESCE(OLD.assigned_to, '') AND status = OLD.status;
+                UPDATE task_daily_counters SET created = created - 1
+                WHERE assigned_to = COALESCE(OLD.assigned_to, '') AND day = date(OLD.created_at, 'unixepoch');
+            END;
+        """)
+
+        if not has_counters:
+            # Stores created before the counters existed
+            conn.executescript("""
+                INSERT OR REPLACE INTO task_counters (assigned_to, status, count)
+                SELECT COALESCE(assigned_to, ''), status, COUNT(*) FROM tasks GROUP BY 1, 2;
+                INSERT OR REPLACE INTO task_daily_counters (assigned_to, day, created)
+                SELECT COALESCE(assigned_to, ''), date(created_at, 'unixepoch'), COUNT(*)
+                FROM tasks GROUP BY 1, 2;
+            """)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Per-thread connection; sqlite3 connections must not cross threads or forks"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    # Workflows
+
+    def insert_workflow(self, workflow: Dict[str, Any]):
+        """Insert a workflow row; JSON fields are serialized here"""
+        row = dict(workflow)
+        row['trigger_conditions'] = _dumps(row['trigger_conditions'])
+        row['steps'] = _dumps(row['steps'])
+        self._connect().execute(
+            f"INSERT INTO workflows ({', '.join(WORKFLOW_COLUMNS)}) "
+            f"VALUES ({', '.join('?' for _ in WORKFLOW_COLUMNS)})",
+            tuple(row.get(column) for column in WORKFLOW_COLUMNS)
+        )
+
+    def _workflow_from_row(self, row) -> Dict[str, Any]:
+        workflow = dict(zip(WORKFLOW_COLUMNS, row))
+        workflow['trigger_conditions'] = json.loads(workflow['trigger_conditions'])
+        workflow['steps'] = json.loads(workflow['steps'])
+        return workflow
+
+    def get_workflow(self, workflow_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute(
+            f"SELECT {', '.join(WORKFLOW_COLUMNS)} FROM workflows WHERE id = ?", (workflow_id,)
+        ).fetchone()
+        return self._workflow_from_row(row) if row else None
+
+    def list_workflows(self, created_by: Optional[str] = None) -> List[Dict[str, Any]]:
+        query = f"SELECT {', '.join(WORKFLOW_COLUMNS)} FROM workflows"
+        params: tuple = ()
+        if created_by is not None:
+            query += " WHERE created_by = ?"
+            params = (str(created_by),)
+        return [self._workflow_from_row(row) for row in self._connect().execute(query + " ORDER BY created_at", params)]
+
+    def count_workflows(self, status: Optional[str] = None, created_by: Optional[str] = None,
+                        executed_since: Optional[float] = None) -> int:
+        conditions, params = [], []
+        if status is not None:
+            conditions.append("status = ?")
+            params.append(status)
+        if created_by is not None:
+            conditions.append("created_by = ?")
+            params.append(str(created_by))
+        if executed_since is not None:
+            conditions.append("last_executed >= ?")
+            params.append(executed_since)
+        query = "SELECT COUNT(*) FROM workflows"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        return self._connect().execute(query, tuple(params)).fetchone()[0]
+
+    # Runs
+
+    def create_run(self, workflow_id: str, state: Dict[str, Any]) -> str:
+        """Queue a run of a workflow and record the execution on the workflow"""
+        run_id = f"run_{uuid.uuid4().hex}"
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO workflow_runs (id, workflow_id, status, state, available_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (run_id, workflow_id, RUN_QUEUED, _dumps(state), now, now, now)
+            )
+            conn.execute(
+                "UPDATE workflows SET last_executed = ?, execution_count = execution_count + 1 WHERE id = ?",
+                (now, workflow_id)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return run_id
+
+    def claim_run(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """Lease the next runnable run, including runs whose worker's lease expired"""
+        now = time.time()
+        conn = self._connect()
+
+        # BEGIN IMMEDIATE takes the write lock so two workers cannot claim the same run
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                f"SELECT {', '.join(RUN_COLUMNS)} FROM workflow_runs "
+                "WHERE (status = ? AND available_at <= ?) OR (status = ? AND lease_expires_at <= ?) "
+                "ORDER BY available_at LIMIT 1",
+                (RUN_QUEUED, now, RUN_RUNNING, now)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+
+            run = dict(zip(RUN_COLUMNS, row))
+            if run['status'] == RUN_RUNNING:
+                logger.warning(f"Recovering workflow run {run['id']} abandoned by {run['worker_id']}")
+
+            run['attempts'] += 1
+            if run['attempts'] > self.max_attempts:
+                conn.execute(
+                    "UPDATE workflow_runs SET status = ?, error = ?, lease_expires_at = NULL, updated_at = ? "
+                    "WHERE id = ?",
+                    (RUN_FAILED, 'Exceeded maximum attempts', now, run['id'])
+                )
+                conn.execute("COMMIT")
+                return self.claim_run(worker_id)
+
+            conn.execute(
+                "UPDATE workflow_runs SET status = ?, attempts = ?, worker_id = ?, lease_expires_at = ?, "
+                "updated_at = ? WHERE id = ?",
+                (RUN_RUNNING, run['attempts'], worker_id, now + self.lease_seconds, now, run['id'])
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        run['status'] = RUN_RUNNING
+        run['worker_id'] = worker_id
+        run['state'] = json.loads(run['state'])
+        return run
+
+    def checkpoint_run(self, run_id: str, worker_id: str, state: Dict[str, Any]) -> bool:
+        """Persist run state and renew the lease; False if the lease was lost to another worker"""
+        now = time.time()
+        cursor = self._connect().execute(
+            "UPDATE workflow_runs SET state = ?, lease_expires_at = ?, updated_at = ? "
+            "WHERE id = ? AND worker_id = ? AND status = ?",
+            (_dumps(state), now + self.lease_seconds, now, run_id, worker_id, RUN_RUNNING)
+        )
+        return cursor.rowcount == 1
+
+    def heartbeat_run(self, run_id: str, worker_id: str) -> bool:
+        """Renew the lease without a checkpoint; False if the lease was lost to another worker"""
+        now = time.time()
+        cursor = self._connect().execute(
+            "UPDATE workflow_runs SET lease_expires_at = ?, updated_at = ? "
+            "WHERE id = ? AND worker_id = ? AND status = ?",
+            (now + self.lease_seconds, now, run_id, worker_id, RUN_RUNNING)
+        )
+        return cursor.rowcount == 1
+
+    def complete_run(self, run_id: str, worker_id: str, state: Dict[str, Any]) -> bool:
+        now = time.time()
+        cursor = self._connect().execute(
+            "UPDATE workflow_runs SET status = ?, state = ?, lease_expires_at = NULL, updated_at = ? "
+            "WHERE id = ? AND worker_id = ? AND status = ?",
+            (RUN_COMPLETED, _dumps(state), now, run_id, worker_id, RUN_RUNNING)
+        )
+        return cursor.rowcount == 1
+
+    def fail_run(self, run_id: str, worker_id: str, error: str, attempts: int):
+        """Requeue the run with exponential backoff, or fail it after max_attempts"""
+        now = time.time()
+        if attempts >= self.max_attempts:
+            status, available_at = RUN_FAILED, now
+        else:
+            status, available_at = RUN_QUEUED, now + self.retry_backoff * (2 ** (attempts - 1))
+        self._connect().execute(
+            "UPDATE workflow_runs SET status = ?, error = ?, available_at = ?, lease_expires_at = NULL, "
+            "updated_at = ? WHERE id = ? AND worker_id = ?",
+            (status, error, available_at, now, run_id, worker_id)
+        )
+
+    def get_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute(
+            f"SELECT {', '.join(RUN_COLUMNS)} FROM workflow_runs WHERE id = ?", (run_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        run = dict(zip(RUN_COLUMNS, row))
+        run['state'] = json.loads(run['state'])
+        return run
+
+    def purge_expired_runs(self) -> int:
+        """Delete finished runs older than the retention period"""
+        cursor = self._connect().execute(
+            "DELETE FROM workflow_runs WHERE status IN (?, ?) AND updated_at < ?",
+            RUN_TERMINAL_STATUSES + (time.time() - self.retention_seconds,)
+        )
+        return cursor.rowcount
+
+    def count_runs(self, status: str) -> int:
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM workflow_runs WHERE status = ?", (status,)
+        ).fetchone()[0]
+
+    # Schedules
+
+    def upsert_schedule(self, workflow_id: str, interval_seconds: float, next_run_at: float, batch_key: str):
+        self._connect().execute(
+            "INSERT INTO workflow_schedules (workflow_id, interval_seconds, next_run_at, batch_key) "
+            "VALUES (?, ?, ?, ?) ON CONFLICT (workflow_id) DO UPDATE SET "
+            "interval_seconds = excluded.interval_seconds, next_run_at = excluded.next_run_at, "
+            "batch_key = excluded.batch_key",
+            (workflow_id, interval_seconds, next_run_at, batch_key)
+        )
+
+    def get_schedule(self, workflow_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute(
+            f"SELECT {', '.join(SCHEDULE_COLUMNS)} FROM workflow_schedules WHERE workflow_id = ?", (workflow_id,)
+        ).fetchone()
+        return dict(zip(SCHEDULE_COLUMNS, row)) if row else None
+
+    def next_schedule_due(self) -> Optional[float]:
+        return self._connect().execute("SELECT MIN(next_run_at) FROM workflow_schedules").fetchone()[0]
+
+    def claim_due_schedules(self, now: float, limit: int) -> List[Dict[str, Any]]:
+        """
+        Advance up to `limit` due schedules past `now` and return them with
+        their due time. Periods missed while nothing was running collapse into
+        this one firing.
+        """
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                f"SELECT {', '.join(SCHEDULE_COLUMNS)} FROM workflow_schedules "
+                "WHERE next_run_at <= ? ORDER BY next_run_at, batch_key LIMIT ?",
+                (now, limit)
+            ).fetchall()
+            schedules = []
+            for row in rows:
+                schedule = dict(zip(SCHEDULE_COLUMNS, row))
+                schedule['due_at'] = schedule['next_run_at']
+                interval = schedule['interval_seconds']
+                schedule['next_run_at'] += (int((now - schedule['due_at']) // interval) + 1) * interval
+                conn.execute(
+                    "UPDATE workflow_schedules SET next_run_at = ?, last_fired_at = ?, "
+                    "fire_count = fire_count + 1 WHERE workflow_id = ?",
+                    (schedule['next_run_at'], now, schedule['workflow_id'])
+                )
+                schedules.append(schedule)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return schedules
+
+    def release_schedules(self, schedules: List[Dict[str, Any]]):
+        """Put claimed schedules back at their due time so they fire again"""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "UPDATE workflow_schedules SET next_run_at = ?, fire_count = fire_count - 1 "
+                "WHERE workflow_id = ? AND next_run_at = ?",
+                [(schedule['due_at'], schedule['workflow_id'], schedule['next_run_at']) for schedule in schedules]
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def list_unscheduled_workflows(self, trigger_type: str) -> List[Dict[str, Any]]:
+        rows = self._connect().execute(
+            f"SELECT {', '.join('w.' + column for column in WORKFLOW_COLUMNS)} FROM workflows w "
+            "LEFT JOIN workflow_schedules s ON s.workflow_id = w.id "
+            "WHERE w.trigger_type = ? AND s.workflow_id IS NULL",
+            (trigger_type,)
+        ).fetchall()
+        return [self._workflow_from_row(row) for row in rows]
+
+    # Tasks
+
+    def insert_task(self, task: Dict[str, Any]) -> str:
+        """
+        Insert a task row and return its id. When a task with the same
+        idempotency key already exists its id is returned instead, so a step
+        replayed after a crash does not create the task twice.
+        """
+        row = dict(task)
+        row['metadata'] = _dumps(row['metadata'])
+        row['dependencies'] = _dumps(row['dependencies'])
+        conn = self._connect()
+        try:
+            conn.execute(
+                f"INSERT INTO tasks ({', '.join(TASK_COLUMNS)}) VALUES ({', '.join('?' for _ in TASK_COLUMNS)})",
+                tuple(row.get(column) for column in TASK_COLUMNS)
+            )
+        except sqlite3.IntegrityError:
+            if not row.get('idempotency_key'):
+                raise
+            existing = conn.execute(
+                "SELECT id FROM tasks WHERE idempotency_key = ?", (row['idempotency_key'],)
+            ).fetchone()
+            if existing is None:
+                raise
+            return existing[0]
+        return row['id']
+
+    def _task_from_row(self, row) -> Dict[str, Any]:
+        task = dict(zip(TASK_COLUMNS, row))
+        task['metadata'] = json.loads(task['metadata'])
+        task['dependencies'] = json.loads(task['dependencies'])
+        return task
+
+    def get_task(self, task_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute(
+            f"SELECT {', '.join(TASK_COLUMNS)} FROM tasks WHERE id = ?", (task_id,)
+        ).fetchone()
+        return self._task_from_row(row) if row else None
+
+    def update_task(self, task_id: str, fields: Dict[str, Any]) -> bool:
+        """Update columns of a task; False if it does not exist"""
+        if not fields:
+            return self.get_task(task_id) is not None
+        assignments = ', '.join(f"{column} = ?" for column in fields)
+        cursor = self._connect().execute(
+            f"UPDATE tasks SET {assignments} WHERE id = ?", tuple(fields.values()) + (task_id,)
+        )
+        return cursor.rowcount == 1
+
+    def find_tasks(self, where: str = '', params: tuple = (), order_by: str = 'created_at') -> List[Dict[str, Any]]:
+        query = f"SELECT {', '.join(TASK_COLUMNS)} FROM tasks"
+        if where:
+            query += f" WHERE {where}"
+        return [self._task_from_row(row) for row in self._connect().execute(f"{query} ORDER BY {order_by}", params)]
+
+    def find_overdue_tasks(self, now: float) -> List[Dict[str, Any]]:
+        """Open tasks past their due date, oldest due first"""
+        # The predicate repeats idx_tasks_open_due's so SQLite can use the partial index
+        return self.find_tasks(
+            "due_date IS NOT NULL AND status != 'completed' AND due_date < ?", (now,), order_by='due_date'
+        )
+
+    def count_overdue_tasks(self, now: float) -> int:
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM tasks WHERE due_date IS NOT NULL AND status != 'completed' AND due_date < ?",
+            (now,)
+        ).fetchone()[0]
+
+    def task_counts(self, assigned_to: Optional[str] = None) -> Dict[str, int]:
+        """Task count per status for one assignee, or for all tasks"""
+        if assigned_to is None:
+            rows = self._connect().execute(
+                "SELECT status, SUM(count) FROM task_counters GROUP BY status"
+            ).fetchall()
+        else:
+            rows = self._connect().execute(
+                "SELECT status, count FROM task_counters WHERE assigned_to = ?", (str(assigned_to),)
+            ).fetchall()
+        return {status: count for status, count in rows if count}
+
+    def tasks_created_on(self, assigned_to: str, day: str) -> int:
+        """Tasks assigned to a user that were created on a UTC YYYY-MM-DD day"""
+        row = self._connect().execute(
+            "SELECT created FROM task_daily_counters WHERE assigned_to = ? AND day = ?", (str(assigned_to), day)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Run queue depth by status plus workflow and task totals"""
+        conn = self._connect()
+        runs = dict(conn.execute("SELECT status, COUNT(*) FROM workflow_runs GROUP BY status").fetchall())
+        return {
+            'workflows': conn.execute("SELECT COUNT(*) FROM workflows").fetchone()[0],
+            'schedules': conn.execute("SELECT COUNT(*) FROM workflow_schedules").fetchone()[0],
+            'tasks': sum(self.task_counts().values()),
+            'runs_queued': runs.get(RUN_QUEUED, 0),
+            'runs_running': runs.get(RUN_RUNNING, 0),
+            'runs_completed': runs.get(RUN_COMPLETED, 0),
+            'runs_failed': runs.get(RUN_FAILED, 0)
+        }
+
+
+_workflow_store: Optional[WorkflowStore] = None
+_workflow_store_lock = threading.Lock()
+
+def get_workflow_store() -> WorkflowStore:
+    """Get the process-wide workflow store"""
+    global _workflow_store
+    with _workflow_store_lock:
+        if _workflow_store is None:
+            _workflow_store = WorkflowStore()
+        return _workflow_store
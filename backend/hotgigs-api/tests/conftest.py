@@ -0,0 +1,23 @@
+import time
+
+import pytest
+
+
+class FakeClock:
+    """Stands in for time.time so lease and backoff expiry can be stepped through"""
+
+    def __init__(self, now: float = 1_700_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(time, 'time', fake)
+    return fake
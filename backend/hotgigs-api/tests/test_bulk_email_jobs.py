@@ -0,0 +1,87 @@
+"""
+Tests for background bulk email jobs
+"""
+import threading
+
+import pytest
+
+from src.services import bulk_email_jobs
+from src.services.bulk_email_jobs import (
+    BulkEmailJobStore, start_bulk_email, BULK_EMAIL_COMPLETED, BULK_EMAIL_FAILED, BULK_EMAIL_RUNNING
+)
+
+
+class FakeEmailService:
+    """Reports progress for every recipient and returns a send_many result"""
+
+    def __init__(self, error=None):
+        self.error = error
+        self.done = threading.Event()
+
+    def send_many(self, recipients, progress=None, **options):
+        try:
+            if isinstance(self.error, Exception):
+                raise self.error
+            for processed in range(1, len(recipients)):
+                progress(processed)
+            if self.error:
+                return {'success': False, 'error': self.error}
+            return {'success': True, 'sent': len(recipients), 'failed': 0, 'failures': []}
+        finally:
+            self.done.set()
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = BulkEmailJobStore(str(tmp_path / 'bulk_email_jobs.db'))
+    monkeypatch.setattr(bulk_email_jobs, 'get_bulk_email_job_store', lambda: store)
+    return store
+
+
+def run_job(store, service, recipients):
+    job_id = start_bulk_email(service, recipients, user_id='u1', template_name='interview_invitation')
+    assert service.done.wait(5)
+    for thread in threading.enumerate():
+        if thread.name == f"bulk-email-{job_id[:8]}":
+            thread.join(5)
+    return store.get(job_id)
+
+
+def test_progress_is_reported_while_running(store):
+    job_id = store.create('u1', 4)
+    store.progress(job_id, 3)
+
+    job = store.get(job_id)
+
+    assert job['status'] == BULK_EMAIL_RUNNING
+    assert job['progress'] == 0.75
+    assert job['result'] is None
+
+
+def test_completed_job_keeps_campaign_result(store):
+    job = run_job(store, FakeEmailService(), [{'to_email': 'a@example.com'}, {'to_email': 'b@example.com'}])
+
+    assert job['status'] == BULK_EMAIL_COMPLETED
+    assert job['user_id'] == 'u1'
+    assert job['progress'] == 1.0
+    assert job['processed'] == 2
+    assert job['result']['sent'] == 2
+
+
+@pytest.mark.parametrize('error', ['Email credentials not configured', RuntimeError('pool crashed')])
+def test_failed_campaign_is_reported(store, error):
+    job = run_job(store, FakeEmailService(error), [{'to_email': 'a@example.com'}])
+
+    assert job['status'] == BULK_EMAIL_FAILED
+    assert job['error'] == str(error)
+
+
+def test_silent_job_is_reported_failed_and_purged(store, clock):
+    job_id = store.create('u1', 10)
+    clock.advance(store.stale_seconds + 1)
+
+    assert store.get(job_id)['status'] == BULK_EMAIL_FAILED
+
+    clock.advance(store.retention_seconds + 1)
+    assert store.purge_expired() == 1
+    assert store.get(job_id) is None
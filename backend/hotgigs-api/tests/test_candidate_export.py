@@ -0,0 +1,160 @@
+"""
+Tests for streaming candidate export writers, database paging and export jobs
+"""
+import csv
+import io
+import os
+
+import pytest
+
+from src.services import candidate_export
+from src.services.candidate_export import (
+    EXPORT_COLUMNS, EXPORT_COMPLETED, EXPORT_FAILED, ExportJobStore,
+    iter_candidate_rows, iter_database_candidates, start_candidate_export, stream_csv, write_export_file
+)
+
+CANDIDATES = [
+    {'name': 'Jane Doe', 'email': 'jane@example.com', 'skills': ['Python', 'SQL'],
+     'work_experience': [{}, {}], 'education': [{'degree': 'BSc'}]},
+    {'name': 'Raj Patel', 'summary': 'Nurse\x07 manager'}
+]
+
+
+class FakeDatabase:
+    """Serves candidate_profiles and related tables in keyset pages"""
+
+    def __init__(self, profiles, skills=(), experiences=(), education=(), users=()):
+        self.tables = {
+            'candidate_profiles': list(profiles),
+            'candidate_skills': list(skills),
+            'work_experiences': list(experiences),
+            'education': list(education),
+            'users': list(users)
+        }
+        self.pages = []
+
+    def _matches(self, row, filters):
+        for column, value in (filters or {}).items():
+            if row.get(column) not in (value if isinstance(value, list) else [value]):
+                return False
+        return True
+
+    def iter_records_keyset(self, table, filters=None, select_fields='*', page_size=1000):
+        rows = [row for row in self.tables[table] if self._matches(row, filters)]
+        for start in range(0, len(rows), page_size):
+            self.pages.append(table)
+            yield rows[start:start + page_size]
+
+    def get_records_optimized(self, table, filters=None, select_fields='*', use_cache=True):
+        return [row for row in self.tables[table] if self._matches(row, filters)]
+
+    def count_records(self, table, filters=None):
+        return len([row for row in self.tables[table] if self._matches(row, filters)])
+
+
+def test_csv_file_holds_one_row_per_candidate(tmp_path):
+    progress = []
+    path, rows_written = write_export_file(
+        iter_candidate_rows(CANDIDATES), 'csv', path=str(tmp_path / 'export.csv'),
+        progress=progress.append, progress_every=1
+    )
+
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = list(csv.reader(f))
+    assert rows_written == 2
+    assert progress == [1, 2, 2]
+    assert rows[0] == EXPORT_COLUMNS
+    assert rows[1][:3] == ['Jane Doe', 'jane@example.com', '']
+    assert rows[1][5:8] == ['Python, SQL', '2', 'BSc']
+
+
+def test_xlsx_file_strips_illegal_characters(tmp_path):
+    openpyxl = pytest.importorskip('openpyxl')
+
+    path, rows_written = write_export_file(iter_candidate_rows(CANDIDATES), 'xlsx', path=str(tmp_path / 'export.xlsx'))
+
+    sheet = openpyxl.load_workbook(path, read_only=True)['Candidates']
+    rows = list(sheet.iter_rows(values_only=True))
+    assert rows_written == 2
+    assert list(rows[0]) == EXPORT_COLUMNS
+    assert rows[2][4] == 'Nurse manager'
+
+
+def test_failed_export_removes_partial_file(tmp_path):
+    def rows():
+        yield from iter_candidate_rows(CANDIDATES)
+        raise RuntimeError('database unavailable')
+
+    with pytest.raises(RuntimeError):
+        write_export_file(rows(), 'csv', path=str(tmp_path / 'export.csv'))
+
+    assert os.listdir(tmp_path) == []
+
+
+def test_stream_csv_yields_bounded_chunks():
+    chunks = list(stream_csv(iter_candidate_rows(CANDIDATES * 50), chunk_size=1024))
+
+    assert len(chunks) > 1
+    assert all(len(chunk) < 2048 for chunk in chunks)
+    rows = list(csv.reader(io.StringIO(b''.join(chunks).decode('utf-8'))))
+    assert len(rows) == 101
+
+
+def test_database_candidates_are_paged_and_joined():
+    db = FakeDatabase(
+        profiles=[{'id': f"p{index}", 'user_id': f"u{index}", 'status': 'active'} for index in range(5)],
+        skills=[{'id': 's1', 'candidate_id': 'p0', 'skill_name': 'Python'},
+                {'id': 's2', 'candidate_id': 'p4', 'skill_name': 'Go'}],
+        experiences=[{'id': 'e1', 'candidate_id': 'p0'}],
+        users=[{'id': 'u0', 'first_name': 'Jane', 'last_name': 'Doe', 'email': 'jane@example.com'}]
+    )
+
+    candidates = list(iter_database_candidates(db, {'status': 'active'}, page_size=2))
+
+    assert len(candidates) == 5
+    assert db.pages.count('candidate_profiles') == 3
+    assert candidates[0]['name'] == 'Jane Doe'
+    assert candidates[0]['skills'] == ['Python']
+    assert len(candidates[0]['work_experience']) == 1
+    assert candidates[4]['skills'] == ['Go']
+    assert candidates[1]['name'] == ''
+
+
+def test_background_export_reports_completion(tmp_path, monkeypatch):
+    store = ExportJobStore(str(tmp_path / 'export_jobs.db'))
+    monkeypatch.setattr(candidate_export, 'get_export_job_store', lambda: store)
+    monkeypatch.setenv('CANDIDATE_EXPORT_DIR', str(tmp_path))
+    db = FakeDatabase(profiles=[{'id': f"p{index}", 'user_id': None} for index in range(3)])
+
+    job_id = start_candidate_export(db, 'csv', user_id='u1', filename='candidates.csv')
+    for thread in candidate_export.threading.enumerate():
+        if thread.name == f"candidate-export-{job_id[:8]}":
+            thread.join(5)
+
+    job = store.get(job_id)
+    assert job['status'] == EXPORT_COMPLETED
+    assert job['total_rows'] == job['rows_written'] == 3
+    assert job['progress'] == 1.0
+    assert job['filename'] == 'candidates.csv'
+    assert os.path.exists(job['file_path'])
+
+
+def test_stale_job_fails_and_expired_files_are_purged(tmp_path, clock):
+    store = ExportJobStore(str(tmp_path / 'export_jobs.db'))
+    running = store.create('u1', 'csv', 'running.csv', total_rows=10)
+    finished = store.create('u1', 'csv', 'finished.csv')
+    file_path = tmp_path / 'finished.csv'
+    file_path.write_text('Name\n')
+    store.progress(running, 4)
+    store.complete(finished, str(file_path), 0)
+
+    assert store.get(running)['progress'] == 0.4
+    clock.advance(store.stale_seconds + 1)
+    assert store.get(running)['status'] == EXPORT_FAILED
+
+    # Marking the job failed counts as its last update
+    clock.advance(store.retention_seconds + 1)
+    assert store.purge_expired() == 2
+    assert not file_path.exists()
+    assert store.get(finished) is None
+    assert store.get(running) is None
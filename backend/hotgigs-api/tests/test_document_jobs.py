@@ -0,0 +1,119 @@
+"""
+Tests for document job leases, fencing, retries and in-job deduplication
+"""
+import pytest
+
+from src.services.document_jobs import (
+    DocumentJobQueue, STATUS_COMPLETED, STATUS_FAILED, STATUS_QUEUED, STATUS_RUNNING
+)
+
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    return DocumentJobQueue(str(tmp_path / 'jobs.db'), max_attempts=2, lease_seconds=60, retry_backoff=5)
+
+
+def submit_one(queue, data=b'%PDF-1.4 resume'):
+    return queue.submit([{'data': data, 'document_type': 'pdf'}], user_id='u1')
+
+
+def test_claim_leases_item_to_one_worker(queue):
+    job_id = submit_one(queue)
+
+    item = queue.claim('worker-a')
+
+    assert item['job_id'] == job_id
+    assert item['attempt'] == 1
+    assert item['data'] == b'%PDF-1.4 resume'
+    assert queue.claim('worker-b') is None
+    assert queue.get_job(job_id)['status'] == STATUS_RUNNING
+
+
+def test_expired_lease_is_reclaimed_and_old_holder_is_fenced(queue, clock):
+    job_id = submit_one(queue)
+    stale = queue.claim('worker-a')
+    clock.advance(61)
+
+    current = queue.claim('worker-b')
+
+    assert current['attempt'] == 2
+    assert not queue.heartbeat(job_id, 0, 'worker-a', stale['attempt'])
+    assert not queue.complete(job_id, 0, 'worker-a', stale['attempt'], {'text': 'stale'})
+    assert not queue.fail(job_id, 0, 'worker-a', stale['attempt'], 'stale error')
+
+    assert queue.complete(job_id, 0, 'worker-b', current['attempt'], {'text': 'fresh'})
+    results = queue.get_results(job_id)
+    assert results[0]['result'] == {'text': 'fresh'}
+    assert queue.get_job(job_id)['status'] == STATUS_COMPLETED
+
+
+def test_heartbeat_keeps_lease_alive(queue, clock):
+    job_id = submit_one(queue)
+    item = queue.claim('worker-a')
+
+    clock.advance(50)
+    assert queue.heartbeat(job_id, 0, 'worker-a', item['attempt'])
+    clock.advance(50)
+
+    assert queue.claim('worker-b') is None
+
+
+def test_failed_item_is_retried_after_backoff_then_failed(queue, clock):
+    job_id = submit_one(queue)
+    first = queue.claim('worker-a')
+
+    assert queue.fail(job_id, 0, 'worker-a', first['attempt'], 'ocr crashed')
+    assert queue.get_job(job_id)['documents'][0]['status'] == STATUS_QUEUED
+    assert queue.claim('worker-a') is None
+
+    clock.advance(5)
+    second = queue.claim('worker-a')
+    assert second['attempt'] == 2
+    assert second['data'] == b'%PDF-1.4 resume'
+
+    assert queue.fail(job_id, 0, 'worker-a', second['attempt'], 'ocr crashed again')
+    job = queue.get_job(job_id)
+    assert job['failed'] == 1
+    assert job['progress'] == 1.0
+
+
+def test_expired_final_attempt_fails_item(queue, clock):
+    job_id = submit_one(queue)
+    queue.claim('worker-a')
+    clock.advance(61)
+    queue.claim('worker-b')
+    clock.advance(61)
+
+    assert queue.claim('worker-c') is None
+    document = queue.get_job(job_id)['documents'][0]
+    assert document['status'] == STATUS_FAILED
+    assert document['error'] == 'Worker lease expired'
+
+
+def test_repeated_document_is_processed_once(queue):
+    job_id = queue.submit([
+        {'data': b'same resume', 'document_type': 'pdf'},
+        {'data': b'same resume', 'document_type': 'pdf'},
+        {'data': b'other resume', 'document_type': 'pdf'}
+    ])
+
+    claimed = [queue.claim('worker-a'), queue.claim('worker-a')]
+    assert queue.claim('worker-a') is None
+    assert sorted(item['item_index'] for item in claimed) == [0, 2]
+
+    for item in claimed:
+        queue.complete(job_id, item['item_index'], 'worker-a', item['attempt'], {'index': item['item_index']})
+
+    results = queue.get_results(job_id)
+    assert [result['result'] for result in results] == [{'index': 0}, {'index': 0}, {'index': 2}]
+    assert [result['deduplicated'] for result in results] == [False, True, False]
+
+
+def test_cancel_only_affects_items_not_started(queue):
+    job_id = queue.submit([{'data': b'one'}, {'data': b'two'}])
+    queue.claim('worker-a')
+
+    assert queue.cancel(job_id) == 1
+    job = queue.get_job(job_id)
+    assert job['running'] == 1
+    assert job['cancelled'] == 1
@@ -0,0 +1,81 @@
+"""
+Tests for content-addressed document result reuse
+"""
+import threading
+import time
+
+import pytest
+
+from src.services.document_results import (
+    DocumentResultStore, deduplication_summary, document_content_hash, document_result_key
+)
+
+ANALYSIS = {'extracted_text': 'Jane Doe, Python developer', 'processing_metadata': {'processing_time_seconds': 2.5}}
+
+
+def test_key_depends_on_content_and_processing_options():
+    content_hash = document_content_hash(b'%PDF-1.4 resume')
+
+    key = document_result_key(content_hash, 'PDF', True, True)
+
+    assert key == document_result_key(content_hash, 'pdf', 1, True)
+    assert key.startswith(content_hash)
+    assert len({
+        key,
+        document_result_key(document_content_hash(b'%PDF-1.4 other'), 'pdf', True, True),
+        document_result_key(content_hash, 'docx', True, True),
+        document_result_key(content_hash, 'pdf', False, True),
+        document_result_key(content_hash, 'pdf', True, False)
+    }) == 5
+
+
+def test_results_are_shared_by_stores_on_one_file(tmp_path):
+    path = str(tmp_path / 'document_results.db')
+    key = document_result_key(document_content_hash(b'resume'), 'pdf', True, True)
+    DocumentResultStore(backend='sqlite', path=path).set(key, ANALYSIS)
+
+    store = DocumentResultStore(backend='sqlite', path=path)
+
+    assert store.get(key) == ANALYSIS
+    assert store.get('missing') is None
+    stats = store.get_stats()
+    assert stats['hit_rate'] == 0.5
+    assert stats['saved_seconds'] == 2.5
+
+
+def test_unserializable_result_is_not_stored(tmp_path):
+    store = DocumentResultStore(backend='sqlite', path=str(tmp_path / 'document_results.db'))
+
+    store.set('key', {'image': object()})
+
+    assert store.get('key') is None
+    assert store.get_stats()['errors'] == 1
+
+
+def test_single_flight_serializes_duplicates_within_a_process():
+    store = DocumentResultStore(backend='memory')
+    processed = []
+
+    def process(worker: int):
+        with store.single_flight('key'):
+            if store.get('key') is None:
+                time.sleep(0.05)
+                processed.append(worker)
+                store.set('key', ANALYSIS)
+
+    threads = [threading.Thread(target=process, args=(worker,)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(processed) == 1
+    assert store._inflight == {}
+
+
+@pytest.mark.parametrize('total, deduplicated, rate', [(4, 1, 0.25), (0, 0, 0.0)])
+def test_deduplication_summary(total, deduplicated, rate):
+    summary = deduplication_summary(total, deduplicated)
+
+    assert summary['processed'] == total - deduplicated
+    assert summary['dedup_rate'] == rate
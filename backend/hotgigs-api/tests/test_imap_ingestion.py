@@ -0,0 +1,202 @@
+"""
+Tests for IMAP response parsing, part decoding and UID checkpoints
+"""
+import base64
+import imaplib
+
+import pytest
+
+from src.services.imap_ingestion import (
+    QuotedString, ResumeMailboxScan, UIDCheckpointStore, decode_part, describe_parts, parse_fetch_response
+)
+
+RESUME_STRUCTURE = (
+    b'(("TEXT" "PLAIN" ("CHARSET" "utf-8") NIL NIL "QUOTED-PRINTABLE" 120 4 NIL NIL NIL NIL)'
+    b'("APPLICATION" "PDF" ("NAME" "cv.pdf") NIL NIL "BASE64" 4000 NIL '
+    b'("ATTACHMENT" ("FILENAME" "cv.pdf")) NIL NIL) "MIXED" ("BOUNDARY" "b1") NIL NIL NIL)'
+)
+HEADERS = b'Subject: Resume\r\nFrom: a@example.com\r\nMessage-ID: <1@example.com>\r\n\r\n'
+
+
+def structure_response(uid: int, structure: bytes = RESUME_STRUCTURE):
+    """imaplib data for a UID BODYSTRUCTURE + header fetch of one message"""
+    return [
+        (b'%d (UID %d BODYSTRUCTURE %s BODY[HEADER.FIELDS (SUBJECT FROM DATE MESSAGE-ID)] {%d}'
+         % (uid, uid, structure, len(HEADERS)), HEADERS),
+        b')'
+    ]
+
+
+class FakeMailbox:
+    """The imaplib calls ResumeMailboxScan makes, answered from canned data"""
+
+    def __init__(self, uids, uidvalidity=7, bodies=None, failing=()):
+        self.uids = uids
+        self.uidvalidity = uidvalidity
+        self.bodies = bodies or {}
+        self.failing = set(failing)
+        self.searches = []
+
+    def select(self, folder, readonly=False):
+        return 'OK', [str(len(self.uids)).encode()]
+
+    def response(self, code):
+        return code, [str(self.uidvalidity).encode()]
+
+    def uid(self, command, *args):
+        if command == 'SEARCH':
+            self.searches.append(args[1])
+            start = int(args[1].split()[1].split(':')[0])
+            # Like a real server, "n:*" also matches the newest UID
+            matched = [uid for uid in self.uids if uid >= start] or self.uids[-1:]
+            return 'OK', [' '.join(str(uid) for uid in matched).encode()]
+
+        uid_set, items = args
+        if 'BODYSTRUCTURE' in items:
+            data = []
+            for uid in uid_set.split(','):
+                data.extend(structure_response(int(uid)))
+            return 'OK', data
+        if int(uid_set) in self.failing:
+            return 'NO', [b'Server busy']
+        body = self.bodies.get(int(uid_set), base64.b64encode(b'%PDF-1.4 resume'))
+        return 'OK', [(b'%s (UID %s BODY[2] {%d}' % (uid_set.encode(), uid_set.encode(), len(body)), body), b')']
+
+
+def test_parse_fetch_response_keys_messages_by_uid():
+    data = structure_response(12) + structure_response(15)
+
+    messages = parse_fetch_response(data)
+
+    assert set(messages) == {'12', '15'}
+    assert messages['12']['BODY[HEADER.FIELDS (SUBJECT FROM DATE MESSAGE-ID)]'] == HEADERS
+    assert messages['15']['BODYSTRUCTURE'][-5] == 'MIXED'
+
+
+def test_parse_fetch_response_keeps_quoted_nil_and_escapes():
+    data = [b'1 (UID 3 BODYSTRUCTURE ("TEXT" "PLAIN" ("NAME" "NIL") NIL "say \\"hi\\"" "7BIT" 5))']
+
+    structure = parse_fetch_response(data)['3']['BODYSTRUCTURE']
+
+    assert structure[2] == ['NAME', 'NIL']
+    assert isinstance(structure[2][1], QuotedString)
+    assert structure[3] is None
+    assert structure[4] == 'say "hi"'
+
+
+def test_describe_parts_numbers_sections_and_reads_filenames():
+    structure = parse_fetch_response(structure_response(1))['1']['BODYSTRUCTURE']
+
+    parts = describe_parts(structure)
+
+    assert [part['section'] for part in parts] == ['1', '2']
+    assert parts[0]['content_type'] == 'text/plain'
+    assert parts[0]['encoding'] == 'quoted-printable'
+    assert parts[1]['disposition'] == 'attachment'
+    assert parts[1]['filename'] == 'cv.pdf'
+    assert parts[1]['size'] == 4000
+
+
+def test_describe_parts_decodes_rfc2231_and_forwarded_messages():
+    forwarded = (
+        b'("MESSAGE" "RFC822" NIL NIL NIL "7BIT" 900 ("date" "subject" NIL NIL NIL NIL NIL NIL NIL NIL) '
+        b'(("TEXT" "PLAIN" NIL NIL NIL "7BIT" 10 1 NIL NIL NIL NIL)'
+        b'("APPLICATION" "PDF" NIL NIL NIL "BASE64" 300 NIL '
+        b'("ATTACHMENT" ("FILENAME*" "utf-8\'\'r%C3%A9sum%C3%A9.pdf")) NIL NIL) "MIXED" NIL NIL NIL NIL) 20)'
+    )
+    data = [b'1 (UID 9 BODYSTRUCTURE (("TEXT" "PLAIN" NIL NIL NIL "7BIT" 10 1 NIL NIL NIL NIL) '
+            + forwarded + b' "MIXED" NIL NIL NIL NIL))']
+
+    parts = describe_parts(parse_fetch_response(data)['9']['BODYSTRUCTURE'])
+
+    assert [part['section'] for part in parts] == ['1', '2.1', '2.2']
+    assert parts[2]['filename'] == 'résumé.pdf'
+
+
+def test_decode_part_undoes_transfer_encodings():
+    assert decode_part(base64.b64encode(b'resume'), 'base64') == b'resume'
+    assert decode_part(b'caf=C3=A9', 'quoted-printable') == 'café'.encode('utf-8')
+    assert decode_part('plain', '7bit') == b'plain'
+    assert decode_part(None, 'base64') == b''
+
+
+def test_decode_part_partial_base64_drops_incomplete_quantum():
+    encoded = base64.encodebytes(b'hello world, this is a resume body')
+    preview = encoded[:23]
+
+    with pytest.raises(ValueError):
+        decode_part(preview, 'base64')
+    assert b'hello world, this is a resume body'.startswith(decode_part(preview, 'base64', partial=True))
+
+
+def test_checkpoint_never_moves_backwards_within_uidvalidity(tmp_path):
+    store = UIDCheckpointStore(str(tmp_path / 'checkpoints.db'))
+
+    store.set('hr@example.com', 'INBOX', 'SUBJECT resume', 7, 40)
+    store.set('hr@example.com', 'INBOX', 'SUBJECT resume', 7, 25)
+
+    assert store.get('hr@example.com', 'INBOX', 'SUBJECT resume', 7) == 40
+    assert store.get('hr@example.com', 'INBOX', 'SUBJECT other', 7) == 0
+
+
+def test_checkpoint_is_discarded_when_uidvalidity_changes(tmp_path):
+    store = UIDCheckpointStore(str(tmp_path / 'checkpoints.db'))
+    store.set('hr@example.com', 'INBOX', 'SUBJECT resume', 7, 40)
+
+    assert store.get('hr@example.com', 'INBOX', 'SUBJECT resume', 8) == 0
+
+    store.set('hr@example.com', 'INBOX', 'SUBJECT resume', 8, 3)
+    assert store.get('hr@example.com', 'INBOX', 'SUBJECT resume', 8) == 3
+
+    store.reset('hr@example.com')
+    assert store.get('hr@example.com', 'INBOX', 'SUBJECT resume', 8) == 0
+
+
+def test_scan_resumes_after_committed_checkpoint(tmp_path):
+    checkpoints = UIDCheckpointStore(str(tmp_path / 'checkpoints.db'))
+    mail = FakeMailbox([3, 5, 8])
+
+    scan = ResumeMailboxScan(mail, checkpoints, 'hr@example.com', 'INBOX', 'resume', ['.pdf'], batch_size=2)
+    emails = list(scan)
+    scan.commit()
+
+    assert [email_info['uid'] for email_info in emails] == [3, 5, 8]
+    assert emails[0]['attachments'][0]['filename'] == 'cv.pdf'
+    assert base64.b64decode(emails[0]['attachments'][0]['data']) == b'%PDF-1.4 resume'
+
+    # Nothing new: the search's "9:*" matches UID 8 again, which must not be re-yielded
+    rescan = ResumeMailboxScan(mail, checkpoints, 'hr@example.com', 'INBOX', 'resume', ['.pdf'])
+    assert list(rescan) == []
+    assert mail.searches[-1] == 'UID 9:*'
+
+
+def test_scan_skips_undecodable_message_and_moves_past_it(tmp_path):
+    checkpoints = UIDCheckpointStore(str(tmp_path / 'checkpoints.db'))
+    mail = FakeMailbox([3, 5], bodies={3: b'!!not base64!!'})
+
+    scan = ResumeMailboxScan(mail, checkpoints, 'hr@example.com', 'INBOX', 'resume', ['.pdf'])
+    emails = list(scan)
+    scan.commit()
+
+    assert [email_info['uid'] for email_info in emails] == [5]
+    assert scan.stats['scanned'] == 2
+    assert checkpoints.get('hr@example.com', 'INBOX', scan.search_key, 7) == 5
+
+
+def test_failed_attachment_fetch_stops_scan_before_message(tmp_path):
+    checkpoints = UIDCheckpointStore(str(tmp_path / 'checkpoints.db'))
+    mail = FakeMailbox([3, 5, 8], failing={5})
+
+    scan = ResumeMailboxScan(mail, checkpoints, 'hr@example.com', 'INBOX', 'resume', ['.pdf'])
+    emails = []
+    with pytest.raises(imaplib.IMAP4.error):
+        for email_info in scan:
+            emails.append(email_info)
+    scan.commit()
+
+    assert [email_info['uid'] for email_info in emails] == [3]
+    assert checkpoints.get('hr@example.com', 'INBOX', scan.search_key, 7) == 3
+
+    mail.failing.clear()
+    retry = ResumeMailboxScan(mail, checkpoints, 'hr@example.com', 'INBOX', 'resume', ['.pdf'])
+    assert [email_info['uid'] for email_info in retry] == [5, 8]
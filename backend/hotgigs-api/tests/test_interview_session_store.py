@@ -0,0 +1,83 @@
+"""
+Tests for shared interview sessions: guarded turns, expiry and purging
+"""
+import pytest
+
+from src.services.interview_session_store import InterviewSessionStore
+
+QUESTIONS = [{'text': 'Tell me about yourself'}, {'text': 'Why Python?'}, {'text': 'Any questions?'}]
+
+
+@pytest.fixture
+def store(tmp_path, clock):
+    return InterviewSessionStore(str(tmp_path / 'sessions.db'), ttl_seconds=3600, retention_seconds=86400)
+
+
+def test_sessions_are_visible_to_every_worker(store, tmp_path):
+    store.create('s1', QUESTIONS, {'candidate_id': 'c1'}, 'in_progress',
+                 responses=[{'answer': 'I build APIs'}])
+
+    session = InterviewSessionStore(str(tmp_path / 'sessions.db')).get('s1', with_responses=True)
+
+    assert session['status'] == 'in_progress'
+    assert session['question_index'] == session['response_count'] == 1
+    assert session['questions'] == QUESTIONS
+    assert session['attributes'] == {'candidate_id': 'c1'}
+    assert session['responses'] == [{'answer': 'I build APIs'}]
+
+
+def test_each_turn_is_recorded_once(store):
+    store.create('s1', QUESTIONS, {}, 'in_progress')
+
+    assert store.append_response('s1', 0, {'answer': 'first'}, expected_status='in_progress')
+    assert not store.append_response('s1', 0, {'answer': 'duplicate'}, expected_status='in_progress')
+    assert not store.append_response('s1', 1, {'answer': 'paused'}, expected_status='paused')
+    assert store.append_response('s1', 1, {'answer': 'second'}, expected_status='in_progress', status='reviewing')
+
+    session = store.get('s1', with_responses=True)
+    assert session['status'] == 'reviewing'
+    assert session['question_index'] == 2
+    assert [response['answer'] for response in session['responses']] == ['first', 'second']
+
+
+def test_update_merges_attributes_and_guards_on_status(store):
+    store.create('s1', QUESTIONS, {'candidate_id': 'c1', 'score': None}, 'in_progress')
+
+    assert store.update('s1', attributes={'score': 82}, expected_status='in_progress')
+    assert not store.update('s1', status='cancelled', expected_status='completed')
+    assert store.update('s1', status='completed', result={'recommendation': 'hire'}, finished=True)
+
+    session = store.get('s1')
+    assert session['attributes'] == {'candidate_id': 'c1', 'score': 82}
+    assert session['status'] == 'completed'
+    assert session['result'] == {'recommendation': 'hire'}
+
+
+def test_recreating_a_session_replaces_its_responses(store):
+    store.create('s1', QUESTIONS, {}, 'in_progress')
+    store.append_response('s1', 0, {'answer': 'old'}, expected_status='in_progress')
+
+    store.create('s1', QUESTIONS[:1], {}, 'in_progress')
+
+    session = store.get('s1', with_responses=True)
+    assert session['question_index'] == 0
+    assert session['responses'] == []
+
+
+def test_idle_sessions_expire_and_finished_ones_are_retained(store, clock):
+    store.create('idle', QUESTIONS, {}, 'in_progress')
+    store.create('done', QUESTIONS, {}, 'in_progress')
+    store.append_response('done', 0, {'answer': 'bye'}, expected_status='in_progress',
+                          status='completed', finished=True)
+
+    clock.advance(3600)
+
+    assert store.get('idle') is None
+    assert not store.append_response('idle', 0, {'answer': 'late'}, expected_status='in_progress')
+    assert store.get('done')['status'] == 'completed'
+    assert store.purge_expired() == 1
+    assert store.get_stats() == {'sessions': {'completed': 1}, 'responses': 1}
+
+    clock.advance(86400)
+    assert store.purge_expired() == 1
+    assert store.get_stats() == {'sessions': {}, 'responses': 0}
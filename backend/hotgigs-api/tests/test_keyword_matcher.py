@@ -0,0 +1,50 @@
+"""
+Tests for the trie-compiled keyword matcher
+"""
+from src.services.keyword_matcher import KeywordMatcher, TECH_CATEGORY, get_keyword_matcher
+
+
+def test_prefers_longest_keyword_sharing_a_prefix():
+    matcher = KeywordMatcher({'skills': ['java', 'javascript', 'data', 'data science']})
+
+    scan = matcher.scan('JavaScript, Java and Data  Science; data')
+
+    assert [hit.keyword for hit in scan.hits] == ['javascript', 'java', 'data science', 'data']
+
+
+def test_respects_word_boundaries_and_plurals():
+    matcher = KeywordMatcher({'skills': ['api', 'git', 'ai']})
+
+    scan = matcher.scan('Built APIs with GitHub and said aim for AI.')
+
+    assert scan.counts == {'api': 1, 'ai': 1}
+
+
+def test_keywords_with_punctuation_edges():
+    matcher = KeywordMatcher({'contact': ['@'], 'skills': ['c++', 'node.js']})
+
+    scan = matcher.scan('me@example.com knows C++ and Node.js')
+
+    assert scan.counts == {'@': 1, 'c++': 1, 'node.js': 1}
+
+
+def test_categories_list_distinct_keywords_in_first_occurrence_order():
+    matcher = KeywordMatcher({'domain:finance': ['trading', 'portfolio'], 'skills': ['portfolio', 'sql']})
+
+    scan = matcher.scan('Portfolio tools, SQL, trading desks, portfolio reviews')
+
+    assert scan.keywords('domain:finance') == ['portfolio', 'trading']
+    assert scan.keywords('skills') == ['portfolio', 'sql']
+    assert scan.counts['portfolio'] == 2
+    assert not scan.has_any('domain:banking')
+
+
+def test_empty_dictionary_and_text_match_nothing():
+    assert KeywordMatcher({}).scan('python').hits == []
+    assert KeywordMatcher({'skills': ['python']}).scan('').hits == []
+
+
+def test_shared_matcher_covers_tech_keywords():
+    scan = get_keyword_matcher().scan('Machine learning engineer: Python, Docker and Kubernetes on AWS')
+
+    assert scan.keywords(TECH_CATEGORY) == ['machine learning', 'python', 'docker', 'kubernetes', 'aws']
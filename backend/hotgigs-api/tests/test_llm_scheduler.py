@@ -0,0 +1,146 @@
+"""
+Tests for the shared LLM scheduler: rate limits, retries and deadlines
+"""
+import asyncio
+import time
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+from src.services.ai import llm_scheduler
+from src.services.ai.llm_scheduler import LLMDeadlineExceeded, LLMScheduler, TokenBucket
+
+MESSAGES = [{'role': 'user', 'content': 'Summarise this resume'}]
+
+
+def completion(content: str, prompt_tokens: int = 10, completion_tokens: int = 5):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+        usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+    )
+
+
+def connection_error():
+    return openai.APIConnectionError(request=httpx.Request('POST', 'https://api.openai.com/v1/chat/completions'))
+
+
+class FakeCompletions:
+    """Plays back scripted outcomes: a response, an exception, or seconds to wait before answering 'slow'"""
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    async def create(self, **request):
+        self.calls += 1
+        outcome = self.outcomes.pop(0) if self.outcomes else completion(request['messages'][-1]['content'])
+        if isinstance(outcome, (int, float)):
+            await asyncio.sleep(outcome)
+            return completion('slow')
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+@pytest.fixture
+def make_scheduler(monkeypatch):
+    monkeypatch.setenv('OPENAI_API_KEY', 'test-key')
+    monkeypatch.setattr(llm_scheduler.random, 'uniform', lambda low, high: 0.0)
+    schedulers = []
+
+    def make_scheduler(outcomes=(), **options):
+        scheduler = LLMScheduler(**options)
+        scheduler._ensure_loop()
+        scheduler.completions = FakeCompletions(outcomes)
+        scheduler._client = SimpleNamespace(chat=SimpleNamespace(completions=scheduler.completions))
+        schedulers.append(scheduler)
+        return scheduler
+    yield make_scheduler
+    for scheduler in schedulers:
+        scheduler._loop.call_soon_threadsafe(scheduler._loop.stop)
+
+
+def test_token_bucket_refills_continuously(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(llm_scheduler.time, 'monotonic', lambda: now[0])
+    bucket = TokenBucket(60, capacity=2)
+
+    assert bucket.delay_for(2) == 0.0
+    assert bucket.delay_for(1) == 1.0
+
+    now[0] += 0.5
+    assert bucket.available() == 0.5
+    bucket.adjust(10)
+    assert bucket.available() == 2
+    assert bucket.delay_for(5) == 0.0
+
+
+def test_completion_returns_content_and_refunds_unused_tokens(make_scheduler):
+    scheduler = make_scheduler([completion('Strong Python background', 12, 8)], tokens_per_minute=10000)
+
+    result = scheduler.complete('gpt-4o-mini', MESSAGES, max_tokens=100)
+
+    assert result.content == 'Strong Python background'
+    assert result.usage == {'prompt_tokens': 12, 'completion_tokens': 8}
+    assert scheduler._token_bucket.available() == pytest.approx(10000 - 20, abs=1)
+    assert scheduler.get_stats()['completed'] == 1
+
+
+def test_retryable_errors_are_retried(make_scheduler):
+    scheduler = make_scheduler([connection_error(), completion('ok')])
+
+    result = scheduler.complete('gpt-4o-mini', MESSAGES)
+
+    assert result.content == 'ok'
+    assert result.attempts == 2
+    assert scheduler.get_stats()['retries'] == 1
+
+
+def test_other_errors_fail_without_retry(make_scheduler):
+    scheduler = make_scheduler([ValueError('bad request')])
+
+    with pytest.raises(ValueError):
+        scheduler.complete('gpt-4o-mini', MESSAGES)
+
+    assert scheduler.completions.calls == 1
+    assert scheduler.get_stats()['failed'] == 1
+
+
+def test_wait_for_a_concurrency_slot_is_bounded_by_the_deadline(make_scheduler):
+    scheduler = make_scheduler([0.5], max_concurrency=1)
+    slow = scheduler.submit('gpt-4o-mini', MESSAGES, timeout=5)
+    while scheduler.get_stats()['in_flight'] == 0:
+        time.sleep(0.01)
+
+    with pytest.raises(LLMDeadlineExceeded):
+        scheduler.complete('gpt-4o-mini', MESSAGES, timeout=0.1)
+
+    assert slow.result().content == 'slow'
+    assert scheduler.get_stats()['deadline_exceeded'] == 1
+
+
+def test_rate_limit_wait_beyond_the_deadline_fails_early(make_scheduler):
+    scheduler = make_scheduler(requests_per_minute=1)
+    scheduler.complete('gpt-4o-mini', MESSAGES)
+
+    started = time.monotonic()
+    with pytest.raises(LLMDeadlineExceeded):
+        scheduler.complete('gpt-4o-mini', MESSAGES, timeout=5)
+
+    assert time.monotonic() - started < 1
+    assert scheduler.get_headroom() < 0.01
+
+
+def test_complete_many_keeps_request_order_and_failures_in_place(make_scheduler):
+    scheduler = make_scheduler([completion('first'), ValueError('bad request'), completion('third')],
+                               max_concurrency=1)
+
+    results = scheduler.complete_many([
+        {'model': 'gpt-4o-mini', 'messages': MESSAGES} for _ in range(3)
+    ])
+
+    assert results[0].content == 'first'
+    assert isinstance(results[1], ValueError)
+    assert results[2].content == 'third'
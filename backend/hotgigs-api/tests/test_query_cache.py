@@ -0,0 +1,109 @@
+"""
+Tests for the bounded LRU/TTL query cache and its tag invalidation
+"""
+import threading
+
+from src.models.cache import QueryCache, estimate_size
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = QueryCache(max_entries=2, shards=1)
+    cache.set('a', 1)
+    cache.set('b', 2)
+
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.get_stats()['evictions'] == 1
+
+
+def test_byte_limit_evicts_and_oversized_values_are_skipped():
+    value = 'x' * 100
+    entry_bytes = estimate_size(value) + len('k0')
+    cache = QueryCache(max_entries=100, max_bytes=entry_bytes * 2, shards=1)
+
+    for index in range(3):
+        cache.set(f"k{index}", value)
+    cache.set('huge', 'x' * entry_bytes * 2)
+
+    assert cache.keys() == ['k1', 'k2']
+    stats = cache.get_stats()
+    assert stats['bytes'] == entry_bytes * 2
+    assert stats['rejected'] == 1
+
+
+def test_expired_entries_miss_and_are_purged():
+    cache = QueryCache(shards=1)
+    cache.set('stale', 1, ttl=0)
+    cache.set('also_stale', 2, ttl=0)
+    cache.set('fresh', 3, ttl=60)
+
+    assert cache.get('stale') is None
+    assert cache.purge_expired() == 1
+    assert cache.keys() == ['fresh']
+    stats = cache.get_stats()
+    assert stats['expirations'] == 2
+    assert stats['misses'] == 1
+
+
+def test_overwrite_replaces_value_and_size():
+    cache = QueryCache(shards=1)
+    cache.set('key', 'short')
+    cache.set('key', 'a much longer value')
+
+    assert cache.get('key') == 'a much longer value'
+    assert len(cache) == 1
+    assert cache.get_stats()['bytes'] == estimate_size('a much longer value') + len('key')
+
+
+def test_concurrent_writers_stay_within_limits():
+    cache = QueryCache(max_entries=64, shards=4)
+
+    def writer(worker: int):
+        for index in range(500):
+            cache.set(f"{worker}:{index % 100}", {'index': index})
+            cache.get(f"{(worker + 1) % 8}:{index % 100}")
+
+    threads = [threading.Thread(target=writer, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(cache) <= 64
+    stats = cache.get_stats()
+    assert stats['bytes'] == sum(estimate_size(cache.get(key)) + len(key) for key in cache.keys())
+    assert stats['sets'] == 4000
+
+
+def test_tag_invalidation_removes_only_dependent_entries():
+    cache = QueryCache(shards=4)
+    cache.set('job:1', {'id': 1}, tags=['jobs:id:1', 'jobs'])
+    cache.set('jobs:company:7', [{'id': 1}, {'id': 2}], tags=['jobs:company_id:7', 'jobs'])
+    cache.set('job:2', {'id': 2}, tags=['jobs:id:2', 'jobs'])
+    cache.set('user:1', {'id': 1}, tags=['users:id:1'])
+
+    assert cache.invalidate_tags(['jobs:id:1', 'jobs:company_id:7']) == 2
+
+    assert sorted(cache.keys()) == ['job:2', 'user:1']
+    assert cache.invalidate_tags(['jobs']) == 1
+    assert cache.keys() == ['user:1']
+    assert cache.get_stats()['invalidations'] == 3
+
+
+def test_tag_index_follows_overwrites_and_evictions():
+    cache = QueryCache(max_entries=1, shards=1)
+    cache.set('key', 1, tags=['old'])
+    cache.set('key', 2, tags=['new'])
+
+    assert cache.invalidate_tags(['old']) == 0
+    assert cache.get('key') == 2
+
+    cache.set('other', 3, tags=['other'])
+    assert cache.get_stats()['tags'] == 1
+    assert cache.invalidate_tags(['new']) == 0
+    assert cache.invalidate_tags(['other']) == 1
+    assert cache.get_stats()['tags'] == 0
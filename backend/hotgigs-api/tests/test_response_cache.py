@@ -0,0 +1,56 @@
+"""
+Tests for the content-addressed LLM response cache
+"""
+import pytest
+
+from src.services.ai.response_cache import LLMResponseCache, completion_cache_key
+
+MESSAGES = [{'role': 'system', 'content': 'You rank resumes'}, {'role': 'user', 'content': 'Rank these'}]
+
+
+def test_key_covers_every_input_of_a_completion():
+    key = completion_cache_key('gpt-4o-mini', MESSAGES, 0.0, 500)
+
+    assert key == completion_cache_key('gpt-4o-mini', [dict(message) for message in MESSAGES], 0.0, 500)
+    assert len({
+        key,
+        completion_cache_key('gpt-4o', MESSAGES, 0.0, 500),
+        completion_cache_key('gpt-4o-mini', MESSAGES[:1], 0.0, 500),
+        completion_cache_key('gpt-4o-mini', MESSAGES, 0.7, 500),
+        completion_cache_key('gpt-4o-mini', MESSAGES, 0.0, None)
+    }) == 5
+
+
+@pytest.mark.parametrize('backend', ['memory', 'sqlite'])
+def test_hits_credit_the_tokens_they_saved(tmp_path, backend):
+    cache = LLMResponseCache(backend=backend, path=str(tmp_path / 'openai_cache.db'))
+    key = completion_cache_key('gpt-4o-mini', MESSAGES, 0.0, 500)
+
+    assert cache.get(key) is None
+    cache.set(key, 'ranked', {'prompt_tokens': 120, 'completion_tokens': 30})
+    assert cache.get(key) == {'content': 'ranked', 'usage': {'prompt_tokens': 120, 'completion_tokens': 30}}
+    cache.get(key)
+
+    stats = cache.get_stats()
+    assert stats['backend'] == backend
+    assert stats['entries'] == 1
+    assert stats['hit_rate'] == round(2 / 3, 4)
+    assert stats['saved_tokens'] == 300
+
+
+def test_sqlite_backend_is_shared_across_instances(tmp_path):
+    path = str(tmp_path / 'openai_cache.db')
+    key = completion_cache_key('gpt-4o-mini', MESSAGES, 0.0, 500)
+
+    LLMResponseCache(backend='sqlite', path=path).set(key, 'ranked')
+
+    assert LLMResponseCache(backend='sqlite', path=path).get(key)['content'] == 'ranked'
+
+
+def test_unknown_backend_disables_caching():
+    cache = LLMResponseCache(backend='off')
+    cache.set('key', 'ranked')
+
+    assert not cache.enabled
+    assert cache.get('key') is None
+    assert cache.get_stats()['entries'] == 0
@@ -0,0 +1,180 @@
+"""
+Tests for SMTP session reuse, recycling and failure handling against a local server
+"""
+import socket
+import socketserver
+import threading
+import time
+from email.message import EmailMessage
+
+import pytest
+
+from src.services.smtp_pool import SMTPConnectionPool, EmailTemplate
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP to accept, reject and record messages"""
+
+    def reply(self, line: str):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections.append(self.connection)
+        self.reply('220 localhost ready')
+        recipients = []
+        for raw in self.rfile:
+            command = raw.decode().strip()
+            verb = command.split(' ', 1)[0].upper()
+            if verb in ('EHLO', 'HELO'):
+                self.reply('250 localhost')
+            elif verb == 'MAIL':
+                recipients = []
+                self.reply('250 OK')
+            elif verb == 'RCPT':
+                address = command.split(':', 1)[1].strip().strip('<>')
+                if address in server.rejected:
+                    self.reply('550 No such user')
+                else:
+                    recipients.append(address)
+                    self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                lines = []
+                for data_line in self.rfile:
+                    if data_line == b'.\r\n':
+                        break
+                    lines.append(data_line)
+                with server.lock:
+                    server.messages.append((recipients, b''.join(lines)))
+                self.reply('250 Queued')
+            elif verb in ('RSET', 'NOOP'):
+                self.reply('250 OK')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+
+class LocalSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), SMTPHandler)
+        self.lock = threading.Lock()
+        self.connections = []
+        self.messages = []
+        self.rejected = set()
+
+    def drop_connections(self):
+        """Close every open session from the server side"""
+        with self.lock:
+            connections, self.connections = self.connections, []
+        for connection in connections:
+            connection.shutdown(socket.SHUT_RDWR)
+
+
+@pytest.fixture
+def server():
+    server = LocalSMTPServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def make_pool(server):
+    pools = []
+
+    def make_pool(**options):
+        pool = SMTPConnectionPool('127.0.0.1', server.server_address[1], security='none', timeout=5, **options)
+        pools.append(pool)
+        return pool
+    yield make_pool
+    for pool in pools:
+        pool.close()
+
+
+def message(to_email: str) -> EmailMessage:
+    msg = EmailMessage()
+    msg['From'] = 'recruiter@example.com'
+    msg['To'] = to_email
+    msg['Subject'] = 'Interview'
+    msg.set_content(f"Hello {to_email}")
+    return msg
+
+
+def test_sequential_sends_reuse_one_session(server, make_pool):
+    pool = make_pool()
+
+    assert all(pool.send(message(f"c{index}@example.com")) for index in range(3))
+
+    stats = pool.get_stats()
+    assert stats['connections_opened'] == 1
+    assert stats['messages_sent'] == 3
+    assert stats['idle_connections'] == 1
+    assert len(server.messages) == 3
+
+
+def test_session_is_recycled_after_message_cap(server, make_pool):
+    pool = make_pool(max_connections=1, max_messages_per_session=2)
+
+    result = pool.send_many(message(f"c{index}@example.com") for index in range(5))
+
+    assert result['sent'] == 5
+    stats = pool.get_stats()
+    assert stats['connections_opened'] == 3
+    assert stats['sessions_recycled'] == 2
+    assert len(server.messages) == 5
+
+
+def test_reconnects_after_server_drops_session(server, make_pool):
+    pool = make_pool()
+    assert pool.send(message('first@example.com'))
+
+    server.drop_connections()
+    time.sleep(0.05)
+
+    assert pool.send(message('second@example.com'))
+    stats = pool.get_stats()
+    assert stats['reconnects'] == 1
+    assert stats['connections_opened'] == 2
+    assert [recipients for recipients, _ in server.messages] == [['first@example.com'], ['second@example.com']]
+
+
+def test_rejected_recipient_fails_only_that_message(server, make_pool):
+    server.rejected.add('gone@example.com')
+    pool = make_pool(max_connections=1)
+
+    result = pool.send_many(message(to_email) for to_email in
+                            ['a@example.com', 'gone@example.com', 'b@example.com'])
+
+    assert result['sent'] == 2
+    assert [failure['to_email'] for failure in result['failures']] == ['gone@example.com']
+    assert '550' in result['failures'][0]['error']
+    assert pool.get_stats()['connections_opened'] == 1
+    assert not pool.send(message('gone@example.com'))
+    assert pool.get_stats()['connections_opened'] == 1
+
+
+def test_unreachable_server_fails_every_message(make_pool, server):
+    pool = make_pool(max_connections=2)
+    server.shutdown()
+    server.server_close()
+
+    result = pool.send_many(message(f"c{index}@example.com") for index in range(4))
+
+    assert result['sent'] == 0
+    assert result['failed'] == 4
+
+
+def test_template_renders_missing_fields_empty():
+    template = EmailTemplate('Hi {first_name} {last_name}, about {job_title!s}')
+
+    assert template.fields == ['first_name', 'job_title', 'last_name']
+    assert template.render({'first_name': 'Ada', 'last_name': None}) == 'Hi Ada , about '
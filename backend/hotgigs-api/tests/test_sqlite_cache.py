@@ -0,0 +1,70 @@
+"""
+Tests for the SQLite key/value cache store shared by worker processes
+"""
+import pytest
+
+from src.models.sqlite_cache import SQLiteCacheStore
+
+
+@pytest.fixture
+def make_store(tmp_path, clock):
+    def make_store(**options):
+        options.setdefault('max_entries', 100)
+        options.setdefault('max_bytes', 1024 * 1024)
+        options.setdefault('touch_interval', 60)
+        return SQLiteCacheStore(str(tmp_path / 'cache.db'), table='entries', **options)
+    return make_store
+
+
+def last_access(store, key):
+    return store._connect().execute("SELECT last_access FROM entries WHERE key = ?", (key,)).fetchone()[0]
+
+
+def test_entries_are_shared_between_stores_on_one_file(make_store):
+    writer = make_store()
+    reader = make_store()
+
+    writer.set('key', {'content': 'cached'}, ttl=60)
+
+    assert reader.get('key') == {'content': 'cached'}
+    assert reader.get('missing') is None
+
+
+def test_expired_entry_is_deleted_on_read(make_store, clock):
+    store = make_store()
+    store.set('key', {'content': 'cached'}, ttl=60)
+
+    clock.advance(60)
+
+    assert store.get('key') is None
+    assert len(store) == 0
+
+
+def test_reads_refresh_last_access_at_most_once_per_interval(make_store, clock):
+    store = make_store()
+    store.set('key', {'content': 'cached'}, ttl=3600)
+    written_at = clock.now
+
+    clock.advance(30)
+    store.get('key')
+    assert last_access(store, 'key') == written_at
+
+    clock.advance(30)
+    store.get('key')
+    assert last_access(store, 'key') == clock.now
+
+
+def test_limits_trim_least_recently_used_entries(make_store, clock):
+    store = make_store(max_entries=10, touch_interval=0)
+    for index in range(10):
+        store.set(f"k{index}", {'index': index}, ttl=3600)
+        clock.advance(1)
+    store.get('k0')
+    store.set('k10', {'index': 10}, ttl=3600)
+
+    store.enforce_limits()
+
+    assert len(store) == 9
+    assert store.get('k0') == {'index': 0}
+    assert store.get('k1') is None
+    assert store.get('k10') == {'index': 10}
@@ -0,0 +1,99 @@
+"""
+Tests for the segmented, memory-mapped vector index
+"""
+import os
+
+import pytest
+
+from src.services.vector_index import LocalVectorIndex, create_text_vectorizer
+
+JOBS = [
+    ('j1', 'Senior Python developer building Django REST APIs', {'id': 'j1'}),
+    ('j2', 'Registered nurse for the intensive care unit', {'id': 'j2'}),
+    ('j3', 'Data engineer with Python, Spark and Airflow pipelines', {'id': 'j3'})
+]
+
+
+@pytest.fixture
+def make_index(tmp_path):
+    def make_index(**options):
+        options.setdefault('vectorizer', create_text_vectorizer(2 ** 12))
+        return LocalVectorIndex('jobs', directory=str(tmp_path), **options)
+    return make_index
+
+
+def ids(results):
+    return [payload['id'] for payload, _ in results]
+
+
+def test_search_ranks_similar_documents_first(make_index):
+    index = make_index()
+    index.add(JOBS)
+
+    results = index.search('python django developer', top_k=2)
+
+    assert ids(results) == ['j1', 'j3']
+    assert results[0][1] > results[1][1] > 0
+    assert index.search('python', min_score=0.99) == []
+
+
+def test_readding_an_id_replaces_its_row(make_index):
+    index = make_index()
+    index.add(JOBS)
+
+    index.add([('j2', 'Kubernetes platform engineer', {'id': 'j2', 'version': 2})])
+
+    assert len(index) == 3
+    assert index.search('nurse intensive care') == []
+    assert index.search('kubernetes')[0][0] == {'id': 'j2', 'version': 2}
+
+
+def test_other_instances_see_additions_and_removals(make_index):
+    writer = make_index()
+    reader = make_index()
+    writer.add(JOBS)
+
+    assert ids(reader.search('nurse')) == ['j2']
+
+    assert writer.remove(['j2', 'unknown']) == 1
+    assert reader.search('nurse') == []
+    assert len(reader) == 2
+
+
+def test_sync_touches_only_changed_items(make_index):
+    index = make_index()
+    index.add(JOBS)
+    segments = index.get_stats()['segments']
+
+    result = index.sync([JOBS[0], ('j3', JOBS[2][1], {'id': 'j3', 'remote': True})])
+
+    assert result == {'added': 1, 'removed': 1, 'unchanged': 1}
+    assert sorted(ids(index.search('python'))) == ['j1', 'j3']
+    assert index.get_stats()['segments'] == segments + 1
+
+
+def test_segments_are_compacted_past_the_limit(make_index):
+    index = make_index(max_segments=2)
+    for job in JOBS:
+        index.add([job])
+
+    stats = index.get_stats()
+    assert stats['segments'] == 1
+    assert stats['items'] == stats['rows'] == 3
+    assert ids(index.search('python spark airflow', top_k=1)) == ['j3']
+
+
+def test_retired_segments_outlive_the_grace_period_only(make_index, clock):
+    index = make_index(retire_grace=60)
+    index.add(JOBS[:1])
+    index.add(JOBS[1:])
+    index.compact()
+
+    retired = sorted(name for name in os.listdir(index.path) if name.startswith('seg-'))[:2]
+    assert index.get_stats()['retired_segments'] == 2
+
+    clock.advance(61)
+    index.remove(['j1'])
+
+    assert not any(os.path.exists(os.path.join(index.path, name)) for name in retired)
+    assert ids(index.search('nurse')) == ['j2']
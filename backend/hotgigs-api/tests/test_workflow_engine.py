@@ -0,0 +1,84 @@
+"""
+Tests for workflow run execution under a heartbeated lease
+"""
+import threading
+import time
+
+import pytest
+
+from src.services.workflow_automation import TaskManager, WorkflowEngine
+from src.services.workflow_store import RUN_COMPLETED, WorkflowStore
+
+
+def step(step_id: str) -> dict:
+    return {
+        'id': step_id,
+        'name': step_id,
+        'description': '',
+        'step_type': 'action',
+        'action': 'ai_analysis',
+        'conditions': {},
+        'parameters': {},
+        'next_steps': [],
+        'failure_steps': []
+    }
+
+
+@pytest.fixture
+def engine(tmp_path, clock):
+    # A 3 second lease is heartbeated every second
+    store = WorkflowStore(str(tmp_path / 'workflows.db'), lease_seconds=3)
+    store.insert_workflow({
+        'id': 'wf1',
+        'name': 'wf1',
+        'description': '',
+        'trigger_type': 'manual',
+        'trigger_conditions': {},
+        'steps': [step('slow')],
+        'status': 'active',
+        'created_by': 'u1',
+        'created_at': clock.now,
+        'execution_count': 0
+    })
+    return WorkflowEngine(TaskManager(store))
+
+
+def wait_for(condition, timeout: float = 5) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_lease_is_heartbeated_while_a_slow_step_runs(engine, clock):
+    store = engine.store
+    run_id = store.create_run('wf1', {'pending': [{'seq': 1, 'step_id': 'slow'}], 'context': {}, 'seq': 1, 'log': []})
+    run = store.claim_run('worker-a')
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_step(compiled, snapshot, step_key):
+        started.set()
+        release.wait(10)
+        return 'completed', 0.0, {'analysed': True}
+    engine._run_step = slow_step
+
+    executor = threading.Thread(target=engine.execute_run, args=(run, 'worker-a'))
+    executor.start()
+    try:
+        assert started.wait(5)
+        clock.advance(2)
+        assert wait_for(lambda: store.get_run(run_id)['lease_expires_at'] == clock.now + 3)
+
+        # Past the lease taken at claim time; the heartbeat has moved it on
+        clock.advance(2)
+        assert store.claim_run('worker-b') is None
+    finally:
+        release.set()
+        executor.join(5)
+
+    run = store.get_run(run_id)
+    assert run['status'] == RUN_COMPLETED
+    assert run['state']['context'] == {'analysed': True}
@@ -0,0 +1,174 @@
+"""
+Tests for scheduled workflow slotting, search batching and backpressure
+"""
+import pytest
+
+from src.services import workflow_scheduler
+from src.services.ai.llm_scheduler import TokenBucket
+from src.services.workflow_scheduler import WorkflowScheduler
+from src.services.workflow_store import WorkflowStore
+
+JOBS = [
+    {'id': 'j1', 'title': 'Python Engineer', 'location': 'Austin, TX', 'salary_min': 90000, 'salary_max': 120000},
+    {'id': 'j2', 'title': 'Python Developer', 'location': 'Remote', 'salary_min': 70000, 'salary_max': 80000},
+    {'id': 'j3', 'title': 'Backend Engineer', 'location': 'Austin, TX', 'salary_min': 150000, 'salary_max': 180000}
+]
+
+
+class FakeLLMScheduler:
+    def __init__(self, headroom: float = 1.0):
+        self.headroom = headroom
+
+    def get_headroom(self) -> float:
+        return self.headroom
+
+
+class FakeEngine:
+    """Records the runs the scheduler queues"""
+
+    def __init__(self, store: WorkflowStore):
+        self.store = store
+        self.runs = []
+
+    def execute_workflow(self, workflow_id, context):
+        self.runs.append((workflow_id, context))
+        return f"run_{len(self.runs)}"
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    fake = FakeLLMScheduler()
+    monkeypatch.setattr(workflow_scheduler, 'get_llm_scheduler', lambda: fake)
+    return fake
+
+
+@pytest.fixture
+def scheduler(tmp_path, clock, llm):
+    engine = FakeEngine(WorkflowStore(str(tmp_path / 'workflows.db')))
+    scheduler = WorkflowScheduler(engine, poll_interval=5)
+    scheduler.searches = []
+
+    def search(query, limit):
+        scheduler.searches.append(query)
+        return list(JOBS)
+    scheduler.search = search
+    return scheduler
+
+
+def auto_apply_workflow(workflow_id: str, keywords: str, **criteria) -> dict:
+    criteria['job_criteria'] = {'keywords': keywords}
+    return {
+        'id': workflow_id,
+        'name': workflow_id,
+        'trigger_type': 'scheduled',
+        'trigger_conditions': {'schedule': 'hourly'},
+        'steps': [{
+            'action': 'ai_analysis',
+            'parameters': {'analysis_type': 'job_search', 'criteria': criteria}
+        }],
+        'status': 'active',
+        'created_at': 0,
+        'execution_count': 0
+    }
+
+
+def add_workflows(scheduler, now: float, *workflows) -> float:
+    """Store and register workflows; returns the time by which all of them are due"""
+    due = []
+    for workflow in workflows:
+        scheduler.store.insert_workflow(workflow)
+        due.append(scheduler.register(workflow, now=now))
+    return max(due)
+
+
+def test_same_search_shares_a_slot(scheduler, clock):
+    add_workflows(
+        scheduler, clock.now,
+        auto_apply_workflow('wf1', 'Python'),
+        auto_apply_workflow('wf2', '  python '),
+        auto_apply_workflow('wf3', 'Go')
+    )
+
+    schedules = [scheduler.store.get_schedule(workflow_id) for workflow_id in ('wf1', 'wf2', 'wf3')]
+
+    assert schedules[0]['batch_key'] == schedules[1]['batch_key'] != schedules[2]['batch_key']
+    assert schedules[0]['next_run_at'] == schedules[1]['next_run_at']
+    assert all(schedule['interval_seconds'] == 3600 for schedule in schedules)
+
+
+def test_unknown_schedule_is_not_registered(scheduler):
+    workflow = auto_apply_workflow('wf1', 'Python')
+    workflow['trigger_conditions'] = {'schedule': 'fortnightly'}
+
+    assert scheduler.register(workflow) is None
+    assert scheduler.store.get_schedule('wf1') is None
+
+
+def test_tick_runs_one_search_per_batch_and_filters_per_candidate(scheduler, clock):
+    due = add_workflows(
+        scheduler, clock.now,
+        auto_apply_workflow('wf1', 'Python', preferred_locations=['austin']),
+        auto_apply_workflow('wf2', 'python', salary_range={'max': 100000}),
+        auto_apply_workflow('wf3', 'Go')
+    )
+
+    scheduler.tick(now=due)
+
+    assert len(scheduler.searches) == 2
+    contexts = {workflow_id: context for workflow_id, context in scheduler.engine.runs}
+    assert [job['id'] for job in contexts['wf1']['jobs']] == ['j1', 'j3']
+    assert [job['id'] for job in contexts['wf2']['jobs']] == ['j1', 'j2']
+    stats = scheduler.get_stats()
+    assert stats['fired'] == 3
+    assert stats['batches'] == 2
+    assert stats['coalesced_searches'] == 1
+
+
+def test_search_rate_limit_releases_unfired_batches(scheduler, clock):
+    due = add_workflows(scheduler, clock.now, auto_apply_workflow('wf1', 'Python'), auto_apply_workflow('wf2', 'Go'))
+    scheduler._search_bucket = TokenBucket(1, capacity=1)
+
+    delay = scheduler.tick(now=due)
+
+    assert delay > 0
+    assert len(scheduler.engine.runs) == 1
+    fired = scheduler.engine.runs[0][0]
+    held = 'wf2' if fired == 'wf1' else 'wf1'
+    assert scheduler.store.get_schedule(held)['next_run_at'] <= due
+    assert scheduler.store.get_schedule(fired)['next_run_at'] > due
+    assert scheduler.get_stats()['last_backpressure'] == 'search_rate_limited'
+
+
+def test_failed_search_releases_claimed_schedules(scheduler, clock):
+    due = add_workflows(scheduler, clock.now, auto_apply_workflow('wf1', 'Python'))
+
+    def failing_search(query, limit):
+        raise RuntimeError('database unavailable')
+    scheduler.search = failing_search
+
+    scheduler.tick(now=due)
+
+    assert scheduler.engine.runs == []
+    assert scheduler.store.get_schedule('wf1')['next_run_at'] <= due
+    assert scheduler.get_stats()['search_errors'] == 1
+
+
+def test_exhausted_llm_budget_holds_schedules_due(scheduler, clock, llm):
+    due = add_workflows(scheduler, clock.now, auto_apply_workflow('wf1', 'Python'))
+    llm.headroom = 0.05
+
+    assert scheduler.tick(now=due) == scheduler.backpressure_delay
+    assert scheduler.engine.runs == []
+    assert scheduler.store.get_schedule('wf1')['next_run_at'] <= due
+    assert scheduler.get_stats()['last_backpressure'] == 'llm_budget_exhausted'
+
+
+def test_inactive_workflow_is_skipped(scheduler, clock):
+    workflow = auto_apply_workflow('wf1', 'Python')
+    workflow['status'] = 'paused'
+    due = add_workflows(scheduler, clock.now, workflow)
+
+    scheduler.tick(now=due)
+
+    assert scheduler.engine.runs == []
+    assert scheduler.get_stats()['skipped'] == 1
@@ -0,0 +1,233 @@
+"""
+Tests for workflow run leases and checkpoints, task counters and schedule claims
+"""
+import pytest
+
+from src.services.workflow_store import RUN_COMPLETED, RUN_FAILED, RUN_QUEUED, RUN_RUNNING, WorkflowStore
+
+DAY = 86400
+
+
+@pytest.fixture
+def store(tmp_path, clock):
+    return WorkflowStore(str(tmp_path / 'workflows.db'), max_attempts=2, lease_seconds=60, retry_backoff=10)
+
+
+def make_workflow(workflow_id: str, created_at: float, trigger_type: str = 'manual') -> dict:
+    return {
+        'id': workflow_id,
+        'name': workflow_id,
+        'description': '',
+        'trigger_type': trigger_type,
+        'trigger_conditions': {},
+        'steps': [],
+        'status': 'active',
+        'created_by': 'u1',
+        'created_at': created_at,
+        'execution_count': 0
+    }
+
+
+def make_task(task_id: str, created_at: float, assigned_to=None, status: str = 'pending', **fields) -> dict:
+    task = {
+        'id': task_id,
+        'title': task_id,
+        'task_type': 'review',
+        'status': status,
+        'priority': 'medium',
+        'assigned_to': assigned_to,
+        'created_at': created_at,
+        'metadata': {},
+        'dependencies': [],
+        'progress': 0.0
+    }
+    task.update(fields)
+    return task
+
+
+# Runs
+
+def test_run_resumes_from_last_checkpoint_after_lease_expires(store, clock):
+    store.insert_workflow(make_workflow('wf1', clock.now))
+    run_id = store.create_run('wf1', {'pending_steps': [0, 1, 2], 'log': []})
+
+    first = store.claim_run('worker-a')
+    assert first['id'] == run_id
+    assert store.claim_run('worker-b') is None
+    assert store.checkpoint_run(run_id, 'worker-a', {'pending_steps': [1, 2], 'log': ['step 0']})
+
+    clock.advance(61)
+    resumed = store.claim_run('worker-b')
+
+    assert resumed['attempts'] == 2
+    assert resumed['state'] == {'pending_steps': [1, 2], 'log': ['step 0']}
+    assert not store.checkpoint_run(run_id, 'worker-a', {'pending_steps': [2], 'log': ['stale']})
+    assert not store.complete_run(run_id, 'worker-a', {})
+    assert store.complete_run(run_id, 'worker-b', {'pending_steps': [], 'log': ['step 0', 'step 1', 'step 2']})
+    assert store.get_run(run_id)['status'] == RUN_COMPLETED
+    assert store.get_workflow('wf1')['execution_count'] == 1
+
+
+def test_checkpoint_renews_lease(store, clock):
+    store.insert_workflow(make_workflow('wf1', clock.now))
+    run_id = store.create_run('wf1', {})
+    store.claim_run('worker-a')
+
+    clock.advance(50)
+    store.checkpoint_run(run_id, 'worker-a', {'step': 1})
+    clock.advance(50)
+
+    assert store.claim_run('worker-b') is None
+
+
+def test_heartbeat_renews_lease_only_for_its_holder(store, clock):
+    store.insert_workflow(make_workflow('wf1', clock.now))
+    run_id = store.create_run('wf1', {'step': 0})
+    store.claim_run('worker-a')
+
+    clock.advance(50)
+    assert store.heartbeat_run(run_id, 'worker-a')
+    clock.advance(50)
+    assert store.claim_run('worker-b') is None
+
+    clock.advance(11)
+    assert store.claim_run('worker-b')['state'] == {'step': 0}
+    assert not store.heartbeat_run(run_id, 'worker-a')
+
+
+def test_failed_run_backs_off_then_fails_after_max_attempts(store, clock):
+    store.insert_workflow(make_workflow('wf1', clock.now))
+    run_id = store.create_run('wf1', {})
+
+    run = store.claim_run('worker-a')
+    store.fail_run(run_id, 'worker-a', 'boom', run['attempts'])
+    assert store.get_run(run_id)['status'] == RUN_QUEUED
+    assert store.claim_run('worker-a') is None
+
+    clock.advance(10)
+    run = store.claim_run('worker-a')
+    store.fail_run(run_id, 'worker-a', 'boom again', run['attempts'])
+    assert store.get_run(run_id)['status'] == RUN_FAILED
+
+
+def test_abandoned_final_attempt_is_failed_on_claim(store, clock):
+    store.insert_workflow(make_workflow('wf1', clock.now))
+    run_id = store.create_run('wf1', {})
+    store.claim_run('worker-a')
+    clock.advance(61)
+    store.claim_run('worker-b')
+    clock.advance(61)
+
+    assert store.claim_run('worker-c') is None
+    run = store.get_run(run_id)
+    assert run['status'] == RUN_FAILED
+    assert run['error'] == 'Exceeded maximum attempts'
+    assert store.get_stats()['runs_running'] == 0
+    assert store.count_runs(RUN_RUNNING) == 0
+
+
+# Task counters
+
+def test_task_counters_follow_inserts_updates_and_deletes(store, clock):
+    store.insert_task(make_task('t1', clock.now, assigned_to='alice'))
+    store.insert_task(make_task('t2', clock.now, assigned_to='alice'))
+    store.insert_task(make_task('t3', clock.now))
+    assert store.task_counts('alice') == {'pending': 2}
+    assert store.task_counts() == {'pending': 3}
+
+    store.update_task('t1', {'status': 'completed'})
+    store.update_task('t3', {'assigned_to': 'bob'})
+    assert store.task_counts('alice') == {'pending': 1, 'completed': 1}
+    assert store.task_counts('bob') == {'pending': 1}
+    assert store.task_counts() == {'pending': 2, 'completed': 1}
+
+    store._connect().execute("DELETE FROM tasks WHERE id = ?", ('t2',))
+    assert store.task_counts('alice') == {'completed': 1}
+
+
+def test_daily_counters_move_with_reassignment(store, clock):
+    day = '2023-11-14'
+    store.insert_task(make_task('t1', clock.now, assigned_to='alice'))
+    store.insert_task(make_task('t2', clock.now + DAY, assigned_to='alice'))
+    assert store.tasks_created_on('alice', day) == 1
+
+    store.update_task('t1', {'assigned_to': 'bob'})
+    store.update_task('t1', {'status': 'in_progress'})
+
+    assert store.tasks_created_on('alice', day) == 0
+    assert store.tasks_created_on('bob', day) == 1
+    assert store.tasks_created_on('alice', '2023-11-15') == 1
+
+
+def test_counters_are_backfilled_for_stores_created_before_them(tmp_path, clock):
+    path = str(tmp_path / 'workflows.db')
+    store = WorkflowStore(path)
+    store.insert_task(make_task('t1', clock.now, assigned_to='alice'))
+    store.insert_task(make_task('t2', clock.now, assigned_to='alice', status='completed'))
+    conn = store._connect()
+    conn.executescript("""
+        DROP TRIGGER trg_tasks_insert;
+        DROP TRIGGER trg_tasks_update;
+        DROP TRIGGER trg_tasks_delete;
+        DROP TABLE task_counters;
+        DROP TABLE task_daily_counters;
+    """)
+    conn.close()
+
+    upgraded = WorkflowStore(path)
+
+    assert upgraded.task_counts('alice') == {'pending': 1, 'completed': 1}
+    assert upgraded.tasks_created_on('alice', '2023-11-14') == 2
+
+
+def test_replayed_task_insert_returns_existing_task(store, clock):
+    first = store.insert_task(make_task('t1', clock.now, assigned_to='alice', idempotency_key='run1:step2'))
+    second = store.insert_task(make_task('t2', clock.now, assigned_to='alice', idempotency_key='run1:step2'))
+
+    assert first == second == 't1'
+    assert store.task_counts('alice') == {'pending': 1}
+
+
+def test_overdue_tasks_exclude_completed(store, clock):
+    store.insert_task(make_task('t1', clock.now, due_date=clock.now - 10))
+    store.insert_task(make_task('t2', clock.now, due_date=clock.now - 20, status='completed'))
+    store.insert_task(make_task('t3', clock.now, due_date=clock.now + 10))
+
+    assert [task['id'] for task in store.find_overdue_tasks(clock.now)] == ['t1']
+    assert store.count_overdue_tasks(clock.now) == 1
+
+
+# Schedules
+
+def test_claim_due_schedules_collapses_missed_periods(store, clock):
+    store.upsert_schedule('wf1', 3600, clock.now - 3 * 3600 - 5, 'search-a')
+    store.upsert_schedule('wf2', 3600, clock.now + 100, 'search-a')
+
+    claimed = store.claim_due_schedules(clock.now, limit=10)
+
+    assert [schedule['workflow_id'] for schedule in claimed] == ['wf1']
+    assert claimed[0]['next_run_at'] == clock.now + 3600 - 5
+    assert store.get_schedule('wf1')['fire_count'] == 1
+    assert store.claim_due_schedules(clock.now, limit=10) == []
+
+
+def test_released_schedules_fire_again(store, clock):
+    due_at = clock.now - 5
+    store.upsert_schedule('wf1', 3600, due_at, 'search-a')
+    claimed = store.claim_due_schedules(clock.now, limit=10)
+
+    store.release_schedules(claimed)
+
+    schedule = store.get_schedule('wf1')
+    assert schedule['next_run_at'] == due_at
+    assert schedule['fire_count'] == 0
+    assert [s['workflow_id'] for s in store.claim_due_schedules(clock.now, limit=10)] == ['wf1']
+
+
+def test_unscheduled_workflows_are_listed_until_registered(store, clock):
+    store.insert_workflow(make_workflow('wf1', clock.now, trigger_type='scheduled'))
+    store.insert_workflow(make_workflow('wf2', clock.now, trigger_type='scheduled'))
+    store.insert_workflow(make_workflow('wf3', clock.now))
+    store.upsert_schedule('wf2', 3600, clock.now, '')
+
+    assert [workflow['id'] for workflow in store.list_unscheduled_workflows('scheduled')] == ['wf1']